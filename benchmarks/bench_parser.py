@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+記事パーサーのベンチマーク（解析速度と抽出精度）
+
+生成結果のコーパス（benchmarks/corpus/completions.jsonl）を対象に、
+行リストを作って結合し直す従来の_parse_article_contentと、オフセットで
+スライスする1パスのparse_marked_content、構造化出力用の
+parse_structured_contentを比較する。コーパスの記事を繰り返して作る
+数MBの入力でも計測し、tracemallocで解析中の最大メモリ確保量も表示する。
+
+コーパスの各行は {"name", "format": "marked" | "json", "content", "expected"} で、
+expectedは {"title": str | null, "tags": [str], "body": str}（titleがnullなら
+タイトルなしが正解）。
+
+使用方法: python benchmarks/bench_parser.py [--corpus PATH] [--sizes-mb 1,8] [--repeat N]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "python"))
+from article_generator import _parse_tags, parse_marked_content, parse_structured_content
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "corpus" / "completions.jsonl"
+
+def legacy_parse(content: str) -> tuple:
+    """従来のArticleGenerator._parse_article_content（行リストに分割して走査し、本文を結合し直す）"""
+
+    lines = content.strip().split('\n')
+    title = ""
+    tags = []
+    body = ""
+
+    # タイトルとタグを抽出
+    body_start = 0
+    for i, line in enumerate(lines):
+        if line.startswith("TITLE:"):
+            title = line.replace("TITLE:", "").strip()
+        elif line.startswith("TAGS:"):
+            tags = _parse_tags(line)
+        elif line.startswith("BODY:"):
+            body_start = i + 1
+            break
+
+    # 本文を抽出
+    if body_start > 0:
+        body = '\n'.join(lines[body_start:]).strip()
+    else:
+        body = content  # フォーマットが異なる場合は全体を本文とする
+
+    return title, tags, body
+
+PARSERS: Dict[str, Callable[[str], tuple]] = {
+    "legacy": legacy_parse,
+    "single-pass": parse_marked_content,
+    "structured": parse_structured_content
+}
+
+def load_corpus(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def scale_case(case: Dict[str, Any], size_bytes: int) -> Dict[str, Any]:
+    """記事本文を繰り返してsize_bytes程度の入力を作る（期待値も合わせて作る）"""
+    expected = case["expected"]
+    unit = expected["body"] + "\n\n"
+    body = (unit * (size_bytes // len(unit.encode("utf-8")) + 1)).strip()
+    if case["format"] == "json":
+        content = json.dumps({"title": expected["title"], "tags": expected["tags"], "body": body}, ensure_ascii=False)
+    elif expected["title"] is None:
+        content = body
+    else:
+        content = f"TITLE: {expected['title']}\nTAGS: [{', '.join(expected['tags'])}]\nBODY:\n{body}\n"
+    size_mb = size_bytes / 1_000_000
+    return {
+        "name": f"{case['name']}@{size_mb:g}MB",
+        "format": case["format"],
+        "content": content,
+        "expected": dict(expected, body=body)
+    }
+
+def is_correct(result: tuple, expected: Dict[str, Any]) -> bool:
+    title, tags, body = result
+    return (
+        title == (expected["title"] or "")
+        and [tag["name"] for tag in tags] == expected["tags"]
+        and body == expected["body"]
+    )
+
+def run_parser(parser: Callable[[str], tuple], content: str) -> Any:
+    try:
+        return parser(content)
+    except ValueError:
+        return None
+
+def applicable(parser_name: str, case: Dict[str, Any]) -> bool:
+    return (parser_name == "structured") == (case["format"] == "json")
+
+def measure(parser: Callable[[str], tuple], content: str, repeat: int) -> float:
+    """1回あたりの解析時間（repeat回の最小値、秒）"""
+    return min(timeit.repeat(lambda: run_parser(parser, content), number=1, repeat=repeat))
+
+def peak_memory(parser: Callable[[str], tuple], content: str) -> int:
+    tracemalloc.start()
+    run_parser(parser, content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description="記事パーサーのベンチマーク（解析速度と抽出精度）")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help=f"コーパス (デフォルト: {DEFAULT_CORPUS})")
+    parser.add_argument("--sizes-mb", default="1,8", help="大きな入力のサイズ（MB、カンマ区切り、デフォルト: 1,8）")
+    parser.add_argument("--repeat", type=int, default=20, help="計測の繰り返し回数 (デフォルト: 20)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.corpus))
+    sizes = [int(float(size) * 1_000_000) for size in args.sizes_mb.split(",") if size]
+    # マーカーあり・マーカーなし（全体を走査する）・JSONの代表例を大きくする
+    samples = [
+        next(c for c in corpus if c["format"] == "marked" and c["expected"]["title"] is not None),
+        next(c for c in corpus if c["format"] == "marked" and c["expected"]["title"] is None),
+        next(c for c in corpus if c["format"] == "json")
+    ]
+    large = [scale_case(case, size) for case in samples for size in sizes]
+
+    print("📊 記事パーサーベンチマーク")
+    print(f"   コーパス: {args.corpus} ({len(corpus)}件)")
+    print()
+
+    # 抽出精度（マーカー形式はlegacy/single-pass、JSONはstructuredで評価）
+    print("🎯 抽出精度")
+    for name, parse in PARSERS.items():
+        cases = [case for case in corpus if applicable(name, case)]
+        failed = [
+            case["name"] for case in cases
+            if not is_correct(run_parser(parse, case["content"]) or ("", [], None), case["expected"])
+        ]
+        print(f"   {name:<12} {len(cases) - len(failed)}/{len(cases)}" + (f"  不一致: {', '.join(failed)}" if failed else ""))
+    agree = all(
+        legacy_parse(case["content"]) == parse_marked_content(case["content"])
+        for case in corpus + large if case["format"] == "marked"
+    )
+    print(f"   legacyとsingle-passの結果一致: {'OK' if agree else 'NG'}")
+    print()
+
+    # コーパス全体の解析速度
+    print("⏱️  解析速度（コーパス全体）")
+    for name, parse in PARSERS.items():
+        contents = [case["content"] for case in corpus if applicable(name, case)]
+        seconds = min(timeit.repeat(lambda: [run_parser(parse, c) for c in contents], number=100, repeat=5)) / 100
+        print(f"   {name:<12} {seconds / len(contents) * 1e6:8.2f}µs/記事")
+    print()
+
+    # 大きな入力（最小時間・スループット・最大メモリ確保量）
+    print("📦 大きな入力")
+    print(f"   {'入力':<28}{'パーサー':<14}{'時間(ms)':>10}{'MB/s':>10}{'peak(MB)':>10}")
+    for case in large:
+        size_mb = len(case["content"].encode("utf-8")) / 1_000_000
+        for name, parse in PARSERS.items():
+            if not applicable(name, case):
+                continue
+            seconds = measure(parse, case["content"], args.repeat)
+            peak = peak_memory(parse, case["content"]) / 1_000_000
+            ok = "" if is_correct(run_parser(parse, case["content"]), case["expected"]) else "  ❌"
+            print(f"   {case['name']:<28}{name:<14}{seconds * 1e3:>10.2f}{size_mb / seconds:>10.0f}{peak:>10.2f}{ok}")
+
+if __name__ == "__main__":
+    main()
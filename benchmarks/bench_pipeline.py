@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+generate_and_publish.py のエンドツーエンド負荷ベンチマーク
+
+benchmarks/mock_servers.py のOpenAI / Qiita代替サーバーを起動し、
+generate_and_publish.py --batch（生成 → JSON → 投稿）を並行数を変えて実行する。
+記事ごとのレイテンシ（最初の生成リクエストから投稿完了まで）のp50/p95/p99と、
+1分あたりの記事数を表示する。
+
+投稿はElixir（publish_to_qiita.sh、またはQIITA_PUBLISHER_PORTの常駐デーモン）を
+経由するため、Elixirの実行環境が必要。--generate-onlyでは生成のみを計測する。
+
+使用方法: python benchmarks/bench_pipeline.py [--articles 20] [--concurrency 1,2,4,8] [--generate-only] ...
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT / "python"))
+sys.path.append(str(Path(__file__).resolve().parent))
+from generation_metrics import _percentile
+from mock_servers import MockConfig, MockOpenAIServer, MockQiitaServer
+
+def run_level(args, concurrency: int, openai_server: MockOpenAIServer, qiita_server: MockQiitaServer) -> Dict:
+    """1つの並行数でバッチを実行し、集計結果を返す"""
+    openai_server.reset()
+    qiita_server.reset()
+
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+        tmp = Path(tmp)
+        topics = [f"負荷テスト{concurrency}-{i:03d}" for i in range(args.articles)]
+        manifest = tmp / "manifest.jsonl"
+        manifest.write_text(
+            "".join(json.dumps({"topic": t, "template": args.template}, ensure_ascii=False) + "\n" for t in topics),
+            encoding="utf-8"
+        )
+
+        command = [
+            sys.executable, str(PROJECT_ROOT / "generate_and_publish.py"),
+            "--batch", str(manifest),
+            "--concurrency", str(concurrency),
+            "--no-cache",
+            "--spool-dir", str(tmp / "spool"),
+            "--metrics-log", str(tmp / "metrics.jsonl")
+        ] + (["--generate-only"] if args.generate_only else []) + args.extra
+
+        env = dict(
+            os.environ,
+            OPENAI_BASE_URL=openai_server.base_url,
+            OPENAI_API_KEY="mock",
+            QIITA_API_BASE_URL=qiita_server.base_url,
+            QIITA_ACCESS_TOKEN="mock"
+        )
+        if not args.daemon:
+            env.pop("QIITA_PUBLISHER_PORT", None)
+
+        started_at = time.time()
+        result = subprocess.run(command, env=env, cwd=PROJECT_ROOT, capture_output=True, text=True)
+        wall = time.time() - started_at
+
+    if result.returncode != 0:
+        print(result.stdout[-2000:])
+        print(result.stderr[-2000:])
+
+    # トピックごとの最初の生成リクエスト開始〜完了（投稿あり: 投稿完了）を記事のレイテンシとする
+    generated: Dict[str, List[float]] = {}
+    for event in openai_server.events:
+        span = generated.setdefault(event.key, [event.started_at, event.finished_at])
+        span[0] = min(span[0], event.started_at)
+        span[1] = max(span[1], event.finished_at)
+    published = {e.key: e.finished_at for e in qiita_server.events if e.status == 201}
+
+    latencies = []
+    for topic in topics:
+        if topic not in generated:
+            continue
+        if args.generate_only:
+            latencies.append(generated[topic][1] - generated[topic][0])
+        elif topic in published:
+            latencies.append(published[topic] - generated[topic][0])
+
+    events = openai_server.events + qiita_server.events
+    return {
+        "concurrency": concurrency,
+        "articles": args.articles,
+        "completed": len(latencies),
+        "wall_seconds": wall,
+        "articles_per_minute": len(latencies) / wall * 60 if wall else 0.0,
+        "p50": _percentile(latencies, 0.5),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+        "openai_requests": len(openai_server.events),
+        "qiita_requests": len(qiita_server.events),
+        "rate_limited": sum(1 for e in events if e.status == 429),
+        "server_errors": sum(1 for e in events if e.status >= 500),
+        "exit_code": result.returncode
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="generate_and_publish.pyのエンドツーエンド負荷ベンチマーク")
+    parser.add_argument("--articles", type=int, default=20, help="並行数ごとの記事数 (デフォルト: 20)")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="並行数（カンマ区切り、デフォルト: 1,2,4,8）")
+    parser.add_argument("--template", default="tips", help="マニフェストのテンプレート (デフォルト: tips)")
+    parser.add_argument("--latency", type=float, default=0.5, help="OpenAIの平均レイテンシ（秒）")
+    parser.add_argument("--qiita-latency", type=float, default=0.1, help="Qiitaの平均レイテンシ（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500を返す割合")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429を返す割合")
+    parser.add_argument("--qiita-quota", type=int, default=0, help="Qiitaのウィンドウあたり投稿数上限（0なら無制限）")
+    parser.add_argument("--qiita-window", type=float, default=60.0, help="Qiitaの上限のウィンドウ（秒）")
+    parser.add_argument("--completion-chars", type=int, default=3000, help="生成する本文の文字数")
+    parser.add_argument("--seed", type=int, default=1, help="乱数シード")
+    parser.add_argument("--generate-only", action="store_true", help="生成のみ計測（Elixir不要）")
+    parser.add_argument("--daemon", action="store_true", help="QIITA_PUBLISHER_PORTの投稿デーモンを使用")
+    parser.add_argument("--output", help="結果をJSONで保存するパス")
+    parser.add_argument("extra", nargs="*", help="generate_and_publish.pyへの追加引数（-- の後に指定）")
+    args = parser.parse_args()
+
+    common = dict(error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    openai_server = MockOpenAIServer(
+        MockConfig(latency=args.latency, completion_chars=args.completion_chars, **common)
+    ).start()
+    qiita_server = MockQiitaServer(
+        MockConfig(latency=args.qiita_latency, quota=args.qiita_quota, quota_window=args.qiita_window, **common)
+    ).start()
+
+    print("📊 パイプライン負荷ベンチマーク")
+    print(f"   OpenAI: {openai_server.base_url} (レイテンシ {args.latency}s)")
+    print(f"   Qiita:  {qiita_server.base_url} (レイテンシ {args.qiita_latency}s)")
+    print(f"   エラー率 {args.error_rate:.0%} / 429 {args.rate_limit_rate:.0%} / 記事数 {args.articles}")
+    print()
+
+    header = f"{'並行数':>6}{'完了':>8}{'所要(s)':>10}{'記事/分':>10}{'p50(s)':>9}{'p95(s)':>9}{'p99(s)':>9}" \
+             f"{'API呼出':>9}{'429':>6}{'5xx':>6}"
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    try:
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c]:
+            r = run_level(args, concurrency, openai_server, qiita_server)
+            results.append(r)
+            print(
+                f"{r['concurrency']:>6}{r['completed']:>5}/{r['articles']:<3}{r['wall_seconds']:>9.1f}"
+                f"{r['articles_per_minute']:>10.1f}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}"
+                f"{r['openai_requests'] + r['qiita_requests']:>9}{r['rate_limited']:>6}{r['server_errors']:>6}"
+                + ("  ⚠️ 異常終了" if r["exit_code"] else "")
+            )
+    finally:
+        openai_server.stop()
+        qiita_server.stop()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 結果を {args.output} に保存しました")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+プロンプト組み立てのマイクロベンチマーク
+
+事前コンパイル済みテンプレート（TemplateRegistry.render_prompt）と、
+呼び出しごとに長さガイド・テンプレート指示の辞書とf文字列を組み立て直す
+従来方式の出力が一致すること、プロンプトの固定部分が呼び出し間でバイト単位で
+同一であることを確認し、固定部分（システムプロンプト＋テンプレートの指示）の大きさを表示する。
+
+1回の組み立ては数µsで、両方式の差は計測ごとのばらつき（0.95〜1.65倍程度）に埋もれる。
+所要時間は参考値として表示するだけで、速度の改善は主張しない。
+
+使用方法: python benchmarks/bench_prompt_build.py [--iterations N]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "python"))
+from prompt_templates import TemplateRegistry, get_registry
+from rate_limiter import estimate_tokens
+
+# OpenAIのプロンプトキャッシュが効く一致部分の下限（トークン）
+CACHE_MIN_TOKENS = 1024
+
+def legacy_build_prompt(
+    topic: str, 
+    target_audience: str, 
+    article_length: str,
+    programming_language: Optional[str],
+    template_style: Optional[str] = None
+) -> str:
+    """従来のArticleGenerator._build_prompt（呼び出しごとに辞書とf文字列を組み立てる）"""
+    
+    length_guide = {
+        "短い": "1000-1500文字程度（基本的な説明と簡単な例）",
+        "中程度": "2000-3000文字程度（詳細な説明と複数の例）", 
+        "長い": "3500-5000文字程度（網羅的な説明と実践的な例）"
+    }
+    
+    # テンプレート別の追加指示
+    template_instructions = {
+        "tutorial": """
+【チュートリアル記事の特別要件】:
+- 初心者でも理解できる段階的な説明
+- 各ステップを明確に分けて解説
+- 「なぜこの手順が必要か」の理由も説明
+- 実際に手を動かして学べる構成
+- つまずきやすいポイントの事前説明""",
+        
+        "tips": """
+【Tips記事の特別要件】:
+- すぐに実践で使える小技やテクニック
+- 「知っていると便利」な情報を中心に
+- 短時間で読めて即座に活用できる内容
+- 具体的な使用場面の提示
+- 他の方法との比較があると良い""",
+        
+        "deep-dive": """
+【深掘り記事の特別要件】:
+- 技術の内部動作や仕組みの詳細解説
+- 上級者向けの高度な内容
+- 理論的背景と実装の両方をカバー
+- パフォーマンスやセキュリティの考慮
+- 実際のプロダクションでの使用例""",
+        
+        "comparison": """
+【比較記事の特別要件】:
+- 複数の技術・手法の客観的な比較
+- それぞれのメリット・デメリット
+- 使用場面に応じた選択指針
+- 実際のコード例での性能比較
+- 導入コストや学習コストの考慮""",
+        
+        "troubleshooting": """
+【トラブルシューティング記事の特別要件】:
+- よくある問題とその解決方法
+- エラーメッセージの読み方と対処法
+- 問題の原因分析のアプローチ
+- 予防策や回避方法の提示
+- デバッグのコツやツールの紹介"""
+    }
+    
+    # テンプレート固有の指示を先頭に置く（共通の要件はシステムプロンプト側）
+    prompt = template_instructions.get(template_style, "") if template_style else ""
+    
+    prompt += f"""
+以下の条件で技術記事を作成してください：
+
+【記事の基本情報】:
+- トピック: {topic}
+- 対象読者: {target_audience}
+- 記事の長さ: {length_guide.get(article_length, "2000-3000文字程度")}
+"""
+
+    if programming_language:
+        prompt += f"- 主要プログラミング言語: {programming_language}\n"
+    
+    prompt += f"""
+【対象読者: {target_audience}】に合わせた難易度で執筆してください。
+"""
+
+    return prompt
+
+def main():
+    parser = argparse.ArgumentParser(description="プロンプト組み立てのマイクロベンチマーク")
+    parser.add_argument("--iterations", type=int, default=200_000, help="計測回数 (デフォルト: 200000)")
+    args = parser.parse_args()
+
+    args_list = [
+        ("ElixirのGenServerの使い方", "Elixir初心者", "長い", "Elixir", "tutorial"),
+        ("React Hooksの活用法", "中級エンジニア", "中程度", "JavaScript", "tips"),
+        ("Docker Composeでよくあるエラー", "DevOpsエンジニア", "短い", None, "troubleshooting"),
+    ]
+
+    load_seconds = timeit.timeit(TemplateRegistry.load, number=100) / 100
+    registry = get_registry()
+
+    def run_registry():
+        for call_args in args_list:
+            registry.render_prompt(*call_args)
+
+    def run_legacy():
+        for call_args in args_list:
+            legacy_build_prompt(*call_args)
+
+    calls = args.iterations * len(args_list)
+    registry_seconds = timeit.timeit(run_registry, number=args.iterations)
+    legacy_seconds = timeit.timeit(run_legacy, number=args.iterations)
+
+    # 従来方式との出力一致
+    identical = all(registry.render_prompt(*call_args) == legacy_build_prompt(*call_args) for call_args in args_list)
+
+    # 固定部分の同一性（テンプレートが同じなら、トピック直前までは同一バイト列）
+    prefixes = {registry.render_prompt(topic, "読者", "中程度", template_style="tips").split(topic, 1)[0]
+                for topic in ("A", "B", "C")}
+
+    # 固定部分（システムプロンプト＋トピック直前まで）の大きさ
+    from article_generator import SYSTEM_PROMPT
+    static = SYSTEM_PROMPT + next(iter(prefixes))
+    static_tokens = estimate_tokens([{"content": static}], 0)
+
+    print("📊 プロンプト組み立てベンチマーク")
+    print(f"   レジストリ読み込み・検証: {load_seconds * 1e6:.1f}µs（プロセスごとに1回）")
+    # 差は計測のばらつきの範囲に収まるため、比は表示しない
+    print(f"   事前コンパイル済み（参考値）: {registry_seconds / calls * 1e6:.2f}µs/prompt")
+    print(f"   従来方式（参考値）: {legacy_seconds / calls * 1e6:.2f}µs/prompt")
+    print(f"   従来方式との出力一致: {'OK' if identical else 'NG'}")
+    print(f"   固定部分のバイト列一致: {'OK' if len(prefixes) == 1 else 'NG'}")
+    # estimate_tokensは上限の確保用に多めに見積もるため、実際のトークン数はこれより少ない
+    print(f"   固定部分の大きさ: {len(static):,}文字 / 見積もり{static_tokens:,}トークン "
+          f"（多めの見積もり。キャッシュの対象は{CACHE_MIN_TOKENS}トークン以上の一致から）")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+generate_and_publish.py の起動時間ベンチマーク（回帰チェックつき）
+
+OpenAI APIを呼ばない起動パス（--help、投稿待ちのない --publish-only）を
+`python -X importtime` で繰り返し実行し、プロセス全体の所要時間とインポート時間の
+中央値、インポート時間の大きいモジュールを表示する。
+
+インポート時間が予算（--budget-ms）を超えた場合、または重いモジュール
+（openai / httpx / pydantic）が読み込まれた場合は終了コード1で終了するため、
+CIで起動時間の回帰を検出できる。
+
+使用方法: python benchmarks/bench_startup.py [--runs 10] [--budget-ms 150] [--top 8]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = PROJECT_ROOT / "generate_and_publish.py"
+
+# 生成しない起動パスで読み込んではいけないモジュール
+FORBIDDEN_MODULES = ("openai", "httpx", "pydantic")
+DEFAULT_BUDGET_MS = 150.0
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """-X importtime の出力を (モジュール名, 自身の時間[us], 累積時間[us]) のリストに変換"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return entries
+
+def run_once(args: List[str], env: Dict[str, str]) -> Tuple[float, List[Tuple[str, int, int]], int]:
+    """1回起動し、(所要時間[秒], インポートの記録, 終了コード)を返す"""
+    started_at = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", str(SCRIPT)] + args,
+                            env=env, capture_output=True, text=True, cwd=str(PROJECT_ROOT))
+    return time.perf_counter() - started_at, parse_importtime(result.stderr), result.returncode
+
+def measure(name: str, args: List[str], env: Dict[str, str], runs: int, top: int) -> Dict:
+    """起動パスをruns回実行して集計"""
+    walls, imports, loaded = [], [], set()
+    cumulative: Dict[str, List[int]] = {}
+    failures = 0
+    for _ in range(runs):
+        wall, entries, returncode = run_once(args, env)
+        failures += returncode != 0
+        walls.append(wall)
+        # トップレベル（インデントが1段）のエントリの累積時間の合計がインポート時間の合計
+        imports.append(sum(c for module, _, c in entries if not module.startswith("  ")) / 1000)
+        for module, _, c in entries:
+            loaded.add(module.strip())
+            if not module.startswith("  "):
+                cumulative.setdefault(module.strip(), []).append(c)
+
+    heaviest = sorted(((statistics.median(v) / 1000, m) for m, v in cumulative.items()), reverse=True)[:top]
+    forbidden = sorted(m for m in loaded if m in FORBIDDEN_MODULES)
+    return {
+        "name": name,
+        "wall_ms": statistics.median(walls) * 1000,
+        "import_ms": statistics.median(imports),
+        "heaviest": heaviest,
+        "forbidden": forbidden,
+        "failures": failures
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="generate_and_publish.py の起動時間ベンチマーク")
+    parser.add_argument("--runs", type=int, default=10, help="起動パスごとの実行回数 (デフォルト: 10)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"インポート時間の予算（ミリ秒、中央値。デフォルト: {DEFAULT_BUDGET_MS:g}）")
+    parser.add_argument("--top", type=int, default=8, help="表示するモジュール数 (デフォルト: 8)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        env = dict(os.environ)
+        env.pop("QIITA_PUBLISHER_PORT", None)
+        scenarios = [
+            ("--help", ["--help"]),
+            ("--publish-only (投稿待ちなし)", ["--publish-only", "--spool-dir", str(Path(tmp) / "spool")])
+        ]
+        # 1回目はバイトコードのコンパイルを含むため計測しない
+        for _, scenario_args in scenarios:
+            run_once(scenario_args, env)
+
+        print(f"🚀 起動時間ベンチマーク ({args.runs}回の中央値, 予算: インポート {args.budget_ms:g}ms)")
+        ok = True
+        for name, scenario_args in scenarios:
+            result = measure(name, scenario_args, env, args.runs, args.top)
+            print(f"\n{name}")
+            print(f"   所要時間: {result['wall_ms']:.1f}ms / インポート: {result['import_ms']:.1f}ms")
+            for ms, module in result["heaviest"]:
+                print(f"   {ms:8.1f}ms  {module}")
+            if result["failures"]:
+                print(f"   ❌ 終了コードが0以外: {result['failures']}/{args.runs}回")
+                ok = False
+            if result["forbidden"]:
+                print(f"   ❌ 読み込むべきでないモジュール: {result['forbidden']}")
+                ok = False
+            if result["import_ms"] > args.budget_ms:
+                print(f"   ❌ インポート時間が予算を超えています: {result['import_ms']:.1f}ms > {args.budget_ms:g}ms")
+                ok = False
+
+    print("\n✅ 予算内です" if ok else "\n❌ 起動時間の回帰があります")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+OpenAI Chat Completions / Qiita API のローカル代替サーバー
+
+ネットワークやAPIキーなしでパイプライン全体を動かし、性能を計測するための
+モックサーバー。レイテンシ、エラー率、429（レート制限）、本文の途中切れ（finish_reason: length）の
+発生を設定できる。
+
+- OpenAI: POST /v1/chat/completions（stream / response_format / n に対応）
+          POST /v1/files, GET /v1/files/:id/content, POST /v1/batches, GET /v1/batches/:id（Batch API）
+- Qiita:  POST /api/v2/items, GET/PATCH /api/v2/items/:id, GET /api/v2/authenticated_user/items
+          （Rate-Limit / Rate-Remaining / Rate-Reset ヘッダーつき）
+
+接続先は環境変数で切り替える:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    QIITA_API_BASE_URL=http://127.0.0.1:8200/api/v2
+
+使用方法: python benchmarks/mock_servers.py [--openai-port 8100] [--qiita-port 8200] [--latency 0.5] ...
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from email import policy as email_policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+TOPIC_PATTERN = re.compile(r"- トピック: (.*)")
+SECTION_PATTERN = re.compile(r"- セクション: \d+\. (.*)")
+
+@dataclass
+class MockConfig:
+    """モックサーバーの挙動"""
+    latency: float = 0.5          # 1リクエストの平均レイテンシ（秒）
+    jitter: float = 0.2           # レイテンシのばらつき（平均に対する割合）
+    error_rate: float = 0.0       # 500を返す割合
+    rate_limit_rate: float = 0.0  # 429を返す割合
+    completion_chars: int = 3000  # OpenAIが返す本文の文字数
+    quota: int = 0                # Qiita: ウィンドウあたりの投稿数上限（0なら無制限）
+    quota_window: float = 60.0    # Qiita: 上限のウィンドウ（秒）
+    batch_latency: float = 1.0    # OpenAI: バッチが完了するまでの時間（秒）
+    rpm: int = 0                  # OpenAI: 1分あたりのリクエスト数上限（0なら無制限。超過分は429）
+    truncation_rate: float = 0.0  # OpenAI: 本文を途中で切り、finish_reason: lengthを返す割合
+    seed: Optional[int] = None
+
+    def sample_latency(self, rng: random.Random) -> float:
+        return max(0.0, self.latency * (1 + rng.uniform(-self.jitter, self.jitter)))
+
+@dataclass
+class MockEvent:
+    """モックサーバーが処理した1リクエスト"""
+    api: str
+    key: str                      # OpenAI: トピック / Qiita: 記事タイトル
+    status: int
+    started_at: float
+    finished_at: float = 0.0
+    kind: str = ""
+
+class MockServer:
+    """ThreadingHTTPServerをバックグラウンドスレッドで動かすモックサーバーの基底クラス"""
+
+    api = ""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.events: List[MockEvent] = []
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        raise NotImplementedError
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset(self) -> None:
+        """記録したイベントを消去"""
+        with self._lock:
+            self.events = []
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _latency(self) -> float:
+        with self._lock:
+            return self.config.sample_latency(self._rng)
+
+    def _record(self, event: MockEvent) -> None:
+        event.finished_at = time.time()
+        with self._lock:
+            self.events.append(event)
+
+    def _fault(self) -> Optional[int]:
+        """設定された割合で429/500を返す"""
+        roll = self._random()
+        if roll < self.config.rate_limit_rate:
+            return 429
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle(self, "GET")
+
+            def do_POST(self):
+                server.handle(self, "POST")
+
+            def do_PATCH(self):
+                server.handle(self, "PATCH")
+
+            def read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length)
+
+            def read_json(self) -> Any:
+                return json.loads(self.read_body() or b"{}")
+
+            def send_bytes(self, status: int, body: bytes, content_type: str = "application/octet-stream"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, request, method: str) -> None:
+        raise NotImplementedError
+
+class MockOpenAIServer(MockServer):
+    """
+    Chat Completions APIの代替（本文はTITLE:/TAGS:/BODY:形式、またはresponse_formatのJSON）
+
+    Batch APIはアップロードされたJSONLの各リクエストをbatch_latency秒後にまとめて処理し、
+    結果を出力ファイル（成功）とエラーファイル（error_rate / rate_limit_rateで失敗させた分）に書く。
+    """
+
+    api = "openai"
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(config, host, port)
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._recent: List[float] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self.files = {}
+            self.batches = {}
+            self._recent = []
+
+    def handle(self, request, method: str) -> None:
+        path = request.path.split("?", 1)[0].rstrip("/")
+        file_match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        batch_match = re.fullmatch(r"/v1/batches/([^/]+)", path)
+        if method == "POST" and path == "/v1/chat/completions":
+            self._chat(request)
+        elif method == "POST" and path == "/v1/files":
+            self._upload(request)
+        elif method == "GET" and file_match and file_match.group(1) in self.files:
+            request.send_bytes(200, self.files[file_match.group(1)], "application/jsonl")
+        elif method == "POST" and path == "/v1/batches":
+            self._create_batch(request)
+        elif method == "GET" and batch_match and batch_match.group(1) in self.batches:
+            with self._lock:
+                request.send_json(200, dict(self.batches[batch_match.group(1)]))
+        else:
+            request.send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+
+    def _chat(self, request) -> None:
+        started_at = time.time()
+        payload = request.read_json()
+        prompt = payload["messages"][-1]["content"]
+        topic = self._topic(prompt)
+        event = MockEvent(api=self.api, key=topic, status=200, started_at=started_at)
+
+        time.sleep(self._latency() * (0.2 if payload.get("stream") else 1.0))
+
+        allowed, headers = self._take_request()
+        fault = self._fault() if allowed else 429
+        if fault:
+            event.status = fault
+            self._record(event)
+            error_type = "rate_limit_exceeded" if fault == 429 else "server_error"
+            if fault == 429:
+                headers.setdefault("retry-after", "1")
+            request.send_json(fault, {"error": {"message": f"mock {error_type}", "type": error_type}}, headers)
+            return
+
+        event.kind = self._kind(payload, prompt)
+        completion = self._completion(payload, event.kind, topic, prompt, started_at)
+
+        if payload.get("stream"):
+            choice = completion["choices"][0]
+            self._stream(request, payload, choice["message"]["content"], completion["usage"], choice["finish_reason"])
+        else:
+            request.send_json(200, completion, headers)
+        self._record(event)
+
+    def _take_request(self) -> tuple:
+        """rpmの直近1分の枠を消費し、(許可されたか, x-ratelimit-*ヘッダー)を返す"""
+        if not self.config.rpm:
+            return True, {}
+        with self._lock:
+            now = time.time()
+            self._recent = [t for t in self._recent if now - t < 60.0]
+            allowed = len(self._recent) < self.config.rpm
+            if allowed:
+                self._recent.append(now)
+            reset = 60.0 - (now - self._recent[0]) if self._recent else 0.0
+            headers = {
+                "x-ratelimit-limit-requests": str(self.config.rpm),
+                "x-ratelimit-remaining-requests": str(self.config.rpm - len(self._recent)),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s"
+            }
+            if not allowed:
+                headers["retry-after"] = f"{reset:.3f}"
+        return allowed, headers
+
+    @staticmethod
+    def _topic(prompt: str) -> str:
+        topic_match = TOPIC_PATTERN.search(prompt)
+        return topic_match.group(1).strip() if topic_match else "topic"
+
+    def _completion(self, payload: Dict[str, Any], kind: str, topic: str, prompt: str, created: float) -> Dict[str, Any]:
+        """chat.completionのレスポンス本体"""
+        choices = [self._choice(self._content(kind, topic, prompt)) for _ in range(int(payload.get("n") or 1))]
+        contents = [c for c, _ in choices]
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(created),
+            "model": payload.get("model", "mock"),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": c}, "finish_reason": finish_reason}
+                for i, (c, finish_reason) in enumerate(choices)
+            ],
+            "usage": {
+                "prompt_tokens": len(prompt) // 2,
+                "completion_tokens": sum(len(c) for c in contents) // 2,
+                "total_tokens": (len(prompt) + sum(len(c) for c in contents)) // 2
+            }
+        }
+
+    def _choice(self, content: str) -> tuple:
+        """truncation_rateの割合で本文を途中（コードブロックの中など）で切り、(本文, finish_reason)を返す"""
+        if self._random() < self.config.truncation_rate:
+            return content[:len(content) * 2 // 3], "length"
+        return content, "stop"
+
+    def _upload(self, request) -> None:
+        """multipart/form-dataのファイルを保存"""
+        message = BytesParser(policy=email_policy.HTTP).parsebytes(
+            f"Content-Type: {request.headers.get('Content-Type')}\r\n\r\n".encode("latin-1") + request.read_body()
+        )
+        fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+        if "file" not in fields:
+            request.send_json(400, {"error": {"message": "file is required", "type": "invalid_request_error"}})
+            return
+        content = fields["file"].get_payload(decode=True)
+        file_id = self._store_file(content)
+        request.send_json(200, {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": fields["file"].get_filename() or "upload.jsonl",
+            "purpose": fields["purpose"].get_content().strip() if "purpose" in fields else "batch",
+            "status": "processed"
+        })
+
+    def _store_file(self, content: bytes) -> str:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self._lock:
+            self.files[file_id] = content
+        return file_id
+
+    def _create_batch(self, request) -> None:
+        payload = request.read_json()
+        if payload.get("input_file_id") not in self.files:
+            request.send_json(400, {"error": {"message": "input file not found", "type": "invalid_request_error"}})
+            return
+        lines = [json.loads(line) for line in self.files[payload["input_file_id"]].splitlines() if line.strip()]
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}", "object": "batch", "endpoint": payload.get("endpoint"),
+            "errors": None, "input_file_id": payload["input_file_id"],
+            "completion_window": payload.get("completion_window", "24h"), "status": "validating",
+            "output_file_id": None, "error_file_id": None, "created_at": int(time.time()),
+            "in_progress_at": None, "completed_at": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": payload.get("metadata")
+        }
+        with self._lock:
+            self.batches[batch["id"]] = batch
+        threading.Thread(target=self._run_batch, args=(batch["id"], lines), daemon=True).start()
+        request.send_json(200, dict(batch))
+
+    def _run_batch(self, batch_id: str, lines: List[Dict[str, Any]]) -> None:
+        """バッチのリクエストを処理し、出力ファイルとエラーファイルを作る"""
+        batch = self.batches[batch_id]
+        with self._lock:
+            batch.update(status="in_progress", in_progress_at=int(time.time()))
+        time.sleep(self.config.batch_latency)
+
+        outputs, errors = [], []
+        for line in lines:
+            started_at = time.time()
+            payload = line["body"]
+            prompt = payload["messages"][-1]["content"]
+            event = MockEvent(api=self.api, key=self._topic(prompt), status=200, started_at=started_at,
+                              kind="batch")
+            fault = self._fault()
+            if fault:
+                event.status = fault
+                errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line["custom_id"],
+                               "response": {"status_code": fault, "body": {"error": {"message": "mock error"}}},
+                               "error": None})
+            else:
+                event.kind = f"batch:{self._kind(payload, prompt)}"
+                body = self._completion(payload, event.kind[6:], event.key, prompt, started_at)
+                outputs.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line["custom_id"],
+                                "response": {"status_code": 200, "body": body}, "error": None})
+            self._record(event)
+
+        def to_file(records: List[Dict[str, Any]]) -> Optional[str]:
+            if not records:
+                return None
+            return self._store_file("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8"))
+
+        output_file_id, error_file_id = to_file(outputs), to_file(errors)
+        with self._lock:
+            batch.update(status="completed", completed_at=int(time.time()), output_file_id=output_file_id,
+                         error_file_id=error_file_id,
+                         request_counts={"total": len(lines), "completed": len(outputs), "failed": len(errors)})
+
+    @staticmethod
+    def _kind(payload: Dict[str, Any], prompt: str) -> str:
+        schema = (payload.get("response_format") or {}).get("json_schema") or {}
+        if schema.get("name") == "qiita_article_outline":
+            return "outline"
+        if schema.get("name") == "qiita_article":
+            return "json"
+        if SECTION_PATTERN.search(prompt):
+            return "section"
+        return "marked"
+
+    def _content(self, kind: str, topic: str, prompt: str) -> str:
+        if kind == "outline":
+            return json.dumps({
+                "title": topic,
+                "tags": ["Mock", "Benchmark"],
+                "sections": [{"heading": h, "points": ["要点"]} for h in ("はじめに", "仕組み", "実践", "まとめ")]
+            }, ensure_ascii=False)
+        if kind == "section":
+            return self._body(SECTION_PATTERN.search(prompt).group(1), self.config.completion_chars // 4)
+        body = self._body(topic, self.config.completion_chars)
+        if kind == "json":
+            return json.dumps({"title": topic, "tags": ["Mock", "Benchmark"], "body": body}, ensure_ascii=False)
+        return f"TITLE: {topic}\nTAGS: [Mock, Benchmark]\nBODY:\n{body}"
+
+    @staticmethod
+    def _body(topic: str, chars: int) -> str:
+        unit = (
+            f"## {topic}のポイント\n\n{topic}について、実際のコードで確認します。\n\n"
+            "```python\n# モックサーバーが生成したサンプルコード\nprint(\"hello\")\n```\n\n"
+        )
+        return (unit * (chars // len(unit) + 1))[:chars].rsplit("\n\n", 1)[0]
+
+    def _stream(self, request, payload: Dict[str, Any], content: str, usage: Dict[str, int],
+                finish_reason: str = "stop") -> None:
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.send_header("Transfer-Encoding", "chunked")
+        request.end_headers()
+
+        def send(data: str) -> None:
+            chunk = f"data: {data}\n\n".encode("utf-8")
+            request.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+            request.wfile.flush()
+
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": payload.get("model", "mock")}
+        pieces = [content[i:i + 200] for i in range(0, len(content), 200)] or [""]
+        # 残りのレイテンシ（平均の8割）をチャンク間に配分する
+        delay = self.config.latency * 0.8 / len(pieces)
+        for piece in pieces:
+            send(json.dumps(dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}]),
+                            ensure_ascii=False))
+            time.sleep(delay)
+        send(json.dumps(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}])))
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            send(json.dumps(dict(base, choices=[], usage=usage)))
+        send("[DONE]")
+        request.wfile.write(b"0\r\n\r\n")
+
+class MockQiitaServer(MockServer):
+    """Qiita API v2 /items の代替（記事はメモリ上に保持）"""
+
+    api = "qiita"
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__(config, host, port)
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._window_started = time.time()
+        self._window_used = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v2"
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self.items = {}
+            self._window_started = time.time()
+            self._window_used = 0
+
+    def _rate_headers(self) -> tuple:
+        """リクエストを1回分数え、(上限を超えたか, Rate-*ヘッダー)を返す（Qiitaと同じく全メソッドが対象）"""
+        with self._lock:
+            now = time.time()
+            if now - self._window_started >= self.config.quota_window:
+                self._window_started, self._window_used = now, 0
+            limit = self.config.quota or 1000
+            exceeded = bool(self.config.quota) and self._window_used >= self.config.quota
+            if not exceeded:
+                self._window_used += 1
+            headers = {
+                "Rate-Limit": str(limit),
+                "Rate-Remaining": str(max(0, limit - self._window_used)),
+                "Rate-Reset": str(int(self._window_started + self.config.quota_window))
+            }
+        return exceeded, headers
+
+    def handle(self, request, method: str) -> None:
+        started_at = time.time()
+        path, _, query = request.path.partition("?")
+        path = path.rstrip("/")
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            request.send_json(401, {"message": "Unauthorized", "type": "unauthorized"})
+            return
+
+        payload = request.read_json() if method in ("POST", "PATCH") else {}
+        event = MockEvent(api=self.api, key=str(payload.get("title", "")), status=0, started_at=started_at,
+                          kind=f"{method} {re.sub(r'/items/[^/]+$', '/items/:id', path)}")
+        time.sleep(self._latency())
+
+        exceeded, headers = self._rate_headers()
+        fault = 429 if exceeded else self._fault()
+        if fault:
+            event.status = fault
+            self._record(event)
+            message = "Rate limit exceeded" if fault == 429 else "Internal server error"
+            request.send_json(fault, {"message": message, "type": "mock_error"}, headers)
+            return
+
+        status, response, extra_headers = self._route(method, path, payload, parse_qs(query))
+        event.status = status
+        if not event.key and isinstance(response, dict):
+            event.key = response.get("title", "")
+        self._record(event)
+        request.send_json(status, response, dict(headers, **extra_headers))
+
+    def _route(self, method: str, path: str, payload: Dict[str, Any], query: Dict[str, List[str]]) -> tuple:
+        match = re.fullmatch(r"/api/v2/items/([^/]+)", path)
+        if method == "GET" and path == "/api/v2/authenticated_user/items":
+            return self._list_items(query)
+        if method == "POST" and path == "/api/v2/items":
+            item_id = uuid.uuid4().hex[:20]
+            now = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+            item = dict(payload, id=item_id, url=f"http://127.0.0.1:{self.port}/items/{item_id}",
+                        created_at=now, updated_at=now)
+            with self._lock:
+                self.items[item_id] = item
+            return 201, item, {}
+        if match and match.group(1) in self.items:
+            item_id = match.group(1)
+            if method == "GET":
+                return 200, self.items[item_id], {}
+            if method == "PATCH":
+                with self._lock:
+                    self.items[item_id].update(payload, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S+00:00",
+                                                                                 time.gmtime()))
+                return 200, self.items[item_id], {}
+        return 404, {"message": "Not found", "type": "not_found"}, {}
+
+    def _list_items(self, query: Dict[str, List[str]]) -> tuple:
+        """記事一覧（作成日時の新しい順、page / per_page、Total-Count / Linkヘッダー）"""
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["20"])[0])
+        if not 1 <= page <= 100 or not 1 <= per_page <= 100:
+            return 400, {"message": "Bad request", "type": "bad_request"}, {}
+        with self._lock:
+            items = sorted(self.items.values(), key=lambda item: item["created_at"], reverse=True)
+        last_page = max(1, -(-len(items) // per_page))
+        link = f"<{self.base_url}/authenticated_user/items?page={last_page}&per_page={per_page}>; rel=\"last\""
+        if page < last_page:
+            link += f", <{self.base_url}/authenticated_user/items?page={page + 1}&per_page={per_page}>; rel=\"next\""
+        page_items = items[(page - 1) * per_page:page * per_page]
+        return 200, page_items, {"Total-Count": str(len(items)), "Link": link}
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI / Qiita APIのローカル代替サーバー")
+    parser.add_argument("--openai-port", type=int, default=8100, help="OpenAI代替サーバーのポート (デフォルト: 8100)")
+    parser.add_argument("--qiita-port", type=int, default=8200, help="Qiita代替サーバーのポート (デフォルト: 8200)")
+    parser.add_argument("--latency", type=float, default=0.5, help="OpenAIの平均レイテンシ（秒）")
+    parser.add_argument("--qiita-latency", type=float, default=0.1, help="Qiitaの平均レイテンシ（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500を返す割合")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429を返す割合")
+    parser.add_argument("--qiita-quota", type=int, default=0, help="Qiitaのウィンドウあたり投稿数上限（0なら無制限）")
+    parser.add_argument("--qiita-window", type=float, default=60.0, help="Qiitaの上限のウィンドウ（秒）")
+    parser.add_argument("--completion-chars", type=int, default=3000, help="生成する本文の文字数")
+    parser.add_argument("--openai-rpm", type=int, default=0, help="OpenAIの1分あたりのリクエスト数上限（0なら無制限）")
+    parser.add_argument("--truncation-rate", type=float, default=0.0,
+                        help="OpenAIの本文を途中で切る（finish_reason: length）割合")
+    parser.add_argument("--batch-latency", type=float, default=1.0, help="Batch APIのバッチが完了するまでの時間（秒）")
+    args = parser.parse_args()
+
+    common = dict(error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+    openai_server = MockOpenAIServer(
+        MockConfig(latency=args.latency, completion_chars=args.completion_chars, batch_latency=args.batch_latency,
+                   rpm=args.openai_rpm, truncation_rate=args.truncation_rate, **common),
+        port=args.openai_port
+    ).start()
+    qiita_server = MockQiitaServer(
+        MockConfig(latency=args.qiita_latency, quota=args.qiita_quota, quota_window=args.qiita_window, **common),
+        port=args.qiita_port
+    ).start()
+
+    print("🧪 モックサーバー起動")
+    print(f"   OPENAI_BASE_URL={openai_server.base_url}")
+    print(f"   QIITA_API_BASE_URL={qiita_server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        openai_server.stop()
+        qiita_server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/bin/bash
+# Qiita記事一覧取得スクリプト（カタログ同期用）
+# 使用方法: ./export_qiita_catalog.sh <access_token> <output_json> [updated_since]
+# updated_since（ISO 8601）を指定するとその時刻より後に更新された記事のみ取得します
+
+set -e  # エラー時に停止
+
+# 引数チェック
+if [ $# -lt 2 ] || [ $# -gt 3 ]; then
+    echo "使用方法: $0 <access_token> <output_json> [updated_since]"
+    echo "例: $0 your_token_here /tmp/catalog.json 2025-01-01T00:00:00+09:00"
+    exit 1
+fi
+
+ACCESS_TOKEN="$1"
+OUTPUT_PATH="$2"
+UPDATED_SINCE="${3:-}"
+
+# Elixirプロジェクトディレクトリに移動
+cd "$(dirname "$0")/qiita_publisher"
+
+# 依存関係の取得（初回またはmix.lockが更新された場合）
+echo "📦 依存関係を確認中..."
+mix deps.get
+
+echo "📚 記事一覧を取得中..."
+mix run -e "
+opts = if \"$UPDATED_SINCE\" == \"\", do: [], else: [updated_since: \"$UPDATED_SINCE\"]
+
+case QiitaPublisher.PythonBridge.export_user_articles(\"$ACCESS_TOKEN\", \"$OUTPUT_PATH\", opts) do
+  {:ok, catalog} ->
+    IO.puts(\"✅ 取得成功: \" <> Integer.to_string(length(catalog.items)) <> \"件 / 全\" <> Integer.to_string(catalog.total_count) <> \"件\")
+  {:error, reason} ->
+    IO.puts(\"❌ 取得エラー: \" <> inspect(reason))
+    System.halt(1)
+end
+"
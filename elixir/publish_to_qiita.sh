@@ -31,12 +31,16 @@ mix deps.get
 
 # 投稿実行
 echo "📝 記事を投稿中..."
+# TRACEPARENT / QIITA_TRACE_FILE が設定されていれば（generate_and_publish.py --profile）スパンを書き出す
 mix run -e "
-case QiitaPublisher.PythonBridge.publish_from_json(\"$ACCESS_TOKEN\", \"$JSON_PATH\") do
+case QiitaPublisher.Tracing.run_from_env(fn ->
+       QiitaPublisher.PythonBridge.publish_from_json(\"$ACCESS_TOKEN\", \"$JSON_PATH\")
+     end) do
   {:ok, response} ->
     IO.puts(\"✅ 投稿成功!\")
     IO.puts(\"   タイトル: \" <> response[\"title\"])
     IO.puts(\"   URL: \" <> response[\"url\"])
+    IO.puts(\"   ID: \" <> response[\"id\"])
     IO.puts(\"   プライベート: \" <> to_string(response[\"private\"]))
   {:error, reason} ->
     IO.puts(\"❌ 投稿エラー: \" <> inspect(reason))
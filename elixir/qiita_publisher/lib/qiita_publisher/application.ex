@@ -7,14 +7,37 @@ defmodule QiitaPublisher.Application do
 
   @impl true
   def start(_type, _args) do
-    children = [
-      # Starts a worker by calling: QiitaPublisher.Worker.start_link(arg)
-      # {QiitaPublisher.Worker, arg}
-    ]
+    children =
+      [
+        # qiita.com への接続プールを全リクエストで共有する
+        {Finch, name: QiitaPublisher.Finch, pools: %{default: [size: pool_size()]}},
+        {Task.Supervisor, name: QiitaPublisher.ConnectionSupervisor},
+        {QiitaPublisher.PublishQueue, max_concurrency: env_integer("QIITA_PUBLISHER_CONCURRENCY") || 4}
+      ] ++ daemon_children()
 
     # See https://hexdocs.pm/elixir/Supervisor.html
     # for other strategies and supported options
     opts = [strategy: :one_for_one, name: QiitaPublisher.Supervisor]
     Supervisor.start_link(children, opts)
   end
+
+  # QIITA_PUBLISHER_PORT が設定されている場合のみ常駐サービスを起動する
+  defp daemon_children do
+    case env_integer("QIITA_PUBLISHER_PORT") do
+      nil -> []
+      port -> [{QiitaPublisher.Daemon, port: port}]
+    end
+  end
+
+  defp pool_size do
+    env_integer("QIITA_PUBLISHER_POOL_SIZE") || 10
+  end
+
+  defp env_integer(name) do
+    case System.get_env(name) do
+      nil -> nil
+      "" -> nil
+      value -> String.to_integer(value)
+    end
+  end
 end
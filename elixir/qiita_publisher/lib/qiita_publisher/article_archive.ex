@@ -0,0 +1,142 @@
+defmodule QiitaPublisher.ArticleArchive do
+  @moduledoc """
+  Python側（`python/article_archive.py`）が追記する記事のアーカイブを読み出す
+
+  アーカイブ本体（`articles.jsonl.gz`）は1記事1gzipメンバーを連結したJSONLで、
+  インデックス（`articles.jsonl.gz.idx`）は8バイトのヘッダーに続く記事ごとの16バイトの
+  固定長エントリ（オフセット u64・長さ u32・追記時刻 u32、ビッグエンディアン）。
+  通し番号からインデックスの位置が決まるため、1件分のメモリで任意の記事を読み出せる。
+  `stream/1` もインデックスを一定の単位ずつ読み、記事を1件ずつ展開する。
+
+  ## Examples
+
+      {:ok, record} = QiitaPublisher.ArticleArchive.fetch("python/archive/articles.jsonl.gz", 0)
+
+      {:ok, stream} = QiitaPublisher.ArticleArchive.stream("python/archive/articles.jsonl.gz")
+      stream |> Stream.map(fn {_seq, record} -> record["title"] end) |> Enum.take(10)
+  """
+
+  @magic "AIDX"
+  @version 1
+  @header_size 8
+  @entry_size 16
+  # streamでインデックスを読み込む単位（エントリ数）
+  @chunk_entries 1024
+
+  @doc """
+  記事の件数（書きかけのエントリは数えない）
+  """
+  def count(archive_path) do
+    case File.stat(index_path(archive_path)) do
+      {:ok, %{size: size}} when size >= @header_size -> div(size - @header_size, @entry_size)
+      _ -> 0
+    end
+  end
+
+  @doc """
+  通し番号の記事を読み出す（キーは文字列のまま。投稿には `PythonBridge.normalize_article/1` を使う）
+  """
+  def fetch(archive_path, seq) when is_integer(seq) and seq >= 0 do
+    with {:ok, index, data} <- open(archive_path) do
+      try do
+        case :file.pread(index, @header_size + seq * @entry_size, @entry_size) do
+          {:ok, <<offset::64, size::32, _archived_at::32>>} ->
+            read_record(data, offset, size)
+
+          _ ->
+            {:error, "Archive has no article ##{seq} (#{count(archive_path)} articles)"}
+        end
+      after
+        close(index, data)
+      end
+    end
+  end
+
+  @doc """
+  全記事を `{通し番号, 記事}` の順に1件ずつ展開するストリームを返す
+
+  ストリームを列挙し終えるか途中で止めると、ファイルを閉じる。
+  """
+  def stream(archive_path) do
+    with {:ok, index, data} <- open(archive_path) do
+      close(index, data)
+
+      {:ok,
+       Stream.resource(
+         fn ->
+           {:ok, index, data} = open(archive_path)
+           {index, data, 0}
+         end,
+         &next_chunk/1,
+         fn {index, data, _seq} -> close(index, data) end
+       )}
+    end
+  end
+
+  defp next_chunk({index, data, seq} = state) do
+    case :file.pread(index, @header_size + seq * @entry_size, @chunk_entries * @entry_size) do
+      {:ok, chunk} when byte_size(chunk) >= @entry_size ->
+        # 末尾の書きかけのエントリ（16バイトに満たない端数）は読まない
+        records =
+          for {<<offset::64, size::32, _archived_at::32>>, i} <- Enum.with_index(entries(chunk)) do
+            case read_record(data, offset, size) do
+              {:ok, record} -> {seq + i, record}
+              {:error, reason} -> raise "Failed to read archive article ##{seq + i}: #{reason}"
+            end
+          end
+
+        {records, {index, data, seq + length(records)}}
+
+      _ ->
+        {:halt, state}
+    end
+  end
+
+  defp entries(chunk) do
+    for <<entry::binary-size(@entry_size) <- chunk>>, do: entry
+  end
+
+  defp read_record(data, offset, size) do
+    with {:ok, member} when byte_size(member) == size <- :file.pread(data, offset, size),
+         {:ok, line} <- gunzip(member),
+         {:ok, record} when is_map(record) <- Jason.decode(line) do
+      {:ok, record}
+    else
+      {:ok, _} -> {:error, "Truncated or invalid article at offset #{offset}"}
+      {:error, reason} -> {:error, inspect(reason)}
+      :eof -> {:error, "Article at offset #{offset} is beyond the end of the archive"}
+    end
+  end
+
+  defp gunzip(member) do
+    {:ok, :zlib.gunzip(member)}
+  rescue
+    e in ErlangError -> {:error, e.original}
+  end
+
+  defp open(archive_path) do
+    with {:ok, index} <- File.open(index_path(archive_path), [:read, :binary, :raw]) do
+      case {:file.pread(index, 0, @header_size), File.open(archive_path, [:read, :binary, :raw])} do
+        {{:ok, <<@magic, @version::16, _reserved::16>>}, {:ok, data}} ->
+          {:ok, index, data}
+
+        {_, {:error, reason}} ->
+          File.close(index)
+          {:error, "Failed to open archive #{archive_path}: #{inspect(reason)}"}
+
+        {_, {:ok, data}} ->
+          close(index, data)
+          {:error, "Not an article archive index: #{index_path(archive_path)}"}
+      end
+    else
+      {:error, reason} -> {:error, "Failed to open archive index #{index_path(archive_path)}: #{inspect(reason)}"}
+    end
+  end
+
+  defp close(index, data) do
+    File.close(index)
+    File.close(data)
+  end
+
+  defp index_path(archive_path), do: archive_path <> ".idx"
+end
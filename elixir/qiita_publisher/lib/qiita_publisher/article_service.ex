@@ -5,16 +5,21 @@ defmodule QiitaPublisher.ArticleService do
 
   alias QiitaPublisher.Client
 
+  @catalog_per_page 100
+  @catalog_concurrency 4
+  # 1ページの取得の上限時間（ミリ秒）
+  @catalog_page_timeout 60_000
+
+  @doc """
+  記事を投稿する（`item_id` がある場合はその記事を更新する）
+  """
+  def publish_article(access_token, %{item_id: item_id} = article_data) when is_binary(item_id) do
+    update_article(access_token, item_id, article_data)
+  end
+
   def publish_article(access_token, article_data) do
     client = Client.new(access_token)
-    
-    params = %{
-      title: article_data.title,
-      body: article_data.body,
-      tags: format_tags(article_data.tags),
-      private: Map.get(article_data, :private, false),
-      tweet: Map.get(article_data, :tweet, false)
-    }
+    params = build_params(article_data)
 
     case Client.create_item(client, params) do
       {:ok, %{status: 201, body: response}} ->
@@ -26,10 +31,49 @@ defmodule QiitaPublisher.ArticleService do
     end
   end
 
+  @doc """
+  投稿済みの記事のタイトル・本文・タグを更新する
+  """
+  def update_article(access_token, item_id, article_data) do
+    client = Client.new(access_token)
+
+    case Client.update_item(client, item_id, build_update_params(article_data)) do
+      {:ok, %{status: 200, body: response}} ->
+        {:ok, response}
+      {:ok, %{status: status, body: error}} ->
+        {:error, {status, error}}
+      {:error, reason} ->
+        {:error, reason}
+    end
+  end
+
+  @doc """
+  記事データからQiita APIの投稿パラメータを組み立てる
+  """
+  def build_params(article_data) do
+    %{
+      title: article_data.title,
+      body: article_data.body,
+      tags: format_tags(article_data.tags),
+      private: Map.get(article_data, :private, false),
+      tweet: Map.get(article_data, :tweet, false)
+    }
+  end
+
+  @doc """
+  記事データからQiita APIの更新パラメータを組み立てる（更新時はツイートしない）
+  """
+  def build_update_params(article_data) do
+    article_data |> build_params() |> Map.delete(:tweet)
+  end
+
+  @doc """
+  認証ユーザーの記事を1ページ分取得する（`page` / `per_page` を指定可能）
+  """
   def get_user_articles(access_token, opts \\ []) do
     client = Client.new(access_token)
     
-    case Client.get_items(client, opts) do
+    case Client.get_authenticated_user_items(client, opts) do
       {:ok, %{status: 200, body: articles}} ->
         {:ok, articles}
       {:ok, %{status: status, body: error}} ->
@@ -39,6 +83,128 @@ defmodule QiitaPublisher.ArticleService do
     end
   end
 
+  @doc """
+  認証ユーザーの記事一覧をページをたどって取得する
+
+  `:updated_since` を指定しない場合は1ページ目の `Total-Count` ヘッダーから
+  ページ数を求め、残りのページを並列に取得する（全件）。
+  指定した場合は新しい順に1ページずつ取得し、その時刻より後に更新された記事だけを
+  返す（差分）。一覧は作成日時の新しい順のため、その時刻より前に作成された記事を
+  含むページで打ち切る。それより古いページの記事の編集は差分では検出できないため、
+  呼び出し側で定期的に全件取得すること（Python側の `QiitaCatalog.sync` は
+  `FULL_SYNC_INTERVAL` ごとに全件取得する）。
+
+  ページの取得がタイムアウトした場合も `{:error, reason}` を返す。
+
+  一覧の記事からは `rendered_body` を除く。
+
+  ## Options
+
+    * `:per_page` - 1ページの件数（最大100、デフォルト: #{@catalog_per_page}）
+    * `:max_concurrency` - 並列に取得するページ数（デフォルト: #{@catalog_concurrency}）
+    * `:updated_since` - 差分取得の基準時刻（ISO 8601）
+
+  ## Examples
+
+      ArticleService.list_user_articles(token)
+      #=> {:ok, %{items: [...], total_count: 120, complete: true}}
+  """
+  def list_user_articles(access_token, opts \\ []) do
+    client = Client.new(access_token)
+    per_page = Keyword.get(opts, :per_page, @catalog_per_page)
+
+    case parse_since(Keyword.get(opts, :updated_since)) do
+      nil -> list_all_pages(client, per_page, Keyword.get(opts, :max_concurrency, @catalog_concurrency))
+      since -> list_updated_pages(client, per_page, since, 1, [])
+    end
+  end
+
+  defp list_all_pages(client, per_page, max_concurrency) do
+    with {:ok, first, total_count} <- fetch_page(client, 1, per_page) do
+      last_page = max(div(total_count + per_page - 1, per_page), 1)
+
+      2..last_page//1
+      |> Task.async_stream(&fetch_page(client, &1, per_page),
+        max_concurrency: max_concurrency,
+        timeout: @catalog_page_timeout,
+        on_timeout: :kill_task
+      )
+      |> Enum.reduce_while({:ok, [first]}, fn
+        {:ok, {:ok, items, _total}}, {:ok, pages} -> {:cont, {:ok, [items | pages]}}
+        {:ok, {:error, reason}}, _acc -> {:halt, {:error, reason}}
+        {:exit, reason}, _acc -> {:halt, {:error, reason}}
+      end)
+      |> case do
+        {:ok, pages} ->
+          items = pages |> Enum.reverse() |> Enum.concat()
+          {:ok, %{items: items, total_count: total_count, complete: true}}
+
+        {:error, reason} ->
+          {:error, reason}
+      end
+    end
+  end
+
+  defp list_updated_pages(client, per_page, since, page, acc) do
+    with {:ok, items, total_count} <- fetch_page(client, page, per_page) do
+      acc = [Enum.filter(items, &updated_after?(&1, since)) | acc]
+
+      # 作成日時が基準時刻より前の記事に達したら、それより後のページは見ない
+      if items == [] or Enum.any?(items, &created_before?(&1, since)) or page * per_page >= total_count do
+        items = acc |> Enum.reverse() |> Enum.concat()
+        {:ok, %{items: items, total_count: total_count, complete: false}}
+      else
+        list_updated_pages(client, per_page, since, page + 1, acc)
+      end
+    end
+  end
+
+  defp fetch_page(client, page, per_page) do
+    case Client.get_authenticated_user_items(client, page: page, per_page: per_page) do
+      {:ok, %{status: 200, body: items} = response} ->
+        total_count =
+          case Req.Response.get_header(response, "total-count") do
+            [value | _] -> String.to_integer(value)
+            [] -> length(items)
+          end
+
+        {:ok, Enum.map(items, &Map.delete(&1, "rendered_body")), total_count}
+
+      {:ok, %{status: status, body: error}} ->
+        {:error, {status, error}}
+
+      {:error, reason} ->
+        {:error, reason}
+    end
+  end
+
+  defp parse_since(nil), do: nil
+
+  defp parse_since(value) do
+    case DateTime.from_iso8601(value) do
+      {:ok, datetime, _offset} -> datetime
+      {:error, _reason} -> nil
+    end
+  end
+
+  defp updated_after?(%{"updated_at" => updated_at}, since) when is_binary(updated_at) do
+    case DateTime.from_iso8601(updated_at) do
+      {:ok, datetime, _offset} -> DateTime.compare(datetime, since) == :gt
+      {:error, _reason} -> true
+    end
+  end
+
+  defp updated_after?(_item, _since), do: true
+
+  defp created_before?(%{"created_at" => created_at}, since) when is_binary(created_at) do
+    case DateTime.from_iso8601(created_at) do
+      {:ok, datetime, _offset} -> DateTime.compare(datetime, since) == :lt
+      {:error, _reason} -> false
+    end
+  end
+
+  defp created_before?(_item, _since), do: false
+
   def validate_article(article_data) do
     required_fields = [:title, :body, :tags]
     
@@ -1,13 +1,20 @@
 defmodule QiitaPublisher.Client do
   @moduledoc """
   Qiita API client using Req
+
+  接続先は環境変数 `QIITA_API_BASE_URL` で変更できる（ローカルのモックサーバーでの計測用）。
+  投稿・更新のリクエストは `QiitaPublisher.Tracing` のスパンとして記録する。
   """
 
+  alias QiitaPublisher.Tracing
+
   @base_url "https://qiita.com/api/v2"
 
   def new(access_token) do
     Req.new(
-      base_url: @base_url,
+      base_url: base_url(),
+      # アプリケーションで起動した接続プールを再利用する
+      finch: QiitaPublisher.Finch,
       headers: [
         {"Authorization", "Bearer #{access_token}"},
         {"Content-Type", "application/json"}
@@ -16,19 +23,27 @@ defmodule QiitaPublisher.Client do
   end
 
   def create_item(client, params) do
-    Req.post(client, url: "/items", json: params)
+    Tracing.span("qiita.create_item", %{"http.method" => "POST"}, fn ->
+      Req.post(client, url: "/items", json: params)
+    end)
   end
 
   def get_items(client, opts \\ []) do
     Req.get(client, url: "/items", params: opts)
   end
 
+  def get_authenticated_user_items(client, opts \\ []) do
+    Req.get(client, url: "/authenticated_user/items", params: opts)
+  end
+
   def get_item(client, item_id) do
     Req.get(client, url: "/items/#{item_id}")
   end
 
   def update_item(client, item_id, params) do
-    Req.patch(client, url: "/items/#{item_id}", json: params)
+    Tracing.span("qiita.update_item", %{"http.method" => "PATCH", "item_id" => item_id}, fn ->
+      Req.patch(client, url: "/items/#{item_id}", json: params)
+    end)
   end
 
   def delete_item(client, item_id) do
@@ -38,4 +53,8 @@ defmodule QiitaPublisher.Client do
   def get_authenticated_user(client) do
     Req.get(client, url: "/authenticated_user")
   end
+
+  defp base_url do
+    System.get_env("QIITA_API_BASE_URL") || @base_url
+  end
 end
@@ -0,0 +1,187 @@
+defmodule QiitaPublisher.Daemon do
+  @moduledoc """
+  投稿ジョブをローカルソケットで受け付ける常駐サービス
+
+  `127.0.0.1` の指定ポートで待ち受け、4バイト長プレフィックス付きの
+  JSONメッセージを1リクエスト1レスポンスで処理する。
+  BEAMを起動したままにすることで、記事ごとの `mix run` の起動コストと
+  qiita.com へのTLS接続確立を省略する（接続は `QiitaPublisher.Finch` で共有）。
+
+  ## リクエスト
+
+      {"action": "ping"}
+      {"action": "publish", "access_token": "...", "article": {"title": ..., "body": ..., "tags": [...]}}
+      {"action": "publish_many", "access_token": "...", "articles": [...]}
+      {"action": "list_items", "access_token": "...", "updated_since": "2025-01-01T00:00:00+09:00"}
+
+  投稿は `QiitaPublisher.PublishQueue` を経由するため、レート制限と再試行が適用される。
+  記事に `"item_id"` を指定すると、新規投稿ではなくその記事を更新する。
+
+  ## レスポンス
+
+      {"ok": true, "response": ...}
+      {"ok": false, "error": "..."}
+
+  `publish_many` の `response` は記事ごとの `{"ok", "response" | "error", "attempts"}` のリスト。
+  `list_items` の `response` は `{"items", "total_count", "complete"}`
+  （`ArticleService.list_user_articles/2`。`updated_since` を省略すると全件）。
+
+  ## トレース
+
+  リクエストにW3C Trace Contextの `"traceparent"` を付けると、処理を `daemon.<action>` の
+  スパンとして記録し、レスポンスの `"spans"` に含めて返す（`QiitaPublisher.Tracing`）。
+  """
+
+  use GenServer
+  require Logger
+
+  alias QiitaPublisher.{ArticleService, PublishQueue, PythonBridge, Tracing}
+
+  @default_port 4477
+
+  def start_link(opts) do
+    GenServer.start_link(__MODULE__, opts, name: __MODULE__)
+  end
+
+  @doc """
+  実際に待ち受けているポート番号を返す
+  """
+  def port do
+    GenServer.call(__MODULE__, :port)
+  end
+
+  @impl true
+  def init(opts) do
+    port = Keyword.get(opts, :port, @default_port)
+
+    listen_opts = [:binary, packet: 4, active: false, reuseaddr: true, ip: {127, 0, 0, 1}]
+
+    case :gen_tcp.listen(port, listen_opts) do
+      {:ok, listen_socket} ->
+        {:ok, actual_port} = :inet.port(listen_socket)
+        {:ok, acceptor} = Task.start_link(fn -> accept_loop(listen_socket) end)
+        Logger.info("QiitaPublisher daemon listening on 127.0.0.1:#{actual_port}")
+        {:ok, %{socket: listen_socket, port: actual_port, acceptor: acceptor}}
+
+      {:error, reason} ->
+        {:stop, {:listen_failed, reason}}
+    end
+  end
+
+  @impl true
+  def handle_call(:port, _from, state) do
+    {:reply, state.port, state}
+  end
+
+  defp accept_loop(listen_socket) do
+    {:ok, socket} = :gen_tcp.accept(listen_socket)
+
+    {:ok, pid} =
+      Task.Supervisor.start_child(QiitaPublisher.ConnectionSupervisor, fn -> serve(socket) end)
+
+    :ok = :gen_tcp.controlling_process(socket, pid)
+    accept_loop(listen_socket)
+  end
+
+  defp serve(socket) do
+    case :gen_tcp.recv(socket, 0) do
+      {:ok, payload} ->
+        reply = payload |> decode_request() |> handle_traced() |> Jason.encode!()
+        :ok = :gen_tcp.send(socket, reply)
+        serve(socket)
+
+      {:error, :closed} ->
+        :ok
+
+      {:error, reason} ->
+        Logger.warning("QiitaPublisher daemon connection error: #{inspect(reason)}")
+        :gen_tcp.close(socket)
+    end
+  end
+
+  defp decode_request(payload) do
+    case Jason.decode(payload) do
+      {:ok, request} when is_map(request) -> request
+      {:ok, _other} -> {:error, "request must be a JSON object"}
+      {:error, reason} -> {:error, "JSON decode error: #{inspect(reason)}"}
+    end
+  end
+
+  defp handle_traced(%{"traceparent" => traceparent} = request) when is_binary(traceparent) do
+    {reply, spans} =
+      Tracing.collect(traceparent, fn ->
+        Tracing.span("daemon.#{request["action"]}", fn -> handle_request(request) end)
+      end)
+
+    Map.put(reply, :spans, spans)
+  end
+
+  defp handle_traced(request), do: handle_request(request)
+
+  @doc false
+  def handle_request({:error, reason}), do: error_reply(reason)
+
+  def handle_request(%{"action" => "ping"}), do: %{ok: true, response: "pong"}
+
+  def handle_request(%{"action" => "publish", "access_token" => token, "article" => article})
+      when is_binary(token) and is_map(article) do
+    token |> publish(article) |> Map.delete(:attempts)
+  end
+
+  def handle_request(%{"action" => "publish_many", "access_token" => token, "articles" => articles})
+      when is_binary(token) and is_list(articles) do
+    {valid, invalid} =
+      articles
+      |> Enum.with_index()
+      |> Enum.map(fn {article, index} -> {index, validate(article)} end)
+      |> Enum.split_with(fn {_index, result} -> match?({:ok, _}, result) end)
+
+    published =
+      PublishQueue.publish_many(token, Enum.map(valid, fn {_index, {:ok, data}} -> data end))
+      |> Enum.map(&queue_reply/1)
+
+    replies =
+      Enum.zip(Enum.map(valid, &elem(&1, 0)), published) ++
+        Enum.map(invalid, fn {index, {:error, reason}} -> {index, error_reply(reason)} end)
+
+    %{ok: true, response: replies |> Enum.sort_by(&elem(&1, 0)) |> Enum.map(&elem(&1, 1))}
+  end
+
+  def handle_request(%{"action" => "list_items", "access_token" => token} = request) when is_binary(token) do
+    opts = if since = request["updated_since"], do: [updated_since: since], else: []
+
+    case ArticleService.list_user_articles(token, opts) do
+      {:ok, catalog} -> %{ok: true, response: catalog}
+      {:error, reason} -> error_reply(reason)
+    end
+  end
+
+  def handle_request(_request), do: error_reply("unknown request")
+
+  defp publish(token, article) do
+    case validate(article) do
+      {:ok, article_data} -> token |> PublishQueue.publish(article_data) |> queue_reply()
+      {:error, reason} -> error_reply(reason)
+    end
+  end
+
+  defp validate(article) when is_map(article) do
+    article_data = PythonBridge.normalize_article(article)
+
+    case ArticleService.validate_article(article_data) do
+      :ok -> {:ok, article_data}
+      {:error, reason} -> {:error, "Validation failed: #{reason}"}
+    end
+  end
+
+  defp validate(_article), do: {:error, "Validation failed: article must be an object"}
+
+  defp queue_reply(%{result: {:ok, response}, attempts: attempts}),
+    do: %{ok: true, response: response, attempts: attempts}
+
+  defp queue_reply(%{result: {:error, reason}, attempts: attempts}),
+    do: reason |> error_reply() |> Map.put(:attempts, attempts)
+
+  defp error_reply(reason) when is_binary(reason), do: %{ok: false, error: reason}
+  defp error_reply(reason), do: %{ok: false, error: inspect(reason)}
+end
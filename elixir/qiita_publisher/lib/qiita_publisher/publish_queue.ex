@@ -0,0 +1,238 @@
+defmodule QiitaPublisher.PublishQueue do
+  @moduledoc """
+  Qiitaのレート制限に合わせて記事を並列投稿するキュー
+
+  同時実行数を `max_concurrency` に制限し、レスポンスの `Rate-Remaining` /
+  `Rate-Reset` ヘッダーから残り回数を追跡する。残り回数が0になった場合は
+  リセット時刻まで新しい投稿を待たせる。再試行はジッター付き指数バックオフで行う。
+  新規投稿（POST）は冪等でないため、サーバーに届いていないことが確実な場合
+  （429と、接続を確立できなかった通信エラー）だけを再試行し、5xxや送信後の
+  通信エラーは二重投稿を避けるため失敗とする。更新（PATCH）は同じ内容で上書きする
+  だけなので、429・5xx・通信エラーを再試行する。
+  記事データに `item_id` がある場合は新規投稿ではなくその記事を更新する。
+
+  ## Examples
+
+      QiitaPublisher.PublishQueue.publish_many(token, [article1, article2])
+      #=> [%{title: "...", result: {:ok, response}, attempts: 1}, ...]
+  """
+
+  use GenServer
+
+  alias QiitaPublisher.{ArticleService, Client, Tracing}
+
+  @default_max_concurrency 4
+  @default_max_attempts 5
+  @default_base_backoff_ms 1_000
+  @default_max_backoff_ms 60_000
+  # 接続の確立前に失敗したことが確実な通信エラー（POSTを再送しても二重投稿にならない）
+  @pre_send_errors [:econnrefused, :nxdomain, :ehostunreach, :enetunreach]
+
+  def start_link(opts \\ []) do
+    GenServer.start_link(__MODULE__, opts, name: __MODULE__)
+  end
+
+  @doc """
+  複数の記事を並列に投稿し、入力と同じ順序で記事ごとの結果を返す
+
+  ## Options
+
+    * `:max_attempts` - 1記事あたりの最大試行回数（デフォルト: #{@default_max_attempts}）
+    * `:base_backoff_ms` - バックオフの基準時間（デフォルト: #{@default_base_backoff_ms}）
+    * `:max_backoff_ms` - バックオフの上限（デフォルト: #{@default_max_backoff_ms}）
+  """
+  def publish_many(access_token, articles, opts \\ []) do
+    # 呼び出し元のトレースを各タスクに引き継ぐ
+    context = Tracing.context()
+
+    articles
+    |> Task.async_stream(
+      fn article ->
+        Tracing.attach(context)
+        publish(access_token, article, opts)
+      end,
+      max_concurrency: max(length(articles), 1),
+      timeout: :infinity
+    )
+    |> Enum.map(fn {:ok, result} -> result end)
+  end
+
+  @doc """
+  1件の記事をレート制限・再試行付きで投稿する
+  """
+  def publish(access_token, article_data, opts \\ []) do
+    client = Client.new(access_token)
+    {result, attempts} = attempt(request_fun(client, article_data), 1, opts)
+    %{title: article_data.title, result: result, attempts: attempts}
+  end
+
+  @doc """
+  現在のレート制限と実行状況を返す
+  """
+  def status do
+    GenServer.call(__MODULE__, :status)
+  end
+
+  defp request_fun(client, %{item_id: item_id} = article_data) when is_binary(item_id) do
+    params = ArticleService.build_update_params(article_data)
+    {:patch, fn -> Client.update_item(client, item_id, params) end}
+  end
+
+  defp request_fun(client, article_data) do
+    params = ArticleService.build_params(article_data)
+    {:post, fn -> Client.create_item(client, params) end}
+  end
+
+  defp attempt({method, request}, attempt_no, opts) do
+    max_attempts = Keyword.get(opts, :max_attempts, @default_max_attempts)
+    # 同時実行数・レート制限の空き待ち
+    {:ok, ref} = Tracing.span("publish_queue.wait", fn -> GenServer.call(__MODULE__, :acquire, :infinity) end)
+
+    response = request.()
+    GenServer.cast(__MODULE__, {:release, ref, rate_limit(response)})
+
+    case classify(method, response) do
+      {:ok, body} ->
+        {{:ok, body}, attempt_no}
+
+      {:retry, _reason} when attempt_no < max_attempts ->
+        Tracing.span("publish_queue.backoff", %{"attempt" => attempt_no}, fn ->
+          Process.sleep(backoff_ms(attempt_no, opts))
+        end)
+
+        attempt({method, request}, attempt_no + 1, opts)
+
+      {_, reason} ->
+        {{:error, reason}, attempt_no}
+    end
+  end
+
+  @doc false
+  # レスポンスを :ok / :retry / :error に分類する（methodは :post か :patch）
+  def classify(_method, {:ok, %{status: status, body: body}}) when status in [200, 201],
+    do: {:ok, body}
+
+  def classify(_method, {:ok, %{status: 429, body: body}}), do: {:retry, {429, body}}
+
+  def classify(:patch, {:ok, %{status: status, body: body}}) when status >= 500,
+    do: {:retry, {status, body}}
+
+  def classify(_method, {:ok, %{status: status, body: body}}), do: {:error, {status, body}}
+  def classify(:patch, {:error, reason}), do: {:retry, reason}
+
+  def classify(:post, {:error, %{reason: reason} = error}) when reason in @pre_send_errors,
+    do: {:retry, error}
+
+  def classify(:post, {:error, reason}), do: {:error, reason}
+
+  # フルジッター付き指数バックオフ
+  defp backoff_ms(attempt_no, opts) do
+    base = Keyword.get(opts, :base_backoff_ms, @default_base_backoff_ms)
+    cap = Keyword.get(opts, :max_backoff_ms, @default_max_backoff_ms)
+    :rand.uniform(min(cap, base * Integer.pow(2, attempt_no - 1)))
+  end
+
+  defp rate_limit({:ok, %Req.Response{} = response}) do
+    with [remaining | _] <- Req.Response.get_header(response, "rate-remaining"),
+         [reset | _] <- Req.Response.get_header(response, "rate-reset"),
+         {remaining, ""} <- Integer.parse(remaining),
+         {reset, ""} <- Integer.parse(reset) do
+      {remaining, reset}
+    else
+      _ -> nil
+    end
+  end
+
+  defp rate_limit(_response), do: nil
+
+  # GenServer
+
+  @impl true
+  def init(opts) do
+    state = %{
+      max_concurrency: Keyword.get(opts, :max_concurrency, @default_max_concurrency),
+      in_flight: %{},
+      waiting: :queue.new(),
+      remaining: nil,
+      reset_at: nil,
+      reset_timer: nil
+    }
+
+    {:ok, state}
+  end
+
+  @impl true
+  def handle_call(:acquire, from, state) do
+    {:noreply, dispatch(%{state | waiting: :queue.in(from, state.waiting)})}
+  end
+
+  def handle_call(:status, _from, state) do
+    status = %{
+      in_flight: map_size(state.in_flight),
+      waiting: :queue.len(state.waiting),
+      max_concurrency: state.max_concurrency,
+      rate_remaining: state.remaining,
+      rate_reset: state.reset_at
+    }
+
+    {:reply, status, state}
+  end
+
+  @impl true
+  def handle_cast({:release, ref, rate_limit}, state) do
+    Process.demonitor(ref, [:flush])
+    state = %{state | in_flight: Map.delete(state.in_flight, ref)}
+
+    state =
+      case rate_limit do
+        {remaining, reset_at} -> %{state | remaining: remaining, reset_at: reset_at}
+        nil -> state
+      end
+
+    {:noreply, dispatch(state)}
+  end
+
+  @impl true
+  def handle_info({:DOWN, ref, :process, _pid, _reason}, state) do
+    {:noreply, dispatch(%{state | in_flight: Map.delete(state.in_flight, ref)})}
+  end
+
+  def handle_info(:rate_reset, state) do
+    {:noreply, dispatch(%{state | remaining: nil, reset_at: nil, reset_timer: nil})}
+  end
+
+  defp dispatch(state) do
+    cond do
+      :queue.is_empty(state.waiting) ->
+        state
+
+      map_size(state.in_flight) >= state.max_concurrency ->
+        state
+
+      rate_exhausted?(state) ->
+        schedule_reset(state)
+
+      true ->
+        {{:value, {pid, _tag} = from}, waiting} = :queue.out(state.waiting)
+        ref = Process.monitor(pid)
+        GenServer.reply(from, {:ok, ref})
+
+        remaining = if state.remaining, do: max(state.remaining - 1, 0)
+        in_flight = Map.put(state.in_flight, ref, pid)
+        dispatch(%{state | waiting: waiting, in_flight: in_flight, remaining: remaining})
+    end
+  end
+
+  defp rate_exhausted?(%{remaining: 0, reset_at: reset_at}) when is_integer(reset_at) do
+    reset_at > System.os_time(:second)
+  end
+
+  defp rate_exhausted?(_state), do: false
+
+  defp schedule_reset(%{reset_timer: nil} = state) do
+    delay_ms = max(state.reset_at - System.os_time(:second), 0) * 1_000 + 1_000
+    %{state | reset_timer: Process.send_after(self(), :rate_reset, delay_ms)}
+  end
+
+  defp schedule_reset(state), do: state
+end
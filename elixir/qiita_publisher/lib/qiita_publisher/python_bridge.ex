@@ -3,38 +3,49 @@ defmodule QiitaPublisher.PythonBridge do
   Python側で生成された記事をQiitaに投稿するブリッジモジュール
   """
 
-  alias QiitaPublisher.ArticleService
+  alias QiitaPublisher.{ArticleArchive, ArticleService, Tracing}
 
   def publish_from_json(access_token, json_file_path) do
-    case read_article_json(json_file_path) do
+    case Tracing.span("elixir.read_json", fn -> read_article_json(json_file_path) end) do
       {:ok, article_data} ->
-        case ArticleService.validate_article(article_data) do
-          :ok ->
-            ArticleService.publish_article(access_token, article_data)
-          {:error, reason} ->
-            {:error, "Validation failed: #{reason}"}
-        end
+        publish_article_data(access_token, article_data)
       {:error, reason} ->
         {:error, "Failed to read JSON: #{reason}"}
     end
   end
 
+  @doc """
+  Python側のアーカイブ（`python/archive/articles.jsonl.gz`）から通し番号の記事を読み出して投稿する
+  """
+  def publish_from_archive(access_token, archive_path, seq) do
+    case ArticleArchive.fetch(archive_path, seq) do
+      {:ok, record} ->
+        publish_article_data(access_token, normalize_article(record))
+      {:error, reason} ->
+        {:error, "Failed to read archive: #{reason}"}
+    end
+  end
+
+  @doc """
+  正規化済みの記事データを検証してから投稿する
+  """
+  def publish_article_data(access_token, article_data) do
+    case ArticleService.validate_article(article_data) do
+      :ok ->
+        ArticleService.publish_article(access_token, article_data)
+      {:error, reason} ->
+        {:error, "Validation failed: #{reason}"}
+    end
+  end
+
   def read_article_json(file_path) do
     case File.read(file_path) do
       {:ok, content} ->
-        case Jason.decode(content, keys: :atoms) do
-          {:ok, data} ->
-            # タグの形式を正しく処理
-            formatted_tags = format_tags(data.tags)
-            
-            article_data = %{
-              title: data.title,
-              body: data.body,
-              tags: formatted_tags,
-              private: Map.get(data, :private, true),
-              tweet: Map.get(data, :tweet, false)
-            }
-            {:ok, article_data}
+        case Jason.decode(content) do
+          {:ok, data} when is_map(data) ->
+            {:ok, normalize_article(data)}
+          {:ok, _data} ->
+            {:error, "JSON decode error: article must be an object"}
           {:error, reason} ->
             {:error, "JSON decode error: #{inspect(reason)}"}
         end
@@ -43,6 +54,74 @@ defmodule QiitaPublisher.PythonBridge do
     end
   end
 
+  @doc """
+  Python側の記事データ（文字列キー・アトムキーどちらも可）を投稿用の形式に変換する
+  """
+  def normalize_article(data) do
+    %{
+      title: field(data, :title),
+      body: field(data, :body),
+      # タグの形式を正しく処理
+      tags: format_tags(field(data, :tags)),
+      private: field(data, :private, true),
+      tweet: field(data, :tweet, false),
+      # 投稿済みの記事を更新する場合のQiitaの記事ID
+      item_id: field(data, :item_id)
+    }
+  end
+
+  @doc """
+  投稿成功マーカー（`<file>.done`）の内容
+
+  Python側（`generate_and_publish.done_info`）と同じく、Qiitaの記事ID・URLと
+  投稿した内容のハッシュ（`content_hash/1`）を記録する。`--republish` はこのIDと
+  ハッシュで記事を対応付け、変更の有無を判定する。
+  """
+  def done_marker(article_data, response) do
+    %{
+      id: response["id"],
+      url: response["url"],
+      content_hash: content_hash(article_data),
+      finished_at: System.os_time(:second)
+    }
+  end
+
+  @doc """
+  タイトル・タグ・本文の変更を検出するハッシュ（`python/qiita_catalog.py` の `content_hash` と同じ値）
+
+  本文は改行コードを `\\n` にそろえて前後の空白を除いたSHA-256、タグは名前の昇順。
+  `[タイトル, タグ名, 本文のハッシュ]` をPythonの `json.dumps` と同じ区切り（`", "`）で
+  連結してSHA-256を取る。
+  """
+  def content_hash(article_data) do
+    title = article_data |> field(:title) |> to_string() |> String.trim()
+
+    names =
+      (field(article_data, :tags) || [])
+      |> Enum.map(fn
+        %{name: name} -> name
+        %{"name" => name} -> name
+        name -> to_string(name)
+      end)
+      |> Enum.sort()
+
+    body_hash =
+      case field(article_data, :body) do
+        nil -> nil
+        body -> sha256(body |> String.replace("\r\n", "\n") |> String.trim())
+      end
+
+    sha256(json_list([Jason.encode!(title), json_list(Enum.map(names, &Jason.encode!/1)), Jason.encode!(body_hash)]))
+  end
+
+  defp json_list(encoded), do: "[" <> Enum.join(encoded, ", ") <> "]"
+
+  defp sha256(data), do: :crypto.hash(:sha256, data) |> Base.encode16(case: :lower)
+
+  defp field(data, key, default \\ nil) do
+    Map.get(data, key, Map.get(data, Atom.to_string(key), default))
+  end
+
   defp format_tags(tags) when is_list(tags) do
     Enum.map(tags, fn tag ->
       case tag do
@@ -64,17 +143,105 @@ defmodule QiitaPublisher.PythonBridge do
 
   defp format_tags(_), do: []
 
+  @doc """
+  Python側のスプールディレクトリにある未投稿の記事を生成順に投稿する
+
+  各記事は `<file>.lock` を排他作成して確保し、結果を `<file>.done` /
+  `<file>.failed` に書き込む（`python/article_spool.py` と同じ形式）。
+  他のプロセスが確保済みの記事はスキップする。
+  """
+  def publish_spool(access_token, spool_dir) do
+    spool_dir
+    |> pending_spool_entries()
+    |> Enum.map(fn path -> {path, publish_spool_entry(access_token, path)} end)
+  end
+
   def publish_python_generated_article(access_token, python_project_path \\ "../../../python") do
-    json_path = Path.join([python_project_path, "generated_article.json"])
-    absolute_path = Path.expand(json_path, __DIR__)
+    spool_dir = Path.expand(Path.join([python_project_path, "spool"]), __DIR__)
     
-    IO.puts("📖 Reading article from: #{absolute_path}")
+    IO.puts("📖 Reading articles from spool: #{spool_dir}")
     
-    case File.exists?(absolute_path) do
+    case File.dir?(spool_dir) do
       true ->
-        publish_from_json(access_token, absolute_path)
+        {:ok, publish_spool(access_token, spool_dir)}
       false ->
-        {:error, "Generated article file not found: #{absolute_path}"}
+        {:error, "Spool directory not found: #{spool_dir}"}
+    end
+  end
+
+  @doc """
+  認証ユーザーの記事一覧を取得し、Python側のカタログ同期用のJSONとして書き出す
+
+  `opts` は `ArticleService.list_user_articles/2` と同じ。書き出す内容は
+  `{"items": [...], "total_count": n, "complete": bool}`（`python/qiita_catalog.py` が取り込む）。
+  """
+  def export_user_articles(access_token, output_path, opts \\ []) do
+    case ArticleService.list_user_articles(access_token, opts) do
+      {:ok, catalog} ->
+        atomic_write(output_path, catalog)
+        {:ok, catalog}
+
+      {:error, reason} ->
+        {:error, reason}
     end
   end
+
+  defp pending_spool_entries(spool_dir) do
+    spool_dir
+    |> Path.join("*.json")
+    |> Path.wildcard()
+    |> Enum.sort()
+    |> Enum.reject(fn path ->
+      Enum.any?([".done", ".failed", ".lock"], &File.exists?(path <> &1))
+    end)
+  end
+
+  defp publish_spool_entry(access_token, path) do
+    case File.open(path <> ".lock", [:write, :exclusive]) do
+      {:ok, lock} ->
+        IO.write(lock, Jason.encode!(%{host: host_name(), claimed_at: System.os_time(:second)}))
+        File.close(lock)
+
+        result =
+          case Tracing.span("elixir.read_json", fn -> read_article_json(path) end) do
+            {:ok, article_data} ->
+              result = publish_article_data(access_token, article_data)
+              write_marker(path, article_data, result)
+              result
+
+            {:error, reason} ->
+              result = {:error, "Failed to read JSON: #{reason}"}
+              write_marker(path, nil, result)
+              result
+          end
+
+        File.rm(path <> ".lock")
+        result
+
+      {:error, :eexist} ->
+        {:error, :claimed}
+
+      {:error, reason} ->
+        {:error, "Failed to claim #{path}: #{inspect(reason)}"}
+    end
+  end
+
+  defp write_marker(path, article_data, {:ok, response}) do
+    atomic_write(path <> ".done", done_marker(article_data, response))
+  end
+
+  defp write_marker(path, _article_data, {:error, reason}) do
+    atomic_write(path <> ".failed", %{error: inspect(reason), finished_at: System.os_time(:second)})
+  end
+
+  defp atomic_write(path, data) do
+    tmp_path = path <> ".tmp"
+    File.write!(tmp_path, Jason.encode!(data))
+    File.rename!(tmp_path, path)
+  end
+
+  defp host_name do
+    {:ok, name} = :inet.gethostname()
+    to_string(name)
+  end
 end
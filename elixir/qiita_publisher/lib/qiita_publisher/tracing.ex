@@ -0,0 +1,176 @@
+defmodule QiitaPublisher.Tracing do
+  @moduledoc """
+  Python側（`python/tracing.py`）と同じ形式のスパンを記録する軽量なトレーシング
+
+  W3C Trace Contextの `traceparent` を受け取った場合だけ記録し、受け取らなければ
+  `span/3` は関数を実行するだけになる。スパンは `collect/2` を呼んだプロセスへ
+  メッセージで送られ、`collect/2` の終了時にまとめて返る。別プロセス（Task）で
+  記録する場合は、`context/0` で取得したコンテキストを `attach/1` で引き継ぐ。
+  スパンのフィールド名はOpenTelemetryのJSON形式（`traceId` / `spanId` / `parentSpanId` ...）。
+
+  ## Examples
+
+      {result, spans} =
+        QiitaPublisher.Tracing.collect(traceparent, fn ->
+          QiitaPublisher.Tracing.span("qiita.create_item", fn -> Client.create_item(client, params) end)
+        end)
+  """
+
+  @context_key :qiita_publisher_trace
+  @span_message :qiita_publisher_span
+
+  @doc """
+  `traceparent` のトレースとして `fun` を実行し、`{結果, スパンのリスト}` を返す
+
+  `traceparent` が `nil` または不正な値の場合は記録せず、スパンは空のリストになる。
+  """
+  def collect(traceparent, fun) do
+    case parse_traceparent(traceparent) do
+      {:ok, trace_id, parent_id} ->
+        previous = Process.put(@context_key, %{trace_id: trace_id, parent_id: parent_id, collector: self()})
+
+        result =
+          try do
+            fun.()
+          after
+            restore(previous)
+          end
+
+        {result, drain(trace_id, [])}
+
+      :error ->
+        {fun.(), []}
+    end
+  end
+
+  @doc """
+  環境変数 `TRACEPARENT` と `QIITA_TRACE_FILE` が設定されていれば、スパンを記録して
+  `QIITA_TRACE_FILE` にJSONで書き出す（`publish_to_qiita.sh` の `mix run` 用）
+
+  BEAMの起動から `fun` の開始までを `beam.boot` として記録する。
+  """
+  def run_from_env(fun) do
+    case {System.get_env("TRACEPARENT"), System.get_env("QIITA_TRACE_FILE")} do
+      {traceparent, path} when is_binary(traceparent) and is_binary(path) ->
+        {result, spans} =
+          collect(traceparent, fn ->
+            record_boot()
+            fun.()
+          end)
+
+        File.write(path, Jason.encode!(spans))
+        result
+
+      _ ->
+        fun.()
+    end
+  end
+
+  @doc """
+  `fun` の実行をスパンとして記録する（`{:error, _}` や4xx・5xxの応答はstatusをerrorにする）
+  """
+  def span(name, attributes \\ %{}, fun) do
+    case Process.get(@context_key) do
+      nil ->
+        fun.()
+
+      context ->
+        span_id = random_hex(8)
+        started_at = System.os_time(:nanosecond)
+        started_mono = System.monotonic_time(:nanosecond)
+        Process.put(@context_key, %{context | parent_id: span_id})
+
+        try do
+          result = fun.()
+          send_span(context, span_id, name, started_at, started_mono, attributes, status(result))
+          result
+        rescue
+          e ->
+            attributes = Map.put(attributes, "error", Exception.message(e))
+            send_span(context, span_id, name, started_at, started_mono, attributes, "error")
+            reraise e, __STACKTRACE__
+        after
+          Process.put(@context_key, context)
+        end
+    end
+  end
+
+  @doc """
+  現在のプロセスのトレースのコンテキスト（記録していなければ `nil`）
+  """
+  def context, do: Process.get(@context_key)
+
+  @doc """
+  `context/0` で取得したコンテキストを現在のプロセスに引き継ぐ
+  """
+  def attach(nil), do: :ok
+
+  def attach(context) do
+    Process.put(@context_key, context)
+    :ok
+  end
+
+  defp record_boot do
+    case Process.get(@context_key) do
+      nil ->
+        :ok
+
+      context ->
+        vm_started = System.convert_time_unit(:erlang.system_info(:start_time), :native, :nanosecond)
+        uptime = System.monotonic_time(:nanosecond) - vm_started
+        now = System.os_time(:nanosecond)
+        span = build_span(context, random_hex(8), "beam.boot", now - uptime, now, %{}, "ok")
+        send(context.collector, {@span_message, context.trace_id, span})
+        :ok
+    end
+  end
+
+  defp send_span(context, span_id, name, started_at, started_mono, attributes, status) do
+    ended_at = started_at + System.monotonic_time(:nanosecond) - started_mono
+    span = build_span(context, span_id, name, started_at, ended_at, attributes, status)
+    send(context.collector, {@span_message, context.trace_id, span})
+  end
+
+  defp build_span(context, span_id, name, started_at, ended_at, attributes, status) do
+    %{
+      "traceId" => context.trace_id,
+      "spanId" => span_id,
+      "parentSpanId" => context.parent_id,
+      "name" => name,
+      "startTimeUnixNano" => started_at,
+      "endTimeUnixNano" => ended_at,
+      "attributes" => attributes,
+      "status" => status,
+      "service" => "elixir",
+      "thread" => inspect(self())
+    }
+  end
+
+  defp status({:error, _reason}), do: "error"
+  defp status({:ok, %{status: status}}) when status >= 400, do: "error"
+  defp status(%{ok: false}), do: "error"
+  defp status(_result), do: "ok"
+
+  defp drain(trace_id, spans) do
+    receive do
+      {@span_message, ^trace_id, span} -> drain(trace_id, [span | spans])
+    after
+      0 -> Enum.reverse(spans)
+    end
+  end
+
+  defp restore(nil), do: Process.delete(@context_key)
+  defp restore(previous), do: Process.put(@context_key, previous)
+
+  defp parse_traceparent(
+         <<"00-", trace_id::binary-size(32), "-", parent_id::binary-size(16), "-", _flags::binary-size(2)>>
+       ) do
+    # 親のスパンがない場合（0埋め）は最上位のスパンとして記録する
+    parent_id = if parent_id == String.duplicate("0", 16), do: nil, else: parent_id
+    {:ok, trace_id, parent_id}
+  end
+
+  defp parse_traceparent(_traceparent), do: :error
+
+  defp random_hex(bytes), do: bytes |> :rand.bytes() |> Base.encode16(case: :lower)
+end
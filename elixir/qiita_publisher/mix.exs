@@ -14,7 +14,7 @@ defmodule QiitaPublisher.MixProject do
   # Run "mix help compile.app" to learn about applications.
   def application do
     [
-      extra_applications: [:logger],
+      extra_applications: [:logger, :crypto],
       mod: {QiitaPublisher.Application, []}
     ]
   end
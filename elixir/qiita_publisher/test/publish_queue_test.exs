@@ -0,0 +1,55 @@
+defmodule QiitaPublisher.PublishQueueTest do
+  use ExUnit.Case, async: true
+
+  alias QiitaPublisher.PublishQueue
+
+  defp response(status, body \\ %{}), do: {:ok, %Req.Response{status: status, body: body}}
+  defp transport_error(reason), do: {:error, %Mint.TransportError{reason: reason}}
+
+  describe "classify/2" do
+    test "成功したレスポンスはPOST・PATCHとも :ok" do
+      assert PublishQueue.classify(:post, response(201, %{"id" => "abc"})) == {:ok, %{"id" => "abc"}}
+      assert PublishQueue.classify(:patch, response(200, %{"id" => "abc"})) == {:ok, %{"id" => "abc"}}
+    end
+
+    test "429はPOST・PATCHとも再試行する" do
+      assert {:retry, {429, _}} = PublishQueue.classify(:post, response(429))
+      assert {:retry, {429, _}} = PublishQueue.classify(:patch, response(429))
+    end
+
+    test "5xxはPOSTでは二重投稿を避けるため失敗とする" do
+      for status <- [500, 502, 503, 504] do
+        assert {:error, {^status, _}} = PublishQueue.classify(:post, response(status))
+      end
+    end
+
+    test "5xxはPATCHでは再試行する" do
+      assert {:retry, {503, _}} = PublishQueue.classify(:patch, response(503))
+    end
+
+    test "4xxは再試行しない" do
+      for status <- [400, 401, 403, 404, 422] do
+        assert {:error, {^status, _}} = PublishQueue.classify(:post, response(status))
+        assert {:error, {^status, _}} = PublishQueue.classify(:patch, response(status))
+      end
+    end
+
+    test "接続前の通信エラーはPOSTでも再試行する" do
+      for reason <- [:econnrefused, :nxdomain, :ehostunreach, :enetunreach] do
+        assert {:retry, %Mint.TransportError{reason: ^reason}} =
+                 PublishQueue.classify(:post, transport_error(reason))
+      end
+    end
+
+    test "送信後の可能性がある通信エラーはPOSTでは失敗とする" do
+      for reason <- [:timeout, :closed] do
+        assert {:error, %Mint.TransportError{reason: ^reason}} =
+                 PublishQueue.classify(:post, transport_error(reason))
+      end
+    end
+
+    test "通信エラーはPATCHでは再試行する" do
+      assert {:retry, _} = PublishQueue.classify(:patch, transport_error(:timeout))
+    end
+  end
+end
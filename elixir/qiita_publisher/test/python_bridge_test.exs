@@ -0,0 +1,34 @@
+defmodule QiitaPublisher.PythonBridgeTest do
+  use ExUnit.Case, async: true
+
+  alias QiitaPublisher.PythonBridge
+
+  describe "content_hash/1" do
+    # 期待値は python/qiita_catalog.py の content_hash で計算したもの
+    test "matches the Python hash (title trimmed, tags sorted, CRLF normalized)" do
+      article =
+        PythonBridge.normalize_article(%{
+          "title" => " Elixirの\"入門\" ",
+          "tags" => [%{"name" => "Elixir"}, %{"name" => "Beam"}],
+          "body" => "line1\r\nline2\n\n"
+        })
+
+      assert PythonBridge.content_hash(article) ==
+               "bc8c3e540df4657b539f4e19d211f44ba2810f2c45f015079b01468c740aacc3"
+    end
+
+    test "hashes a missing body as null" do
+      assert PythonBridge.content_hash(%{title: "T", tags: [], body: nil}) ==
+               "a42cbcabeed0017e2508bf4d1a66f947920f143af9b0b1842c7e26c2ff58c9a9"
+    end
+  end
+
+  test "done_marker/2 records the item id, url and content hash" do
+    article = %{title: "T", tags: [], body: nil}
+    marker = PythonBridge.done_marker(article, %{"id" => "abc123", "url" => "https://qiita.com/u/items/abc123"})
+
+    assert marker.id == "abc123"
+    assert marker.url == "https://qiita.com/u/items/abc123"
+    assert marker.content_hash == PythonBridge.content_hash(article)
+  end
+end
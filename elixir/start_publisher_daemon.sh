@@ -0,0 +1,19 @@
+#!/bin/bash
+# Qiita投稿デーモン起動スクリプト
+# 使用方法: ./start_publisher_daemon.sh [port]
+# 起動後は QIITA_PUBLISHER_PORT=<port> を設定して generate_and_publish.py を実行すると
+# 記事ごとにBEAMを起動せず、このデーモン経由で投稿します
+
+set -e  # エラー時に停止
+
+PORT="${1:-${QIITA_PUBLISHER_PORT:-4477}}"
+
+# Elixirプロジェクトディレクトリに移動
+cd "$(dirname "$0")/qiita_publisher"
+
+# 依存関係の取得（起動時に一度だけ）
+echo "📦 依存関係を確認中..."
+mix deps.get
+
+echo "🚀 Qiita投稿デーモンを起動します (127.0.0.1:$PORT)"
+QIITA_PUBLISHER_PORT="$PORT" exec mix run --no-halt
@@ -9,60 +9,69 @@ import os
 import sys
 import subprocess
 import json
+import csv
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from dotenv import load_dotenv
 
 # プロジェクトルートを取得
 PROJECT_ROOT = Path(__file__).parent
 PYTHON_DIR = PROJECT_ROOT / "python"
 ELIXIR_DIR = PROJECT_ROOT / "elixir" / "qiita_publisher"
+SPOOL_DIR = PYTHON_DIR / "spool"
+CACHE_PATH = PYTHON_DIR / ".cache" / "responses.sqlite3"
+TOPIC_INDEX_PATH = PYTHON_DIR / ".cache" / "topic_index.sqlite3"
+CATALOG_PATH = PYTHON_DIR / ".cache" / "qiita_catalog.sqlite3"
+METRICS_LOG_PATH = PYTHON_DIR / "metrics" / "generation.jsonl"
+BATCH_STATE_DIR = PYTHON_DIR / ".cache" / "batches"
+JOURNAL_PATH = PYTHON_DIR / ".cache" / "runs.sqlite3"
+ARCHIVE_PATH = PYTHON_DIR / "archive" / "articles.jsonl.gz"
 
 # Pythonモジュールをインポートするためにパスを追加
 sys.path.append(str(PROJECT_ROOT / "python"))
-from article_generator import ArticleGenerator, ArticleData
-
-# 記事テンプレート定義
-ARTICLE_TEMPLATES = {
-    "tutorial": {
-        "description": "初心者向けチュートリアル記事",
-        "target_audience": "初心者エンジニア",
-        "article_length": "長い",
-        "style": "丁寧で段階的な解説"
-    },
-    "tips": {
-        "description": "実用的なTips・小技記事", 
-        "target_audience": "中級エンジニア",
-        "article_length": "中程度",
-        "style": "すぐに使える実践的な内容"
-    },
-    "deep-dive": {
-        "description": "技術の深掘り解説記事",
-        "target_audience": "上級エンジニア", 
-        "article_length": "長い",
-        "style": "詳細な技術解説と背景"
-    },
-    "comparison": {
-        "description": "技術比較・選択指針記事",
-        "target_audience": "エンジニア全般",
-        "article_length": "中程度", 
-        "style": "客観的な比較と判断基準"
-    },
-    "troubleshooting": {
-        "description": "問題解決・トラブルシューティング記事",
-        "target_audience": "実務エンジニア",
-        "article_length": "中程度",
-        "style": "具体的な問題と解決手順"
-    }
-}
+# article_generator（OpenAI SDK）は読み込みに0.5秒程度かかるため、記事を生成する関数の中でインポートする
+# （--publish-only / --help / レポート系のオプションでは読み込まない）
+from response_cache import ResponseCache, DEFAULT_TTL_SECONDS
+from publisher_client import PublisherClient, PublisherError
+from article_spool import ArticleSpool
+from generation_metrics import MetricsRecorder, load_records, summarize
+from prompt_templates import get_registry
+from topic_index import DEFAULT_THRESHOLD, TopicIndex
+from qiita_catalog import QiitaCatalog, content_hash
+from batch_generation import DEFAULT_POLL_INTERVAL, BatchGenerator, BatchItem
+from rate_limiter import DEFAULT_RPM, DEFAULT_TPM, RateLimiter
+from model_routing import DEFAULT_MODEL, RoutingPolicy
+from article_validator import DEFAULT_MAX_REGENERATIONS, ERROR, FIXED, ArticleValidator
+from run_journal import FAILED, GENERATED, PUBLISHED, VALIDATED, RunJournal
+from article_archive import ArticleArchive
+from article_ranking import save_candidates
+import tracing
+
+def article_templates() -> dict:
+    """記事テンプレート定義（組み込み + python/templates/ のユーザー定義）
+
+    .envのARTICLE_TEMPLATE_DIRが効くよう、import時ではなく.envの読み込み後に初めて読み込む。
+    """
+    return get_registry().as_dict()
+
+def load_env_file() -> bool:
+    """プロジェクトルートの.envファイルを読み込む（既に設定された環境変数は上書きしない）"""
+    env_file = PROJECT_ROOT / ".env"
+    if not env_file.exists():
+        return False
+    from dotenv import load_dotenv
+    load_dotenv(env_file)
+    return True
 
 def setup_environment():
     """環境設定の確認"""
     print("🔧 環境設定を確認中...")
     
     # プロジェクトルートの.envファイルを読み込み
-    env_file = PROJECT_ROOT / ".env"
-    if env_file.exists():
-        load_dotenv(env_file)
+    if load_env_file():
         print("✅ .envファイルを読み込みました")
     else:
         print("⚠️  .envファイルが見つかりません（オプション）")
@@ -80,42 +89,429 @@ def setup_environment():
     print("✅ 環境設定OK")
     return True
 
-def generate_article(topic, template_type, programming_language=None, custom_params=None, model="gpt-4o-mini"):
-    """記事を生成 (リファクタリング版)"""
-    print(f"📝 記事生成中: {topic}")
-    print(f"🤖 使用モデル: {model}")
+def generate_article(topic, template_type, programming_language=None, custom_params=None, model=DEFAULT_MODEL,
+                     generator=None, output_path=None, stream=False, cache=None, metrics=None,
+                     structured=False, sectioned=False, topic_index=None, rate_limiter=None, routing=None,
+                     archive=None, candidates=1):
+    """記事を生成 (リファクタリング版)
 
-    try:
-        template = ARTICLE_TEMPLATES.get(template_type, ARTICLE_TEMPLATES["tutorial"])
-        
-        # パラメータを決定
-        target_audience = custom_params.get('target_audience', template["target_audience"])
-        article_length = custom_params.get('article_length', template["article_length"])
-
-        # ArticleGeneratorを直接呼び出し
-        generator = ArticleGenerator(model=model)
-        article = generator.generate_article(
-            topic=topic,
-            target_audience=target_audience,
-            article_length=article_length,
-            programming_language=programming_language,
-            template_style=template_type
+    generatorを渡すとOpenAIクライアントを使い回す（バッチモード用）。
+    output_pathを省略した場合はスプール（python/spool）に実行IDつきのファイル名で保存する。
+    streamを指定するとタイトル・タグを先に確定させ、本文を逐次書き出す。
+    structuredを指定するとJSONスキーマの構造化出力でタイトル・タグ・本文を受け取る。
+    sectionedを指定すると、長い記事・深掘り記事はアウトライン→セクションの並行生成で作る。
+    topic_indexを指定すると、保存した記事を類似トピックのインデックスに登録する。
+    rate_limiterを指定すると、API呼び出しをレート制限に合わせて待たせ、429・タイムアウトを再試行する。
+    routingを指定すると、テンプレートごとのモデルの振り分け・期限・ヘッジを適用する（modelは既定のモデル）。
+    archiveを指定すると、保存した記事をアーカイブに追記する。
+    candidatesが2以上なら1回のリクエストでその数の候補を生成し、採点で最も良い候補を保存する。
+
+    Returns:
+        Path: 保存したJSONファイルのパス（失敗時はNone）
+    """
+    with tracing.span("generate", topic=topic[:80], template=template_type):
+        # OpenAI SDKの読み込み（初回のみ時間がかかる）
+        with tracing.span("import.article_generator"):
+            from article_generator import ArticleGenerator, use_sectioned
+
+        print(f"📝 記事生成中: {topic}")
+
+        try:
+            # パラメータを決定
+            target_audience, article_length = resolve_params(template_type, custom_params)
+
+            # ArticleGeneratorを直接呼び出し
+            if generator is None:
+                with tracing.span("generator.init"):
+                    generator = ArticleGenerator(model=model, cache=cache, metrics=metrics,
+                                                 structured_output=structured, topic_index=topic_index,
+                                                 rate_limiter=rate_limiter, routing=routing, archive=archive)
+            print(f"🤖 使用モデル: {generator.route(template_type).model}")
+            output_path = Path(output_path) if output_path else ArticleSpool(SPOOL_DIR).entry_path()
+
+            if stream:
+                def on_header(title, tags):
+                    print(f"   タイトル: {title}")
+                    print(f"   タグ: {[tag['name'] for tag in tags]}")
+
+                streamed = generator.generate_article_stream(
+                    topic=topic,
+                    output_path=str(output_path),
+                    target_audience=target_audience,
+                    article_length=article_length,
+                    programming_language=programming_language,
+                    template_style=template_type,
+                    on_header=on_header
+                )
+                print("✅ 記事生成完了!")
+                print(f"   本文長: {streamed.body_length}文字")
+                if streamed.format_fallback:
+                    print("   ⚠️  TITLE:/TAGS:の形式で出力されなかったため、タイトル・タグを補完しました")
+                print(f"💾 JSONファイルを {output_path} に保存しました")
+                return output_path
+
+            params = dict(
+                topic=topic,
+                target_audience=target_audience,
+                article_length=article_length,
+                programming_language=programming_language,
+                template_style=template_type
+            )
+            if sectioned and use_sectioned(article_length, template_type):
+                print("🧩 分割生成: アウトライン作成後、セクションを並行生成します")
+                article = generator.generate_article_sectioned(**params)
+            elif candidates > 1:
+                article = generate_candidates(generator, candidates, output_path, **params)
+            else:
+                article = generator.generate_article(**params)
+
+            print("✅ 記事生成完了!")
+            print(f"   タイトル: {article.title}")
+            print(f"   タグ: {[tag['name'] for tag in article.tags]}")
+            print(f"   本文長: {len(article.body)}文字")
+            if article.format_fallback:
+                print("   ⚠️  TITLE:/TAGS:の形式で出力されなかったため、タイトル・タグを補完しました")
+
+            # JSONファイルに保存
+            generator.save_article_json(article, str(output_path), topic=topic)
+            print(f"💾 JSONファイルを {output_path} に保存しました")
+            return output_path
+
+        except Exception as e:
+            print(f"❌ 記事生成中にエラー: {e}")
+            if getattr(e, "retryable", False):
+                print("   一時的なエラーです。しばらく待ってから再実行してください")
+            return None
+
+def generate_candidates(generator, candidates, output_path, **params):
+    """候補モード: 1回のリクエストで複数の候補を生成し、採点で最も良い候補を返す（全候補は確認用に書き出す）"""
+    print(f"🎯 候補モード: 1回のリクエストで{candidates}件の候補を生成し、採点で選びます")
+    ranked = generator.generate_article_candidates(n=candidates, **params)
+    # バッチの並行スレッドの出力と混ざらないよう、順位表はまとめて表示する
+    print("\n".join(
+        f"   {'👑' if rank == 1 else '  '} {rank}. 候補{candidate.index + 1}: {candidate.score.summary()}\n"
+        f"         {candidate.article.title}"
+        for rank, candidate in enumerate(ranked, start=1)
+    ))
+    if len(ranked) > 1:
+        path = save_candidates(ranked, output_path)
+        print(f"🗂️  全候補を {path} に保存しました")
+    return ranked[0].article
+
+def resolve_params(template_type, custom_params=None):
+    """対象読者と記事の長さを決定（指定がなければテンプレートのデフォルト）"""
+    templates = article_templates()
+    template = templates.get(template_type, templates["tutorial"])
+    custom_params = custom_params or {}
+    return (custom_params.get('target_audience', template["target_audience"]),
+            custom_params.get('article_length', template["article_length"]))
+
+def row_custom_params(row):
+    """マニフェストの行からカスタムパラメータを作る"""
+    custom_params = {}
+    if row.get("audience"):
+        custom_params['target_audience'] = row["audience"]
+    if row.get("length"):
+        custom_params['article_length'] = row["length"]
+    return custom_params
+
+def load_manifest(manifest_path):
+    """バッチ用マニフェスト（JSONL/CSV）を読み込む
+
+    各行は topic（必須）と template / lang / audience / length（任意）を持つ。
+    """
+    path = Path(manifest_path)
+    if not path.exists():
+        raise FileNotFoundError(f"マニフェストが見つかりません: {path}")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix.lower() == ".csv":
+            rows = [dict(row) for row in csv.DictReader(f)]
+        else:
+            rows = []
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_no} のJSONが不正です: {e}")
+
+    templates = article_templates()
+    for index, row in enumerate(rows, start=1):
+        if not (row.get("topic") or "").strip():
+            raise ValueError(f"{index}行目にtopicがありません")
+        template = row.get("template") or "tutorial"
+        if template not in templates:
+            raise ValueError(f"{index}行目のテンプレートが不正です: {template}")
+        row["template"] = template
+    return rows
+
+def generate_batch(manifest_path, model=DEFAULT_MODEL, concurrency=4, spool=None, stream=False, cache=None,
+                   metrics=None, structured=False, sectioned=False, topic_index=None, dedupe="flag",
+                   rate_limiter=None, routing=None, validator=None, max_regenerations=DEFAULT_MAX_REGENERATIONS,
+                   journal=None, archive=None, candidates=1):
+    """マニフェストの全トピックを並行生成し、1行ごとにスプールへJSONを出力する
+
+    ArticleGeneratorは1つだけ作成し、全スレッドでOpenAIクライアントを共有する。
+    topic_indexを指定すると、生成前に過去の記事とマニフェスト内の他の行の両方に対して
+    類似トピックを確認し、dedupeに従ってスキップ・再利用する。
+    rate_limiterを指定すると、全スレッドのAPI呼び出しをレート制限と同時実行数の上限に合わせて待たせる。
+    validatorを指定すると、生成した記事を並列に検査し、不合格の行だけを再生成する。
+    journalを指定すると、行ごとの段階を実行ジャーナルに記録し、同じ実行IDのspoolで再実行した場合は
+    生成済みの記事がある行を生成しない。
+    archiveを指定すると、生成した記事を1件ずつアーカイブに追記する。
+    candidatesが2以上なら、行ごとに1回のリクエストでその数の候補を生成し、採点で選ぶ。
+
+    Returns:
+        list: (行番号, 出力パス or None) のリスト（スキップした行は含まない）
+    """
+    with tracing.span("import.article_generator"):
+        from article_generator import ArticleGenerator
+
+    rows = load_manifest(manifest_path)
+    spool = spool or ArticleSpool(SPOOL_DIR)
+    print(f"📦 バッチ生成: {len(rows)}件 (並行数: {concurrency}, 実行ID: {spool.run_id})")
+
+    with tracing.span("generator.init"):
+        generator = ArticleGenerator(model=model, cache=cache, metrics=metrics, structured_output=structured,
+                                     topic_index=topic_index, rate_limiter=rate_limiter, routing=routing,
+                                     archive=archive)
+
+    carried = resume_rows(journal, spool, rows)
+    pending, reused = plan_batch_rows(rows, topic_index, dedupe, skip=carried)
+
+    def run(index, row, generator=generator):
+        output_path = generate_article(
+            row["topic"].strip(),
+            row["template"],
+            row.get("lang") or None,
+            row_custom_params(row),
+            model,
+            generator=generator,
+            output_path=spool.entry_path(index),
+            stream=stream,
+            sectioned=sectioned,
+            topic_index=topic_index,
+            candidates=candidates
         )
+        record_generated(journal, spool, index, output_path)
+        return index, output_path
 
-        print("✅ 記事生成完了!")
-        print(f"   タイトル: {article.title}")
-        print(f"   タグ: {[tag['name'] for tag in article.tags]}")
-        print(f"   本文長: {len(article.body)}文字")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(tracing.propagate(run), index, row) for index, row in pending]
+        generated = [future.result() for future in futures] + carried_paths(carried, GENERATED)
 
-        # JSONファイルに保存
-        output_path = PYTHON_DIR / "generated_article.json"
-        generator.save_article_json(article, str(output_path))
-        print(f"💾 JSONファイルを {output_path} に保存しました")
-        return True
+    if validator:
+        # 再生成ではキャッシュを読まない（不合格の記事がキャッシュから返るのを防ぎ、合格した結果で上書きする）
+        regenerator = ArticleGenerator(model=model, cache=cache.refreshing() if cache else None, metrics=metrics,
+                                       structured_output=structured, topic_index=topic_index,
+                                       rate_limiter=rate_limiter, routing=routing, archive=archive)
+        # 再開時に引き継いだ生成済みの行も不合格なら再生成するため、全行を引けるようにする
+        rows_by_index = dict(enumerate(rows, start=1))
+        generated = validate_generated(validator, spool, generated,
+                                       lambda index: run(index, rows_by_index[index], regenerator)[1],
+                                       max_regenerations, concurrency, journal)
+    results = sorted(generated + reused + carried_paths(carried, VALIDATED, PUBLISHED, FAILED))
 
-    except Exception as e:
-        print(f"❌ 記事生成中にエラー: {e}")
-        return False
+    succeeded = sum(1 for _, path in results if path)
+    print(f"📊 バッチ生成結果: 成功 {succeeded}件 / 失敗 {len(results) - succeeded}件")
+    print_rate_limiter_stats(rate_limiter)
+    return results
+
+def plan_batch_rows(rows, topic_index, dedupe, skip=()):
+    """類似トピックを生成前に順番に確認し、生成する行と再利用する既存記事に分ける
+
+    マニフェスト内の重複も検出する。skipの行（再開時に生成済みの行）は確認せずに除く。
+
+    Returns:
+        tuple: ([(行番号, 行)], [(行番号, 既存記事のパス)])
+    """
+    reused = []
+    pending = []
+    batch_index = TopicIndex(":memory:", threshold=topic_index.threshold) if topic_index else None
+    for index, row in enumerate(rows, start=1):
+        topic = row["topic"].strip()
+        if index in skip:
+            # 生成済みの記事はインデックスに登録済みのため、自分自身と重複と判定しないよう確認しない
+            if batch_index:
+                batch_index.add(topic)
+            continue
+        action, match = check_duplicate(topic_index, topic, dedupe, batch_index)
+        if batch_index:
+            batch_index.add(topic)
+        if action == "reuse" and match.path not in [str(path) for _, path in reused]:
+            reused.append((index, Path(match.path)))
+        elif action == "generate":
+            pending.append((index, row))
+    skipped = len(rows) - len(skip) - len(pending) - len(reused)
+    if skipped or reused:
+        print(f"🔁 類似トピック: スキップ {skipped}件 / 既存記事を再利用 {len(reused)}件")
+    return pending, reused
+
+def generate_batch_api(manifest_path, model=DEFAULT_MODEL, spool=None, cache=None, metrics=None, structured=False,
+                       topic_index=None, dedupe="flag", state_dir=BATCH_STATE_DIR,
+                       poll_interval=DEFAULT_POLL_INTERVAL, routing=None, validator=None,
+                       max_regenerations=DEFAULT_MAX_REGENERATIONS, journal=None, archive=None):
+    """マニフェストの全トピックをOpenAI Batch APIでまとめて生成し、1行ごとにスプールへJSONを出力する
+
+    完了まで待機する（最大24時間）。待機中に終了しても、同じマニフェストで再実行すると
+    投入済みのバッチの待機から再開する。routingはモデルの振り分けのみ適用する（期限・ヘッジは対象外）。
+    validatorで不合格になった行は、バッチを再投入せずに通常のAPIで1件ずつ再生成する。
+
+    Returns:
+        list: (行番号, 出力パス or None) のリスト（スキップした行は含まない）
+    """
+    from article_generator import ArticleGenerator
+
+    rows = load_manifest(manifest_path)
+    spool = spool or ArticleSpool(SPOOL_DIR)
+    print(f"📦 Batch APIで生成: {len(rows)}件 (実行ID: {spool.run_id})")
+
+    generator = ArticleGenerator(model=model, cache=cache, metrics=metrics, structured_output=structured,
+                                 topic_index=topic_index, routing=routing, archive=archive)
+    carried = resume_rows(journal, spool, rows)
+    pending, reused = plan_batch_rows(rows, topic_index, dedupe, skip=carried)
+
+    items = []
+    for index, row in pending:
+        topic = row["topic"].strip()
+        lang = row.get("lang") or None
+        target_audience, article_length = resolve_params(row["template"], row_custom_params(row))
+        prompt = generator._build_prompt(topic, target_audience, article_length, lang, row["template"])
+        items.append(BatchItem(index=index, topic=topic, prompt=prompt, output_path=str(spool.entry_path(index)),
+                               template=row["template"], programming_language=lang))
+
+    generated = []
+    if items:
+        for item in BatchGenerator(generator, state_dir, poll_interval).run(items):
+            if item.status != "done":
+                print(f"❌ [{item.index}] {item.topic}: {item.error}")
+            generated.append((item.index, Path(item.output_path) if item.status == "done" else None))
+            record_generated(journal, spool, item.index, generated[-1][1], item.error)
+    generated += carried_paths(carried, GENERATED)
+
+    if validator:
+        # 再開時に引き継いだ生成済みの行も不合格なら再生成するため、全行を引けるようにする
+        rows_by_index = dict(enumerate(rows, start=1))
+
+        def regenerate(index):
+            row = rows_by_index[index]
+            output_path = generate_article(row["topic"].strip(), row["template"], row.get("lang") or None,
+                                           row_custom_params(row), model, output_path=spool.entry_path(index),
+                                           cache=cache.refreshing() if cache else None, metrics=metrics,
+                                           structured=structured, topic_index=topic_index, routing=routing,
+                                           archive=archive)
+            record_generated(journal, spool, index, output_path)
+            return output_path
+
+        generated = validate_generated(validator, spool, generated, regenerate, max_regenerations,
+                                       journal=journal)
+    results = sorted(generated + reused + carried_paths(carried, VALIDATED, PUBLISHED, FAILED))
+
+    succeeded = sum(1 for _, path in results if path)
+    print(f"📊 バッチ生成結果: 成功 {succeeded}件 / 失敗 {len(results) - succeeded}件")
+    return results
+
+def validate_generated(validator, spool, generated, regenerate, max_regenerations=DEFAULT_MAX_REGENERATIONS,
+                       concurrency=4, journal=None):
+    """生成した記事を並列に検査し、不合格の記事だけを再生成する
+
+    タグの正規化などの修正は検査時にJSONへ書き戻す。再生成しても不合格の記事には
+    .failedマーカーを残し、--publish-onlyでも投稿されないようにする。
+
+    Args:
+        generated: (行番号, 出力パス or None) のリスト
+        regenerate: 行番号を受け取って同じパスに再生成し、パス（失敗時はNone）を返す関数
+        max_regenerations: 1行あたりの再生成の上限回数
+
+    Returns:
+        list: (行番号, 出力パス or None) のリスト（不合格の行はNone）
+    """
+    results = dict(generated)
+    paths = {index: path for index, path in generated if path}
+    targets = sorted(paths)
+    regenerated = 0
+    for attempt in range(max_regenerations + 1):
+        with tracing.span("validate", articles=len(targets), attempt=attempt + 1):
+            reports = validator.validate_all([paths[index] for index in targets])
+        failed = {}
+        for index, report in zip(targets, reports):
+            for issue in report.issues:
+                if issue.severity != ERROR:
+                    mark = "🔧" if issue.severity == FIXED else "⚠️ "
+                    print(f"{mark} [{index}] {issue.check}: {issue.message}")
+            if not report.ok:
+                print(f"❌ [{index}] 品質検査で不合格: {report.summary()}")
+                failed[index] = report.summary()
+        if not failed or attempt == max_regenerations:
+            break
+
+        print(f"🔁 品質検査で不合格の{len(failed)}件を再生成します ({attempt + 1}/{max_regenerations})")
+        regenerated += len(failed)
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(failed)))) as executor:
+            outputs = list(executor.map(tracing.propagate(regenerate), failed))
+        targets = []
+        for index, path in zip(failed, outputs):
+            if path:
+                targets.append(index)
+            else:
+                # 再生成に失敗した場合も、前回の不合格の記事が投稿されないようにする
+                spool.mark_failed(paths[index], f"品質検査: {failed[index]}")
+                results[index] = None
+                record_stage(journal, spool, index, FAILED, error=f"品質検査: {failed[index]}",
+                             failed_stage=VALIDATED)
+        if not targets:
+            failed = {}
+            break
+
+    for index, summary in failed.items():
+        spool.mark_failed(paths[index], f"品質検査: {summary}")
+        results[index] = None
+        record_stage(journal, spool, index, FAILED, error=f"品質検査: {summary}", failed_stage=VALIDATED)
+    for index in paths:
+        if results[index]:
+            record_stage(journal, spool, index, VALIDATED, path=results[index])
+    passed = sum(1 for index in paths if results[index])
+    print(f"🧪 品質検査: 合格 {passed}件 / 不合格 {len(paths) - passed}件 (再生成 {regenerated}回)")
+    return list(results.items())
+
+def resume_rows(journal, spool, rows):
+    """マニフェストの行をジャーナルに登録し、生成済みの記事がある行（行番号 → 記録）を返す"""
+    if not journal:
+        return {}
+    journal.enqueue(spool.run_id, [(index, row["topic"].strip()) for index, row in enumerate(rows, start=1)])
+    carried = {index: entry for index, entry in journal.entries(spool.run_id).items() if entry.has_article()}
+    if carried:
+        print(f"♻️  生成済みの{len(carried)}件は再生成しません (実行ID: {spool.run_id})")
+    return carried
+
+def carried_paths(carried, *stages):
+    """再開時に引き継ぐ行のうち、指定の段階の (行番号, 記事のパス)"""
+    return [(index, Path(entry.path)) for index, entry in carried.items() if entry.stage in stages]
+
+def record_stage(journal, spool, index, stage, **fields):
+    """行の段階をジャーナルに記録（実行IDはspoolの実行ID）"""
+    if journal:
+        journal.record(spool.run_id, index, stage, **fields)
+
+def record_generated(journal, spool, index, output_path, error=None):
+    """生成の結果をジャーナルに記録"""
+    if output_path:
+        record_stage(journal, spool, index, GENERATED, path=output_path)
+    else:
+        record_stage(journal, spool, index, FAILED, error=error or "記事生成に失敗しました", failed_stage=GENERATED)
+
+def record_publish_results(journal, spool, generated):
+    """投稿の結果（done/failedマーカー）をジャーナルに記録"""
+    for index, path in generated:
+        done = spool.read_done(path)
+        if done:
+            record_stage(journal, spool, index, PUBLISHED, url=done.get("url"), item_id=done.get("id"))
+        else:
+            error = (spool.read_failed(path) or {}).get("error") or "投稿に失敗しました"
+            record_stage(journal, spool, index, FAILED, error=error, failed_stage=PUBLISHED)
 
 def get_topic(args):
     """トピックを取得（複数の入力方式に対応）"""
@@ -170,28 +566,41 @@ def get_topic(args):
             print("\n❌ 入力がキャンセルされました")
             sys.exit(1)
 
-def publish_article(access_token):
-    """記事をQiitaに投稿 (シェルスクリプト使用)"""
+def publish_article(access_token, json_path, publisher=None):
+    """記事をQiitaに投稿 (常駐デーモン、またはシェルスクリプト使用)
+
+    Returns:
+        dict: 投稿結果（url など、取得できた範囲）。失敗時はNone
+    """
     print("🚀 Qiitaに投稿中...")
-    json_path = PYTHON_DIR / "generated_article.json"
+    json_path = Path(json_path)
     
     if not json_path.exists():
         print(f"❌ 投稿用のJSONファイルが見つかりません: {json_path}")
-        return False
+        return None
+
+    if publisher:
+        return publish_via_daemon(publisher, access_token, json_path)
 
     # 専用シェルスクリプトを実行
     script_path = ELIXIR_DIR.parent / "publish_to_qiita.sh"
+    # 子プロセスのBEAMがデーモンとしてポートを確保しないようにする
+    env = {k: v for k, v in os.environ.items() if k != "QIITA_PUBLISHER_PORT"}
     
     try:
-        result = subprocess.run(
-            [str(script_path), access_token, str(json_path)],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with traced_script(env):
+            result = subprocess.run(
+                [str(script_path), access_token, str(json_path)],
+                capture_output=True,
+                text=True,
+                check=True,
+                env=env
+            )
         
         print(result.stdout)
-        return True
+        fields = dict(line.strip().split(": ", 1) for line in result.stdout.splitlines()
+                      if line.strip().startswith(("URL: ", "ID: ")))
+        return {"url": fields.get("URL"), "id": fields.get("ID") or item_id_from_url(fields.get("URL"))}
         
     except subprocess.CalledProcessError as e:
         print(f"❌ 投稿エラー:")
@@ -199,23 +608,713 @@ def publish_article(access_token):
             print(e.stdout)
         if e.stderr:
             print(e.stderr)
-        return False
+        return None
     except Exception as e:
         print(f"❌ 投稿中に予期せぬエラー: {e}")
-        return False
+        return None
+
+@contextmanager
+def traced_script(env):
+    """--profile時、投稿スクリプトの実行をスパンとして記録し、Elixir側のスパンを取り込む
+
+    子プロセスにはenvのTRACEPARENTで親のスパンを、QIITA_TRACE_FILEでスパンの書き出し先を渡す。
+    BEAMの起動（beam.boot）より前の時間は、スクリプトのmix deps.getとmixの起動として記録する。
+    """
+    tracer = tracing.get_tracer()
+    if not tracer:
+        yield
+        return
+    fd, trace_file = tempfile.mkstemp(prefix="qiita_trace_", suffix=".json")
+    os.close(fd)
+    try:
+        with tracing.span("publish.script") as script_span:
+            env.update(TRACEPARENT=tracing.traceparent(), QIITA_TRACE_FILE=trace_file)
+            try:
+                yield
+            finally:
+                # 投稿に失敗した場合もElixir側のスパンを取り込む
+                load_script_spans(tracer, trace_file, script_span)
+    finally:
+        os.unlink(trace_file)
+
+def load_script_spans(tracer, trace_file, script_span):
+    """投稿スクリプトが書き出したElixir側のスパンと、BEAMの起動前の区間をトレースに追加"""
+    try:
+        with open(trace_file, "r", encoding="utf-8") as f:
+            spans = json.load(f) if os.path.getsize(trace_file) else []
+    except (OSError, json.JSONDecodeError):
+        return
+    tracer.add_spans(spans)
+    boot = next((span for span in spans if span["name"] == "beam.boot"), None)
+    if boot:
+        tracer.add_spans([{
+            "traceId": tracer.trace_id,
+            "spanId": os.urandom(8).hex(),
+            "parentSpanId": script_span.span_id,
+            "name": "mix.deps_get",
+            "startTimeUnixNano": script_span.start_ns,
+            "endTimeUnixNano": int(boot["startTimeUnixNano"]),
+            "attributes": {"note": "BEAMの起動前（mix deps.getとmixの起動）"}
+        }])
+
+def publish_via_daemon(publisher, access_token, json_path):
+    """常駐デーモン経由で投稿（BEAMの起動を伴わない）"""
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            article = json.load(f)
+        response = publisher.publish(access_token, article)
+    except PublisherError as e:
+        print(f"❌ 投稿エラー: {e}")
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"❌ 投稿用のJSONファイルを読み込めません: {e}")
+        return None
+
+    print("✅ 投稿成功!")
+    print(f"   タイトル: {response.get('title')}")
+    print(f"   URL: {response.get('url')}")
+    print(f"   プライベート: {str(response.get('private')).lower()}")
+    return response
+
+def publish_spooled(access_token, spool, json_path, publisher=None, catalog=None):
+    """スプール内の記事を確保してから投稿し、done/failedマーカーを残す
+
+    catalogを指定すると、同じタイトルの記事が投稿済みの場合は投稿せずに失敗扱いとする。
+    投稿成功のマーカーがある記事（再開時など）は投稿せず、マーカーの内容を返す。
+    """
+    if spool.is_published(json_path):
+        print(f"⏭️  投稿済みのためスキップ: {json_path.name}")
+        return spool.read_done(json_path)
+    if not spool.claim(json_path):
+        print(f"⏭️  他のプロセスが投稿中のためスキップ: {json_path.name}")
+        return None
+
+    duplicate = find_published_title(catalog, json_path)
+    if duplicate:
+        spool.mark_failed(json_path, f"duplicate title: {duplicate.url}")
+        return None
+
+    response = publish_article(access_token, json_path, publisher)
+    if response:
+        spool.mark_done(json_path, done_info(json_path, response))
+        record_published(catalog, json_path, response)
+    else:
+        spool.mark_failed(json_path, "publish failed")
+    return response
+
+def find_published_title(catalog, json_path):
+    """同じタイトルの投稿済み記事をローカルのカタログから探す（見つかればCatalogItem）"""
+    if not catalog:
+        return None
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            title = json.load(f).get("title", "")
+    except (OSError, json.JSONDecodeError):
+        return None
+    matches = catalog.find_by_title(title) if title else []
+    if matches:
+        print(f"⏭️  同じタイトルの記事が投稿済みのため投稿しません: 「{title}」 {matches[0].url}")
+        print("   （投稿する場合は --allow-duplicate-title を指定してください）")
+        return matches[0]
+    return None
+
+def load_article(json_path):
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def article_content_hash(article):
+    """記事JSONのタイトル・タグ・本文のハッシュ（再投稿時の変更検出用）"""
+    return content_hash(article.get("title", ""), article.get("tags"), article.get("body"))
+
+def item_id_from_url(url):
+    """記事のURL（https://qiita.com/<user>/items/<id>）から記事IDを取り出す（取り出せなければNone）"""
+    if not url or "/items/" not in url:
+        return None
+    item_id = url.rstrip("/").rsplit("/items/", 1)[-1]
+    return item_id if item_id and "/" not in item_id else None
+
+def done_info(json_path, response, item_id=None):
+    """投稿成功マーカーの内容（記事ID・URLと、投稿した内容のハッシュ）
+
+    Elixir側のスプール投稿（PythonBridge.done_marker）と同じ内容を書き込む。
+    """
+    return {
+        "url": response.get("url"),
+        "id": item_id or response.get("id") or item_id_from_url(response.get("url")),
+        "content_hash": article_content_hash(load_article(json_path))
+    }
+
+def record_published(catalog, json_path, response):
+    """投稿した記事をカタログに追加（次回の同期を待たずに重複の確認に使う）"""
+    if not catalog:
+        return
+    item_id = response.get("id") or item_id_from_url(response.get("url"))
+    if not item_id:
+        return
+    item = dict(load_article(json_path), **{k: v for k, v in response.items() if v is not None})
+    item["id"] = item_id
+    catalog.upsert_items([item])
+
+def publish_batch_via_daemon(publisher, access_token, spool, generated, catalog=None):
+    """生成済みの記事をまとめてデーモンに渡し、レート制限に合わせて並列投稿
+
+    Returns:
+        list: 投稿に失敗した行番号
+    """
+    generated = [(index, path) for index, path in generated if spool.claim(path)]
+    duplicates = []
+    for index, path in generated:
+        match = find_published_title(catalog, path)
+        if match:
+            spool.mark_failed(path, f"duplicate title: {match.url}")
+            duplicates.append((index, path))
+    generated = [entry for entry in generated if entry not in duplicates]
+    print(f"🚀 Qiitaに{len(generated)}件を投稿中...")
+    articles = []
+    for _, path in generated:
+        with open(path, 'r', encoding='utf-8') as f:
+            articles.append(json.load(f))
+
+    try:
+        replies = publisher.publish_many(access_token, articles)
+    except PublisherError as e:
+        print(f"❌ 投稿エラー: {e}")
+        for _, path in generated:
+            spool.mark_failed(path, str(e))
+        return [index for index, _ in generated]
+
+    failed = []
+    for (index, path), reply in zip(generated, replies):
+        if reply.get("ok"):
+            response = reply["response"]
+            spool.mark_done(path, done_info(path, response))
+            record_published(catalog, path, response)
+            print(f"✅ [{index}] {response.get('title')} - {response.get('url')} (試行{reply.get('attempts')}回)")
+        else:
+            spool.mark_failed(path, reply.get("error", "unknown error"))
+            print(f"❌ [{index}] 投稿エラー: {reply.get('error')}")
+            failed.append(index)
+    return failed + [index for index, _ in duplicates]
+
+def resolve_item_id(catalog, json_path, article):
+    """ローカルの記事に対応するQiitaの記事IDを探す
+
+    記事JSONのqiita_item_id、投稿成功マーカーのid、同じタイトルの投稿済み記事（カタログ）の順に使う。
+    """
+    if article.get("qiita_item_id"):
+        return article["qiita_item_id"]
+    done = ArticleSpool.read_done(json_path) or {}
+    # IDを記録していない以前のマーカーはURLから取り出す
+    item_id = done.get("id") or item_id_from_url(done.get("url"))
+    if item_id:
+        return item_id
+    matches = catalog.find_by_title(article["title"]) if article.get("title") else []
+    return matches[0].id if matches else None
+
+def plan_republish(spool, catalog, paths=None):
+    """スプールの記事をQiitaの記事と照合し、新規投稿・更新・変更なしに分ける
+
+    同じQiitaの記事に対応するローカルの記事が複数ある場合は、最も新しく生成したものを使う。
+    Qiita上の内容はカタログ（--sync-catalogで本文まで取り込み済みの場合）、
+    なければ前回投稿時のマーカーに記録したハッシュと比較する。
+
+    Returns:
+        tuple: (新規投稿するパスのリスト, 更新する[(記事ID, パス, 記事)], 変更なしの[(記事ID, パス)])
+    """
+    pending = set(spool.pending())
+    paths = [Path(path) for path in paths] if paths else None
+    latest = {}
+    new = []
+    for path in sorted(paths or spool.root.glob("*.json")):
+        if path.with_name(path.name + ".lock").exists():
+            continue
+        try:
+            article = load_article(path)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  読み込めませんでした: {path} ({e})")
+            continue
+        item_id = resolve_item_id(catalog, path, article)
+        if item_id:
+            latest[item_id] = (path, article)
+        elif path in pending or (paths and not ArticleSpool.is_published(path)):
+            new.append(path)
+
+    updates, unchanged = [], []
+    for item_id, (path, article) in latest.items():
+        remote = catalog.get(item_id)
+        published_hash = remote.content_hash() if remote else None
+        if published_hash is None:
+            published_hash = (ArticleSpool.read_done(path) or {}).get("content_hash")
+        if published_hash == article_content_hash(article):
+            unchanged.append((item_id, path))
+        else:
+            updates.append((item_id, path, article))
+    return new, updates, unchanged
+
+def republish(args, paths=None):
+    """--republish: 変更された記事だけをQiita上で更新し、対応する記事がないものは新規投稿
+
+    Returns:
+        list: 投稿・更新に失敗した記事のパス
+    """
+    access_token = get_access_token(args)
+    publisher = connect_publisher()
+    catalog = QiitaCatalog(args.catalog)
+    spool = ArticleSpool(args.spool_dir)
+
+    new, updates, unchanged = plan_republish(spool, catalog, paths)
+    print(f"🔁 更新 {len(updates)}件 / 変更なし {len(unchanged)}件 / 新規 {len(new)}件")
+
+    # 変更のない記事はAPIを呼ばずに投稿済みとして記録する
+    for item_id, path in unchanged:
+        done = ArticleSpool.read_done(path) or {}
+        if done.get("id") != item_id:
+            remote = catalog.get(item_id)
+            spool.mark_done(path, done_info(path, {"url": remote.url if remote else None}, item_id))
+
+    failed = []
+    updates = [(item_id, path, article) for item_id, path, article in updates if spool.claim(path)]
+    if updates and publisher:
+        try:
+            replies = publisher.publish_many(
+                access_token, [dict(article, item_id=item_id) for item_id, _, article in updates]
+            )
+        except PublisherError as e:
+            print(f"❌ 更新エラー: {e}")
+            replies = [{"ok": False, "error": str(e)}] * len(updates)
+        results = [reply.get("response") if reply.get("ok") else None for reply in replies]
+    else:
+        results = [update_via_script(access_token, path, item_id) for item_id, path, _ in updates]
+
+    for (item_id, path, article), response in zip(updates, results):
+        if response:
+            spool.mark_done(path, done_info(path, response, item_id))
+            record_published(catalog, path, dict(response, id=item_id))
+            print(f"✅ 更新: {article.get('title')} - {response.get('url')}")
+        else:
+            spool.mark_failed(path, "update failed")
+            print(f"❌ 更新に失敗しました: {article.get('title')}")
+            failed.append(path)
+
+    for path in new:
+        if not publish_spooled(access_token, spool, path, publisher, catalog):
+            failed.append(path)
+    return failed
+
+def update_via_script(access_token, json_path, item_id):
+    """item_idを付けた記事JSONを一時ファイルに書き、シェルスクリプトで更新"""
+    with tempfile.TemporaryDirectory(prefix="qiita-update-") as tmp:
+        tmp_path = Path(tmp) / json_path.name
+        tmp_path.write_text(json.dumps(dict(load_article(json_path), item_id=item_id), ensure_ascii=False),
+                            encoding="utf-8")
+        return publish_article(access_token, tmp_path)
+
+def publish_pending(args):
+    """--publish-only: 指定のJSON、またはスプールの未投稿記事を生成順に投稿"""
+    if args.republish:
+        failed = republish(args, [args.json] if args.json else None)
+        if failed:
+            print(f"❌ 投稿・更新に失敗した記事: {[path.name for path in failed]}")
+            sys.exit(1)
+        return
+
+    # 投稿待ちがなければデーモン・カタログに接続せずに終了する（cronで頻繁に実行されるため）
+    if not args.json:
+        spool = ArticleSpool(args.spool_dir)
+        pending = spool.pending()
+        if not pending:
+            print(f"ℹ️  投稿待ちの記事はありません: {spool.root}")
+            return
+
+    access_token = get_access_token(args)
+    publisher = connect_publisher()
+    catalog = build_catalog(args)
+
+    if args.json:
+        if find_published_title(catalog, args.json):
+            sys.exit(1)
+        response = publish_article(access_token, args.json, publisher)
+        if not response:
+            sys.exit(1)
+        record_published(catalog, args.json, response)
+        return
+
+    print(f"📤 投稿待ち: {len(pending)}件")
+    failed = [path.name for path in pending if not publish_spooled(access_token, spool, path, publisher, catalog)]
+    if failed:
+        print(f"❌ 投稿に失敗した記事: {failed}")
+        sys.exit(1)
+
+def connect_publisher():
+    """QIITA_PUBLISHER_PORTが設定されていれば投稿デーモンに接続（応答がなければNone）"""
+    if not os.getenv("QIITA_PUBLISHER_PORT"):
+        return None
+
+    publisher = PublisherClient()
+    if publisher.ping():
+        print(f"🔌 投稿デーモンに接続しました (127.0.0.1:{publisher.port})")
+        return publisher
+
+    print(f"⚠️  投稿デーモン (127.0.0.1:{publisher.port}) に接続できません。シェルスクリプトで投稿します")
+    publisher.close()
+    return None
+
+def build_catalog(args):
+    """CLIオプションから投稿済み記事のカタログを構築（--allow-duplicate-title時はNone）"""
+    if args.allow_duplicate_title:
+        return None
+    return QiitaCatalog(args.catalog)
+
+def fetch_catalog(access_token, updated_since, publisher=None):
+    """Elixir側で記事一覧を取得（常駐デーモン、またはシェルスクリプト使用）"""
+    if publisher:
+        return publisher.list_items(access_token, updated_since)
+
+    script_path = ELIXIR_DIR.parent / "export_qiita_catalog.sh"
+    env = {k: v for k, v in os.environ.items() if k != "QIITA_PUBLISHER_PORT"}
+    with tempfile.TemporaryDirectory(prefix="qiita-catalog-") as tmp:
+        output_path = Path(tmp) / "catalog.json"
+        result = subprocess.run(
+            [str(script_path), access_token, str(output_path)] + ([updated_since] if updated_since else []),
+            capture_output=True,
+            text=True,
+            env=env
+        )
+        if result.returncode != 0:
+            raise PublisherError((result.stdout + result.stderr).strip() or "export_qiita_catalog.sh failed")
+        with open(output_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+def sync_catalog(args):
+    """--sync-catalog: 投稿済み記事の一覧をローカルのカタログに同期（2回目以降は差分のみ）"""
+    access_token = get_access_token(args)
+    publisher = connect_publisher()
+    catalog = QiitaCatalog(args.catalog)
+    mode = "全件" if args.full_sync or catalog.needs_full_sync() else "差分"
+    print(f"🔄 Qiitaの記事一覧を同期中（{mode}）...")
+    try:
+        result = catalog.sync(lambda since: fetch_catalog(access_token, since, publisher), full=args.full_sync)
+    except PublisherError as e:
+        print(f"❌ 同期エラー: {e}")
+        sys.exit(1)
+    print(f"✅ 取得 {result.fetched}件（追加 {result.added} / 更新 {result.updated} / 削除 {result.removed}）"
+          f" - Qiita上の記事数 {result.total_count}件")
+
+def print_catalog_report(catalog_path, limit=10):
+    """--catalog-report: ローカルのカタログの集計を表示（APIは呼ばない）"""
+    if not Path(catalog_path).exists():
+        print(f"❌ カタログが見つかりません: {catalog_path}（--sync-catalog で作成してください）")
+        sys.exit(1)
+    catalog = QiitaCatalog(catalog_path)
+    stats = catalog.stats()
+    synced = time.strftime("%Y-%m-%d %H:%M", time.localtime(stats["last_synced_at"])) if stats["last_synced_at"] else "-"
+    print(f"📚 投稿済み記事: {stats['items']}件（限定共有 {stats['private']}件） 最終同期: {synced}")
+    print("\n🏷️  タグ別の記事数:")
+    for tag, count in catalog.tag_counts(limit):
+        print(f"   {tag:<24} {count:>5}")
+    print("\n🆕 最近の記事:")
+    for item in catalog.recent(limit):
+        print(f"   {(item.created_at or '')[:10]}  {item.title}  {item.url}")
+    duplicates = catalog.duplicate_titles()
+    if duplicates:
+        print("\n⚠️  重複しているタイトル:")
+        for title, count in duplicates[:limit]:
+            print(f"   {title} ({count}件)")
+
+def build_cache(args):
+    """CLIオプションからレスポンスキャッシュを構築（--no-cache時はNone）"""
+    if args.no_cache:
+        return None
+    return ResponseCache(str(CACHE_PATH), ttl_seconds=args.cache_ttl, refresh=args.refresh_cache)
+
+def build_topic_index(args):
+    """CLIオプションから類似トピックのインデックスを構築（--dedupe off時はNone）"""
+    if args.dedupe == "off":
+        return None
+    return TopicIndex(args.topic_index, threshold=args.dedupe_threshold)
+
+def build_archive(args):
+    """CLIオプションから記事のアーカイブを構築（--no-archive時はNone）"""
+    if args.no_archive:
+        return None
+    return ArticleArchive(args.archive)
+
+def check_duplicate(topic_index, topic, mode, batch_index=None):
+    """生成前に類似トピックの記事を確認し、生成するかどうかを決める
+
+    mode: flag（警告のみ）/ skip（生成しない）/
+          reuse（未投稿の既存記事があればそのJSONを使い、投稿済みならスキップ）
+    batch_index: 同じバッチで先に処理したトピックのインデックス（一致したらスキップ扱い）
+
+    Returns:
+        tuple: (アクション "generate" / "skip" / "reuse", 一致した記事 or None)
+    """
+    if not topic_index:
+        return "generate", None
+
+    with tracing.span("dedupe.check"):
+        in_batch = batch_index.find_similar(topic, limit=1) if batch_index else []
+        matches = in_batch or topic_index.find_similar(topic, limit=1)
+    if not matches:
+        return "generate", None
+
+    match = matches[0]
+    source = "このバッチ内" if in_batch else (match.path or "投稿済み記事")
+    print(f"🔁 類似トピック: 「{topic}」≈「{match.topic}」(類似度 {match.score:.2f}, {source})")
+    if mode == "flag":
+        return "generate", match
+    if mode == "reuse" and not in_batch and match.path and Path(match.path).exists() \
+            and not ArticleSpool.is_published(Path(match.path)):
+        print(f"♻️  既存の記事を再利用します: {match.path}")
+        return "reuse", match
+    print(f"⏭️  生成をスキップします: {topic}")
+    return "skip", match
+
+def index_spool(topic_index, spool_dir):
+    """スプール内の未登録の記事JSONをインデックスに登録（--reindex）"""
+    added = 0
+    for path in sorted(Path(spool_dir).glob("*.json")):
+        if topic_index.contains_path(str(path)):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                article = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  読み込めませんでした: {path} ({e})")
+            continue
+        topic_index.add(article.get("title", ""), article.get("title", ""), article.get("body"), path=str(path))
+        added += 1
+    print(f"🗂️  インデックスに{added}件登録しました（合計 {topic_index.stats()['articles']}件）")
+
+def archive_spool(archive, spool_dir):
+    """スプール内の未登録の記事JSONをアーカイブに追記（--archive-spool）"""
+    archived = archive.sources()
+    added = 0
+    for path in sorted(Path(spool_dir).glob("*.json")):
+        if str(path) in archived:
+            continue
+        try:
+            archive.append_file(str(path))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  読み込めませんでした: {path} ({e})")
+            continue
+        added += 1
+    print(f"🗄️  アーカイブに{added}件追記しました（合計 {len(archive)}件, {archive.path}）")
+
+def print_archive_search(archive, query, limit=20):
+    """--archive-search: アーカイブの記事を検索して表示（空文字列なら新しい順に一覧）"""
+    if not len(archive):
+        print(f"ℹ️  アーカイブに記事はありません: {archive.path}")
+        return
+    # 新しい方からlimit件の見出しだけを保持する（本文は1件ずつ展開して捨てる）
+    latest = deque(maxlen=limit)
+    found = 0
+    for entry, record in archive.search(query):
+        latest.append((entry.seq, entry.archived_at, record.get("title"), record.get("source")))
+        found += 1
+    print(f"🗄️  アーカイブの記事: {found}件 / {len(archive)}件 ({archive.path})")
+    for seq, archived_at, title, source in reversed(latest):
+        archived = time.strftime("%Y-%m-%d %H:%M", time.localtime(archived_at))
+        print(f"   #{seq}  {archived}  {title}")
+        if source:
+            print(f"      {source}")
+
+def print_cache_stats(cache):
+    """キャッシュのヒット・ミス統計を表示"""
+    if not cache:
+        return
+    stats = cache.stats()
+    print(f"🗄️  キャッシュ: ヒット {stats['hits']}件 / ミス {stats['misses']}件 "
+          f"(節約: {stats['saved_seconds']}秒, {stats['saved_tokens']}トークン)")
+
+def build_metrics(args):
+    """CLIオプションから計測レコーダーを構築（--metrics-port指定時は/metricsを公開）"""
+    metrics = MetricsRecorder(args.metrics_log)
+    if args.metrics_port is not None:
+        port = metrics.serve(args.metrics_port)
+        print(f"📈 メトリクスを公開中: http://127.0.0.1:{port}/metrics")
+    return metrics
+
+def build_rate_limiter(args, metrics=None):
+    """CLIオプションからOpenAI API呼び出しのレート制限を構築（--no-rate-limit指定時はNone）
+
+    同時実行数は--concurrency（分割生成ではセクション数の分も含む）を上限に、
+    応答のレート制限ヘッダーに合わせて増減する。
+    """
+    if args.no_rate_limit:
+        return None
+    with tracing.span("import.article_generator"):
+        from article_generator import MAX_SECTIONS
+
+    concurrency = max(1, args.concurrency)
+    limiter = RateLimiter(
+        rpm=args.rpm,
+        tpm=args.tpm,
+        max_concurrency=concurrency * (MAX_SECTIONS if args.sectioned else 1),
+        initial_concurrency=concurrency
+    )
+    if metrics:
+        metrics.add_collector(limiter.render_prometheus)
+    return limiter
+
+def build_validator(args):
+    """CLIオプションから投稿前の品質検査を構築（--no-validate時はNone）"""
+    if args.no_validate:
+        return None
+    return ArticleValidator(check_code=args.check_code)
+
+def build_routing(args):
+    """CLIオプションからモデルの振り分け・期限・ヘッジの設定を構築（--model指定時は振り分けない）"""
+    return RoutingPolicy(
+        by_template=args.model is None,
+        fallback_model=args.fallback_model,
+        deadline=args.deadline,
+        hedge_after=args.hedge_after
+    )
+
+def print_rate_limiter_stats(rate_limiter):
+    """レート制限の待機・再試行の統計を表示"""
+    if not rate_limiter:
+        return
+    state = rate_limiter.state()
+    if state["throttled_seconds"] or state["rate_limited"] or state["retries"]:
+        print(f"🚦 レート制限: 待機 {state['throttled_seconds']:.1f}秒 / 429 {state['rate_limited']}回 / "
+              f"再試行 {state['retries']}回 (同時実行数: {state['concurrency_limit']:g})")
+
+def print_metrics_report(metrics_log):
+    """--metrics-report: 計測ログの集計レポートを表示"""
+    if not Path(metrics_log).exists():
+        print(f"❌ 計測ログが見つかりません: {metrics_log}")
+        sys.exit(1)
+    print(f"📊 生成メトリクス: {metrics_log}")
+    print(summarize(load_records(metrics_log)))
+
+def get_access_token(args):
+    """Qiita Access Tokenを取得（未設定なら終了）"""
+    access_token = args.token or os.getenv("QIITA_ACCESS_TOKEN")
+    if not access_token:
+        print("❌ Qiita Access Tokenが設定されていません")
+        print("   --token オプションまたは環境変数QIITA_ACCESS_TOKENを設定してください")
+        sys.exit(1)
+    return access_token
+
+def run_batch(args):
+    """バッチモードの実行（生成後、--generate-onlyでなければ順に投稿）
+
+    行ごとの段階を実行ジャーナルに記録する。--resumeでは記録した設定で同じ実行を続ける。
+    """
+    journal = RunJournal(args.journal)
+    if args.resume:
+        restore_run(args, journal)
+    cache = build_cache(args)
+    try:
+        spool = ArticleSpool(args.spool_dir, run_id=args.resume)
+        journal.start(spool.run_id, str(Path(args.batch).resolve()), run_options(args))
+        metrics = build_metrics(args)
+        with tracing.span("batch.generate", manifest=args.batch):
+            if args.batch_api:
+                results = generate_batch_api(args.batch, args.model or DEFAULT_MODEL, spool, cache, metrics,
+                                             args.structured, build_topic_index(args), args.dedupe,
+                                             args.batch_state_dir, args.batch_poll_interval, build_routing(args),
+                                             build_validator(args), args.max_regenerations, journal,
+                                             build_archive(args))
+            else:
+                results = generate_batch(args.batch, args.model or DEFAULT_MODEL, args.concurrency, spool,
+                                         args.stream, cache, metrics, args.structured, args.sectioned,
+                                         build_topic_index(args), args.dedupe, build_rate_limiter(args, metrics),
+                                         build_routing(args), build_validator(args), args.max_regenerations,
+                                         journal, build_archive(args), args.candidates)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ マニフェストエラー: {e}")
+        sys.exit(1)
+    print_cache_stats(cache)
+
+    failed = [index for index, path in results if not path]
+
+    if not args.generate_only:
+        access_token = get_access_token(args)
+        generated = [(index, path) for index, path in results if path]
+        # 投稿済み（前回の実行でマーカーまで書いた記事）は投稿しない
+        published = [(index, path) for index, path in generated if spool.is_published(path)]
+        record_publish_results(journal, spool, published)
+        generated = [entry for entry in generated if entry not in published]
+        # 前回の実行が投稿中に止まった記事のロックを解除する
+        for _, path in generated:
+            if spool.release_stale_lock(path):
+                print(f"🔓 停止したプロセスのロックを解除しました: {path.name}")
+        if args.republish:
+            failed_paths = republish(args, [path for _, path in generated])
+            failed.extend(index for index, path in generated if path in failed_paths)
+            record_publish_results(journal, spool, generated)
+        else:
+            publisher = connect_publisher()
+            catalog = build_catalog(args)
+            if publisher:
+                failed.extend(publish_batch_via_daemon(publisher, access_token, spool, generated, catalog))
+                record_publish_results(journal, spool, generated)
+            else:
+                for index, path in generated:
+                    if not publish_spooled(access_token, spool, path, catalog=catalog):
+                        failed.append(index)
+                    record_publish_results(journal, spool, [(index, path)])
+
+    if failed:
+        print(f"❌ 失敗した行: {sorted(set(failed))}")
+        print(f"💡 失敗した行から再開: python generate_and_publish.py --resume {spool.run_id}")
+        sys.exit(1)
+
+    print("\n🎉 完了!")
+
+# --resumeで記録した設定から復元するオプション（生成結果と出力先に関わるもの）
+RESUME_OPTIONS = ("model", "structured", "sectioned", "stream", "batch_api", "spool_dir", "candidates")
+
+def run_options(args):
+    """再開時に復元する実行の設定"""
+    return {key: getattr(args, key) for key in RESUME_OPTIONS}
+
+def restore_run(args, journal):
+    """--resume: ジャーナルに記録した実行のマニフェストと設定を復元"""
+    run = journal.get_run(args.resume)
+    if not run:
+        print(f"❌ 実行が見つかりません: {args.resume} ({journal.path})")
+        print("   （--list-runs で最近の実行を確認できます）")
+        sys.exit(1)
+    args.batch = args.batch or run.manifest
+    for key, value in run.options.items():
+        setattr(args, key, value)
+    counts = ", ".join(f"{stage} {count}件" for stage, count in sorted(run.counts.items()))
+    print(f"♻️  実行 {run.run_id} を再開します: {run.manifest} ({counts})")
+
+def print_runs(journal_path, limit=10):
+    """--list-runs: 最近の実行と行ごとの段階の件数を表示"""
+    journal = RunJournal(journal_path)
+    runs = journal.runs(limit)
+    if not runs:
+        print(f"ℹ️  記録された実行はありません: {journal_path}")
+        return
+    print(f"🗂️  最近の実行 ({journal_path})")
+    for run in runs:
+        updated = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run.updated_at))
+        counts = ", ".join(f"{stage} {count}" for stage, count in sorted(run.counts.items()))
+        print(f"   {run.run_id}  {updated}  {run.manifest}")
+        print(f"      {counts}")
 
 def main():
+    # テンプレートの一覧（--templateの選択肢）がARTICLE_TEMPLATE_DIRを反映するよう、引数の解析より前に読み込む
+    load_env_file()
+    templates = article_templates()
     parser = argparse.ArgumentParser(
         description="AI記事生成・投稿ツール",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=f"""
 記事テンプレート:
-{chr(10).join([f"  {k}: {v['description']}" for k, v in ARTICLE_TEMPLATES.items()])}
+{chr(10).join([f"  {k}: {v['description']}" for k, v in templates.items()])}
 
 使用例:
   python generate_and_publish.py "ElixirのGenServerの使い方" --template tutorial --lang Elixir
   python generate_and_publish.py "React vs Vue.js" --template comparison --lang JavaScript
   python generate_and_publish.py "Docker環境構築" --template troubleshooting --audience "DevOpsエンジニア"
+  python generate_and_publish.py --batch topics.jsonl --concurrency 8 --generate-only
         """
     )
     
@@ -223,36 +1322,188 @@ def main():
     parser.add_argument("--topic-file", help="トピックファイルのパス")
     parser.add_argument("--interactive", "-i", action="store_true", help="対話式トピック入力")
     parser.add_argument("--template", "-t", 
-                       choices=list(ARTICLE_TEMPLATES.keys()),
+                       choices=list(templates.keys()),
                        default="tutorial",
                        help="記事テンプレート (デフォルト: tutorial)")
     parser.add_argument("--lang", "-l", help="プログラミング言語")
     parser.add_argument("--audience", "-a", help="対象読者")
     parser.add_argument("--length", choices=["短い", "中程度", "長い"], help="記事の長さ")
-    parser.add_argument("--model", "-m", default="gpt-4o-mini", 
-                       help="OpenAIモデル (デフォルト: gpt-4o-mini)")
+    parser.add_argument("--model", "-m",
+                       help=f"OpenAIモデル（指定時は全テンプレートで使用。省略時はテンプレートの振り分け、"
+                            f"定義がなければ{DEFAULT_MODEL}）")
+    parser.add_argument("--fallback-model", help="ヘッジ時の予備のモデル（省略時はテンプレートの定義。なければヘッジしない）")
+    parser.add_argument("--deadline", type=float, help="OpenAI APIの1リクエストの期限（秒）")
+    parser.add_argument("--hedge-after", type=float,
+                        help="最初のトークンがこの秒数以内に届かなければ予備のモデルにも送り、先に完了した方を採用")
     parser.add_argument("--token", help="Qiita Access Token (環境変数QIITA_ACCESS_TOKENからも取得可能)")
     parser.add_argument("--private", action="store_true", default=True, help="プライベート記事として投稿")
     parser.add_argument("--generate-only", action="store_true", help="記事生成のみ（投稿しない）")
-    parser.add_argument("--publish-only", action="store_true", help="投稿のみ（生成済みJSONを使用）")
+    parser.add_argument("--publish-only", action="store_true", help="投稿のみ（スプールの未投稿記事、または--jsonを使用）")
+    parser.add_argument("--json", help="--publish-only時に投稿するJSONファイル")
+    parser.add_argument("--spool-dir", default=str(SPOOL_DIR),
+                       help=f"生成した記事の受け渡しディレクトリ (デフォルト: {SPOOL_DIR})")
+    parser.add_argument("--stream", action="store_true", help="ストリーミング生成（タイトル・タグを先に確定し本文を逐次保存）")
+    parser.add_argument("--structured", action="store_true",
+                       help="構造化出力（JSONスキーマ）でタイトル・タグ・本文を受け取る（--streamとは併用不可）")
+    parser.add_argument("--sectioned", action="store_true",
+                       help="長い記事・deep-dive記事をアウトライン→セクションの並行生成で作成（--streamとは併用不可）")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="1回のリクエストで生成する候補数（2以上で採点して最も良い候補を採用。--stream / --sectioned / "
+                             "--batch-apiとは併用不可）")
+    parser.add_argument("--dedupe", choices=["flag", "skip", "reuse", "off"], default="flag",
+                       help="類似トピックの記事がある場合の動作: flag=警告のみ（デフォルト）/ skip=生成しない / "
+                            "reuse=未投稿の既存記事を再利用 / off=確認しない")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help=f"類似トピックと判定する類似度 (0-1、デフォルト: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--topic-index", default=str(TOPIC_INDEX_PATH),
+                       help=f"類似トピックのインデックス (デフォルト: {TOPIC_INDEX_PATH})")
+    parser.add_argument("--reindex", action="store_true", help="スプール内の記事を類似トピックのインデックスに登録して終了")
+    parser.add_argument("--archive", default=str(ARCHIVE_PATH),
+                        help=f"生成した記事を追記するアーカイブ (デフォルト: {ARCHIVE_PATH})")
+    parser.add_argument("--no-archive", action="store_true", help="生成した記事をアーカイブに追記しない")
+    parser.add_argument("--archive-spool", action="store_true", help="スプール内の未登録の記事をアーカイブに追記して終了")
+    parser.add_argument("--archive-search", metavar="QUERY",
+                        help="アーカイブの記事をタイトル・トピック・本文で検索して終了（\"\"で新しい順に一覧）")
+    parser.add_argument("--catalog", default=str(CATALOG_PATH),
+                        help=f"投稿済み記事のカタログのパス (デフォルト: {CATALOG_PATH})")
+    parser.add_argument("--sync-catalog", action="store_true",
+                        help="Qiitaの記事一覧をカタログに同期して終了（2回目以降は差分のみ。"
+                             "差分は前回より前に作成された記事の編集を取りこぼすことがあるため、7日ごとに全件を取得）")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="--sync-catalog時に全件を取得し直す（古い記事の編集・削除をすぐに反映する場合）")
+    parser.add_argument("--catalog-report", action="store_true", help="カタログの集計レポートを表示して終了")
+    parser.add_argument("--allow-duplicate-title", action="store_true",
+                        help="同じタイトルの記事が投稿済みでも投稿する")
+    parser.add_argument("--republish", action="store_true",
+                        help="投稿済みの記事は内容が変わった場合のみ更新（対応する記事がなければ新規投稿）")
+    parser.add_argument("--no-cache", action="store_true", help="レスポンスキャッシュを使用しない")
+    parser.add_argument("--refresh-cache", action="store_true", help="キャッシュを読まずに再生成し、結果で上書き")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL_SECONDS,
+                       help=f"キャッシュの有効期限（秒、デフォルト: {DEFAULT_TTL_SECONDS}）")
+    parser.add_argument("--metrics-log", default=str(METRICS_LOG_PATH),
+                       help=f"生成ごとのトークン数・レイテンシの記録先 (デフォルト: {METRICS_LOG_PATH})")
+    parser.add_argument("--metrics-port", type=int, help="実行中にPrometheus形式の/metricsを公開するポート")
+    parser.add_argument("--metrics-report", action="store_true", help="計測ログの集計レポートを表示して終了")
+    parser.add_argument("--batch", metavar="MANIFEST", help="バッチ生成用マニフェスト（JSONL/CSV）")
+    parser.add_argument("--concurrency", type=int, default=4, help="バッチ生成の並行数 (デフォルト: 4)")
+    parser.add_argument("--rpm", type=int,
+                        help=f"OpenAI APIの1分あたりのリクエスト数の上限 (デフォルト: 環境変数OPENAI_RPM_LIMIT、"
+                             f"未設定なら{DEFAULT_RPM}。応答ヘッダーの値で補正)")
+    parser.add_argument("--tpm", type=int,
+                        help=f"OpenAI APIの1分あたりのトークン数の上限 (デフォルト: 環境変数OPENAI_TPM_LIMIT、"
+                             f"未設定なら{DEFAULT_TPM}。応答ヘッダーの値で補正)")
+    parser.add_argument("--no-rate-limit", action="store_true",
+                        help="クライアント側のレート制限・再試行を使わない（SDKの再試行のみ）")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="--batchのトピックをOpenAI Batch APIでまとめて生成（完了まで待機、再実行で再開）")
+    parser.add_argument("--batch-poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Batch APIの状態確認の間隔（秒、デフォルト: {DEFAULT_POLL_INTERVAL:g}）")
+    parser.add_argument("--batch-state-dir", default=str(BATCH_STATE_DIR),
+                        help=f"Batch APIのジョブ状態の保存先 (デフォルト: {BATCH_STATE_DIR})")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="中断したバッチ実行を続きから再開（生成済みの記事は再生成せず、投稿済みの記事は再投稿しない）")
+    parser.add_argument("--journal", default=str(JOURNAL_PATH),
+                        help=f"バッチ実行の進行状況の記録先 (デフォルト: {JOURNAL_PATH})")
+    parser.add_argument("--list-runs", action="store_true", help="最近のバッチ実行と進行状況を表示して終了")
+    parser.add_argument("--no-validate", action="store_true", help="生成後の品質検査を行わない")
+    parser.add_argument("--check-code", action="store_true",
+                        help="品質検査でPython・JSONのコードブロックの構文も確認する")
+    parser.add_argument("--profile", action="store_true",
+                        help="段階ごとの所要時間（投稿側のElixirを含む）の内訳とウォーターフォールを表示")
+    parser.add_argument("--profile-output", metavar="PATH",
+                        help="トレースを書き出すファイル（.jsonはChromeのトレース形式、それ以外はJSONL。--profileを含む）")
+    parser.add_argument("--max-regenerations", type=int, default=DEFAULT_MAX_REGENERATIONS,
+                        help=f"品質検査で不合格の記事を再生成する回数 (デフォルト: {DEFAULT_MAX_REGENERATIONS})")
     
     args = parser.parse_args()
+    if args.structured and args.stream:
+        parser.error("--structured と --stream は同時に指定できません")
+    if args.sectioned and args.stream:
+        parser.error("--sectioned と --stream は同時に指定できません")
+    if args.batch_api and not args.batch:
+        parser.error("--batch-api には --batch のマニフェストが必要です")
+    for option in ("deadline", "hedge_after"):
+        if getattr(args, option) is not None and getattr(args, option) <= 0:
+            parser.error(f"--{option.replace('_', '-')} には正の秒数を指定してください")
+    if args.max_regenerations < 0:
+        parser.error("--max-regenerations には0以上を指定してください")
+    if args.batch_api and (args.stream or args.sectioned):
+        parser.error("--batch-api は --stream / --sectioned と同時に指定できません")
+    if args.candidates < 1:
+        parser.error("--candidates には1以上を指定してください")
+    if args.candidates > 1 and (args.stream or args.sectioned or args.batch_api):
+        parser.error("--candidates は --stream / --sectioned / --batch-api と同時に指定できません")
+    
+    if not (args.profile or args.profile_output):
+        run(args)
+        return
+    
+    tracer = tracing.enable()
+    try:
+        with tracing.span("main", command=" ".join(sys.argv[1:])[:200]):
+            run(args)
+    finally:
+        tracing.print_profile(tracer)
+        if args.profile_output:
+            tracer.export(args.profile_output)
+            print(f"💾 トレースを {args.profile_output} に書き出しました")
+
+def run(args):
+    """解析済みのオプションに従って実行"""
+    if args.metrics_report:
+        print_metrics_report(args.metrics_log)
+        return
+    
+    if args.catalog_report:
+        print_catalog_report(args.catalog)
+        return
+    
+    if args.list_runs:
+        print_runs(args.journal)
+        return
+    
+    if args.reindex:
+        index_spool(TopicIndex(args.topic_index, threshold=args.dedupe_threshold), args.spool_dir)
+        return
+    
+    if args.archive_spool:
+        archive_spool(ArticleArchive(args.archive), args.spool_dir)
+        return
+    
+    if args.archive_search is not None:
+        print_archive_search(ArticleArchive(args.archive), args.archive_search)
+        return
     
     print("🤖 AI Article Generator & Publisher")
     print("=" * 50)
     
     # 環境設定確認
-    if not setup_environment():
+    with tracing.span("setup_environment"):
+        ready = setup_environment()
+    if not ready:
         sys.exit(1)
     
+    # カタログの同期
+    if args.sync_catalog:
+        sync_catalog(args)
+        return
+    
+    # バッチモード（--resumeは記録したマニフェストで再開）
+    if args.batch or args.resume:
+        run_batch(args)
+        return
+    
+    # 投稿のみ
+    if args.publish_only:
+        publish_pending(args)
+        print("\n🎉 完了!")
+        return
+    
     # topicの取得（複数の入力方式に対応）
-    if not args.publish_only:
-        topic = get_topic(args)
-        if not topic:
-            print("❌ エラー: 記事生成にはトピックが必要です")
-            sys.exit(1)
-    else:
-        topic = None
+    topic = get_topic(args)
+    if not topic:
+        print("❌ エラー: 記事生成にはトピックが必要です")
+        sys.exit(1)
     
     # カスタムパラメータの構築
     custom_params = {}
@@ -262,33 +1513,51 @@ def main():
         custom_params['article_length'] = args.length
     
     # 記事生成
-    if not args.publish_only:
-        if not topic:
-            print("❌ エラー: 記事生成にはトピックが必要です")
-            sys.exit(1)
-            
-        print(f"📋 設定:")
-        print(f"   トピック: {topic}")
-        print(f"   テンプレート: {args.template} ({ARTICLE_TEMPLATES[args.template]['description']})")
-        print(f"   モデル: {args.model}")
-        if args.lang:
-            print(f"   言語: {args.lang}")
-        if custom_params:
-            print(f"   カスタム設定: {custom_params}")
-        print()
-        
-        if not generate_article(topic, args.template, args.lang, custom_params, args.model):
+    print(f"📋 設定:")
+    print(f"   トピック: {topic}")
+    print(f"   テンプレート: {args.template} ({templates[args.template]['description']})")
+    print(f"   モデル: {build_routing(args).route(args.template, args.model or DEFAULT_MODEL).model}")
+    if args.lang:
+        print(f"   言語: {args.lang}")
+    if custom_params:
+        print(f"   カスタム設定: {custom_params}")
+    print()
+    
+    spool = ArticleSpool(args.spool_dir)
+    topic_index = build_topic_index(args)
+    action, match = check_duplicate(topic_index, topic, args.dedupe)
+    if action == "skip":
+        return
+    if action == "reuse":
+        json_path = Path(match.path)
+    else:
+        cache = build_cache(args)
+        metrics = build_metrics(args)
+        options = dict(output_path=spool.entry_path(), stream=args.stream, metrics=metrics,
+                       structured=args.structured, sectioned=args.sectioned, topic_index=topic_index,
+                       rate_limiter=build_rate_limiter(args, metrics), routing=build_routing(args),
+                       archive=build_archive(args), candidates=args.candidates)
+        generate = lambda cache: generate_article(topic, args.template, args.lang, custom_params,
+                                                  args.model or DEFAULT_MODEL, cache=cache, **options)
+        json_path = generate(cache)
+        validator = build_validator(args)
+        if json_path and validator:
+            # 再生成ではキャッシュを読まない
+            [(_, json_path)] = validate_generated(validator, spool, [(1, json_path)],
+                                                  lambda _: generate(cache.refreshing() if cache else None),
+                                                  args.max_regenerations)
+        if not json_path:
             sys.exit(1)
+        print_cache_stats(cache)
     
     # 記事投稿
     if not args.generate_only:
-        access_token = args.token or os.getenv("QIITA_ACCESS_TOKEN")
-        if not access_token:
-            print("❌ Qiita Access Tokenが設定されていません")
-            print("   --token オプションまたは環境変数QIITA_ACCESS_TOKENを設定してください")
-            sys.exit(1)
+        access_token = get_access_token(args)
         
-        if not publish_article(access_token):
+        if args.republish:
+            if republish(args, [json_path]):
+                sys.exit(1)
+        elif not publish_spooled(access_token, spool, json_path, connect_publisher(), build_catalog(args)):
             sys.exit(1)
     
     print("\n🎉 完了!")
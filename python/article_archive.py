@@ -0,0 +1,222 @@
+"""
+Article Archive
+生成した記事の追記専用アーカイブ（gzipメンバーを連結したJSONLとオフセットインデックス）
+
+記事が数万件になると、1記事1ファイルのJSONでは一覧・検索・再エクスポートのたびに
+全ファイルを開くことになる。アーカイブは次の2ファイルに記事を追記する。
+
+- `<name>.jsonl.gz`: 1記事（JSONの1行）を1つのgzipメンバーとして連結したもの。
+  全体が通常のgzipとして読めるため、`zcat articles.jsonl.gz` でJSONLとして流せる
+- `<name>.jsonl.gz.idx`: 8バイトのヘッダー（`AIDX` + バージョン + 予約）に続く、
+  記事ごとの16バイトの固定長エントリ（オフセット u64・長さ u32・追記時刻 u32、ビッグエンディアン）
+
+通し番号（seq）からインデックスの位置が決まるため、任意の記事を1件分のメモリで読み出せる。
+全件の走査もインデックスを先頭から読みながら1件ずつ展開するため、メモリ使用量は件数によらない。
+Elixir側（`QiitaPublisher.ArticleArchive`）も同じ形式を読む。
+
+本文を先に書き、インデックスのエントリを最後に書くため、追記の途中で止まっても
+読み手にはエントリのある記事だけが見える（残った書きかけの本文は次の追記時に切り詰める）。
+複数のプロセスからの追記はインデックスのファイルロック（fcntl、Windowsではプロセス内のみ）で直列化する。
+"""
+
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+INDEX_MAGIC = b"AIDX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct(">4sHH")
+INDEX_ENTRY = struct.Struct(">QII")
+INDEX_SUFFIX = ".idx"
+DEFAULT_COMPRESSLEVEL = 6
+# 全件の走査でインデックスを読み込む単位（エントリ数）
+READ_CHUNK_ENTRIES = 1024
+
+# アーカイブに記録する記事のフィールド（save_article_jsonのJSONと同じ）
+ARTICLE_FIELDS = ("title", "body", "tags", "private", "tweet", "finish_reason")
+
+@dataclass
+class ArchiveEntry:
+    """インデックスの1エントリ"""
+    seq: int
+    offset: int
+    length: int
+    archived_at: int
+
+class ArticleArchive:
+    """
+    追記専用の記事アーカイブ
+
+    スレッド間で共有して使用できる（バッチ生成の並行スレッドから記事ごとに追記する）。
+    """
+
+    def __init__(self, path: str, compresslevel: int = DEFAULT_COMPRESSLEVEL):
+        """
+        初期化
+
+        Args:
+            path: アーカイブ本体のパス（インデックスは末尾に.idxを付けたパス）
+            compresslevel: gzipの圧縮レベル
+        """
+        self.path = Path(path)
+        self.index_path = Path(str(path) + INDEX_SUFFIX)
+        self.compresslevel = compresslevel
+        self._lock = threading.Lock()
+
+    def append(self, article: Dict[str, Any], topic: Optional[str] = None, source: Optional[str] = None) -> int:
+        """
+        記事を1件追記し、通し番号を返す
+
+        Args:
+            article: 記事データ（save_article_jsonのJSONと同じ形式）
+            topic: 生成に使ったトピック
+            source: 記事JSONのパス（同じパスの記事を再生成した場合は後の記録が新しい）
+        """
+        archived_at = int(time.time())
+        record = {key: article[key] for key in ARTICLE_FIELDS if key in article}
+        record.update(topic=topic, source=str(source) if source else None, archived_at=archived_at)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        # mtimeを固定し、同じ記事は同じバイト列に圧縮する
+        member = gzip.compress(line.encode("utf-8"), compresslevel=self.compresslevel, mtime=0)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.index_path, "a+b") as index, open(self.path, "ab") as data:
+            if fcntl:
+                fcntl.flock(index.fileno(), fcntl.LOCK_EX)
+            try:
+                count = self._recover(index, data)
+                offset = os.fstat(data.fileno()).st_size
+                data.write(member)
+                data.flush()
+                os.fsync(data.fileno())
+                index.write(INDEX_ENTRY.pack(offset, len(member), archived_at))
+                index.flush()
+                os.fsync(index.fileno())
+            finally:
+                if fcntl:
+                    fcntl.flock(index.fileno(), fcntl.LOCK_UN)
+        return count
+
+    def append_file(self, json_path: str, topic: Optional[str] = None) -> int:
+        """記事JSONファイルを読み込んで追記（ストリーミング生成・スプールの取り込み用）"""
+        with open(json_path, "r", encoding="utf-8") as f:
+            return self.append(json.load(f), topic=topic, source=json_path)
+
+    def _recover(self, index, data) -> int:
+        """
+        ヘッダーを用意し、追記の途中で止まった書きかけの部分を切り詰めて、記事の件数を返す
+
+        インデックスの端数（書きかけのエントリ）と、インデックスにない本文の末尾を捨てる。
+        """
+        size = os.fstat(index.fileno()).st_size
+        if size < INDEX_HEADER.size:
+            index.truncate(0)
+            index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0))
+            index.flush()
+            size = INDEX_HEADER.size
+        else:
+            _read_header(index)
+        count = (size - INDEX_HEADER.size) // INDEX_ENTRY.size
+        data_size = os.fstat(data.fileno()).st_size
+        # 本文が欠けているエントリ（本文のファイルだけを戻した場合など）は捨てる
+        while count:
+            entry = _read_entry(index, count - 1)
+            if entry.offset + entry.length <= data_size:
+                break
+            count -= 1
+        end = entry.offset + entry.length if count else 0
+        if size != INDEX_HEADER.size + count * INDEX_ENTRY.size:
+            index.truncate(INDEX_HEADER.size + count * INDEX_ENTRY.size)
+        if data_size > end:
+            data.truncate(end)
+        index.seek(0, os.SEEK_END)
+        return count
+
+    def __len__(self) -> int:
+        """記事の件数（書きかけのエントリは数えない）"""
+        try:
+            size = self.index_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+        return max(0, (size - INDEX_HEADER.size) // INDEX_ENTRY.size)
+
+    def entry(self, seq: int) -> ArchiveEntry:
+        """通し番号のエントリ（範囲外はIndexError）"""
+        if not 0 <= seq < len(self):
+            raise IndexError(f"アーカイブに{seq}番の記事はありません（{len(self)}件）")
+        with open(self.index_path, "rb") as index:
+            _read_header(index)
+            return _read_entry(index, seq)
+
+    def entries(self, start: int = 0) -> Iterator[ArchiveEntry]:
+        """startからのエントリを順に返す（インデックスを一定の単位ずつ読む）"""
+        try:
+            index = open(self.index_path, "rb")
+        except FileNotFoundError:
+            return
+        with index:
+            _read_header(index)
+            seq = max(0, start)
+            index.seek(INDEX_HEADER.size + seq * INDEX_ENTRY.size)
+            while True:
+                chunk = index.read(READ_CHUNK_ENTRIES * INDEX_ENTRY.size)
+                usable = len(chunk) - len(chunk) % INDEX_ENTRY.size
+                for offset, length, archived_at in INDEX_ENTRY.iter_unpack(chunk[:usable]):
+                    yield ArchiveEntry(seq, offset, length, archived_at)
+                    seq += 1
+                if len(chunk) < READ_CHUNK_ENTRIES * INDEX_ENTRY.size:
+                    return
+
+    def read(self, seq: int) -> Dict[str, Any]:
+        """通し番号の記事を読み出す"""
+        entry = self.entry(seq)
+        with open(self.path, "rb") as data:
+            return _read_record(data, entry)
+
+    def __iter__(self) -> Iterator[Tuple[ArchiveEntry, Dict[str, Any]]]:
+        """全記事を (エントリ, 記事) の順に1件ずつ展開して返す"""
+        entries = self.entries()
+        try:
+            data = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with data:
+            for entry in entries:
+                yield entry, _read_record(data, entry)
+
+    def search(self, query: str) -> Iterator[Tuple[ArchiveEntry, Dict[str, Any]]]:
+        """タイトル・トピック・本文に文字列を含む記事（大文字・小文字を区別しない）"""
+        query = query.casefold()
+        for entry, record in self:
+            if any(query in (record.get(key) or "").casefold() for key in ("title", "topic", "body")):
+                yield entry, record
+
+    def sources(self) -> set:
+        """記録済みの記事JSONのパス（スプールの取り込みで重複を避けるため）"""
+        return {record["source"] for _, record in self if record.get("source")}
+
+def _read_header(index) -> None:
+    index.seek(0)
+    magic, version, _ = INDEX_HEADER.unpack(index.read(INDEX_HEADER.size))
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        raise ValueError(f"アーカイブのインデックスではありません: {index.name}")
+
+def _read_entry(index, seq: int) -> ArchiveEntry:
+    index.seek(INDEX_HEADER.size + seq * INDEX_ENTRY.size)
+    offset, length, archived_at = INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))
+    return ArchiveEntry(seq, offset, length, archived_at)
+
+def _read_record(data, entry: ArchiveEntry) -> Dict[str, Any]:
+    data.seek(entry.offset)
+    return json.loads(gzip.decompress(data.read(entry.length)))
@@ -5,16 +5,170 @@ OpenAI APIを使用して技術記事を自動生成する
 
 import os
 import json
-from typing import Dict, List, Optional
-from dataclasses import dataclass
-from openai import OpenAI
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from dataclasses import dataclass, field
+import httpx
+from openai import AsyncOpenAI, OpenAI, OpenAIError
 from dotenv import load_dotenv
+from response_cache import ResponseCache
+from generation_metrics import GenerationRecord, MetricsRecorder
+from prompt_templates import ARTICLE_GUIDE, MARKER_FORMAT, STREAM_MARKER_FORMAT, OutlineSection, get_registry
+from topic_index import TopicIndex
+from article_archive import ArticleArchive
+from article_spool import atomic_write
+from rate_limiter import RateLimiter, estimate_tokens, is_retryable
+from model_routing import PRIMARY, Attempt, ModelRoute, RoutingPolicy, run_hedged
+from article_validator import QIITA_TITLE_MAX_LENGTH
+from article_ranking import RankedCandidate, rank_candidates
+import tracing
 
-# 環境変数を読み込み
-load_dotenv()
+# 環境変数を読み込み（python/.env。パスを明示して呼び出し元からの.envの探索を省く）
+load_dotenv(Path(__file__).with_name(".env"))
 
-# Qiitaのタイトル上限文字数
-QIITA_TITLE_MAX_LENGTH = 50
+# サンプリングパラメータ
+MAX_TOKENS = 4000
+TEMPERATURE = 0.7
+
+# 記事生成用のシステムプロンプト（人物設定＋記事に共通する要件・記法）
+# 可変部分より前に固定部分を置き、メッセージの先頭は常に同じバイト列にする。
+# プロバイダー側のプロンプトキャッシュは1024トークン以上の一致が条件で、現状の固定部分は
+# それに満たないことがある（サイズはbench_prompt_build.pyで表示する）。
+SYSTEM_PROMPT = """あなたは1000いいねを獲得する技術記事を書く専門家です。Qiita向けの超高品質な技術記事をMarkdown形式で作成してください。
+
+【1000いいね獲得のポイント】:
+- 実用的で即座に使える具体的なコード例
+- 初心者にも分かりやすい丁寧な解説
+- 「なぜそうするのか」の理由も説明
+- ハマりやすいポイントと解決策を含める
+- 読者の「知りたかった！」に応える内容
+- 適切な見出し構成で読みやすさを重視
+- コードにはコメントを充実させる
+- 実際のプロジェクトで使える実践的な内容""" + ARTICLE_GUIDE
+# TITLE:/TAGS:/BODY:形式で受け取る呼び出し（構造化出力・分割生成以外）のシステムプロンプト
+MARKED_SYSTEM_PROMPT = SYSTEM_PROMPT + MARKER_FORMAT
+# ストリーミング生成のシステムプロンプト（TITLE:/TAGS:を先頭に出力させる）
+STREAM_SYSTEM_PROMPT = MARKED_SYSTEM_PROMPT + STREAM_MARKER_FORMAT
+
+# 分割生成（アウトライン→セクション）の設定
+OUTLINE_MAX_TOKENS = 1000
+# 候補モードで1回の呼び出しに生成する候補数の既定値
+DEFAULT_CANDIDATES = 3
+MAX_SECTIONS = 8
+# 分割生成を使う記事の長さ・テンプレート（1回の呼び出しでは遅く、途中で切れやすい）
+SECTIONED_LENGTHS = {"長い"}
+SECTIONED_TEMPLATES = {"deep-dive"}
+
+# 構造化出力モードでresponse_formatに指定するJSONスキーマ
+ARTICLE_JSON_SCHEMA = {
+    "name": "qiita_article",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "記事のタイトル（50文字以内）"},
+            "tags": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Qiitaのタグ名（5個以内）"
+            },
+            "body": {"type": "string", "description": "Markdown形式の記事本文"}
+        },
+        "required": ["title", "tags", "body"],
+        "additionalProperties": False
+    }
+}
+
+# 分割生成の1段目（アウトライン）のJSONスキーマ
+OUTLINE_JSON_SCHEMA = {
+    "name": "qiita_article_outline",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "記事のタイトル（50文字以内）"},
+            "tags": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Qiitaのタグ名（5個以内）"
+            },
+            "sections": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "heading": {"type": "string", "description": "セクションの見出し（##なし）"},
+                        "points": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": ["heading", "points"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["title", "tags", "sections"],
+        "additionalProperties": False
+    }
+}
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """
+    OpenAI API用HTTPコネクションプールの設定（環境変数で上書き可能）
+    
+    環境変数はインスタンスの作成時に読む（import後にsetup_environment()が読み込む.envの値も反映される）。
+    """
+    max_connections: int = field(default_factory=lambda: int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100")))
+    max_keepalive_connections: int = field(default_factory=lambda: int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "20")))
+    keepalive_expiry: float = field(default_factory=lambda: float(os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY", "30")))
+    timeout: float = field(default_factory=lambda: float(os.getenv("OPENAI_HTTP_TIMEOUT", "600")))
+    connect_timeout: float = field(default_factory=lambda: float(os.getenv("OPENAI_HTTP_CONNECT_TIMEOUT", "10")))
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+_pool_lock = threading.Lock()
+_shared_http_client: Optional[httpx.Client] = None
+_shared_async_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client(config: Optional[HttpPoolConfig] = None) -> httpx.Client:
+    """
+    プロセス全体で共有する同期HTTPクライアントを取得
+    
+    最初の呼び出し時の設定でコネクションプールを作成し、以降は同じプールを返す。
+    httpx.Clientはスレッドセーフなので、複数スレッドのArticleGeneratorで共有できる。
+    """
+    global _shared_http_client
+    with _pool_lock:
+        if _shared_http_client is None or _shared_http_client.is_closed:
+            config = config or HttpPoolConfig()
+            _shared_http_client = httpx.Client(limits=config.limits(), timeout=config.timeouts())
+        return _shared_http_client
+
+def get_async_http_client(config: Optional[HttpPoolConfig] = None) -> httpx.AsyncClient:
+    """
+    プロセス全体で共有する非同期HTTPクライアントを取得
+    
+    同期版と同じプール設定を使う。httpx.AsyncClientは作成後最初に使用した
+    イベントループに紐づくため、1つのイベントループ内で共有すること。
+    """
+    global _shared_async_http_client
+    with _pool_lock:
+        if _shared_async_http_client is None or _shared_async_http_client.is_closed:
+            config = config or HttpPoolConfig()
+            _shared_async_http_client = httpx.AsyncClient(limits=config.limits(), timeout=config.timeouts())
+        return _shared_async_http_client
 
 @dataclass
 class ArticleData:
@@ -24,22 +178,281 @@ class ArticleData:
     tags: List[Dict[str, any]]
     private: bool = True
     tweet: bool = False
+    finish_reason: Optional[str] = None  # "length"ならmax_tokensで本文が途中で切れている
+    format_fallback: bool = False        # TITLE:/TAGS:が見つからず、タイトル・タグを補完した
+
+@dataclass
+class Completion:
+    """1回のChat Completions呼び出しの結果（ヘッジした場合は採用した方）"""
+    content: str
+    usage: any = None
+    model: str = ""
+    route: str = PRIMARY
+    hedged: bool = False
+    ttft: Optional[float] = None
+    retries: int = 0
+    finish_reason: Optional[str] = None
+
+class ArticleGenerationError(Exception):
+    """記事生成に失敗した（retryableは時間をおいて再実行すれば成功しうるか）"""
 
-class ArticleGenerator:
-    """OpenAI APIを使用した記事生成クラス"""
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+class _ArticleGeneratorBase:
+    """
+    ArticleGeneratorとAsyncArticleGeneratorに共通する処理
+    
+    モデルの振り分け・プロンプトの構築・レスポンスの解析・計測・キャッシュ・保存を持ち、
+    APIの呼び出しは持たない（呼び出し方は同期・非同期のサブクラスで実装する）。
+    """
+    
+    def route(self, template: Optional[str]) -> ModelRoute:
+        """テンプレートで使うモデル（routing未設定なら常にmodel）"""
+        if not self.routing:
+            return ModelRoute(model=self.model)
+        return self.routing.route(template, self.model)
+    
+    def _record(
+        self,
+        template: Optional[str],
+        latency: float = 0.0,
+        usage=None,
+        ttft: Optional[float] = None,
+        cache_hit: bool = False,
+        stream: bool = False,
+        error: Optional[str] = None,
+        retries: int = 0,
+        model: Optional[str] = None,
+        route: str = PRIMARY,
+        hedged: bool = False,
+        format_fallback: bool = False
+    ) -> None:
+        """生成1回分の計測結果をmetricsに記録"""
+        if not self.metrics:
+            return
+        self.metrics.record(GenerationRecord(
+            model=model or self.model,
+            template=template,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            latency=latency,
+            time_to_first_token=ttft,
+            retries=retries,
+            cache_hit=cache_hit,
+            stream=stream,
+            error=error,
+            route=route,
+            hedged=hedged,
+            format_fallback=format_fallback
+        ))
+    
+    def _record_completion(self, template: Optional[str], latency: float, completion: Completion,
+                           format_fallback: bool = False) -> None:
+        """成功した呼び出しを、採用したモデル・経路とともに記録"""
+        self._record(template, latency=latency, usage=completion.usage, ttft=completion.ttft,
+                     retries=completion.retries, model=completion.model, route=completion.route,
+                     hedged=completion.hedged, format_fallback=format_fallback)
+    
+    def _cache_lookup(self, prompt: str, params: Optional[Dict[str, any]] = None, model: Optional[str] = None,
+                      system_prompt: Optional[str] = None) -> tuple:
+        """キャッシュを検索し、(キャッシュキー, ヒットした記事 or None)を返す（system_promptの省略時は_system_prompt()）"""
+        if not self.cache:
+            return None, None
+        with tracing.span("cache.lookup") as span:
+            cache_key = ResponseCache.make_key(model or self.model, system_prompt or self._system_prompt(), prompt,
+                                               params or self._request_params())
+            cached = self.cache.get(cache_key)
+            if span:
+                span.attributes["hit"] = cached is not None
+        return cache_key, (ArticleData(**cached.article) if cached else None)
+    
+    def _cache_store(self, cache_key: Optional[str], content: str, article: ArticleData, latency: float, response) -> None:
+        """生成結果をキャッシュに保存（max_tokensで途中で切れた記事は保存しない）"""
+        if not self.cache or article.finish_reason == "length":
+            return
+        usage = getattr(response, "usage", None)
+        self.cache.put(
+            cache_key,
+            content,
+            asdict(article),
+            latency,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0
+        )
+    
+    def _sampling_params(self) -> Dict[str, any]:
+        """API呼び出しのサンプリングパラメータ（キャッシュキーにも使用）"""
+        return {"max_tokens": MAX_TOKENS, "temperature": TEMPERATURE}
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini"):
+    def _request_params(self) -> Dict[str, any]:
+        """非ストリーミング呼び出しのパラメータ（構造化出力時はresponse_formatを含む）"""
+        params = self._sampling_params()
+        if self.structured_output:
+            params["response_format"] = {"type": "json_schema", "json_schema": ARTICLE_JSON_SCHEMA}
+        return params
+    
+    def _system_prompt(self) -> str:
+        """記事を1回で生成する呼び出しのシステムプロンプト（構造化出力でなければマーカー形式を指示する）"""
+        return SYSTEM_PROMPT if self.structured_output else MARKED_SYSTEM_PROMPT
+    
+    def _build_messages(self, prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """Chat Completions API用のメッセージを構築（system_promptの省略時は_system_prompt()）"""
+        return [
+            {"role": "system", "content": system_prompt or self._system_prompt()},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _build_prompt(
+        self, 
+        topic: str, 
+        target_audience: str, 
+        article_length: str,
+        programming_language: Optional[str],
+        template_style: Optional[str] = None
+    ) -> str:
+        """記事生成用のプロンプトを構築（事前コンパイル済みテンプレートから組み立て）"""
+        with tracing.span("prompt.build", template=template_style):
+            return get_registry().render_prompt(
+                topic, target_audience, article_length, programming_language, template_style
+            )
+    
+    def _parse_completion(
+        self,
+        content: str,
+        topic: str,
+        programming_language: Optional[str]
+    ) -> ArticleData:
+        """レスポンスの形式（構造化出力かマーカー形式か）に応じて記事を解析"""
+        with tracing.span("parse", structured=self.structured_output):
+            if self.structured_output:
+                return self._parse_structured_content(content, topic, programming_language)
+            return self._parse_article_content(content, topic, programming_language)
+    
+    def _parse_structured_content(
+        self,
+        content: str,
+        topic: str,
+        programming_language: Optional[str]
+    ) -> ArticleData:
+        """構造化出力（JSON）の記事内容をArticleDataに変換"""
+        title, tags, body = parse_structured_content(content)
+        format_fallback = not (title and tags)
+        title, tags = _finalize_header(title, tags, topic, programming_language)
+        return ArticleData(title=title, body=body, tags=tags, private=True, tweet=False,
+                           format_fallback=format_fallback)
+    
+    def _parse_article_content(
+        self, 
+        content: str, 
+        topic: str,
+        programming_language: Optional[str]
+    ) -> ArticleData:
+        """
+        生成された記事内容（TITLE:/TAGS:/BODY:形式）を解析してArticleDataに変換
+        
+        マーカーがまったくない場合は本文先頭の # 見出しをタイトルとし、それもなければトピックから補完する
+        （StreamingArticleParserと同じ扱い）。
+        TITLE:かTAGS:のどちらかがなければformat_fallbackを立てる（メトリクスで件数を確認できる）。
+        """
+        
+        title, tags, body = parse_marked_content(content)
+        format_fallback = not (title and tags)
+        if not (title or tags):
+            title, body = title_from_heading(body)
+        title, tags = _finalize_header(title, tags, topic, programming_language)
+        
+        return ArticleData(
+            title=title,
+            body=body,
+            tags=tags,
+            private=True,  # デフォルトでプライベート
+            tweet=False,
+            format_fallback=format_fallback
+        )
+    
+    def save_article_json(self, article: ArticleData, filename: str, topic: Optional[str] = None) -> None:
+        """
+        記事データをJSONファイルに保存（一時ファイル経由でアトミックに置き換える）
+        
+        topic_indexが設定されている場合は、保存した記事をインデックスに登録する。
+        archiveが設定されている場合は、保存した記事をアーカイブに追記する（途中で切れた記事は除く）。
+        """
+        article_dict = {
+            "title": article.title,
+            "body": article.body,
+            "tags": article.tags,
+            "private": article.private,
+            "tweet": article.tweet
+        }
+        if article.finish_reason:
+            article_dict["finish_reason"] = article.finish_reason
+        
+        with tracing.span("json.write"):
+            with atomic_write(filename) as f:
+                json.dump(article_dict, f, ensure_ascii=False, indent=2)
+        
+        if self.topic_index:
+            with tracing.span("topic_index.add"):
+                self.topic_index.add(topic or article.title, article.title, article.body, path=filename)
+        if self.archive is not None and article.finish_reason != "length":
+            with tracing.span("archive.append"):
+                self.archive.append(article_dict, topic=topic, source=filename)
+
+class ArticleGenerator(_ArticleGeneratorBase):
+    """
+    OpenAI APIを使用した記事生成クラス
+    
+    インスタンスは生成ごとの状態を持たないため、複数スレッドから共有できる。
+    HTTPコネクションプールはget_http_client()でプロセス全体に共有されるので、
+    インスタンスを都度作成してもTLS接続は再利用される。
+    """
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4o-mini",
+        cache: Optional[ResponseCache] = None,
+        http_client: Optional[httpx.Client] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        structured_output: bool = False,
+        topic_index: Optional[TopicIndex] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        routing: Optional[RoutingPolicy] = None,
+        archive: Optional[ArticleArchive] = None
+    ):
         """
         初期化
         
         Args:
             api_key: OpenAI API Key (環境変数OPENAI_API_KEYから取得可能)
             model: 使用するOpenAIモデル (デフォルト: gpt-4o-mini)
+            cache: レスポンスキャッシュ (指定時は同一条件の生成結果を再利用)
+            http_client: 使用するHTTPクライアント (デフォルト: 共有プール)
+            metrics: 生成ごとのトークン数・レイテンシの記録先
+            structured_output: response_formatのJSONスキーマでタイトル・タグ・本文を受け取る
+            topic_index: 保存した記事を登録する類似度インデックス
+            rate_limiter: API呼び出しのレート制限・同時実行数制御・再試行 (指定時はSDKの再試行を無効化)
+            routing: テンプレートごとのモデルの振り分け・期限・ヘッジ (省略時は常にmodelを使う。
+                     期限の指定時は再試行で期限を超えないようSDKの再試行を無効化)
+            archive: 保存した記事を追記するアーカイブ
         """
+        deadline = routing.deadline if routing else None
+        client_options = {"max_retries": 0} if rate_limiter or deadline else {}
         self.client = OpenAI(
-            api_key=api_key or os.getenv("OPENAI_API_KEY")
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=http_client or get_http_client(),
+            **client_options
         )
         self.model = model
+        self.cache = cache
+        self.metrics = metrics
+        self.structured_output = structured_output
+        self.topic_index = topic_index
+        self.rate_limiter = rate_limiter
+        self.routing = routing
+        self.archive = archive
     
     def generate_article(
         self, 
@@ -47,7 +460,8 @@ class ArticleGenerator:
         target_audience: str = "エンジニア",
         article_length: str = "中程度",
         programming_language: Optional[str] = None,
-        template_style: Optional[str] = None
+        template_style: Optional[str] = None,
+        candidates: int = 1
     ) -> ArticleData:
         """
         指定されたトピックで記事を生成
@@ -58,226 +472,786 @@ class ArticleGenerator:
             article_length: 記事の長さ (短い/中程度/長い)
             programming_language: プログラミング言語 (指定がある場合)
             template_style: 記事テンプレートのスタイル
+            candidates: 2以上なら1回の呼び出しでその数の候補を生成し、採点で最も良い候補を返す
+                        (全候補はgenerate_article_candidatesで受け取れる)
             
         Returns:
             ArticleData: 生成された記事データ
         """
+        if candidates > 1:
+            return self.generate_article_candidates(topic, target_audience, article_length, programming_language,
+                                                    template_style, n=candidates)[0].article
         
         # プロンプトを構築
         prompt = self._build_prompt(topic, target_audience, article_length, programming_language, template_style)
         
+        # キャッシュを確認
+        route = self.route(template_style)
+        cache_key, cached = self._cache_lookup(prompt, model=route.model)
+        if cached:
+            self._record(template_style, cache_hit=True, model=route.model)
+            return cached
+        
+        started_at = time.perf_counter()
         try:
             # OpenAI APIを呼び出し
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """あなたは1000いいねを獲得する技術記事を書く専門家です。Qiita向けの超高品質な技術記事をMarkdown形式で作成してください。
-
-【1000いいね獲得のポイント】:
-- 実用的で即座に使える具体的なコード例
-- 初心者にも分かりやすい丁寧な解説
-- 「なぜそうするのか」の理由も説明
-- ハマりやすいポイントと解決策を含める
-- 読者の「知りたかった！」に応える内容
-- 適切な見出し構成で読みやすさを重視
-- コードにはコメントを充実させる
-- 実際のプロジェクトで使える実践的な内容"""
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=4000,  # トークン数を増やす
-                temperature=0.7
-            )
+            completion = self._completion(self._build_messages(prompt), route, **self._request_params())
+            latency = time.perf_counter() - started_at
             
             # レスポンスから記事内容を抽出
-            article_content = response.choices[0].message.content
+            article_content = completion.content
             
             # 記事データを構造化
-            return self._parse_article_content(article_content, topic, programming_language)
+            article = self._parse_completion(article_content, topic, programming_language)
+            article.finish_reason = completion.finish_reason
             
-        except Exception as e:
-            raise Exception(f"記事生成中にエラーが発生しました: {str(e)}")
+        except (OpenAIError, ValueError, TimeoutError) as e:
+            self._record(template_style, latency=time.perf_counter() - started_at, error=str(e), model=route.model)
+            raise ArticleGenerationError(f"記事生成中にエラーが発生しました: {str(e)}", is_retryable(e)) from e
+        
+        self._record_completion(template_style, latency, completion, format_fallback=article.format_fallback)
+        self._cache_store(cache_key, article_content, article, latency, completion)
+        return article
     
-    def _build_prompt(
-        self, 
-        topic: str, 
-        target_audience: str, 
-        article_length: str,
-        programming_language: Optional[str],
-        template_style: Optional[str] = None
-    ) -> str:
-        """記事生成用のプロンプトを構築"""
+    def generate_article_candidates(
+        self,
+        topic: str,
+        target_audience: str = "エンジニア",
+        article_length: str = "中程度",
+        programming_language: Optional[str] = None,
+        template_style: Optional[str] = None,
+        n: int = DEFAULT_CANDIDATES
+    ) -> List[RankedCandidate]:
+        """
+        1回の呼び出しでn件の候補を生成し、ローカルで採点して良い順に返す
         
-        length_guide = {
-            "短い": "1000-1500文字程度（基本的な説明と簡単な例）",
-            "中程度": "2000-3000文字程度（詳細な説明と複数の例）", 
-            "長い": "3500-5000文字程度（網羅的な説明と実践的な例）"
-        }
+        生成をn回やり直す場合と違い、プロンプトのトークンと往復は1回分で済む（出力トークンはn件分）。
+        候補は並行して解析し、article_rankingの観点（本文の長さ・コードブロック・見出し構成・タイトル）で
+        順位を付ける。先頭が採用する候補で、残りは確認用。解析できなかった候補は除く。
+        ヘッジは1件分の本文をストリーミングで受け取る仕組みのため使わない（期限は適用する）。
+        キャッシュには採用した候補だけを保存し、ヒットした場合はその1件を返す。
+        n以外の引数はgenerate_articleと同じ。
+        
+        Returns:
+            List[RankedCandidate]: 採点した候補（良い順）
+        """
+        
+        prompt = self._build_prompt(topic, target_audience, article_length, programming_language, template_style)
+        
+        route = self.route(template_style)
+        params = dict(self._request_params(), n=n)
+        cache_key, cached = self._cache_lookup(prompt, params, route.model)
+        if cached:
+            self._record(template_style, cache_hit=True, model=route.model)
+            return rank_candidates([cached], article_length)
+        
+        def parse(choice) -> Optional[ArticleData]:
+            try:
+                article = self._parse_completion(choice.message.content or "", topic, programming_language)
+            except ValueError:
+                return None
+            article.finish_reason = choice.finish_reason
+            return article
         
-        # テンプレート別の追加指示
-        template_instructions = {
-            "tutorial": """
-【チュートリアル記事の特別要件】:
-- 初心者でも理解できる段階的な説明
-- 各ステップを明確に分けて解説
-- 「なぜこの手順が必要か」の理由も説明
-- 実際に手を動かして学べる構成
-- つまずきやすいポイントの事前説明""",
+        deadline = self.routing.deadline if self.routing else None
+        timeout = {"timeout": deadline} if deadline else {}
+        started_at = time.perf_counter()
+        try:
+            response, retries = self._create(self._build_messages(prompt), model=route.model, **params, **timeout)
+            latency = time.perf_counter() - started_at
             
-            "tips": """
-【Tips記事の特別要件】:
-- すぐに実践で使える小技やテクニック
-- 「知っていると便利」な情報を中心に
-- 短時間で読めて即座に活用できる内容
-- 具体的な使用場面の提示
-- 他の方法との比較があると良い""",
+            choices = response.choices
+            with ThreadPoolExecutor(max_workers=max(1, len(choices))) as executor:
+                articles = list(executor.map(tracing.propagate(parse), choices))
+            # 解析できなかった候補を除いても、choicesの位置を候補の番号として残す
+            parsed = [(index, article) for index, article in enumerate(articles) if article]
+            if not parsed:
+                raise ValueError(f"{len(choices)}件の候補をいずれも解析できませんでした")
+        
+        except (OpenAIError, ValueError, TimeoutError) as e:
+            self._record(template_style, latency=time.perf_counter() - started_at, error=str(e), model=route.model)
+            raise ArticleGenerationError(f"記事生成中にエラーが発生しました: {str(e)}", is_retryable(e)) from e
+        
+        with tracing.span("rank", candidates=len(parsed)):
+            ranked = rank_candidates([article for _, article in parsed], article_length,
+                                     indexes=[index for index, _ in parsed])
+        
+        best = ranked[0]
+        self._record(template_style, latency=latency, usage=getattr(response, "usage", None), retries=retries,
+                     model=route.model, format_fallback=best.article.format_fallback)
+        self._cache_store(cache_key, choices[best.index].message.content, best.article, latency, response)
+        return ranked
+    
+    def generate_article_sectioned(
+        self,
+        topic: str,
+        target_audience: str = "エンジニア",
+        article_length: str = "長い",
+        programming_language: Optional[str] = None,
+        template_style: Optional[str] = None
+    ) -> ArticleData:
+        """
+        アウトライン→セクションの2段階で長い記事を生成
+        
+        1回目の呼び出しでタイトル・タグ・見出し構成をJSONで受け取り、
+        各セクションの本文を並行して生成してから1つの本文に結合する。
+        所要時間はアウトライン＋最も遅いセクションで決まり、記事全体の長さが
+        1回の呼び出しのmax_tokensに制限されない。
+        引数はgenerate_articleと同じ。
+        
+        Returns:
+            ArticleData: 生成された記事データ
+        """
+        
+        registry = get_registry()
+        base_prompt = self._build_prompt(topic, target_audience, article_length, programming_language, template_style)
+        outline_prompt = registry.render_outline_prompt(base_prompt)
+        
+        model = self.route(template_style).model
+        cache_key, cached = self._cache_lookup(outline_prompt, dict(self._sampling_params(), mode="sectioned"), model,
+                                               system_prompt=SYSTEM_PROMPT)
+        if cached:
+            self._record(template_style, cache_hit=True, model=model)
+            return cached
+        
+        started_at = time.perf_counter()
+        try:
+            title, tags, outline = parse_outline(
+                self._complete(outline_prompt, template_style, max_tokens=OUTLINE_MAX_TOKENS,
+                               response_format={"type": "json_schema", "json_schema": OUTLINE_JSON_SCHEMA}).content
+            )
             
-            "deep-dive": """
-【深掘り記事の特別要件】:
-- 技術の内部動作や仕組みの詳細解説
-- 上級者向けの高度な内容
-- 理論的背景と実装の両方をカバー
-- パフォーマンスやセキュリティの考慮
-- 実際のプロダクションでの使用例""",
+            section_prompts = [
+                registry.render_section_prompt(base_prompt, outline, index, article_length)
+                for index in range(len(outline))
+            ]
+            with ThreadPoolExecutor(max_workers=len(section_prompts)) as executor:
+                sections = list(executor.map(tracing.propagate(lambda prompt: self._complete(prompt, template_style)),
+                                             section_prompts))
             
-            "comparison": """
-【比較記事の特別要件】:
-- 複数の技術・手法の客観的な比較
-- それぞれのメリット・デメリット
-- 使用場面に応じた選択指針
-- 実際のコード例での性能比較
-- 導入コストや学習コストの考慮""",
+            body = stitch_sections(outline, [section.content for section in sections])
+        
+        except (OpenAIError, ValueError, TimeoutError) as e:
+            raise ArticleGenerationError(f"記事生成中にエラーが発生しました: {str(e)}", is_retryable(e)) from e
+        
+        title, tags = _finalize_header(title, tags, topic, programming_language)
+        # どれか1セクションでも途中で切れていれば記事全体を切れているものとして扱う
+        truncated = any(section.finish_reason == "length" for section in sections)
+        article = ArticleData(title=title, body=body, tags=tags, private=True, tweet=False,
+                              finish_reason="length" if truncated else "stop")
+        self._cache_store(cache_key, body, article, time.perf_counter() - started_at, None)
+        return article
+    
+    def _complete(self, prompt: str, template: Optional[str], **params) -> Completion:
+        """1回のChat Completions呼び出し（計測つき）の結果を返す"""
+        route = self.route(template)
+        started_at = time.perf_counter()
+        try:
+            completion = self._completion(self._build_messages(prompt, SYSTEM_PROMPT), route,
+                                          **dict(self._sampling_params(), **params))
+        except (OpenAIError, TimeoutError) as e:
+            self._record(template, latency=time.perf_counter() - started_at, error=str(e), model=route.model)
+            raise
+        self._record_completion(template, time.perf_counter() - started_at, completion)
+        return completion
+    
+    def _completion(self, messages: List[Dict[str, str]], route: ModelRoute, **params) -> Completion:
+        """
+        routeのモデルで本文を生成（routingの期限・ヘッジを適用）
+        
+        ヘッジする場合は最初のトークンの到着を知るためにストリーミングで受信し、
+        予備のリクエストと先に完了した方を採用する。
+        """
+        deadline = self.routing.deadline if self.routing else None
+        hedge_after = self.routing.hedge_after if self.routing else None
+        if hedge_after is None or not route.can_hedge:
+            timeout = {"timeout": deadline} if deadline else {}
+            response, retries = self._create(messages, model=route.model, **params, **timeout)
+            choice = response.choices[0]
+            return Completion(content=choice.message.content, usage=getattr(response, "usage", None),
+                              model=route.model, retries=retries, finish_reason=choice.finish_reason)
+        
+        outcome = run_hedged(lambda attempt: self._stream_attempt(attempt, messages, deadline, **params),
+                             route, hedge_after, deadline)
+        completion = outcome.result
+        completion.model, completion.route, completion.hedged, completion.ttft = (
+            outcome.model, outcome.route, outcome.hedged, outcome.ttft
+        )
+        return completion
+    
+    def _stream_attempt(self, attempt: Attempt, messages: List[Dict[str, str]], deadline: Optional[float],
+                        **params) -> Completion:
+        """ヘッジの1本分: ストリーミングで本文を受信する（キャンセルされたら中断）"""
+        timeout = {"timeout": deadline} if deadline else {}
+        stream, retries = self._create(messages, model=attempt.model, stream=True,
+                                       stream_options={"include_usage": True}, **params, **timeout)
+        parts = []
+        usage = None
+        finish_reason = None
+        try:
+            with tracing.span("openai.stream", model=attempt.model):
+                for chunk in stream:
+                    if attempt.cancelled.is_set():
+                        break
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        finish_reason = chunk.choices[0].finish_reason
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        attempt.mark_first_token()
+                        parts.append(chunk.choices[0].delta.content)
+        finally:
+            stream.close()
+        return Completion(content="".join(parts), usage=usage, retries=retries, finish_reason=finish_reason)
+    
+    def _create(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params) -> tuple:
+        """
+        Chat Completionsを呼び出し、(レスポンス, 再試行回数)を返す（modelの省略時はself.model）
+        
+        rate_limiterが設定されている場合は、見積もりトークン数で送信枠を確保してから呼び出し、
+        応答のレート制限ヘッダーを読むためにwith_raw_responseを使う。
+        ストリーミングでは送信枠を本文を読み終わるか閉じるまで保持する（呼び出し側で必ずclose()する）。
+        """
+        model = model or self.model
+        # ストリーミングではレスポンスヘッダーの受信まで（本文の受信はopenai.streamで計測）
+        with tracing.span("openai.request", model=model, stream=bool(params.get("stream"))):
+            if not self.rate_limiter:
+                return self.client.chat.completions.create(model=model, messages=messages, **params), 0
+            tokens = estimate_tokens(messages, params.get("max_tokens", MAX_TOKENS) * params.get("n", 1))
+            return self.rate_limiter.call(
+                lambda: self.client.chat.completions.with_raw_response.create(model=model, messages=messages,
+                                                                              **params),
+                tokens,
+                stream=bool(params.get("stream"))
+            )
+    
+    def generate_article_stream(
+        self,
+        topic: str,
+        output_path: str,
+        target_audience: str = "エンジニア",
+        article_length: str = "中程度",
+        programming_language: Optional[str] = None,
+        template_style: Optional[str] = None,
+        on_header: Optional[Callable[[str, List[Dict[str, any]]], None]] = None
+    ) -> "StreamedArticle":
+        """
+        ストリーミングで記事を生成し、JSONファイルへ逐次書き出す
+        
+        TITLE:/TAGS: が届いた時点でon_headerを呼び出し、本文はチャンクごとに
+        一時ファイルへ書き込み、完了後にoutput_pathへリネームする。
+        本文全体をメモリに保持しない。
+        本文を保持しないため、レスポンスキャッシュは使用しない。
+        出力はTITLE:/TAGS:/BODY:形式で受け取るため、structured_outputは適用しない。
+        本文を逐次書き出すため、routingのヘッジは適用しない（モデルの振り分けと期限は適用する）。
+        
+        Args:
+            topic: 記事のトピック
+            output_path: 書き出し先のJSONファイルパス
+            target_audience: 対象読者
+            article_length: 記事の長さ (短い/中程度/長い)
+            programming_language: プログラミング言語 (指定がある場合)
+            template_style: 記事テンプレートのスタイル
+            on_header: タイトルとタグ確定時のコールバック
             
-            "troubleshooting": """
-【トラブルシューティング記事の特別要件】:
-- よくある問題とその解決方法
-- エラーメッセージの読み方と対処法
-- 問題の原因分析のアプローチ
-- 予防策や回避方法の提示
-- デバッグのコツやツールの紹介"""
-        }
+        Returns:
+            StreamedArticle: タイトル・タグと本文の書き出し結果
+        """
         
-        prompt = f"""
-以下の条件で技術記事を作成してください：
+        prompt = self._build_prompt(topic, target_audience, article_length, programming_language, template_style)
+        model = self.route(template_style).model
+        deadline = self.routing.deadline if self.routing else None
+        
+        started_at = time.perf_counter()
+        first_token_at = None
+        usage = None
+        finish_reason = None
+        try:
+            stream, retries = self._create(
+                self._build_messages(prompt, STREAM_SYSTEM_PROMPT),
+                model=model,
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._sampling_params(),
+                **({"timeout": deadline} if deadline else {})
+            )
+            
+            try:
+                with atomic_write(output_path) as f:
+                    writer = _StreamingJsonWriter(f)
+                
+                    def handle_header(title, tags):
+                        writer.write_header(title, tags)
+                        if on_header:
+                            on_header(title, tags)
+                
+                    parser = StreamingArticleParser(
+                        topic,
+                        programming_language,
+                        on_header=handle_header,
+                        on_body=writer.write_body
+                    )
+                    # 受信・解析・JSONの書き込みを逐次行うため、本文の受信と書き込みは1つの区間になる
+                    with tracing.span("openai.stream", model=model, write=True):
+                        for chunk in stream:
+                            if getattr(chunk, "usage", None):
+                                usage = chunk.usage
+                            if chunk.choices and chunk.choices[0].finish_reason:
+                                finish_reason = chunk.choices[0].finish_reason
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                parser.feed(chunk.choices[0].delta.content)
+                        parser.close()
+                        writer.close(finish_reason)
+            finally:
+                # 途中で失敗しても接続とrate_limiterの送信枠を返す
+                stream.close()
+            
+            self._record(
+                template_style,
+                latency=time.perf_counter() - started_at,
+                usage=usage,
+                ttft=(first_token_at - started_at) if first_token_at else None,
+                stream=True,
+                retries=retries,
+                model=model,
+                format_fallback=parser.format_fallback
+            )
+            if self.topic_index:
+                # 本文はファイルにのみ存在するため、トピックとタイトルだけを登録する
+                with tracing.span("topic_index.add"):
+                    self.topic_index.add(topic, parser.title, path=output_path)
+            if self.archive is not None and finish_reason != "length":
+                with tracing.span("archive.append"):
+                    self.archive.append_file(output_path, topic=topic)
+            return StreamedArticle(
+                title=parser.title,
+                tags=parser.tags,
+                output_path=output_path,
+                body_length=writer.body_length,
+                finish_reason=finish_reason,
+                format_fallback=parser.format_fallback
+            )
+            
+        except (OpenAIError, ValueError) as e:
+            self._record(template_style, latency=time.perf_counter() - started_at, stream=True, error=str(e),
+                         model=model)
+            raise ArticleGenerationError(f"記事生成中にエラーが発生しました: {str(e)}", is_retryable(e)) from e
 
-【記事の基本情報】:
-- トピック: {topic}
-- 対象読者: {target_audience}
-- 記事の長さ: {length_guide.get(article_length, "2000-3000文字程度")}
-"""
+class AsyncArticleGenerator(_ArticleGeneratorBase):
+    """
+    ArticleGeneratorの非同期版
     
-        if programming_language:
-            prompt += f"- 主要プログラミング言語: {programming_language}\n"
-        
-        # テンプレート固有の指示を追加
-        if template_style and template_style in template_instructions:
-            prompt += template_instructions[template_style]
-        
-        prompt += f"""
-
-【記事構成の要件】:
-1. **魅力的なタイトル**: 具体的で読みたくなるタイトル
-2. **はじめに**: 
-   - この記事で何が学べるか
-   - なぜこの技術が重要か
-   - 記事の対象読者
-3. **本文**: 
-   - 段階的に理解できる構成
-   - 実際に動くコード例（コメント付き）
-   - つまずきやすいポイントの解説
-   - 実践的な使用例
-4. **まとめ**: 
-   - 学んだことの要点
-   - 次のステップの提案
-
-【コード例の要件】:
-- 実際に動作するコード
-- 適切なコメント
-- エラーハンドリングを含む
-- 実践的な使用例
-
-【対象読者: {target_audience}】に合わせた難易度で執筆してください。
-
-実用的で読みやすく、実際の開発で役立つ記事を作成してください。
-"""
+    AsyncOpenAIとget_async_http_client()の共有プールを使用する。
+    プロンプト構築・解析・キャッシュ・計測はArticleGeneratorと共通で、
+    rate_limiterとroutingも同期版と同じものを共有できる（同じAPIキーの呼び出しをまとめて制御する）。
+    対応するのは1回の呼び出しで記事を生成するgenerate_articleだけで、ストリーミング生成・
+    分割生成・候補モードとroutingのヘッジは同期版のArticleGeneratorを使うこと。
+    """
     
-        return prompt
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4o-mini",
+        cache: Optional[ResponseCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        structured_output: bool = False,
+        topic_index: Optional[TopicIndex] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        routing: Optional[RoutingPolicy] = None,
+        archive: Optional[ArticleArchive] = None
+    ):
+        """
+        初期化
+        
+        Args:
+            api_key: OpenAI API Key (環境変数OPENAI_API_KEYから取得可能)
+            model: 使用するOpenAIモデル (デフォルト: gpt-4o-mini)
+            cache: レスポンスキャッシュ (指定時は同一条件の生成結果を再利用)
+            http_client: 使用する非同期HTTPクライアント (デフォルト: 共有プール)
+            metrics: 生成ごとのトークン数・レイテンシの記録先
+            structured_output: response_formatのJSONスキーマでタイトル・タグ・本文を受け取る
+            topic_index: 保存した記事を登録する類似度インデックス
+            rate_limiter: API呼び出しのレート制限・同時実行数制御・再試行 (指定時はSDKの再試行を無効化)
+            routing: テンプレートごとのモデルの振り分けと期限 (ヘッジは適用しない。
+                     期限の指定時は再試行で期限を超えないようSDKの再試行を無効化)
+            archive: 保存した記事を追記するアーカイブ
+        """
+        deadline = routing.deadline if routing else None
+        client_options = {"max_retries": 0} if rate_limiter or deadline else {}
+        self.client = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=http_client or get_async_http_client(),
+            **client_options
+        )
+        self.model = model
+        self.cache = cache
+        self.metrics = metrics
+        self.structured_output = structured_output
+        self.topic_index = topic_index
+        self.rate_limiter = rate_limiter
+        self.routing = routing
+        self.archive = archive
     
-    def _parse_article_content(
+    async def generate_article(
         self, 
-        content: str, 
-        topic: str,
-        programming_language: Optional[str]
+        topic: str, 
+        target_audience: str = "エンジニア",
+        article_length: str = "中程度",
+        programming_language: Optional[str] = None,
+        template_style: Optional[str] = None
     ) -> ArticleData:
-        """生成された記事内容を解析してArticleDataに変換"""
+        """
+        指定されたトピックで記事を非同期に生成（引数はArticleGenerator.generate_articleと同じ。候補モードを除く）
+        
+        Returns:
+            ArticleData: 生成された記事データ
+        """
         
-        lines = content.strip().split('\n')
-        title = ""
-        tags = []
-        body = ""
+        prompt = self._build_prompt(topic, target_audience, article_length, programming_language, template_style)
         
-        # タイトルとタグを抽出
-        body_start = 0
-        for i, line in enumerate(lines):
-            if line.startswith("TITLE:"):
-                title = line.replace("TITLE:", "").strip()
-            elif line.startswith("TAGS:"):
-                tag_str = line.replace("TAGS:", "").strip()
-                # 角括弧を除去してからタグを分割
-                tag_str = tag_str.strip('[]')
-                tag_names = [tag.strip().strip('[]') for tag in tag_str.split(',')]
-                # 空のタグや不正なタグを除外
-                tag_names = [name for name in tag_names if name and len(name) > 0]
-                tags = [{"name": name, "versions": []} for name in tag_names]
-            elif line.startswith("BODY:"):
-                body_start = i + 1
-                break
-        
-        # 本文を抽出
-        if body_start > 0:
-            body = '\n'.join(lines[body_start:]).strip()
+        route = self.route(template_style)
+        cache_key, cached = self._cache_lookup(prompt, model=route.model)
+        if cached:
+            self._record(template_style, cache_hit=True, model=route.model)
+            return cached
+        
+        deadline = self.routing.deadline if self.routing else None
+        started_at = time.perf_counter()
+        try:
+            response, retries = await self._create(self._build_messages(prompt), model=route.model,
+                                                   **self._request_params(),
+                                                   **({"timeout": deadline} if deadline else {}))
+            latency = time.perf_counter() - started_at
+            
+            article_content = response.choices[0].message.content
+            article = self._parse_completion(article_content, topic, programming_language)
+            article.finish_reason = response.choices[0].finish_reason
+            
+        except (OpenAIError, ValueError, TimeoutError) as e:
+            self._record(template_style, latency=time.perf_counter() - started_at, error=str(e), model=route.model)
+            raise ArticleGenerationError(f"記事生成中にエラーが発生しました: {str(e)}", is_retryable(e)) from e
+        
+        self._record(template_style, latency=latency, usage=getattr(response, "usage", None), retries=retries,
+                     model=route.model, format_fallback=article.format_fallback)
+        self._cache_store(cache_key, article_content, article, latency, response)
+        return article
+    
+    async def _create(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params) -> tuple:
+        """ArticleGenerator._createの非同期版（rate_limiterの送信枠・再試行も同期版と共通）"""
+        model = model or self.model
+        with tracing.span("openai.request", model=model, stream=False):
+            if not self.rate_limiter:
+                return await self.client.chat.completions.create(model=model, messages=messages, **params), 0
+            tokens = estimate_tokens(messages, params.get("max_tokens", MAX_TOKENS) * params.get("n", 1))
+            return await self.rate_limiter.call_async(
+                lambda: self.client.chat.completions.with_raw_response.create(model=model, messages=messages,
+                                                                              **params),
+                tokens
+            )
+
+def _parse_tags(line: str) -> List[Dict[str, any]]:
+    """TAGS:行をQiitaのタグ形式に変換"""
+    tag_str = line.replace("TAGS:", "").strip()
+    # 角括弧を除去してからタグを分割
+    tag_str = tag_str.strip('[]')
+    tag_names = [tag.strip().strip('[]') for tag in tag_str.split(',')]
+    # 空のタグや不正なタグを除外
+    tag_names = [name for name in tag_names if name and len(name) > 0]
+    return [{"name": name, "versions": []} for name in tag_names]
+
+def parse_marked_content(content: str) -> tuple:
+    """
+    TITLE:/TAGS:/BODY:形式のテキストを1回の走査で(title, tags, body)に分解
+    
+    行リストを作らず、マーカーで始まる行だけを正規表現で辿り、元の文字列を
+    オフセットで参照する。本文はBODY:の次の行から末尾までを一度だけスライスする。
+    BODY:が見つからない場合は全体を本文とする（コピーしない）。
+    """
+    title = ""
+    tags: List[Dict[str, any]] = []
+    
+    # 前後の空白を除いた範囲 [start, end)
+    match = _NON_SPACE.search(content)
+    if not match:
+        return title, tags, content
+    start = match.start()
+    end = len(content)
+    while content[end - 1].isspace():
+        end -= 1
+    
+    for pos in _marker_positions(content, start, end):
+        line_end = content.find("\n", pos, end)
+        if line_end == -1:
+            line_end = end
+        if content.startswith("BODY:", pos):
+            body_match = _NON_SPACE.search(content, line_end + 1, end)
+            body = content[body_match.start():end] if body_match else ""
+            return title, tags, body
+        elif content.startswith("TITLE:", pos):
+            title = content[pos:line_end].replace("TITLE:", "").strip()
         else:
-            body = content  # フォーマットが異なる場合は全体を本文とする
+            tags = _parse_tags(content[pos:line_end])
+    
+    return title, tags, content
+
+def title_from_heading(body: str) -> tuple:
+    """本文が # 見出しで始まる場合は(見出し, 見出しを除いた本文)、そうでなければ("", body)"""
+    match = _TITLE_HEADING.match(body)
+    if not match:
+        return "", body
+    return match.group(1).strip(), body[match.end():].lstrip()
+
+_TITLE_HEADING = re.compile(r"# +(\S[^\n]*)(?:\n|$)")
+_MARKERS = ("TITLE:", "TAGS:", "BODY:")
+_MARKER_LINE = re.compile(r"^(?:TITLE|TAGS|BODY):", re.MULTILINE)
+_NON_SPACE = re.compile(r"\S")
+
+def _marker_positions(content: str, start: int, end: int) -> Iterator[int]:
+    """[start, end)の範囲でマーカーから始まる行の先頭位置を順に返す"""
+    # 先頭の空白を飛ばした位置は行頭ではないため、^では一致しない
+    if start and content[start - 1] != "\n" and content.startswith(_MARKERS, start, end):
+        yield start
+    for match in _MARKER_LINE.finditer(content, start, end):
+        yield match.start()
+
+def parse_structured_content(content: str) -> tuple:
+    """構造化出力（ARTICLE_JSON_SCHEMA形式のJSON）を(title, tags, body)に分解"""
+    data = json.loads(content)
+    if not isinstance(data, dict) or not isinstance(data.get("body"), str):
+        raise ValueError("構造化出力にbodyがありません")
+    
+    return str(data.get("title") or "").strip(), _tag_list(data.get("tags")), data["body"].strip()
+
+def parse_outline(content: str) -> tuple:
+    """分割生成のアウトライン（OUTLINE_JSON_SCHEMA形式のJSON）を(title, tags, sections)に分解"""
+    data = json.loads(content)
+    sections = []
+    for entry in (data.get("sections") or [] if isinstance(data, dict) else []):
+        heading = str(entry.get("heading") or "").strip().lstrip("#").strip()
+        if heading:
+            points = tuple(str(point).strip() for point in entry.get("points") or [] if str(point).strip())
+            sections.append(OutlineSection(heading=heading, points=points))
+    if not sections:
+        raise ValueError("アウトラインにセクションがありません")
+    return str(data.get("title") or "").strip(), _tag_list(data.get("tags")), sections[:MAX_SECTIONS]
+
+def stitch_sections(outline: List[OutlineSection], texts: List[str]) -> str:
+    """
+    セクションごとの本文を1つの記事本文に結合
+    
+    セクション見出しは ## に統一し、本文側で繰り返された見出しは取り除く。
+    本文中の # / ## の見出しは ### に下げ、閉じられていないコードブロックは閉じる。
+    """
+    parts = []
+    for section, text in zip(outline, texts):
+        lines = (text or "").strip().split("\n")
+        if lines and lines[0].startswith("#") and lines[0].lstrip("#").strip() == section.heading:
+            lines = lines[1:]
+        
+        in_code = False
+        for i, line in enumerate(lines):
+            if line.lstrip().startswith("```"):
+                in_code = not in_code
+            elif not in_code and line.startswith("#"):
+                level = len(line) - len(line.lstrip("#"))
+                if level < 3 and line[level:level + 1] == " ":
+                    lines[i] = "###" + line[level:]
+        if in_code:
+            lines.append("```")
         
-        # タイトルが抽出できない場合はトピックから生成
-        if not title:
-            title = f"{topic}について"
+        parts.append(f"## {section.heading}\n\n" + "\n".join(lines).strip())
+    return "\n\n".join(parts)
+
+def use_sectioned(article_length: str, template_style: Optional[str]) -> bool:
+    """分割生成の対象となる記事か（長い記事・深掘り記事）"""
+    return article_length in SECTIONED_LENGTHS or template_style in SECTIONED_TEMPLATES
+
+def _tag_list(names) -> List[Dict[str, any]]:
+    """タグ名のリストをQiitaのタグ形式に変換（空のタグと重複を除外し、順序は維持）"""
+    tag_names = []
+    for name in names or []:
+        name = str(name).strip()
+        if name and name not in tag_names:
+            tag_names.append(name)
+    return [{"name": name, "versions": []} for name in tag_names]
+
+def _finalize_header(
+    title: str,
+    tags: List[Dict[str, any]],
+    topic: str,
+    programming_language: Optional[str]
+) -> tuple:
+    """タイトルとタグのデフォルト補完・切り詰め"""
+    
+    # タイトルが抽出できない場合はトピックから生成
+    if not title:
+        title = f"{topic}について"
+
+    # Qiitaのタイトル上限に合わせて切り詰め
+    title = title[:QIITA_TITLE_MAX_LENGTH]
+    
+    # タグが抽出できない場合はデフォルトタグを設定
+    if not tags:
+        default_tags = ["技術記事"]
+        if programming_language:
+            default_tags.append(programming_language)
+        tags = [{"name": name, "versions": []} for name in default_tags]
+    
+    return title, tags
 
-        # Qiitaのタイトル上限に合わせて切り詰め
-        title = title[:QIITA_TITLE_MAX_LENGTH]
+@dataclass
+class StreamedArticle:
+    """ストリーミング生成の結果（本文はファイルにのみ存在する）"""
+    title: str
+    tags: List[Dict[str, any]]
+    output_path: str
+    body_length: int
+    private: bool = True
+    tweet: bool = False
+    finish_reason: Optional[str] = None
+    format_fallback: bool = False
+
+class StreamingArticleParser:
+    """
+    チャンク単位でTITLE:/TAGS:/BODY:を解析するパーサー
+    
+    ヘッダー部分は行単位で解析し、BODY:以降はチャンクをそのまま
+    on_bodyへ流す。BODY:が見つからない場合は_parse_article_contentと
+    同様に全体を本文として扱う。マーカーより前に本文行が現れた場合や、
+    保持したヘッダーがMAX_HEADER_CHARSを超えた場合はその時点で本文扱いに
+    切り替える。マーカーより前の最初の行が # 見出しなら、それをタイトルとして
+    すぐに本文へ切り替える。本文の前後の空白は_parse_article_contentと同様に取り除く。
+    TITLE:/TAGS:が揃わなかった場合はformat_fallbackを立てる。
+    """
+    
+    MAX_HEADER_CHARS = 2000
+    
+    def __init__(
+        self,
+        topic: str,
+        programming_language: Optional[str],
+        on_header: Callable[[str, List[Dict[str, any]]], None],
+        on_body: Callable[[str], None]
+    ):
+        self.topic = topic
+        self.programming_language = programming_language
+        self.on_header = on_header
+        self.on_body = on_body
+        self.title = ""
+        self.tags: List[Dict[str, any]] = []
+        self.format_fallback = False
+        self._in_body = False
+        self._line_buffer = ""
+        self._held = []  # フォールバック用に保持するヘッダー部分の生テキスト
+        self._body_started = False
+        self._pending_whitespace = ""
+    
+    def feed(self, text: str) -> None:
+        """ストリームのチャンクを1つ処理"""
+        if self._in_body:
+            self._emit_body(text)
+            return
         
-        # タグが抽出できない場合はデフォルトタグを設定
-        if not tags:
-            default_tags = ["技術記事"]
-            if programming_language:
-                default_tags.append(programming_language)
-            tags = [{"name": name, "versions": []} for name in default_tags]
+        self._line_buffer += text
+        while not self._in_body and "\n" in self._line_buffer:
+            line, self._line_buffer = self._line_buffer.split("\n", 1)
+            self._handle_header_line(line, "\n")
         
-        return ArticleData(
-            title=title,
-            body=body,
-            tags=tags,
-            private=True,  # デフォルトでプライベート
-            tweet=False
-        )
+        if self._in_body and self._line_buffer:
+            rest, self._line_buffer = self._line_buffer, ""
+            self._emit_body(rest)
     
-    def save_article_json(self, article: ArticleData, filename: str) -> None:
-        """記事データをJSONファイルに保存"""
-        article_dict = {
-            "title": article.title,
-            "body": article.body,
-            "tags": article.tags,
-            "private": article.private,
-            "tweet": article.tweet
-        }
+    def close(self) -> None:
+        """ストリーム終端の処理"""
+        if not self._in_body and self._line_buffer:
+            line, self._line_buffer = self._line_buffer, ""
+            self._handle_header_line(line, "")
+        if not self._in_body:
+            # BODY:が現れなかった場合は全体を本文とする
+            self._start_body()
+            self._emit_body("".join(self._held))
+        self._held = []
+    
+    def _handle_header_line(self, line: str, newline: str) -> None:
+        if line.startswith("BODY:"):
+            self._held = []
+            self._start_body()
+            return
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(article_dict, f, ensure_ascii=False, indent=2)
+        self._held.append(line + newline)
+        if line.startswith("TITLE:"):
+            self.title = line.replace("TITLE:", "").strip()
+        elif line.startswith("TAGS:"):
+            self.tags = _parse_tags(line)
+        elif not (self.title or self.tags) and _TITLE_HEADING.match(line):
+            # マーカーのない # 見出し: タイトルとして使い、続きを本文とする
+            self.title, self._held = title_from_heading(line)[0], []
+            self.format_fallback = True
+            self._start_body()
+        elif line.strip() and (not (self.title or self.tags) or self._held_chars() > self.MAX_HEADER_CHARS):
+            # マーカーのない本文行: フォーマットが異なるので全体を本文とする
+            held, self._held = "".join(self._held), []
+            self._start_body()
+            self._emit_body(held)
+    
+    def _held_chars(self) -> int:
+        return sum(len(part) for part in self._held)
+    
+    def _start_body(self) -> None:
+        self._in_body = True
+        self.format_fallback = self.format_fallback or not (self.title and self.tags)
+        self.title, self.tags = _finalize_header(self.title, self.tags, self.topic, self.programming_language)
+        self.on_header(self.title, self.tags)
+    
+    def _emit_body(self, text: str) -> None:
+        if not self._body_started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._body_started = True
+        
+        # 末尾の空白は後続の文字が来るまで保留する
+        stripped = text.rstrip()
+        if not stripped:
+            self._pending_whitespace += text
+            return
+        self.on_body(self._pending_whitespace + stripped)
+        self._pending_whitespace = text[len(stripped):]
+
+class _StreamingJsonWriter:
+    """save_article_jsonと同じ形式のJSONを逐次書き出すライター"""
+    
+    def __init__(self, f):
+        self.f = f
+        self.body_length = 0
+        self._header_written = False
+    
+    def write_header(self, title: str, tags: List[Dict[str, any]]) -> None:
+        dump = lambda value: json.dumps(value, ensure_ascii=False)
+        self.f.write("{\n")
+        self.f.write(f'  "title": {dump(title)},\n')
+        self.f.write(f'  "tags": {dump(tags)},\n')
+        self.f.write('  "private": true,\n')
+        self.f.write('  "tweet": false,\n')
+        self.f.write('  "body": "')
+        self.f.flush()
+        self._header_written = True
+    
+    def write_body(self, text: str) -> None:
+        self.f.write(json.dumps(text, ensure_ascii=False)[1:-1])
+        self.f.flush()
+        self.body_length += len(text)
+    
+    def close(self, finish_reason: Optional[str] = None) -> None:
+        if not self._header_written:
+            return
+        self.f.write('"')
+        if finish_reason:
+            self.f.write(f',\n  "finish_reason": {json.dumps(finish_reason)}')
+        self.f.write('\n}\n')
 
 def main():
     """テスト用のメイン関数"""
@@ -0,0 +1,149 @@
+"""
+Article Ranking
+1回のリクエストで生成した複数の候補（n）を、APIを呼ばずにローカルで採点して順位を付ける
+
+記事が物足りないたびに生成をやり直すと、プロンプトのトークンと往復の時間をその都度払うことになる。
+候補モードでは1回の呼び出しでn件の本文を受け取り、次の観点で採点して最も良い候補を採用する。
+
+- 本文の長さ: テンプレートの記事の長さ（短い/中程度/長い）の目標文字数に近いほど高い
+- コードブロック: 閉じられたコードブロックの数（目安の数で満点。閉じ忘れがあれば0点）
+- 見出し構成: 見出しの数（目安の数で満点）。レベルの飛びは減点し、長い本文に見出しがなければ0点
+- タイトル: 空でなく、Qiitaの上限（QIITA_TITLE_MAX_LENGTH）に切り詰めずに収まっているか
+
+max_tokensに達して途中で切れた候補（finish_reason: length）は、点数によらず切れていない候補より下に置く。
+OpenAI SDKに依存しないため、生成しない起動パスから読み込んでも軽い。
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from article_spool import atomic_write
+from article_validator import MIN_BODY_FOR_HEADINGS, QIITA_TITLE_MAX_LENGTH, scan_markdown
+from prompt_templates import DEFAULT_TARGET_CHARS, LENGTH_TARGET_CHARS
+
+# 観点ごとの重み（合計1.0）
+WEIGHTS = {"length": 0.4, "code_blocks": 0.2, "headings": 0.25, "title": 0.15}
+# 満点とするコードブロック・見出しの数
+TARGET_CODE_BLOCKS = 3
+TARGET_HEADINGS = 4
+# これより短いタイトルは内容が伝わりにくいため減点する
+MIN_TITLE_LENGTH = 10
+# 候補を書き出すファイルの接尾辞（スプールの*.jsonの走査に含まれない）
+CANDIDATES_SUFFIX = ".candidates.jsonl"
+
+_HEADING = re.compile(r"^(#{1,6})\s")
+
+@dataclass
+class CandidateScore:
+    """1候補の採点結果（各観点は0〜1）"""
+    total: float
+    length: float
+    code_blocks: float
+    headings: float
+    title: float
+    body_chars: int
+    code_block_count: int
+    heading_count: int
+    truncated: bool = False
+
+    def summary(self) -> str:
+        """表示用の内訳"""
+        return (f"{self.total:.2f} (長さ {self.body_chars}文字 {self.length:.2f} / "
+                f"コード {self.code_block_count}個 {self.code_blocks:.2f} / "
+                f"見出し {self.heading_count}個 {self.headings:.2f} / タイトル {self.title:.2f})"
+                + (" [途中で切れています]" if self.truncated else ""))
+
+@dataclass
+class RankedCandidate:
+    """順位を付けた候補（indexはレスポンスのchoicesの位置）"""
+    index: int
+    article: Any
+    score: CandidateScore
+
+def score_article(article: Any, article_length: str) -> CandidateScore:
+    """
+    記事を採点
+
+    Args:
+        article: ArticleData（title・body・finish_reasonを持つもの）
+        article_length: 記事の長さ（短い/中程度/長い）
+    """
+    body = article.body or ""
+    scan = scan_markdown(body)
+
+    target = LENGTH_TARGET_CHARS.get(article_length, DEFAULT_TARGET_CHARS)
+    length = max(0.0, 1 - abs(len(body) - target) / target)
+
+    code_blocks = min(len(scan.code_blocks), TARGET_CODE_BLOCKS) / TARGET_CODE_BLOCKS
+    if scan.unclosed_fence is not None:
+        code_blocks = 0.0
+
+    levels = [len(match.group(1)) for match in (_HEADING.match(line) for _, line in scan.headings) if match]
+    if not levels:
+        headings = 0.0 if len(body) >= MIN_BODY_FOR_HEADINGS else 0.5
+    else:
+        jumps = sum(1 for a, b in zip(levels, levels[1:]) if b > a + 1)
+        headings = max(0.0, min(len(levels), TARGET_HEADINGS) / TARGET_HEADINGS - 0.25 * jumps)
+
+    title_text = (article.title or "").strip()
+    if not title_text:
+        title = 0.0
+    elif len(title_text) >= QIITA_TITLE_MAX_LENGTH or len(title_text) < MIN_TITLE_LENGTH:
+        # 上限ちょうどは切り詰めた可能性が高い
+        title = 0.5
+    else:
+        title = 1.0
+
+    parts = {"length": length, "code_blocks": code_blocks, "headings": headings, "title": title}
+    return CandidateScore(
+        total=sum(WEIGHTS[key] * value for key, value in parts.items()),
+        body_chars=len(body),
+        code_block_count=len(scan.code_blocks),
+        heading_count=len(levels),
+        truncated=getattr(article, "finish_reason", None) == "length",
+        **parts
+    )
+
+def rank_candidates(
+    articles: Sequence[Any],
+    article_length: str,
+    indexes: Optional[Sequence[int]] = None
+) -> List[RankedCandidate]:
+    """
+    候補を採点し、良い順に並べる（同点はchoicesの順）
+
+    Args:
+        articles: 採点する候補
+        article_length: 記事の長さ（短い/中程度/長い）
+        indexes: 各候補のchoicesの位置（解析できなかった候補を除いた場合。省略時は0からの連番）
+    """
+    indexes = range(len(articles)) if indexes is None else indexes
+    ranked = [RankedCandidate(index, article, score_article(article, article_length))
+              for index, article in zip(indexes, articles)]
+    return sorted(ranked, key=lambda candidate: (candidate.score.truncated, -candidate.score.total, candidate.index))
+
+def candidates_path(output_path: str) -> Path:
+    """記事JSONに対応する候補のファイル（<記事JSON>.candidates.jsonl）"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + CANDIDATES_SUFFIX)
+
+def save_candidates(candidates: List[RankedCandidate], output_path: str) -> Path:
+    """採用しなかった候補も含め、全候補を順位順に1行1件で書き出す（確認用）"""
+    path = candidates_path(output_path)
+    with atomic_write(str(path)) as f:
+        for rank, candidate in enumerate(candidates, start=1):
+            article = candidate.article
+            record: Dict[str, Any] = {
+                "rank": rank,
+                "choice": candidate.index,
+                "score": asdict(candidate.score),
+                "title": article.title,
+                "tags": article.tags,
+                "body": article.body,
+                "finish_reason": article.finish_reason
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
@@ -0,0 +1,162 @@
+"""
+Article Spool
+生成済み記事の受け渡しディレクトリ（スプール）を管理する
+
+ファイル名は `<UTC時刻>-<実行ID>-<連番>.json` で、名前順が生成順になる。
+同じ実行IDで再開した場合は最初の実行の時刻を引き継ぎ、行ごとのファイル名を変えない。
+書き込みは一時ファイル経由のアトミックなリネームで行い、投稿側は
+`.lock` を排他作成して記事を確保し、結果を `.done` / `.failed` マーカーに残す。
+マーカー形式はElixir側の `QiitaPublisher.PythonBridge.publish_spool/2` と共通。
+"""
+
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+DONE_SUFFIX = ".done"
+FAILED_SUFFIX = ".failed"
+LOCK_SUFFIX = ".lock"
+
+def new_run_id() -> str:
+    """実行IDを生成"""
+    return uuid.uuid4().hex[:12]
+
+@contextmanager
+def atomic_write(path: str, encoding: str = "utf-8") -> Iterator[Any]:
+    """同じディレクトリの一時ファイルに書き込み、完了後にリネームする"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+class ArticleSpool:
+    """
+    生成と投稿の間で記事を受け渡すスプールディレクトリ
+
+    複数プロセス・複数マシンから同時に書き込み・消費しても、
+    同じ記事が二重に投稿されないように排他ファイルで確保する。
+    """
+
+    def __init__(self, root: str, run_id: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            root: スプールディレクトリ
+            run_id: この実行のID (省略時は自動生成。既存の実行IDなら再生成した記事も同じファイル名に書く)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id or new_run_id()
+        self._started_at = (run_id and self._first_started_at(run_id)) or \
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+
+    def _first_started_at(self, run_id: str) -> Optional[str]:
+        """実行IDの記事がスプールにあれば、最初の記事のファイル名の時刻"""
+        names = sorted(path.name for path in self.root.glob(f"*-{run_id}-*.json"))
+        return names[0].split("-", 1)[0] if names else None
+
+    def entry_path(self, index: int = 1) -> Path:
+        """この実行のindex番目の記事ファイルのパス"""
+        return self.root / f"{self._started_at}-{self.run_id}-{index:04d}.json"
+
+    def pending(self) -> List[Path]:
+        """未処理（done/failedマーカーも確保中のロックもない）の記事を生成順に返す"""
+        # ディレクトリを1回だけ列挙し、マーカーの有無は名前の集合で判定する（記事ごとのstatを省く）
+        names = set(os.listdir(self.root))
+        markers = (DONE_SUFFIX, FAILED_SUFFIX, LOCK_SUFFIX)
+        return [
+            self.root / name for name in sorted(names)
+            if name.endswith(".json") and not any(name + suffix in names for suffix in markers)
+        ]
+
+    def claim(self, path: Path) -> bool:
+        """記事を排他的に確保（他のプロセスが確保済みならFalse）"""
+        try:
+            fd = os.open(str(self._marker(path, LOCK_SUFFIX)), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"host": socket.gethostname(), "pid": os.getpid(), "claimed_at": time.time()}, f)
+        return True
+
+    @classmethod
+    def is_published(cls, path: Path) -> bool:
+        """投稿成功のマーカーがあるか"""
+        return cls._marker(Path(path), DONE_SUFFIX).exists()
+
+    @classmethod
+    def read_done(cls, path: Path) -> Optional[Dict[str, Any]]:
+        """投稿成功のマーカーの内容（url, id など。マーカーがなければNone）"""
+        return cls._read_marker(path, DONE_SUFFIX)
+
+    @classmethod
+    def read_failed(cls, path: Path) -> Optional[Dict[str, Any]]:
+        """投稿失敗のマーカーの内容（error など。マーカーがなければNone）"""
+        return cls._read_marker(path, FAILED_SUFFIX)
+
+    def release_stale_lock(self, path: Path) -> bool:
+        """
+        このホストで終了済みのプロセスが残したロックを解除（解除した場合はTrue）
+
+        投稿中にプロセスが止まった記事を再開時に投稿し直せるようにする。
+        他のホストのロックは生存を確認できないため解除しない。
+        """
+        lock = self._read_marker(path, LOCK_SUFFIX)
+        if not lock or lock.get("host") != socket.gethostname() or lock.get("pid") == os.getpid():
+            return False
+        try:
+            os.kill(int(lock["pid"]), 0)
+            return False
+        except ProcessLookupError:
+            self._marker(Path(path), LOCK_SUFFIX).unlink(missing_ok=True)
+            return True
+        except (KeyError, TypeError, ValueError, PermissionError):
+            return False
+
+    @classmethod
+    def _read_marker(cls, path: Path, suffix: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(cls._marker(Path(path), suffix), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def mark_done(self, path: Path, info: Optional[Dict[str, Any]] = None) -> None:
+        """投稿成功のマーカーを書き込み、ロックを解除"""
+        self._mark(path, DONE_SUFFIX, info or {})
+
+    def mark_failed(self, path: Path, error: str) -> None:
+        """投稿失敗のマーカーを書き込み、ロックを解除"""
+        self._mark(path, FAILED_SUFFIX, {"error": error})
+
+    def _mark(self, path: Path, suffix: str, info: Dict[str, Any]) -> None:
+        info = dict(info, finished_at=time.time())
+        with atomic_write(str(self._marker(path, suffix))) as f:
+            json.dump(info, f, ensure_ascii=False)
+        # 再投稿に成功した場合は以前の失敗マーカーを消す
+        if suffix == DONE_SUFFIX:
+            self._marker(path, FAILED_SUFFIX).unlink(missing_ok=True)
+        lock = self._marker(path, LOCK_SUFFIX)
+        if lock.exists():
+            lock.unlink()
+
+    @staticmethod
+    def _marker(path: Path, suffix: str) -> Path:
+        return path.with_name(path.name + suffix)
@@ -0,0 +1,256 @@
+"""
+Article Validator
+生成した記事を投稿前に検査する品質ゲート
+
+APIを呼ばないローカルの検査（本文の途中切れ、コードブロックの閉じ忘れ、タイトル長、
+タグの上限・重複、見出し構成、任意でコードブロックの構文）を記事JSONに対して実行する。
+タグの正規化や見出しの書式のように機械的に直せるものはその場で修正してJSONを書き戻し、
+直せない問題（エラー）のある記事だけを再生成の対象にする。
+
+OpenAI SDKに依存しないため、生成しない起動パスから読み込んでも軽い。
+"""
+
+import ast
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from article_spool import atomic_write
+
+# Qiitaの制限（タイトルの上限はarticle_generatorの切り詰めでも使う）
+QIITA_TITLE_MAX_LENGTH = 50
+QIITA_MAX_TAGS = 5
+
+# 見出しがない場合にエラーとする本文の長さ（短いTipsは見出しなしでも読める）
+MIN_BODY_FOR_HEADINGS = 1500
+DEFAULT_MAX_WORKERS = 8
+# 不合格の記事を再生成する回数の上限（既定）
+DEFAULT_MAX_REGENERATIONS = 1
+
+ERROR = "error"      # 再生成が必要
+WARNING = "warning"  # 投稿はするが表示する
+FIXED = "fixed"      # その場で修正した
+
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})(.*)$")
+_HEADING = re.compile(r"^(#{1,6})(\s+|$)")
+# 「##見出し」のように#の後に空白がない行（Qiitaでは見出しにならない）。
+# 「#タグ」のような1個の#はハッシュタグの可能性があるため対象外
+_HEADING_WITHOUT_SPACE = re.compile(r"^(#{2,6})([^#\s])")
+
+@dataclass
+class Issue:
+    """検査で見つかった問題"""
+    check: str
+    message: str
+    severity: str = ERROR
+
+@dataclass
+class ValidationResult:
+    """1記事の検査結果"""
+    path: Path
+    issues: List[Issue] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[Issue]:
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        """エラーの一覧（.failedマーカーと表示用）"""
+        return "; ".join(f"{issue.check}: {issue.message}" for issue in self.errors)
+
+@dataclass
+class CodeBlock:
+    """本文中のコードブロック"""
+    lang: str
+    line: int  # 開始フェンスの行番号（1始まり）
+    code: str
+
+@dataclass
+class MarkdownScan:
+    """本文を1回走査した結果（コードブロックの外の見出しと、コードブロック）"""
+    headings: List[Tuple[int, str]]
+    code_blocks: List[CodeBlock]
+    unclosed_fence: Optional[int] = None  # 閉じられていないフェンスの行番号
+
+def scan_markdown(body: str) -> MarkdownScan:
+    """本文のフェンスを辿り、コードブロックの外の見出し行とコードブロックを集める"""
+    headings: List[Tuple[int, str]] = []
+    blocks: List[CodeBlock] = []
+    fence: Optional[Tuple[str, int, str, int]] = None  # (文字, 長さ, 言語, 開始行)
+    code_lines: List[str] = []
+    for number, line in enumerate(body.split("\n"), start=1):
+        match = _FENCE.match(line)
+        if fence is None:
+            if match:
+                marker, info = match.group(1), match.group(2).strip()
+                fence = (marker[0], len(marker), info, number)
+                code_lines = []
+            elif line.startswith("#"):
+                headings.append((number, line))
+            continue
+        # 閉じフェンスは開きと同じ文字で同じ長さ以上、情報文字列なし
+        if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= fence[1] and not match.group(2).strip():
+            # Qiitaのファイル名指定（```python:main.py）は言語部分だけを使う
+            blocks.append(CodeBlock(lang=fence[2].split(":", 1)[0].strip().lower(), line=fence[3],
+                                    code="\n".join(code_lines)))
+            fence = None
+        else:
+            code_lines.append(line)
+    return MarkdownScan(headings=headings, code_blocks=blocks, unclosed_fence=fence[3] if fence else None)
+
+def check_truncation(article: Dict[str, Any], scan: MarkdownScan) -> List[Issue]:
+    """max_tokensに達して本文が途中で切れていないか"""
+    if article.get("finish_reason") == "length":
+        return [Issue("truncation", "max_tokensに達して本文が途中で切れています")]
+    return []
+
+def check_fences(article: Dict[str, Any], scan: MarkdownScan) -> List[Issue]:
+    """コードブロックが閉じられているか"""
+    if scan.unclosed_fence is not None:
+        return [Issue("fence", f"{scan.unclosed_fence}行目のコードブロックが閉じられていません")]
+    return []
+
+def check_title(article: Dict[str, Any], scan: MarkdownScan) -> List[Issue]:
+    """タイトルが空でなく、Qiitaの上限以内か"""
+    title = (article.get("title") or "").strip()
+    if not title:
+        return [Issue("title", "タイトルがありません")]
+    if len(title) > QIITA_TITLE_MAX_LENGTH:
+        return [Issue("title", f"タイトルが{QIITA_TITLE_MAX_LENGTH}文字を超えています（{len(title)}文字）")]
+    return []
+
+def check_tags(article: Dict[str, Any], scan: MarkdownScan) -> List[Issue]:
+    """タグを正規化（前後の空白・#の除去、大文字小文字を無視した重複の除去、上限の5個まで）"""
+    tags = article.get("tags") or []
+    normalized: List[Dict[str, Any]] = []
+    seen = set()
+    for tag in tags:
+        tag = tag if isinstance(tag, dict) else {"name": str(tag), "versions": []}
+        name = str(tag.get("name") or "").strip().lstrip("#").strip()
+        if not name or name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        normalized.append(dict(tag, name=name, versions=tag.get("versions") or []))
+
+    issues = []
+    if len(normalized) > QIITA_MAX_TAGS:
+        dropped = [tag["name"] for tag in normalized[QIITA_MAX_TAGS:]]
+        normalized = normalized[:QIITA_MAX_TAGS]
+        issues.append(Issue("tags", f"タグを{QIITA_MAX_TAGS}個に切り詰めました（除外: {dropped}）", FIXED))
+    if normalized != tags:
+        article["tags"] = normalized
+        if not issues:
+            issues.append(Issue("tags", "タグの空白・重複を正規化しました", FIXED))
+    if not normalized:
+        issues.append(Issue("tags", "タグがありません"))
+    return issues
+
+def check_headings(article: Dict[str, Any], scan: MarkdownScan) -> List[Issue]:
+    """見出し構成（#の後の空白、レベルの飛び、見出しのない長い本文）"""
+    body = article.get("body") or ""
+    issues = []
+
+    broken = [(number, line) for number, line in scan.headings if _HEADING_WITHOUT_SPACE.match(line)]
+    if broken:
+        lines = body.split("\n")
+        for number, line in broken:
+            lines[number - 1] = _HEADING_WITHOUT_SPACE.sub(r"\1 \2", line, count=1)
+        article["body"] = "\n".join(lines)
+        issues.append(Issue("headings", f"#の後に空白のない見出しを修正しました（{[n for n, _ in broken]}行目）", FIXED))
+
+    levels = []
+    for _, line in scan.headings:
+        match = _HEADING.match(line) or _HEADING_WITHOUT_SPACE.match(line)
+        if match:
+            levels.append(len(match.group(1)))
+    if not levels:
+        if len(body) >= MIN_BODY_FOR_HEADINGS:
+            issues.append(Issue("headings", f"{len(body)}文字の本文に見出しがありません"))
+        return issues
+    jumps = [(a, b) for a, b in zip(levels, levels[1:]) if b > a + 1]
+    if jumps:
+        issues.append(Issue("headings", f"見出しのレベルが飛んでいます（{jumps[0][0]} → {jumps[0][1]}）", WARNING))
+    return issues
+
+def check_code_syntax(article: Dict[str, Any], scan: MarkdownScan) -> List[Issue]:
+    """Python・JSONのコードブロックを構文解析（その他の言語は対象外）"""
+    issues = []
+    for block in scan.code_blocks:
+        try:
+            if block.lang in ("python", "py", "python3"):
+                # 対話モードの例（>>>）は構文解析できないため対象外
+                if not block.code.lstrip().startswith(">>>"):
+                    ast.parse(block.code)
+            elif block.lang == "json":
+                json.loads(block.code)
+        except (SyntaxError, ValueError) as e:
+            issues.append(Issue("code", f"{block.line}行目の{block.lang}のコードブロックの構文エラー: {e}"))
+    return issues
+
+DEFAULT_CHECKS: Tuple[Callable[[Dict[str, Any], MarkdownScan], List[Issue]], ...] = (
+    check_truncation,
+    check_fences,
+    check_title,
+    check_tags,
+    check_headings
+)
+
+class ArticleValidator:
+    """
+    記事JSONに検査を順に適用する品質ゲート
+
+    検査はAPIを呼ばず、記事ごとに独立しているため、validate_allで複数の記事を並列に検査する。
+    """
+
+    def __init__(self, check_code: bool = False, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        初期化
+
+        Args:
+            check_code: コードブロックの構文も検査する
+            max_workers: validate_allの並列数
+        """
+        self.checks = list(DEFAULT_CHECKS) + ([check_code_syntax] if check_code else [])
+        self.max_workers = max_workers
+
+    def validate_article(self, article: Dict[str, Any]) -> List[Issue]:
+        """記事データを検査（修正できる問題はarticleを直接書き換える）"""
+        issues = []
+        body = article.get("body") or ""
+        scan = scan_markdown(body)
+        for check in self.checks:
+            issues.extend(check(article, scan))
+            # 修正で本文が変わった場合だけ走査し直す
+            if (article.get("body") or "") is not body:
+                body = article.get("body") or ""
+                scan = scan_markdown(body)
+        return issues
+
+    def validate(self, path: Path) -> ValidationResult:
+        """記事JSONを検査し、修正した場合はファイルを書き戻す"""
+        path = Path(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                article = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            return ValidationResult(path, [Issue("json", f"記事JSONを読み込めません: {e}")])
+
+        issues = self.validate_article(article)
+        if any(issue.severity == FIXED for issue in issues):
+            with atomic_write(str(path)) as f:
+                json.dump(article, f, ensure_ascii=False, indent=2)
+        return ValidationResult(path, issues)
+
+    def validate_all(self, paths: List[Path]) -> List[ValidationResult]:
+        """複数の記事を並列に検査し、pathsと同じ順に結果を返す"""
+        if not paths:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as executor:
+            return list(executor.map(self.validate, paths))
@@ -0,0 +1,220 @@
+"""
+Batch Generation
+OpenAI Batch APIによる記事のまとめて生成
+
+即時性の不要な大量生成（夜間のバックフィルなど）で、リクエストを1件ずつ送る代わりに
+Chat CompletionsのリクエストをJSONLにまとめてBatch APIに投入する。
+毎分のレート制限を消費せず、結果は完了後に記事ごとのJSONに展開する。
+
+投入したジョブの状態（バッチID・出力先・展開済みの記事）はstate_dirのJSONに保存するため、
+ポーリング中にプロセスが終了しても同じ入力で再実行すれば同じジョブの待機から再開する。
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from article_spool import atomic_write
+import tracing
+
+# ArticleGenerator（OpenAI SDK）は型注釈のみに使う。定数だけを参照するCLIの起動を軽くするため、
+# モジュールの読み込み時にはインポートしない
+if TYPE_CHECKING:
+    from article_generator import ArticleGenerator
+
+COMPLETION_WINDOW = "24h"
+DEFAULT_POLL_INTERVAL = 30.0
+# 完了・失敗が確定したバッチの状態
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+@dataclass
+class BatchItem:
+    """バッチ内の1記事"""
+    index: int
+    topic: str
+    prompt: str
+    output_path: str
+    template: Optional[str] = None
+    programming_language: Optional[str] = None
+    status: str = "pending"  # pending / done / failed
+    error: Optional[str] = None
+
+    @property
+    def custom_id(self) -> str:
+        return f"row-{self.index:05d}"
+
+class BatchGenerator:
+    """
+    ArticleGeneratorの設定（モデル・プロンプト・構造化出力）でBatch APIのジョブを実行する
+
+    キャッシュにある記事はジョブに含めず、そのまま保存する。
+    """
+
+    def __init__(
+        self,
+        generator: "ArticleGenerator",
+        state_dir: str,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        初期化
+
+        Args:
+            generator: リクエストの組み立てと結果の解析・保存に使うArticleGenerator
+            state_dir: ジョブの状態を保存するディレクトリ
+            poll_interval: バッチの状態を確認する間隔（秒）
+            sleep: 待機に使う関数
+        """
+        self.generator = generator
+        self.state_dir = Path(state_dir)
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+
+    def request_line(self, item: BatchItem) -> Dict[str, any]:
+        """JSONLの1行（/v1/chat/completionsへのリクエスト）"""
+        return {
+            "custom_id": item.custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": dict(
+                model=self.generator.route(item.template).model,
+                messages=self.generator._build_messages(item.prompt),
+                **self.generator._request_params()
+            )
+        }
+
+    def job_key(self, items: List[BatchItem]) -> str:
+        """入力（全リクエスト）から決まるジョブのキー。同じ入力の再実行で同じジョブを再開する"""
+        digest = hashlib.sha256()
+        for item in items:
+            digest.update(json.dumps(self.request_line(item), ensure_ascii=False, sort_keys=True).encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()[:20]
+
+    def run(self, items: List[BatchItem]) -> List[BatchItem]:
+        """
+        ジョブを投入（または再開）して完了を待ち、結果を記事ごとのJSONに保存する
+
+        Returns:
+            List[BatchItem]: 入力と同じ順序の各記事（status / output_path / errorを更新済み）
+        """
+        state_path = self.state_dir / f"{self.job_key(items)}.json"
+        state = self._load_state(state_path)
+        if state:
+            items = [BatchItem(**item) for item in state["items"]]
+            print(f"♻️  実行中のバッチを再開します: {state['batch_id']} ({state_path})")
+        else:
+            for item in items:
+                self._from_cache(item)
+            pending = [item for item in items if item.status == "pending"]
+            if not pending:
+                return items
+            with tracing.span("batch_api.submit", requests=len(pending)):
+                state = {"batch_id": self._submit(pending), "submitted_at": time.time(), "items": []}
+            self._save_state(state_path, state, items)
+
+        with tracing.span("batch_api.wait", batch_id=state["batch_id"]):
+            batch = self._wait(state["batch_id"])
+        by_id = {item.custom_id: item for item in items}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.generator.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    self._collect(by_id, json.loads(line), batch)
+            self._save_state(state_path, state, items)
+
+        for item in items:
+            if item.status == "pending":
+                item.status, item.error = "failed", f"バッチが{batch.status}で終了し、結果がありません"
+        state_path.unlink(missing_ok=True)
+        return items
+
+    def _from_cache(self, item: BatchItem) -> None:
+        """キャッシュにある記事はジョブに含めず保存する"""
+        model = self.generator.route(item.template).model
+        _, cached = self.generator._cache_lookup(item.prompt, model=model)
+        if cached:
+            self.generator._record(item.template, cache_hit=True, model=model)
+            self.generator.save_article_json(cached, item.output_path, topic=item.topic)
+            item.status = "done"
+
+    def _submit(self, items: List[BatchItem]) -> str:
+        """JSONLをアップロードしてバッチを作成し、バッチIDを返す"""
+        content = "".join(json.dumps(self.request_line(item), ensure_ascii=False) + "\n" for item in items)
+        client = self.generator.client
+        input_file = client.files.create(file=("requests.jsonl", content.encode("utf-8")), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=COMPLETION_WINDOW
+        )
+        print(f"📤 バッチを投入しました: {batch.id} ({len(items)}件)")
+        return batch.id
+
+    def _wait(self, batch_id: str):
+        """バッチが完了・失敗するまでポーリング"""
+        last = None
+        while True:
+            batch = self.generator.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            progress = (batch.status, counts.completed, counts.failed) if counts else (batch.status,)
+            if progress != last:
+                done = f" {counts.completed + counts.failed}/{counts.total}" if counts else ""
+                print(f"⏳ バッチ {batch_id}: {batch.status}{done}")
+                last = progress
+            if batch.status in TERMINAL_STATUSES:
+                return batch
+            self._sleep(self.poll_interval)
+
+    def _collect(self, by_id: Dict[str, BatchItem], record: Dict[str, any], batch) -> None:
+        """出力・エラーファイルの1行を記事として保存（展開済みの記事は飛ばす）"""
+        from openai.types.chat import ChatCompletion
+
+        item = by_id.get(record.get("custom_id"))
+        if not item or item.status == "done":
+            return
+        model = self.generator.route(item.template).model
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or (response.get("body") or {}).get("error") or response
+            item.status, item.error = "failed", str(error)
+            self.generator._record(item.template, error=item.error, model=model)
+            return
+
+        completion = ChatCompletion.model_validate(response["body"])
+        content = completion.choices[0].message.content
+        latency = float((batch.completed_at or 0) - (batch.in_progress_at or batch.created_at))
+        try:
+            article = self.generator._parse_completion(content, item.topic, item.programming_language)
+            article.finish_reason = completion.choices[0].finish_reason
+        except ValueError as e:
+            item.status, item.error = "failed", str(e)
+            self.generator._record(item.template, latency=latency, usage=completion.usage, error=item.error,
+                                   model=model)
+            return
+
+        cache_key, _ = self.generator._cache_lookup(item.prompt, model=model)
+        self.generator._record(item.template, latency=latency, usage=completion.usage, model=model,
+                               format_fallback=article.format_fallback)
+        self.generator._cache_store(cache_key, content, article, latency, completion)
+        self.generator.save_article_json(article, item.output_path, topic=item.topic)
+        item.status, item.error = "done", None
+
+    @staticmethod
+    def _load_state(path: Path) -> Optional[Dict[str, any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _save_state(path: Path, state: Dict[str, any], items: List[BatchItem]) -> None:
+        state["items"] = [asdict(item) for item in items]
+        with atomic_write(str(path)) as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
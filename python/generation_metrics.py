@@ -0,0 +1,241 @@
+"""
+Generation Metrics
+記事生成の呼び出しごとのトークン数・レイテンシを記録する
+"""
+
+import json
+import statistics
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+@dataclass
+class GenerationRecord:
+    """1回の記事生成の計測結果"""
+    model: str
+    template: Optional[str]
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    time_to_first_token: Optional[float] = None
+    retries: int = 0
+    cache_hit: bool = False
+    stream: bool = False
+    error: Optional[str] = None
+    route: str = "primary"  # 採用したリクエスト（primary / hedge）
+    hedged: bool = False    # 予備のリクエストを送ったか
+    format_fallback: bool = False  # TITLE:/TAGS:が見つからず、タイトル・タグを補完したか
+    timestamp: float = field(default_factory=time.time)
+
+class MetricsRecorder:
+    """
+    生成記録の集計とJSONLへの書き出しを行うレコーダー
+
+    複数スレッドから同時にrecordを呼び出してよい。
+    集計値はPrometheusのテキスト形式でも取得・公開できる。
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None):
+        """
+        初期化
+
+        Args:
+            jsonl_path: 記録を追記するJSONLファイル (省略時はメモリ上の集計のみ)
+        """
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        if self.jsonl_path:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        self.records: List[GenerationRecord] = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def record(self, record: GenerationRecord) -> None:
+        """計測結果を1件記録"""
+        with self._lock:
+            self.records.append(record)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """/metricsに追加する行を返す関数を登録（RateLimiter.render_prometheusなど）"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        """Prometheusのテキスト形式で集計値を出力"""
+        with self._lock:
+            records = list(self.records)
+            collectors = list(self._collectors)
+
+        requests: Dict[tuple, int] = {}
+        tokens: Dict[tuple, int] = {}
+        latency: Dict[tuple, List[float]] = {}
+        ttft: Dict[tuple, List[float]] = {}
+        retries: Dict[tuple, int] = {}
+        hedges: Dict[tuple, int] = {}
+        fallbacks: Dict[tuple, int] = {}
+        for r in records:
+            labels = (r.model, r.template or "none")
+            outcome = "error" if r.error else ("cache_hit" if r.cache_hit else "ok")
+            requests[labels + (outcome,)] = requests.get(labels + (outcome,), 0) + 1
+            tokens[labels + ("prompt",)] = tokens.get(labels + ("prompt",), 0) + r.prompt_tokens
+            tokens[labels + ("completion",)] = tokens.get(labels + ("completion",), 0) + r.completion_tokens
+            retries[labels] = retries.get(labels, 0) + r.retries
+            if r.hedged:
+                hedges[labels + (r.route,)] = hedges.get(labels + (r.route,), 0) + 1
+            if r.format_fallback:
+                fallbacks[labels] = fallbacks.get(labels, 0) + 1
+            if not r.cache_hit and not r.error:
+                latency.setdefault(labels, []).append(r.latency)
+                if r.time_to_first_token is not None:
+                    ttft.setdefault(labels, []).append(r.time_to_first_token)
+
+        lines = [
+            "# HELP article_generation_requests_total Article generation calls by outcome",
+            "# TYPE article_generation_requests_total counter"
+        ]
+        for (model, template, outcome), count in sorted(requests.items()):
+            lines.append(f'article_generation_requests_total{{model="{model}",template="{template}",outcome="{outcome}"}} {count}')
+
+        lines += [
+            "# HELP article_generation_tokens_total Tokens consumed by article generation",
+            "# TYPE article_generation_tokens_total counter"
+        ]
+        for (model, template, kind), count in sorted(tokens.items()):
+            lines.append(f'article_generation_tokens_total{{model="{model}",template="{template}",type="{kind}"}} {count}')
+
+        lines += [
+            "# HELP article_generation_retries_total Retried API calls",
+            "# TYPE article_generation_retries_total counter"
+        ]
+        for (model, template), count in sorted(retries.items()):
+            lines.append(f'article_generation_retries_total{{model="{model}",template="{template}"}} {count}')
+
+        lines += [
+            "# HELP article_generation_hedges_total Hedged calls by the request that won (model is the winner)",
+            "# TYPE article_generation_hedges_total counter"
+        ]
+        for (model, template, route), count in sorted(hedges.items()):
+            lines.append(f'article_generation_hedges_total{{model="{model}",template="{template}",winner="{route}"}} {count}')
+
+        lines += [
+            "# HELP article_generation_format_fallbacks_total Responses without TITLE:/TAGS: markers (title and tags were filled in)",
+            "# TYPE article_generation_format_fallbacks_total counter"
+        ]
+        for (model, template), count in sorted(fallbacks.items()):
+            lines.append(f'article_generation_format_fallbacks_total{{model="{model}",template="{template}"}} {count}')
+
+        for name, values, help_text in (
+            ("article_generation_latency_seconds", latency, "Total latency of API calls"),
+            ("article_generation_ttft_seconds", ttft, "Time to first token of streaming calls")
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+            for (model, template), samples in sorted(values.items()):
+                label = f'model="{model}",template="{template}"'
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'{name}{{{label},quantile="{q}"}} {_percentile(samples, q):.4f}')
+                lines.append(f"{name}_sum{{{label}}} {sum(samples):.4f}")
+                lines.append(f"{name}_count{{{label}}} {len(samples)}")
+
+        for collector in collectors:
+            lines += collector()
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """/metricsをバックグラウンドスレッドで公開し、待ち受けポートを返す"""
+        # http.serverは公開するときだけ読み込む（CLIの起動を軽くするため）
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def shutdown(self) -> None:
+        """/metricsの公開を停止"""
+        if self._server:
+            self._server.shutdown()
+            self._server = None
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+def load_records(jsonl_path: str) -> List[GenerationRecord]:
+    """JSONLファイルから計測結果を読み込む"""
+    records = []
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(GenerationRecord(**json.loads(line)))
+    return records
+
+def summarize(records: List[GenerationRecord]) -> str:
+    """モデル・テンプレート別の集計レポートを作成"""
+    groups: Dict[tuple, List[GenerationRecord]] = {}
+    for r in records:
+        groups.setdefault((r.model, r.template or "-"), []).append(r)
+
+    header = f"{'model':<16}{'template':<18}{'calls':>6}{'cache':>7}{'errors':>7}" \
+             f"{'prompt':>9}{'compl':>9}{'p50(s)':>9}{'p95(s)':>9}{'ttft(s)':>9}"
+    lines = [header, "-" * len(header)]
+    for (model, template), group in sorted(groups.items()):
+        calls = [r for r in group if not r.cache_hit and not r.error]
+        latencies = [r.latency for r in calls]
+        ttfts = [r.time_to_first_token for r in calls if r.time_to_first_token is not None]
+        lines.append(
+            f"{model:<16}{template:<18}{len(group):>6}"
+            f"{sum(r.cache_hit for r in group):>7}{sum(bool(r.error) for r in group):>7}"
+            f"{_mean([r.prompt_tokens for r in calls]):>9.0f}{_mean([r.completion_tokens for r in calls]):>9.0f}"
+            f"{_percentile(latencies, 0.5):>9.2f}{_percentile(latencies, 0.95):>9.2f}"
+            f"{(statistics.median(ttfts) if ttfts else 0.0):>9.2f}"
+        )
+
+    hedged = [r for r in records if r.hedged and not r.error]
+    if hedged:
+        lines.append("")
+        lines.append("ヘッジ（予備リクエストを送った呼び出し）:")
+        by_template: Dict[str, List[GenerationRecord]] = {}
+        for r in hedged:
+            by_template.setdefault(r.template or "-", []).append(r)
+        for template, group in sorted(by_template.items()):
+            won = sum(r.route != "primary" for r in group)
+            lines.append(f"  {template:<18}{len(group):>5}件  予備が採用 {won}件 ({won / len(group):.0%})")
+
+    fallbacks = [r for r in records if r.format_fallback]
+    if fallbacks:
+        lines.append("")
+        lines.append(f"形式の補完（TITLE:/TAGS:がなくタイトル・タグを補完）: {len(fallbacks)}件")
+
+    total_prompt = sum(r.prompt_tokens for r in records if not r.cache_hit)
+    total_completion = sum(r.completion_tokens for r in records if not r.cache_hit)
+    lines.append("")
+    lines.append(f"合計: {len(records)}件 / prompt {total_prompt}トークン / completion {total_completion}トークン")
+    return "\n".join(lines)
+
+def _mean(values: List[Any]) -> float:
+    return statistics.mean(values) if values else 0.0
@@ -0,0 +1,166 @@
+"""
+Model Routing
+テンプレートごとのモデルの振り分けと、ヘッジ（予備リクエスト）による遅い応答の回避
+
+テンプレート定義の model / fallback_model で、軽い記事（tips）は安いモデル、
+深掘り記事（deep-dive）は強いモデルというように生成ごとにモデルを選ぶ。
+ヘッジを有効にすると、最初のリクエストがhedge_after秒以内に最初のトークンを返さない
+（または失敗した）場合に予備のモデルへ2本目のリクエストを送り、先に完了した方を採用する。
+予備のモデルが最初のモデルと同じ（または未定義）の場合は、同じリクエストの重複になるためヘッジしない。
+どちらが採用されたかはGenerationRecord.routeに記録し、振り分けの調整に使う。
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from prompt_templates import get_registry
+import tracing
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+PRIMARY = "primary"
+HEDGE = "hedge"
+
+class DeadlineExceeded(TimeoutError):
+    """期限までに応答が完了しなかった"""
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """1回の生成で使うモデル（fallback_modelはヘッジ先。Noneならヘッジしない）"""
+    model: str
+    fallback_model: Optional[str] = None
+
+    @property
+    def can_hedge(self) -> bool:
+        """最初のモデルと異なる予備のモデルがあるか"""
+        return bool(self.fallback_model) and self.fallback_model != self.model
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """
+    モデルの振り分け・期限・ヘッジの設定
+
+    by_templateがTrueの場合はテンプレート定義のmodel / fallback_modelを使い、
+    定義のないテンプレートは既定のモデルを使う。
+    """
+    by_template: bool = True
+    fallback_model: Optional[str] = None  # 指定時はテンプレートの定義より優先する
+    deadline: Optional[float] = None      # 1リクエストの期限（秒）
+    hedge_after: Optional[float] = None   # 予備リクエストを送るまでの待ち時間（秒）
+
+    def route(self, template: Optional[str], default_model: str) -> ModelRoute:
+        """テンプレートに対応するモデルを返す"""
+        definition = get_registry().get(template) if self.by_template and template else None
+        model = (definition.model if definition else None) or default_model
+        fallback = self.fallback_model or (definition.fallback_model if definition else None)
+        return ModelRoute(model=model, fallback_model=fallback if fallback != model else None)
+
+class Attempt:
+    """ヘッジ中の1本のリクエストの進行状況"""
+
+    def __init__(self, model: str, route: str, started_at: float):
+        self.model = model
+        self.route = route
+        self.started_at = started_at
+        self.first_token_at: Optional[float] = None
+        self.first_token = threading.Event()
+        self.cancelled = threading.Event()
+
+    def mark_first_token(self) -> None:
+        """最初のトークンを受信した（2回目以降の呼び出しは無視）"""
+        if not self.first_token.is_set():
+            self.first_token_at = time.perf_counter()
+            self.first_token.set()
+
+@dataclass
+class HedgeOutcome:
+    """ヘッジの結果（採用したリクエストの結果とモデル）"""
+    result: Any
+    model: str
+    route: str
+    hedged: bool
+    ttft: Optional[float]
+
+def run_hedged(
+    request: Callable[[Attempt], Any],
+    route: ModelRoute,
+    hedge_after: Optional[float],
+    deadline: Optional[float] = None
+) -> HedgeOutcome:
+    """
+    requestを実行し、遅い・失敗した場合は予備のモデルでも実行して先に完了した結果を返す
+
+    Args:
+        request: Attemptを受け取り1本のリクエストを実行する関数。最初のトークンで
+                 attempt.mark_first_token()を呼び、attempt.cancelledが立ったら中断する
+        route: 使用するモデルと予備のモデル
+        hedge_after: 予備リクエストを送るまでの待ち時間（秒、Noneまたは予備のモデルがなければヘッジしない）
+        deadline: 全体の期限（秒）
+
+    Raises:
+        DeadlineExceeded: 期限までにどのリクエストも完了しなかった
+        Exception: すべてのリクエストが失敗した（最初のリクエストのエラー）
+    """
+    started_at = time.perf_counter()
+    done: "queue.Queue" = queue.Queue()
+    attempts: List[Attempt] = []
+    errors: List[BaseException] = []
+
+    def launch(model: str, name: str) -> None:
+        attempt = Attempt(model, name, time.perf_counter())
+        attempts.append(attempt)
+
+        def run():
+            try:
+                with tracing.span("hedge.attempt", route=name, model=model):
+                    done.put((attempt, request(attempt), None))
+            except BaseException as e:
+                done.put((attempt, None, e))
+
+        # 負けたリクエストの終了は待たない
+        threading.Thread(target=tracing.propagate(run), daemon=True).start()
+
+    def cancel_all() -> None:
+        for attempt in attempts:
+            attempt.cancelled.set()
+
+    launch(route.model, PRIMARY)
+    hedge_at = started_at + hedge_after if hedge_after is not None and route.can_hedge else None
+    deadline_at = started_at + deadline if deadline is not None else None
+    running = 1
+
+    while True:
+        now = time.perf_counter()
+        if deadline_at is not None and now >= deadline_at:
+            cancel_all()
+            raise DeadlineExceeded(f"{deadline:g}秒以内に応答が完了しませんでした")
+        if hedge_at is not None and now >= hedge_at:
+            hedge_at = None
+            if not attempts[0].first_token.is_set():
+                launch(route.fallback_model, HEDGE)
+                running += 1
+
+        waits = [t - now for t in (hedge_at, deadline_at) if t is not None]
+        try:
+            attempt, result, error = done.get(timeout=max(0.0, min(waits)) if waits else None)
+        except queue.Empty:
+            continue
+        running -= 1
+
+        if error is None:
+            cancel_all()
+            ttft = attempt.first_token_at - attempt.started_at if attempt.first_token_at else None
+            return HedgeOutcome(result=result, model=attempt.model, route=attempt.route,
+                                hedged=len(attempts) > 1, ttft=ttft)
+
+        errors.append(error)
+        # 最初のリクエストが失敗した場合は待たずに予備を送る
+        if hedge_at is not None:
+            hedge_at = None
+            launch(route.fallback_model, HEDGE)
+            running += 1
+        elif running == 0:
+            raise errors[0]
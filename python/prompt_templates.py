@@ -0,0 +1,379 @@
+"""
+Prompt Templates
+記事テンプレートのレジストリと、事前コンパイル済みプロンプトの組み立て
+
+組み込みの5テンプレートに加えて、ディレクトリ内のJSON/YAMLファイルで
+テンプレートを追加・上書きできる。テンプレートは読み込み時に一度だけ
+検証・コンパイルし、以降のプロンプト組み立ては文字列の連結のみで行う。
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# ユーザー定義テンプレートのデフォルトディレクトリ（環境変数ARTICLE_TEMPLATE_DIRで変更可能）
+DEFAULT_TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+# 記事の長さの目安
+LENGTH_GUIDE = {
+    "短い": "1000-1500文字程度（基本的な説明と簡単な例）",
+    "中程度": "2000-3000文字程度（詳細な説明と複数の例）",
+    "長い": "3500-5000文字程度（網羅的な説明と実践的な例）"
+}
+DEFAULT_LENGTH_GUIDE = "2000-3000文字程度"
+
+# 分割生成時の記事全体の目標文字数（セクション数で割って各セクションの目安にする）
+LENGTH_TARGET_CHARS = {"短い": 1500, "中程度": 3000, "長い": 5000}
+DEFAULT_TARGET_CHARS = 3000
+
+REQUIRED_FIELDS = ("description", "target_audience", "article_length", "style")
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """記事テンプレートの定義"""
+    name: str
+    description: str
+    target_audience: str
+    article_length: str
+    style: str
+    instructions: str = ""
+    model: Optional[str] = None           # このテンプレートで使うモデル（Noneなら既定のモデル）
+    fallback_model: Optional[str] = None  # ヘッジ時の予備のモデル（Noneならヘッジしない）
+
+    def as_dict(self) -> Dict[str, str]:
+        """CLI向けのテンプレート情報（ARTICLE_TEMPLATESと同じ形式）"""
+        return {
+            "description": self.description,
+            "target_audience": self.target_audience,
+            "article_length": self.article_length,
+            "style": self.style,
+            "model": self.model,
+            "fallback_model": self.fallback_model
+        }
+
+@dataclass(frozen=True)
+class OutlineSection:
+    """分割生成のアウトラインの1セクション"""
+    heading: str
+    points: Tuple[str, ...] = ()
+
+BUILTIN_TEMPLATES = [
+    PromptTemplate(
+        name="tutorial",
+        description="初心者向けチュートリアル記事",
+        target_audience="初心者エンジニア",
+        article_length="長い",
+        style="丁寧で段階的な解説",
+        instructions="""
+【チュートリアル記事の特別要件】:
+- 初心者でも理解できる段階的な説明
+- 各ステップを明確に分けて解説
+- 「なぜこの手順が必要か」の理由も説明
+- 実際に手を動かして学べる構成
+- つまずきやすいポイントの事前説明"""
+    ),
+    PromptTemplate(
+        name="tips",
+        description="実用的なTips・小技記事",
+        target_audience="中級エンジニア",
+        article_length="中程度",
+        style="すぐに使える実践的な内容",
+        model="gpt-4o-mini",
+        instructions="""
+【Tips記事の特別要件】:
+- すぐに実践で使える小技やテクニック
+- 「知っていると便利」な情報を中心に
+- 短時間で読めて即座に活用できる内容
+- 具体的な使用場面の提示
+- 他の方法との比較があると良い"""
+    ),
+    PromptTemplate(
+        name="deep-dive",
+        description="技術の深掘り解説記事",
+        target_audience="上級エンジニア",
+        article_length="長い",
+        style="詳細な技術解説と背景",
+        model="gpt-4o",
+        fallback_model="gpt-4o-mini",
+        instructions="""
+【深掘り記事の特別要件】:
+- 技術の内部動作や仕組みの詳細解説
+- 上級者向けの高度な内容
+- 理論的背景と実装の両方をカバー
+- パフォーマンスやセキュリティの考慮
+- 実際のプロダクションでの使用例"""
+    ),
+    PromptTemplate(
+        name="comparison",
+        description="技術比較・選択指針記事",
+        target_audience="エンジニア全般",
+        article_length="中程度",
+        style="客観的な比較と判断基準",
+        instructions="""
+【比較記事の特別要件】:
+- 複数の技術・手法の客観的な比較
+- それぞれのメリット・デメリット
+- 使用場面に応じた選択指針
+- 実際のコード例での性能比較
+- 導入コストや学習コストの考慮"""
+    ),
+    PromptTemplate(
+        name="troubleshooting",
+        description="問題解決・トラブルシューティング記事",
+        target_audience="実務エンジニア",
+        article_length="中程度",
+        style="具体的な問題と解決手順",
+        instructions="""
+【トラブルシューティング記事の特別要件】:
+- よくある問題とその解決方法
+- エラーメッセージの読み方と対処法
+- 問題の原因分析のアプローチ
+- 予防策や回避方法の提示
+- デバッグのコツやツールの紹介"""
+    )
+]
+
+# 記事に共通する固定の指示（システムプロンプトの後半。トピックなどの可変部分より前に置く）
+# 内容は従来のユーザープロンプト末尾の要件と同じで、位置だけを可変部分の前に移している。
+# OpenAIのプロンプトキャッシュはメッセージ先頭の1024トークン以上の一致部分にしか効かないため、
+# 固定部分がそれに満たない間はキャッシュされない（固定部分を先頭に置く順序だけを保証する）。
+ARTICLE_GUIDE = (
+    "\n\n"
+    "【記事構成の要件】:\n"
+    "1. **魅力的なタイトル**: 具体的で読みたくなるタイトル\n"
+    "2. **はじめに**: \n"
+    "   - この記事で何が学べるか\n"
+    "   - なぜこの技術が重要か\n"
+    "   - 記事の対象読者\n"
+    "3. **本文**: \n"
+    "   - 段階的に理解できる構成\n"
+    "   - 実際に動くコード例（コメント付き）\n"
+    "   - つまずきやすいポイントの解説\n"
+    "   - 実践的な使用例\n"
+    "4. **まとめ**: \n"
+    "   - 学んだことの要点\n"
+    "   - 次のステップの提案\n"
+    "\n"
+    "【コード例の要件】:\n"
+    "- 実際に動作するコード\n"
+    "- 適切なコメント\n"
+    "- エラーハンドリングを含む\n"
+    "- 実践的な使用例\n"
+    "\n"
+    "実用的で読みやすく、実際の開発で役立つ記事を作成してください。"
+)
+
+# TITLE:/TAGS:/BODY:形式で受け取る場合の出力形式（ARTICLE_GUIDEの後ろに付ける固定部分）
+# 構造化出力（JSONスキーマ）と分割生成では使わない
+MARKER_FORMAT = (
+    "\n\n"
+    "【出力形式】:\n"
+    "次の形式だけで出力してください。前置き・後書きや、全体をコードブロックで囲むことはしないでください。\n"
+    "1行目: TITLE: の後に記事のタイトル\n"
+    "2行目: TAGS: の後にタグ名をカンマ区切りで5個以内\n"
+    "3行目: BODY: だけの行\n"
+    "4行目以降: Markdownの記事本文（## の見出しから始める）\n"
+    "\n"
+    "例:\n"
+    "TITLE: Pythonのdataclassで設定ファイルを型安全に読み込む方法\n"
+    "TAGS: Python, dataclass, 初心者\n"
+    "BODY:\n"
+    "## はじめに\n"
+    "この記事では、dataclassを使って設定ファイルを読み込む方法を解説します。"
+)
+
+# ストリーミング生成で追加する指示（タイトル・タグが先に届かないと本文の書き出しを始められない）
+STREAM_MARKER_FORMAT = (
+    "\n\n"
+    "受信しながら本文を保存するため、TITLE:とTAGS:の行を必ず最初に出力してください。"
+    "その前に挨拶や説明、空行を書かないでください。"
+)
+
+# ユーザープロンプトの組み立て部品（テンプレート固有の指示→記事ごとの可変部分の順）
+_HEAD = "\n以下の条件で技術記事を作成してください：\n\n【記事の基本情報】:\n- トピック: "
+_AUDIENCE = "\n- 対象読者: "
+_LENGTH = "\n- 記事の長さ: "
+_LANGUAGE = "- 主要プログラミング言語: "
+_LEVEL = "\n【対象読者: "
+_TAIL = "】に合わせた難易度で執筆してください。\n"
+
+# 分割生成（アウトライン→セクション）用の追加指示
+# セクションごとのプロンプトは「記事の条件＋アウトライン」までが共通で、末尾だけが異なる
+_OUTLINE_REQUEST = (
+    "\n【今回の作業】:\n"
+    "まず記事のアウトラインだけを作成してください。本文は書かないでください。\n"
+    "- title: 記事のタイトル\n"
+    "- tags: Qiitaのタグ（5個以内）\n"
+    "- sections: 「はじめに」から「まとめ」までの見出し（3〜8個）と、各見出しで扱う要点\n"
+)
+_OUTLINE_HEAD = "\n【アウトライン】:\n"
+_SECTION_HEAD = "\n【今回の作業】:\nアウトラインのうち、次のセクションの本文だけを書いてください。\n- セクション: "
+_SECTION_RULES = (
+    "- 見出し行（## ...）は書かず、本文から始める。小見出しが必要な場合は ### を使う\n"
+    "- コードブロックには必ず言語名を付け、閉じ忘れないこと\n"
+    "- 他のセクションで扱う内容は書かない\n"
+    "- 分量の目安: "
+)
+
+class TemplateError(ValueError):
+    """テンプレート定義が不正"""
+
+class TemplateRegistry:
+    """
+    検証・コンパイル済みの記事テンプレートの集合
+
+    render_promptはArticleGenerator._build_promptの実体で、
+    テンプレート固有の指示はコンパイル時に解決済みのため、
+    呼び出しごとに辞書や大きな文字列を組み立て直さない。
+    """
+
+    def __init__(self, templates: List[PromptTemplate]):
+        self._templates: Dict[str, PromptTemplate] = {}
+        for template in templates:
+            self._validate(template)
+            self._templates[template.name] = template
+        # テンプレート名 -> 指示文（未知のテンプレートは空文字）
+        self._instructions = {name: t.instructions for name, t in self._templates.items()}
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None) -> "TemplateRegistry":
+        """
+        組み込みテンプレートとディレクトリ内のユーザー定義テンプレートを読み込む
+
+        ディレクトリ内の *.json / *.yaml / *.yml は1ファイル1テンプレート
+        （またはテンプレートのリスト）で、同名の組み込みテンプレートを上書きする。
+        """
+        templates = {t.name: t for t in BUILTIN_TEMPLATES}
+        directory = Path(directory) if directory else None
+        if directory and directory.is_dir():
+            for path in sorted(directory.iterdir()):
+                for template in _load_template_file(path):
+                    templates[template.name] = template
+        return cls(list(templates.values()))
+
+    @staticmethod
+    def _validate(template: PromptTemplate) -> None:
+        if not template.name:
+            raise TemplateError("テンプレート名がありません")
+        for field_name in REQUIRED_FIELDS:
+            if not getattr(template, field_name):
+                raise TemplateError(f"テンプレート {template.name} に {field_name} がありません")
+        if template.article_length not in LENGTH_GUIDE:
+            raise TemplateError(
+                f"テンプレート {template.name} の article_length が不正です: {template.article_length}"
+            )
+
+    def names(self) -> List[str]:
+        """テンプレート名の一覧"""
+        return list(self._templates.keys())
+
+    def get(self, name: str) -> Optional[PromptTemplate]:
+        """テンプレートを取得"""
+        return self._templates.get(name)
+
+    def as_dict(self) -> Dict[str, Dict[str, str]]:
+        """ARTICLE_TEMPLATES形式の辞書"""
+        return {name: t.as_dict() for name, t in self._templates.items()}
+
+    def render_prompt(
+        self,
+        topic: str,
+        target_audience: str,
+        article_length: str,
+        programming_language: Optional[str] = None,
+        template_style: Optional[str] = None
+    ) -> str:
+        """
+        記事生成用のユーザープロンプトを組み立てる
+
+        共通の要件はARTICLE_GUIDE（システムプロンプト側）にあり、ここではテンプレート固有の指示を
+        先頭に、トピックなどの可変部分をその後に置く。同じテンプレートの呼び出しは
+        システムプロンプト＋テンプレートの指示までが同一のバイト列になる。
+        """
+        parts = []
+        if template_style:
+            parts.append(self._instructions.get(template_style, ""))
+        parts += [
+            _HEAD, topic,
+            _AUDIENCE, target_audience,
+            _LENGTH, LENGTH_GUIDE.get(article_length, DEFAULT_LENGTH_GUIDE), "\n"
+        ]
+        if programming_language:
+            parts += [_LANGUAGE, programming_language, "\n"]
+        parts += [_LEVEL, target_audience, _TAIL]
+        return "".join(parts)
+
+    def render_outline_prompt(self, base_prompt: str) -> str:
+        """分割生成の1段目: render_promptの結果にアウトライン作成の指示を加える"""
+        return base_prompt + _OUTLINE_REQUEST
+
+    def render_section_prompt(
+        self,
+        base_prompt: str,
+        outline: List[OutlineSection],
+        index: int,
+        article_length: str
+    ) -> str:
+        """分割生成の2段目: アウトラインのindex番目のセクション本文を依頼するプロンプト"""
+        parts = [base_prompt, _OUTLINE_HEAD]
+        for number, section in enumerate(outline, start=1):
+            parts += [f"{number}. {section.heading}\n"]
+            parts += [f"   - {point}\n" for point in section.points]
+        chars = LENGTH_TARGET_CHARS.get(article_length, DEFAULT_TARGET_CHARS) // max(1, len(outline))
+        parts += [
+            _SECTION_HEAD, f"{index + 1}. {outline[index].heading}\n",
+            _SECTION_RULES, f"{chars}文字程度\n"
+        ]
+        return "".join(parts)
+
+def _load_template_file(path: Path) -> List[PromptTemplate]:
+    suffix = path.suffix.lower()
+    if suffix not in (".json", ".yaml", ".yml"):
+        return []
+
+    with open(path, "r", encoding="utf-8") as f:
+        if suffix == ".json":
+            data = json.load(f)
+        else:
+            try:
+                import yaml
+            except ImportError:
+                raise TemplateError(f"YAMLテンプレートの読み込みにはPyYAMLが必要です: {path}")
+            data = yaml.safe_load(f)
+
+    entries = data if isinstance(data, list) else [data]
+    templates = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise TemplateError(f"テンプレート定義が不正です: {path}")
+        unknown = set(entry) - {"name", "instructions", "model", "fallback_model", *REQUIRED_FIELDS}
+        if unknown:
+            raise TemplateError(f"{path} に不明な項目があります: {sorted(unknown)}")
+        instructions = entry.get("instructions", "").rstrip()
+        if instructions and not instructions.startswith("\n"):
+            instructions = "\n" + instructions
+        templates.append(PromptTemplate(
+            name=entry.get("name") or path.stem,
+            description=entry.get("description", ""),
+            target_audience=entry.get("target_audience", ""),
+            article_length=entry.get("article_length", ""),
+            style=entry.get("style", ""),
+            instructions=instructions,
+            model=entry.get("model") or None,
+            fallback_model=entry.get("fallback_model") or None
+        ))
+    return templates
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> TemplateRegistry:
+    """プロセス全体で共有するテンプレートレジストリ（初回のみ読み込み・検証）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry.load(os.getenv("ARTICLE_TEMPLATE_DIR") or DEFAULT_TEMPLATE_DIR)
+        return _registry
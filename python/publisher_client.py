@@ -0,0 +1,144 @@
+"""
+Qiita Publisher Daemon Client
+常駐しているElixirの投稿デーモン（QiitaPublisher.Daemon）と通信するクライアント
+"""
+
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, List, Optional
+
+import tracing
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4477
+
+class PublisherError(Exception):
+    """投稿デーモンがエラーを返した、または通信に失敗した"""
+
+class PublisherClient:
+    """
+    投稿デーモンのクライアント
+
+    4バイト長プレフィックス付きJSONで1リクエスト1レスポンスの通信を行う。
+    接続は使い回すため、複数記事を連続投稿してもソケットは1本のみ。
+    トレーシングが有効な場合はリクエストにtraceparentを付け、デーモン側のスパンを受け取って記録する。
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: Optional[int] = None, timeout: float = 120.0):
+        """
+        初期化
+
+        Args:
+            host: デーモンのホスト
+            port: デーモンのポート (環境変数QIITA_PUBLISHER_PORTから取得可能)
+            timeout: 1リクエストあたりのタイムアウト（秒）
+        """
+        self.host = host
+        self.port = int(port or os.getenv("QIITA_PUBLISHER_PORT") or DEFAULT_PORT)
+        self.timeout = timeout
+        self._socket: Optional[socket.socket] = None
+
+    def ping(self) -> bool:
+        """デーモンが応答するか確認"""
+        try:
+            return self._request({"action": "ping"}) == "pong"
+        except PublisherError:
+            return False
+
+    def publish(self, access_token: str, article: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        記事を投稿
+
+        Args:
+            access_token: Qiita Access Token
+            article: save_article_jsonと同じ形式の記事データ
+
+        Returns:
+            Dict: Qiita APIのレスポンス（url, title など）
+        """
+        return self._request({"action": "publish", "access_token": access_token, "article": article})
+
+    def publish_many(self, access_token: str, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数の記事をデーモン側で並列投稿（レート制限・再試行はデーモンが管理）
+
+        Args:
+            access_token: Qiita Access Token
+            articles: save_article_jsonと同じ形式の記事データのリスト
+
+        Returns:
+            List[Dict]: 入力と同じ順序の記事ごとの結果
+                        ({"ok": True, "response": ..., "attempts": n} または {"ok": False, "error": ...})
+        """
+        # レート制限の待ち時間を含むため、タイムアウトは設けない
+        return self._request(
+            {"action": "publish_many", "access_token": access_token, "articles": articles},
+            timeout=None
+        )
+
+    def list_items(self, access_token: str, updated_since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        認証ユーザーの記事一覧を取得（ページの取得はデーモン側で並列に行う）
+
+        Args:
+            access_token: Qiita Access Token
+            updated_since: この時刻（ISO 8601）より後に更新された記事のみ取得。Noneなら全件
+
+        Returns:
+            Dict: {"items": [...], "total_count": n, "complete": bool}
+        """
+        payload = {"action": "list_items", "access_token": access_token}
+        if updated_since:
+            payload["updated_since"] = updated_since
+        return self._request(payload, timeout=None)
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def _request(self, payload: Dict[str, Any], timeout: Any = "default") -> Any:
+        with tracing.span(f"daemon.{payload['action']}"):
+            parent = tracing.traceparent()
+            if parent:
+                payload = dict(payload, traceparent=parent)
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            try:
+                sock = self._connect()
+                sock.settimeout(self.timeout if timeout == "default" else timeout)
+                sock.sendall(struct.pack(">I", len(data)) + data)
+                (length,) = struct.unpack(">I", self._recv_exact(sock, 4))
+                reply = json.loads(self._recv_exact(sock, length).decode("utf-8"))
+            except (OSError, ValueError) as e:
+                self.close()
+                raise PublisherError(f"投稿デーモンとの通信に失敗しました: {e}")
+            tracing.add_spans(reply.get("spans"))
+
+        if not reply.get("ok"):
+            raise PublisherError(reply.get("error", "unknown error"))
+        return reply.get("response")
+
+    def _connect(self) -> socket.socket:
+        if self._socket is None:
+            self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        return self._socket
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            chunk = sock.recv(size)
+            if not chunk:
+                raise ConnectionError("connection closed by daemon")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def __enter__(self) -> "PublisherClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,285 @@
+"""
+Qiita Catalog
+投稿済みのQiita記事一覧のローカルコピー
+
+Elixir側（QiitaPublisher.ArticleService.list_user_articles）が取得した記事一覧を
+SQLiteに保存し、投稿時のタイトル重複の確認やレポートをAPIを呼ばずに行う。
+記事はID・正規化したタイトル・タグで索引する。2回目以降の同期は前回までに
+取り込んだ最新の更新日時より後に更新された記事だけを取得する。
+Qiitaの一覧は作成日時の順のため、差分の同期では基準時刻より前に作成された記事の
+編集を取りこぼすことがある。前回の全件取得からFULL_SYNC_INTERVALが過ぎていれば全件を取得し直す。
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_SPACES = re.compile(r"\s+")
+
+# 差分の同期で取りこぼした古い記事の編集・削除を反映するため、全件を取得し直す間隔（秒）
+FULL_SYNC_INTERVAL = 7 * 24 * 3600
+
+@dataclass
+class CatalogItem:
+    """カタログの記事"""
+    id: str
+    title: str
+    url: str
+    tags: List[str] = field(default_factory=list)
+    private: bool = False
+    body_hash: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    def content_hash(self) -> Optional[str]:
+        """Qiita上の内容のハッシュ（本文を取り込んでいない場合はNone）"""
+        if self.body_hash is None:
+            return None
+        return _content_hash(self.title, self.tags, self.body_hash)
+
+@dataclass
+class SyncResult:
+    """同期の結果"""
+    fetched: int
+    added: int
+    updated: int
+    removed: int
+    total_count: int
+    full: bool
+
+def normalize_title(title: str) -> str:
+    """タイトルの比較用キー（全角・半角、大文字・小文字、空白の違いを無視）"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", title)).strip().lower()
+
+def body_hash(body: Optional[str]) -> Optional[str]:
+    """本文のハッシュ（改行コードと前後の空白の違いを無視）"""
+    if body is None:
+        return None
+    return hashlib.sha256(body.replace("\r\n", "\n").strip().encode("utf-8")).hexdigest()
+
+def content_hash(title: str, tags: Iterable[Any], body: Optional[str]) -> str:
+    """タイトル・タグ・本文の変更を検出するハッシュ（タグの順序は無視）"""
+    return _content_hash(title, tags, body_hash(body))
+
+def _content_hash(title: str, tags: Iterable[Any], digest: Optional[str]) -> str:
+    names = sorted(tag["name"] if isinstance(tag, dict) else str(tag) for tag in tags or [])
+    payload = json.dumps([title.strip(), names, digest], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _timestamp(value: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(value).timestamp() if value else 0.0
+    except ValueError:
+        return 0.0
+
+class QiitaCatalog:
+    """
+    投稿済み記事のローカルカタログ
+
+    スレッド間で共有して使用できる。
+    """
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path: SQLiteファイルのパス（":memory:"で一時カタログ）
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                title_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                tags TEXT NOT NULL,
+                private INTEGER NOT NULL DEFAULT 0,
+                body_hash TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                synced_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_title_key ON items (title_key);
+            CREATE TABLE IF NOT EXISTS item_tags (
+                tag TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                PRIMARY KEY (tag, item_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def sync(self, fetch: Callable[[Optional[str]], Dict[str, Any]], full: bool = False) -> SyncResult:
+        """
+        記事一覧を取得して取り込む
+
+        Args:
+            fetch: 基準時刻（ISO 8601、Noneなら全件）を受け取り、
+                   {"items": [...], "total_count": n, "complete": bool} を返す関数
+            full: 前回の同期に関係なく全件を取得する（指定しなくても、
+                  前回の全件取得からFULL_SYNC_INTERVALが過ぎていれば全件）
+
+        Returns:
+            SyncResult: 同期の結果
+        """
+        since = None if full or self.needs_full_sync() else self.get_state("last_updated_at")
+        catalog = fetch(since)
+        items = catalog.get("items") or []
+        added, updated = self.upsert_items(items)
+        # 全件取得できた場合のみ、一覧にない記事（Qiita側で削除された記事）を除く
+        removed = self._remove_except(item["id"] for item in items) if catalog.get("complete") else 0
+
+        latest = max((item.get("updated_at") for item in items if item.get("updated_at")),
+                     key=_timestamp, default=None)
+        if latest and _timestamp(latest) > _timestamp(since):
+            self.set_state("last_updated_at", latest)
+        self.set_state("last_synced_at", str(time.time()))
+        if since is None and catalog.get("complete"):
+            self.set_state("last_full_sync_at", str(time.time()))
+        self.set_state("total_count", str(catalog.get("total_count", len(items))))
+        return SyncResult(fetched=len(items), added=added, updated=updated, removed=removed,
+                          total_count=int(catalog.get("total_count", len(items))), full=since is None)
+
+    def needs_full_sync(self, now: Optional[float] = None) -> bool:
+        """次の同期で全件を取得するか（未同期、または前回の全件取得からFULL_SYNC_INTERVALが経過）"""
+        if not self.get_state("last_updated_at"):
+            return True
+        last_full = self.get_state("last_full_sync_at")
+        # 全件取得の時刻を記録する前に作ったカタログは、最終同期の時刻で代用する
+        last_full = last_full or self.get_state("last_synced_at")
+        return not last_full or (now or time.time()) - float(last_full) >= FULL_SYNC_INTERVAL
+
+    def upsert_items(self, items: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Qiita APIの記事（またはその一部のフィールド）を追加・更新
+
+        Returns:
+            Tuple[int, int]: (追加件数, 更新件数（更新日時か本文が変わった記事）)
+        """
+        added = updated = 0
+        now = time.time()
+        with self._lock:
+            for item in items:
+                tags = [tag["name"] if isinstance(tag, dict) else str(tag) for tag in item.get("tags") or []]
+                digest = body_hash(item.get("body"))
+                existing = self._conn.execute(
+                    "SELECT updated_at, body_hash FROM items WHERE id = ?", (item["id"],)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO items (id, title, title_key, url, tags, private, body_hash, "
+                    "created_at, updated_at, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (item["id"], item.get("title", ""), normalize_title(item.get("title", "")), item.get("url", ""),
+                     json.dumps(tags, ensure_ascii=False), int(bool(item.get("private"))),
+                     digest, item.get("created_at"), item.get("updated_at"), now)
+                )
+                self._conn.execute("DELETE FROM item_tags WHERE item_id = ?", (item["id"],))
+                self._conn.executemany("INSERT OR IGNORE INTO item_tags (tag, item_id) VALUES (?, ?)",
+                                       [(tag.lower(), item["id"]) for tag in tags])
+                if not existing:
+                    added += 1
+                elif existing != (item.get("updated_at"), digest):
+                    updated += 1
+            self._conn.commit()
+        return added, updated
+
+    def _remove_except(self, ids: Iterable[str]) -> int:
+        keep = set(ids)
+        with self._lock:
+            stale = [row[0] for row in self._conn.execute("SELECT id FROM items") if row[0] not in keep]
+            for item_id in stale:
+                self._conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+                self._conn.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
+            self._conn.commit()
+        return len(stale)
+
+    def get(self, item_id: str) -> Optional[CatalogItem]:
+        """IDで記事を取得"""
+        rows = self._query("SELECT * FROM items WHERE id = ?", (item_id,))
+        return rows[0] if rows else None
+
+    def find_by_title(self, title: str) -> List[CatalogItem]:
+        """同じタイトル（正規化後に一致）の記事を新しい順に返す"""
+        return self._query("SELECT * FROM items WHERE title_key = ? ORDER BY created_at DESC",
+                           (normalize_title(title),))
+
+    def items_with_tag(self, tag: str) -> List[CatalogItem]:
+        """タグの付いた記事を新しい順に返す（タグの大文字・小文字は区別しない）"""
+        return self._query(
+            "SELECT items.* FROM item_tags JOIN items ON items.id = item_tags.item_id "
+            "WHERE item_tags.tag = ? ORDER BY items.created_at DESC",
+            (tag.lower(),)
+        )
+
+    def recent(self, limit: int = 10) -> List[CatalogItem]:
+        """作成日時の新しい順に記事を返す"""
+        return self._query("SELECT * FROM items ORDER BY created_at DESC LIMIT ?", (limit,))
+
+    def tag_counts(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """記事数の多いタグ"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT tag, COUNT(*) AS n FROM item_tags GROUP BY tag ORDER BY n DESC, tag LIMIT ?", (limit,)
+            ).fetchall()
+
+    def duplicate_titles(self) -> List[Tuple[str, int]]:
+        """カタログ内で重複しているタイトルと件数"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(title), COUNT(*) AS n FROM items GROUP BY title_key HAVING n > 1 ORDER BY n DESC"
+            ).fetchall()
+
+    def stats(self) -> Dict[str, Any]:
+        """記事数と最終同期の情報"""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM items").fetchone()
+            (private,) = self._conn.execute("SELECT COUNT(*) FROM items WHERE private = 1").fetchone()
+        last_synced_at = self.get_state("last_synced_at")
+        return {
+            "items": count,
+            "private": private,
+            "last_synced_at": float(last_synced_at) if last_synced_at else None,
+            "last_updated_at": self.get_state("last_updated_at")
+        }
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: tuple) -> List[CatalogItem]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            CatalogItem(id=row[0], title=row[1], url=row[3], tags=json.loads(row[4]), private=bool(row[5]),
+                        body_hash=row[6], created_at=row[7], updated_at=row[8])
+            for row in rows
+        ]
@@ -0,0 +1,419 @@
+"""
+Rate Limiter
+OpenAI API呼び出しのクライアント側レート制限と同時実行数の制御
+
+リクエスト数（RPM）とトークン数（TPM）のトークンバケットで送信を待たせ、
+トークン数はプロンプトの文字数とmax_tokensから見積もる（応答のusageで差分を返却）。
+同時実行数はAIMDで調整する: 成功するたびに少しずつ増やし、429を受けたら半分にする
+（5xx・タイムアウト・接続エラーでは増やさない）。ストリーミングの応答は読み終わるか閉じるまで
+送信枠を保持し、同時実行数に数える。
+応答の x-ratelimit-* ヘッダーでバケットの上限と残量をAPI側の値に合わせる。
+429・タイムアウト・5xxはジッター付き指数バックオフ（retry-afterがあればそれ以上）で再試行する。
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import tracing
+
+# 環境変数OPENAI_RPM_LIMIT / OPENAI_TPM_LIMITが未設定の場合の上限（環境変数はRateLimiterの作成時に読む）
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+
+# 再試行するHTTPステータス
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+# 残量が上限のこの割合を下回ったら同時実行数を増やさない
+LOW_WATERMARK = 0.1
+# 429を受けたときの同時実行数の減少率
+DECREASE_FACTOR = 0.5
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """
+    リクエストが消費するトークン数の見積もり（TPMの予約用）
+
+    ASCIIは4文字で1トークン、それ以外（日本語など）は1文字1トークンとして多めに見積もる。
+    """
+    prompt = 0
+    for message in messages:
+        content = message.get("content") or ""
+        ascii_chars = sum(1 for c in content if c.isascii())
+        prompt += ascii_chars // 4 + (len(content) - ascii_chars) + 4
+    return prompt + max_tokens
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """x-ratelimit-reset-* の "1s" / "6m0s" / "120ms" 形式、または秒数を秒に変換"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts) if parts else None
+
+def is_retryable(error: BaseException) -> bool:
+    """再試行で回復しうるエラーか（タイムアウト・接続エラー・429・5xx。クォータ超過は除く）"""
+    # OpenAI SDKの読み込みは重いため、エラーの判定時に読み込む（呼び出し元で読み込み済み）
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS and getattr(error, "code", None) != "insufficient_quota"
+    return False
+
+class TokenBucket:
+    """1分あたりの上限を連続的に補充するトークンバケット（ロックは呼び出し側で取る）"""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = now
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amountが使えるようになるまでの秒数（上限より大きい要求は満杯まで待つ）"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60.0 / self.capacity) if self.capacity else 0.0
+
+    def reconcile(self, limit: Optional[float], remaining: Optional[float]) -> None:
+        """API側の上限・残量に合わせる（残量は手元の値より少ない場合のみ反映）"""
+        if limit:
+            self.capacity = float(limit)
+            self.level = min(self.level, self.capacity)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+@dataclass
+class Permit:
+    """acquireで確保した送信枠"""
+    tokens: int
+    acquired_at: float
+
+class HeldStream:
+    """
+    送信枠を保持したままのストリーミング応答
+
+    最後まで読むか閉じた時点で送信枠を返却する（使用トークン数は最後のチャンクのusageから）。
+    最後まで読んだ場合だけを成功として同時実行数を増やす。それ以外の属性は元のストリームに委ねる。
+    """
+
+    def __init__(self, stream: Any, release: Callable[[Optional[int], bool], None]):
+        self._stream = stream
+        self._release = release
+        self._used_tokens: Optional[int] = None
+        self._completed = False
+        self._released = False
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for chunk in self._stream:
+                usage = getattr(chunk, "usage", None)
+                if usage is not None:
+                    self._used_tokens = getattr(usage, "total_tokens", None)
+                yield chunk
+            self._completed = True
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """ストリームを閉じて送信枠を返却（2回目以降は何もしない）"""
+        if self._released:
+            return
+        self._released = True
+        try:
+            self._stream.close()
+        finally:
+            self._release(self._used_tokens, self._completed)
+
+    def __enter__(self) -> "HeldStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+class RateLimiter:
+    """
+    RPM・TPMのトークンバケットとAIMDの同時実行数制御
+
+    1つのインスタンスを全スレッドで共有する（同じAPIキーの呼び出しをまとめて制御する）。
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        initial_concurrency: Optional[int] = None,
+        min_concurrency: int = 1,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_backoff: float = DEFAULT_BASE_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        初期化
+
+        Args:
+            rpm: 1分あたりのリクエスト数の上限（省略時は環境変数OPENAI_RPM_LIMIT、応答ヘッダーで補正）
+            tpm: 1分あたりのトークン数の上限（省略時は環境変数OPENAI_TPM_LIMIT、応答ヘッダーで補正）
+            max_concurrency: 同時実行数の上限
+            initial_concurrency: 同時実行数の初期値（省略時は上限の半分）
+            min_concurrency: 同時実行数の下限
+            max_attempts: 1リクエストあたりの最大試行回数
+            base_backoff: バックオフの基準時間（秒）
+            max_backoff: バックオフの上限（秒）
+        """
+        self._clock = clock
+        self._sleep = sleep
+        now = clock()
+        # 明示した上限はヘッダーの値より優先する（複数プロセスで枠を分け合う場合など）
+        self._rpm_cap = rpm
+        self._tpm_cap = tpm
+        self._requests = TokenBucket(rpm or int(os.getenv("OPENAI_RPM_LIMIT") or DEFAULT_RPM), now)
+        self._tokens = TokenBucket(tpm or int(os.getenv("OPENAI_TPM_LIMIT") or DEFAULT_TPM), now)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self._limit = float(initial_concurrency or max(min_concurrency, max_concurrency // 2))
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._throttled_seconds = 0.0
+        self._rate_limited = 0
+        self._retries = 0
+        self._requests_total = 0
+
+    def acquire(self, tokens: int) -> Permit:
+        """同時実行数・RPM・TPMに空きができるまで待って送信枠を確保"""
+        with self._cond:
+            started_at = self._clock()
+            while True:
+                now = self._clock()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                if now < self._paused_until:
+                    timeout = self._paused_until - now
+                elif self._in_flight >= int(self._limit):
+                    timeout = None
+                else:
+                    timeout = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                    if timeout <= 0:
+                        self._requests.level -= 1
+                        self._tokens.level -= tokens
+                        self._in_flight += 1
+                        self._requests_total += 1
+                        self._throttled_seconds += now - started_at
+                        return Permit(tokens=tokens, acquired_at=now)
+                self._cond.wait(timeout)
+
+    def release(
+        self,
+        permit: Permit,
+        headers: Optional[Mapping[str, str]] = None,
+        used_tokens: Optional[int] = None,
+        rate_limited: bool = False,
+        succeeded: bool = True
+    ) -> None:
+        """
+        送信枠を返却し、応答のヘッダー・使用トークン数で状態を更新
+
+        同時実行数は成功（succeeded）でのみ増やし、429（rate_limited）で減らす。
+        それ以外の失敗・中断では変えない。
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if used_tokens is not None and used_tokens < permit.tokens:
+                self._tokens.level = min(self._tokens.capacity, self._tokens.level + permit.tokens - used_tokens)
+            low = self._reconcile(headers or {})
+
+            if rate_limited:
+                self._rate_limited += 1
+                self._limit = max(float(self.min_concurrency), self._limit * DECREASE_FACTOR)
+                retry_after = _retry_after(headers or {})
+                if retry_after:
+                    self._paused_until = max(self._paused_until, self._clock() + retry_after)
+            elif succeeded and not low:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    def call(self, request: Callable[[], Any], tokens: int, stream: bool = False) -> Tuple[Any, int]:
+        """
+        送信枠を確保してリクエストを実行し、再試行可能なエラーはバックオフして再試行
+
+        Args:
+            request: OpenAIクライアントの with_raw_response 呼び出し（.headers と .parse() を持つ応答を返す関数）
+            tokens: 見積もりトークン数
+            stream: ストリーミングの呼び出し（送信枠を保持したHeldStreamを返す）
+
+        Returns:
+            Tuple[Any, int]: (parse()した応答, 再試行回数)
+        """
+        attempt = 1
+        while True:
+            with tracing.span("rate_limiter.wait", tokens=tokens):
+                permit = self.acquire(tokens)
+            try:
+                raw = request()
+            except Exception as e:
+                delay = self._failed(permit, e, attempt)
+                with tracing.span("rate_limiter.backoff", attempt=attempt, status=getattr(e, "status_code", None)):
+                    self._sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.release(permit, succeeded=False)
+                raise
+            return self._succeeded(permit, raw, stream), attempt - 1
+
+    async def call_async(self, request: Callable[[], Awaitable[Any]], tokens: int) -> Tuple[Any, int]:
+        """
+        callの非同期版（AsyncOpenAIの with_raw_response 呼び出しを渡す）
+
+        同期版と同じ送信枠・同時実行数を共有する。送信枠の空き待ちはイベントループを止めないよう
+        別スレッドで行い、バックオフはasyncio.sleepで待つ。
+        タスクがキャンセルされた場合も、確保した（待ちの間に確保された）送信枠を返却する。
+        """
+        attempt = 1
+        while True:
+            with tracing.span("rate_limiter.wait", tokens=tokens):
+                permit = await self._acquire_async(tokens)
+            try:
+                raw = await request()
+            except Exception as e:
+                delay = self._failed(permit, e, attempt)
+                with tracing.span("rate_limiter.backoff", attempt=attempt, status=getattr(e, "status_code", None)):
+                    await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.release(permit, succeeded=False)
+                raise
+            return self._succeeded(permit, raw), attempt - 1
+
+    async def _acquire_async(self, tokens: int) -> Permit:
+        """別スレッドで送信枠を確保（キャンセルされたら、スレッドが確保した時点で返却する）"""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire, tokens))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            def release_acquired(future: "asyncio.Future[Permit]") -> None:
+                if not future.cancelled() and future.exception() is None:
+                    self.release(future.result(), succeeded=False)
+            acquiring.add_done_callback(release_acquired)
+            raise
+
+    def _succeeded(self, permit: Permit, raw: Any, stream: bool = False) -> Any:
+        """
+        成功した応答をparse()し、使用トークン数とヘッダーを反映して送信枠を返却
+
+        ストリーミングの場合は、読み終わるか閉じるまで送信枠を保持するHeldStreamを返す。
+        """
+        result = raw.parse()
+        if stream:
+            return HeldStream(result, lambda used_tokens, completed: self.release(
+                permit, raw.headers, used_tokens, succeeded=completed
+            ))
+        usage = getattr(result, "usage", None)
+        self.release(permit, raw.headers, getattr(usage, "total_tokens", None))
+        return result
+
+    def _failed(self, permit: Permit, error: Exception, attempt: int) -> float:
+        """失敗した呼び出しの送信枠を返却し、再試行までの待ち時間を返す（再試行しない場合はerrorを送出）"""
+        response = getattr(error, "response", None)
+        headers = response.headers if response is not None else None
+        status = getattr(error, "status_code", None)
+        self.release(permit, headers, rate_limited=status == 429, succeeded=False)
+        if not is_retryable(error) or attempt >= self.max_attempts:
+            raise error
+        with self._cond:
+            self._retries += 1
+        return max(self._backoff(attempt), _retry_after(headers or {}) or 0.0)
+
+    def state(self) -> Dict[str, float]:
+        """現在の制御状態"""
+        with self._cond:
+            now = self._clock()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                "concurrency_limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "requests_available": round(self._requests.level, 1),
+                "requests_per_minute": self._requests.capacity,
+                "tokens_available": round(self._tokens.level, 1),
+                "tokens_per_minute": self._tokens.capacity,
+                "throttled_seconds": round(self._throttled_seconds, 3),
+                "requests": self._requests_total,
+                "rate_limited": self._rate_limited,
+                "retries": self._retries
+            }
+
+    def render_prometheus(self) -> List[str]:
+        """Prometheusのテキスト形式の行（MetricsRecorder.add_collectorに渡す）"""
+        state = self.state()
+        metrics = [
+            ("openai_ratelimit_concurrency_limit", "gauge", "Current AIMD concurrency limit", "concurrency_limit"),
+            ("openai_ratelimit_in_flight", "gauge", "Requests currently in flight", "in_flight"),
+            ("openai_ratelimit_requests_available", "gauge", "Requests left in the RPM bucket", "requests_available"),
+            ("openai_ratelimit_tokens_available", "gauge", "Tokens left in the TPM bucket", "tokens_available"),
+            ("openai_ratelimit_throttled_seconds_total", "counter", "Time spent waiting for the limiter",
+             "throttled_seconds"),
+            ("openai_ratelimit_rate_limited_total", "counter", "Responses with status 429", "rate_limited"),
+            ("openai_ratelimit_retries_total", "counter", "Retried requests", "retries")
+        ]
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {state[key]}"]
+        return lines
+
+    def _reconcile(self, headers: Mapping[str, str]) -> bool:
+        """x-ratelimit-* ヘッダーでバケットを補正し、残量が少ないかを返す"""
+        low = False
+        for bucket, kind, cap in ((self._requests, "requests", self._rpm_cap), (self._tokens, "tokens", self._tpm_cap)):
+            limit = _number(headers.get(f"x-ratelimit-limit-{kind}"))
+            remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if limit and cap:
+                limit = min(limit, cap)
+            bucket.reconcile(limit, remaining)
+            if remaining is not None and limit and remaining < limit * LOW_WATERMARK:
+                low = True
+        return low
+
+    def _backoff(self, attempt: int) -> float:
+        """フルジッター付き指数バックオフ"""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    if headers.get("retry-after-ms"):
+        return _number(headers.get("retry-after-ms"), 0.0) / 1000.0
+    return parse_duration(headers.get("retry-after"))
+
+def _number(value: Optional[str], default: Optional[float] = None) -> Optional[float]:
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
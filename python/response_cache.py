@@ -0,0 +1,190 @@
+"""
+Response Cache for Article Generation
+生成結果をSQLiteに保存し、同一条件での再生成時にAPI呼び出しを省略する
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# デフォルトの有効期限（7日）
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+# デフォルトの最大件数・最大サイズ
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+@dataclass
+class CachedResponse:
+    """キャッシュされた生成結果"""
+    raw_completion: str
+    article: Dict[str, Any]
+    latency: float
+    prompt_tokens: int
+    completion_tokens: int
+
+class ResponseCache:
+    """
+    コンテンツアドレス方式のレスポンスキャッシュ
+
+    キーはモデル・システムプロンプト・ユーザープロンプト・サンプリング
+    パラメータのハッシュ。TTLを過ぎたエントリは読み出し時に破棄し、
+    件数またはサイズの上限を超えた場合は最終アクセスが古い順に削除する。
+    スレッド間で共有して使用できる。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        refresh: bool = False,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        初期化
+
+        Args:
+            path: SQLiteファイルのパス
+            ttl_seconds: エントリの有効期限（秒）
+            max_entries: 保持する最大件数
+            max_bytes: 保持する最大サイズ（バイト）
+            refresh: Trueの場合は読み出しを行わず、結果の上書きのみ行う
+            clock: 現在時刻（UNIX時間）を返す関数
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                raw_completion TEXT NOT NULL,
+                article TEXT NOT NULL,
+                latency REAL NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, params: Dict[str, Any]) -> str:
+        """キャッシュキーを生成"""
+        payload = json.dumps(
+            {"model": model, "system": system_prompt, "prompt": prompt, "params": params},
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """キャッシュを検索（refresh時は常にミス扱い）"""
+        now = self._clock()
+        with self._lock:
+            row = None
+            if not self.refresh:
+                row = self._conn.execute(
+                    "SELECT raw_completion, article, latency, prompt_tokens, completion_tokens, created_at "
+                    "FROM responses WHERE key = ?",
+                    (key,)
+                ).fetchone()
+
+            if row and now - row[5] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if not row:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_seconds += row[2]
+            self.saved_tokens += row[3] + row[4]
+
+        return CachedResponse(
+            raw_completion=row[0],
+            article=json.loads(row[1]),
+            latency=row[2],
+            prompt_tokens=row[3],
+            completion_tokens=row[4]
+        )
+
+    def put(
+        self,
+        key: str,
+        raw_completion: str,
+        article: Dict[str, Any],
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0
+    ) -> None:
+        """生成結果を保存し、上限を超えた分を削除"""
+        article_json = json.dumps(article, ensure_ascii=False)
+        size = len(raw_completion.encode("utf-8")) + len(article_json.encode("utf-8"))
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, raw_completion, article_json, latency, prompt_tokens, completion_tokens, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """期限切れのエントリと、件数・サイズ上限を超えた古いエントリを削除"""
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (self._clock() - self.ttl_seconds,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミスの統計"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_seconds": round(self.saved_seconds, 2),
+            "saved_tokens": self.saved_tokens
+        }
+
+    def refreshing(self) -> "ResponseCache":
+        """同じファイルを読み出しなし（結果の上書きのみ）で開く（品質検査で不合格の記事の再生成用）"""
+        return ResponseCache(str(self.path), self.ttl_seconds, self.max_entries, self.max_bytes, refresh=True,
+                             clock=self._clock)
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,191 @@
+"""
+Run Journal
+バッチ実行の記事ごとの進行状況（実行ジャーナル）
+
+マニフェストの各行が queued → generated → validated → published（または failed）の
+どの段階まで進んだかをSQLite（WAL）に記録する。段階は記事ごとに完了した時点で書き込むため、
+実行が途中で止まっても `--resume <実行ID>` で続きから再開でき、生成済みの記事を
+再生成したり、投稿済みの記事を再投稿したりしない。
+実行IDはスプールのファイル名に含まれる実行IDと同じ。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+QUEUED = "queued"
+GENERATED = "generated"
+VALIDATED = "validated"
+PUBLISHED = "published"
+FAILED = "failed"
+STAGES = (QUEUED, GENERATED, VALIDATED, PUBLISHED, FAILED)
+
+@dataclass
+class JournalEntry:
+    """マニフェストの1行の進行状況"""
+    run_id: str
+    row: int
+    topic: str
+    stage: str = QUEUED
+    path: Optional[str] = None
+    url: Optional[str] = None
+    item_id: Optional[str] = None
+    error: Optional[str] = None
+    failed_stage: Optional[str] = None  # failedの場合、失敗した段階（generated / validated / published）
+    updated_at: float = 0.0
+
+    def has_article(self) -> bool:
+        """再開時に再生成しなくてよい記事があるか（生成に成功し、品質検査で不合格になっていない）"""
+        if not self.path or not Path(self.path).exists():
+            return False
+        return self.stage in (GENERATED, VALIDATED, PUBLISHED) or (
+            self.stage == FAILED and self.failed_stage == PUBLISHED
+        )
+
+@dataclass
+class JournalRun:
+    """1回のバッチ実行"""
+    run_id: str
+    manifest: str
+    options: Dict[str, Any]
+    created_at: float
+    updated_at: float
+    counts: Dict[str, int] = field(default_factory=dict)
+
+class RunJournal:
+    """
+    バッチ実行のジャーナル
+
+    スレッド間で共有して使用できる（生成の並行スレッドから記事ごとに記録する）。
+    """
+
+    def __init__(self, path: str):
+        """
+        初期化
+
+        Args:
+            path: SQLiteファイルのパス（":memory:"で一時ジャーナル）
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                manifest TEXT NOT NULL,
+                options TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                run_id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                path TEXT,
+                url TEXT,
+                item_id TEXT,
+                error TEXT,
+                failed_stage TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, row)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def start(self, run_id: str, manifest: str, options: Dict[str, Any]) -> None:
+        """実行を登録（再開時は既存の設定を残し、更新日時だけを更新）"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, manifest, options, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (run_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (run_id, manifest, json.dumps(options, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+
+    def enqueue(self, run_id: str, rows: Iterable[Tuple[int, str]]) -> None:
+        """マニフェストの行をqueuedで登録（記録済みの行はそのまま）"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (run_id, row, topic, stage, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, row, topic, QUEUED, now) for row, topic in rows]
+            )
+            self._conn.commit()
+
+    def record(
+        self,
+        run_id: str,
+        row: int,
+        stage: str,
+        path: Optional[str] = None,
+        url: Optional[str] = None,
+        item_id: Optional[str] = None,
+        error: Optional[str] = None,
+        failed_stage: Optional[str] = None
+    ) -> None:
+        """
+        行の段階を記録（1件ごとにコミットする）
+
+        path / url / item_idは省略時に記録済みの値を残す。failed以外ではerrorを消す。
+        """
+        if stage not in STAGES:
+            raise ValueError(f"不明な段階です: {stage}")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET stage = ?, path = COALESCE(?, path), url = COALESCE(?, url), "
+                "item_id = COALESCE(?, item_id), error = ?, failed_stage = ?, updated_at = ? "
+                "WHERE run_id = ? AND row = ?",
+                (stage, str(path) if path else None, url, item_id, error if stage == FAILED else None,
+                 failed_stage if stage == FAILED else None, now, run_id, row)
+            )
+            self._conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+            self._conn.commit()
+
+    def entries(self, run_id: str) -> Dict[int, JournalEntry]:
+        """実行の全行（行番号 → 進行状況）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, row, topic, stage, path, url, item_id, error, failed_stage, updated_at "
+                "FROM entries WHERE run_id = ? ORDER BY row",
+                (run_id,)
+            ).fetchall()
+        return {row[1]: JournalEntry(*row) for row in rows}
+
+    def get_run(self, run_id: str) -> Optional[JournalRun]:
+        """実行を取得（未登録ならNone）"""
+        runs = self._runs("WHERE run_id = ?", (run_id,))
+        return runs[0] if runs else None
+
+    def runs(self, limit: int = 10) -> List[JournalRun]:
+        """最近更新された実行"""
+        return self._runs("ORDER BY updated_at DESC LIMIT ?", (limit,))
+
+    def _runs(self, clause: str, params: tuple) -> List[JournalRun]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT run_id, manifest, options, created_at, updated_at FROM runs {clause}", params
+            ).fetchall()
+            runs = []
+            for run_id, manifest, options, created_at, updated_at in rows:
+                counts = dict(self._conn.execute(
+                    "SELECT stage, COUNT(*) FROM entries WHERE run_id = ? GROUP BY stage", (run_id,)
+                ).fetchall())
+                runs.append(JournalRun(run_id, manifest, json.loads(options), created_at, updated_at, counts))
+        return runs
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,6 @@
+"""pytestの共通設定: python/のモジュールを直接importできるようにする"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
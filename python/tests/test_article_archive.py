@@ -0,0 +1,92 @@
+"""ArticleArchiveの追記・読み出しと、追記の途中で止まった場合の復旧（_recover）のテスト"""
+
+import gzip
+import json
+
+import pytest
+
+from article_archive import INDEX_ENTRY, INDEX_HEADER, ArticleArchive
+
+def article(n):
+    return {"title": f"記事{n}", "body": f"本文{n}", "tags": [{"name": "Python"}], "finish_reason": "stop"}
+
+def archive_with(tmp_path, count):
+    archive = ArticleArchive(str(tmp_path / "articles.jsonl.gz"))
+    for n in range(count):
+        archive.append(article(n), topic=f"トピック{n}")
+    return archive
+
+class TestArchive:
+    def test_append_and_read(self, tmp_path):
+        archive = archive_with(tmp_path, 3)
+        assert len(archive) == 3
+        assert archive.read(1)["title"] == "記事1"
+        assert [record["topic"] for _, record in archive] == ["トピック0", "トピック1", "トピック2"]
+        with pytest.raises(IndexError):
+            archive.read(3)
+
+    def test_whole_file_is_plain_gzip_jsonl(self, tmp_path):
+        archive = archive_with(tmp_path, 2)
+        lines = gzip.decompress(archive.path.read_bytes()).decode("utf-8").splitlines()
+        assert [json.loads(line)["title"] for line in lines] == ["記事0", "記事1"]
+
+    def test_search(self, tmp_path):
+        archive = archive_with(tmp_path, 3)
+        assert [entry.seq for entry, _ in archive.search("本文2")] == [2]
+
+class TestRecover:
+    def test_truncated_index_entry_is_dropped(self, tmp_path):
+        archive = archive_with(tmp_path, 2)
+        # 2件目のエントリを書きかけの状態にする（本文は書き終わっている）
+        with open(archive.index_path, "r+b") as index:
+            index.truncate(INDEX_HEADER.size + INDEX_ENTRY.size + 5)
+        assert len(archive) == 1
+
+        seq = archive.append(article(9))
+
+        assert seq == 1
+        assert len(archive) == 2
+        assert archive.index_path.stat().st_size == INDEX_HEADER.size + 2 * INDEX_ENTRY.size
+        assert [record["title"] for _, record in archive] == ["記事0", "記事9"]
+        # インデックスにない書きかけの本文も捨てられ、全体がgzipとして読める
+        lines = gzip.decompress(archive.path.read_bytes()).decode("utf-8").splitlines()
+        assert [json.loads(line)["title"] for line in lines] == ["記事0", "記事9"]
+
+    def test_truncated_data_tail_is_dropped(self, tmp_path):
+        archive = archive_with(tmp_path, 2)
+        complete_size = archive.path.stat().st_size
+        # インデックスのエントリを書く前に止まった、書きかけの本文
+        partial = gzip.compress(b'{"title": "\xe6\x9b\xb8\xe3\x81\x8d\xe3\x81\x8b\xe3\x81\x91"}\n', mtime=0)
+        with open(archive.path, "ab") as data:
+            data.write(partial[:len(partial) // 2])
+
+        seq = archive.append(article(9))
+
+        assert seq == 2
+        assert archive.entry(2).offset == complete_size
+        assert [record["title"] for _, record in archive] == ["記事0", "記事1", "記事9"]
+
+    def test_entries_without_data_are_dropped(self, tmp_path):
+        archive = archive_with(tmp_path, 3)
+        # 本文のファイルだけを2件目の途中まで戻した場合
+        second = archive.entry(1)
+        with open(archive.path, "r+b") as data:
+            data.truncate(second.offset + second.length - 1)
+
+        seq = archive.append(article(9))
+
+        assert seq == 1
+        assert [record["title"] for _, record in archive] == ["記事0", "記事9"]
+
+    def test_missing_header_is_rewritten(self, tmp_path):
+        archive = ArticleArchive(str(tmp_path / "articles.jsonl.gz"))
+        archive.index_path.write_bytes(b"AI")
+
+        assert archive.append(article(0)) == 0
+        assert archive.read(0)["title"] == "記事0"
+
+    def test_foreign_index_is_rejected(self, tmp_path):
+        archive = ArticleArchive(str(tmp_path / "articles.jsonl.gz"))
+        archive.index_path.write_bytes(b"XXXX" + bytes(INDEX_HEADER.size - 4))
+        with pytest.raises(ValueError):
+            archive.append(article(0))
@@ -0,0 +1,175 @@
+"""TITLE:/TAGS:/BODY:形式の解析とフォールバックのテスト"""
+
+import pytest
+
+from article_generator import (
+    MARKED_SYSTEM_PROMPT,
+    STREAM_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
+    ArticleGenerator,
+    StreamingArticleParser,
+    parse_marked_content
+)
+
+MARKED = """TITLE: ElixirのGenServer入門
+TAGS: Elixir, GenServer, 初心者
+BODY:
+## はじめに
+
+GenServerはプロセスの状態を扱うための仕組みです。
+"""
+
+# マーカーを付けずにMarkdownだけを返す、実際のモデルでよくある応答
+UNMARKED = """# ElixirのGenServerを使いこなす
+
+## はじめに
+
+GenServerはプロセスの状態を扱うための仕組みです。
+
+```elixir
+defmodule Counter do
+  use GenServer
+end
+```
+"""
+
+@pytest.fixture
+def generator():
+    return ArticleGenerator(api_key="sk-test")
+
+class TestParseMarkedContent:
+    def test_parses_markers(self):
+        title, tags, body = parse_marked_content(MARKED)
+        assert title == "ElixirのGenServer入門"
+        assert [tag["name"] for tag in tags] == ["Elixir", "GenServer", "初心者"]
+        assert body.startswith("## はじめに")
+        assert body.endswith("仕組みです。")
+
+    def test_bracketed_tags(self):
+        _, tags, _ = parse_marked_content("TITLE: t\nTAGS: [Python, Docker]\nBODY:\nbody")
+        assert [tag["name"] for tag in tags] == ["Python", "Docker"]
+
+    def test_leading_whitespace_before_marker(self):
+        title, _, body = parse_marked_content("\n\n  TITLE: t\nTAGS: a\nBODY:\nbody\n\n")
+        assert (title, body) == ("t", "body")
+
+    def test_missing_markers_returns_whole_content(self):
+        title, tags, body = parse_marked_content(UNMARKED)
+        assert (title, tags) == ("", [])
+        assert body == UNMARKED
+
+    def test_missing_body_marker_keeps_header(self):
+        title, tags, body = parse_marked_content("TITLE: t\nTAGS: a\n## 見出し\n本文")
+        assert title == "t"
+        assert [tag["name"] for tag in tags] == ["a"]
+        assert "## 見出し" in body
+
+    def test_marker_inside_body_is_not_a_header(self):
+        _, _, body = parse_marked_content("TITLE: t\nTAGS: a\nBODY:\n本文\nTITLE: これは本文\n")
+        assert body == "本文\nTITLE: これは本文"
+
+    def test_empty_content(self):
+        assert parse_marked_content("") == ("", [], "")
+
+class TestParseArticleContent:
+    def test_marked_content_is_not_a_fallback(self, generator):
+        article = generator._parse_article_content(MARKED, "GenServer", "Elixir")
+        assert article.title == "ElixirのGenServer入門"
+        assert not article.format_fallback
+
+    def test_unmarked_content_uses_heading_as_title(self, generator):
+        article = generator._parse_article_content(UNMARKED, "GenServer", "Elixir")
+        assert article.title == "ElixirのGenServerを使いこなす"
+        assert article.body.startswith("## はじめに")
+        assert [tag["name"] for tag in article.tags] == ["技術記事", "Elixir"]
+        assert article.format_fallback
+
+    def test_unmarked_content_without_heading_uses_topic(self, generator):
+        article = generator._parse_article_content("本文だけの応答です。", "GenServer", None)
+        assert article.title == "GenServerについて"
+        assert article.body == "本文だけの応答です。"
+        assert article.format_fallback
+
+    def test_long_title_is_truncated(self, generator):
+        article = generator._parse_article_content("TITLE: " + "あ" * 80 + "\nTAGS: a\nBODY:\nbody", "t", None)
+        assert len(article.title) == 50
+
+class TestPrompt:
+    def test_marker_format_is_requested(self, generator):
+        messages = generator._build_messages("prompt")
+        assert messages[0]["content"] == MARKED_SYSTEM_PROMPT
+        for marker in ("TITLE:", "TAGS:", "BODY:"):
+            assert marker in messages[0]["content"]
+
+    def test_structured_output_does_not_request_markers(self):
+        generator = ArticleGenerator(api_key="sk-test", structured_output=True)
+        assert generator._build_messages("prompt")[0]["content"] == SYSTEM_PROMPT
+        assert "BODY:" not in SYSTEM_PROMPT
+
+def stream(content, chunk_size, topic="GenServer", programming_language="Elixir"):
+    """contentをchunk_size文字ずつStreamingArticleParserに流し、(parser, on_headerの呼び出し, 本文)を返す"""
+    events = []
+    parser = StreamingArticleParser(
+        topic,
+        programming_language,
+        on_header=lambda title, tags: events.append(("header", title, [tag["name"] for tag in tags])),
+        on_body=lambda text: events.append(("body", text))
+    )
+    for i in range(0, len(content), chunk_size):
+        parser.feed(content[i:i + chunk_size])
+    parser.close()
+    headers = [event[1:] for event in events if event[0] == "header"]
+    body = "".join(event[1] for event in events if event[0] == "body")
+    # ヘッダーは本文より前に1回だけ届く
+    assert events and events[0][0] == "header"
+    assert len(headers) == 1
+    return parser, headers[0], body
+
+class TestStreamingArticleParser:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 10_000])
+    def test_split_chunks_match_single_pass_parser(self, chunk_size):
+        parser, header, body = stream(MARKED, chunk_size)
+        title, tags, expected = parse_marked_content(MARKED)
+        assert header == (title, [tag["name"] for tag in tags])
+        assert body == expected
+        assert not parser.format_fallback
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 10_000])
+    def test_realistic_unmarked_response(self, chunk_size):
+        parser, header, body = stream(UNMARKED, chunk_size)
+        assert header == ("ElixirのGenServerを使いこなす", ["技術記事", "Elixir"])
+        assert body == UNMARKED.split("\n", 1)[1].strip()
+        assert parser.format_fallback
+
+    def test_unmarked_heading_emits_header_before_rest_of_body(self):
+        events = []
+        parser = StreamingArticleParser("t", None, on_header=lambda title, tags: events.append("header"),
+                                        on_body=lambda text: events.append("body"))
+        parser.feed("# タイトル\n\n## はじめに\n")
+        assert events == ["header", "body"]
+
+    def test_plain_text_without_markers(self):
+        parser, header, body = stream("挨拶です。\n\n## はじめに\n本文", 4)
+        assert header == ("GenServerについて", ["技術記事", "Elixir"])
+        assert body == "挨拶です。\n\n## はじめに\n本文"
+        assert parser.format_fallback
+
+    def test_missing_body_marker(self):
+        parser, header, body = stream("TITLE: t\nTAGS: a, b\n", 2)
+        assert header == ("t", ["a", "b"])
+        assert body == "TITLE: t\nTAGS: a, b"
+
+    def test_missing_tags_marker(self):
+        parser, header, body = stream("TITLE: t\nBODY:\n本文\n", 3)
+        assert header == ("t", ["技術記事", "Elixir"])
+        assert body == "本文"
+        assert parser.format_fallback
+
+    def test_marker_split_across_chunks(self):
+        _, header, body = stream("TIT" + "LE: t\nTA" + "GS: a\nBO" + "DY:\n本文", 5)
+        assert header == ("t", ["a"])
+        assert body == "本文"
+
+    def test_stream_prompt_asks_for_markers_first(self, generator):
+        assert STREAM_SYSTEM_PROMPT.startswith(MARKED_SYSTEM_PROMPT)
+        assert "最初に出力" in STREAM_SYSTEM_PROMPT
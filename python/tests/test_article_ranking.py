@@ -0,0 +1,72 @@
+"""候補モード（n件の生成と採点）の順位付けのテスト"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from article_generator import ArticleData, ArticleGenerator
+from article_ranking import rank_candidates, save_candidates
+
+GOOD_BODY = "\n\n".join(
+    [f"## 見出し{i}\n" + "本文の説明です。" * 60 + "\n```python\nprint('ok')\n```" for i in range(1, 5)]
+)
+
+def structured(title, body):
+    return json.dumps({"title": title, "tags": ["Python"], "body": body}, ensure_ascii=False)
+
+def completion(*contents):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")
+                 for content in contents],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+    )
+
+def candidate_generator(response):
+    generator = ArticleGenerator(api_key="sk-test", structured_output=True)
+    generator.client = Mock()
+    generator.client.chat.completions.create = Mock(return_value=response)
+    return generator
+
+class TestRankCandidates:
+    def test_indexes_default_to_position(self):
+        articles = [ArticleData(title="短い記事のタイトル", tags=[], body="本文"),
+                    ArticleData(title="しっかりした記事のタイトル", tags=[], body=GOOD_BODY)]
+        ranked = rank_candidates(articles, "中程度")
+        assert [candidate.index for candidate in ranked] == [1, 0]
+
+    def test_keeps_given_indexes(self):
+        articles = [ArticleData(title="短い記事のタイトル", tags=[], body="本文"),
+                    ArticleData(title="しっかりした記事のタイトル", tags=[], body=GOOD_BODY)]
+        ranked = rank_candidates(articles, "中程度", indexes=[1, 3])
+        assert [candidate.index for candidate in ranked] == [3, 1]
+
+class TestGenerateArticleCandidates:
+    def test_index_points_into_choices_when_some_fail_to_parse(self, tmp_path):
+        response = completion(
+            "解析できない出力",
+            structured("短い記事のタイトル", "本文だけ"),
+            "{壊れたJSON",
+            structured("しっかりした記事のタイトル", GOOD_BODY)
+        )
+        generator = candidate_generator(response)
+
+        ranked = generator.generate_article_candidates("テスト", n=4)
+
+        assert [candidate.index for candidate in ranked] == [3, 1]
+        assert ranked[0].article.title == "しっかりした記事のタイトル"
+        assert generator.client.chat.completions.create.call_args.kwargs["n"] == 4
+
+        path = save_candidates(ranked, str(tmp_path / "article.json"))
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [record["choice"] for record in records] == [3, 1]
+        assert records[0]["title"] == "しっかりした記事のタイトル"
+
+    def test_caches_the_content_of_the_chosen_choice(self):
+        response = completion("解析できない出力", structured("しっかりした記事のタイトル", GOOD_BODY))
+        generator = candidate_generator(response)
+        generator._cache_store = Mock()
+
+        ranked = generator.generate_article_candidates("テスト", n=2)
+
+        assert ranked[0].index == 1
+        assert generator._cache_store.call_args.args[1] == response.choices[1].message.content
@@ -0,0 +1,109 @@
+"""スプールの排他確保（.lock）・終了済みプロセスのロック解除・done/failedマーカーのテスト"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from article_spool import ArticleSpool
+
+def spooled(tmp_path, index=1):
+    spool = ArticleSpool(str(tmp_path))
+    path = spool.entry_path(index)
+    path.write_text(json.dumps({"title": "記事"}, ensure_ascii=False), encoding="utf-8")
+    return spool, path
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def write_lock(path, **lock):
+    path.with_name(path.name + ".lock").write_text(json.dumps(lock), encoding="utf-8")
+
+class TestClaim:
+    def test_second_claim_fails(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        assert spool.claim(path)
+        assert not ArticleSpool(str(tmp_path)).claim(path)
+        assert spool.pending() == []
+
+    def test_only_one_process_wins(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(spool.claim, [path] * 8))
+        assert results.count(True) == 1
+        lock = json.loads(path.with_name(path.name + ".lock").read_text(encoding="utf-8"))
+        assert lock["host"] == socket.gethostname()
+        assert lock["pid"] != os.getpid()
+
+class TestStaleLock:
+    def test_releases_lock_of_exited_process(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        write_lock(path, host=socket.gethostname(), pid=dead_pid(), claimed_at=0)
+        assert not spool.claim(path)
+
+        assert spool.release_stale_lock(path)
+        assert spool.pending() == [path]
+        assert spool.claim(path)
+
+    def test_keeps_lock_of_running_process(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        try:
+            write_lock(path, host=socket.gethostname(), pid=process.pid, claimed_at=0)
+            assert not spool.release_stale_lock(path)
+        finally:
+            process.kill()
+            process.wait()
+
+    def test_keeps_own_and_other_hosts_locks(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        assert spool.claim(path)
+        assert not spool.release_stale_lock(path)
+
+        write_lock(path, host=socket.gethostname() + "-other", pid=dead_pid(), claimed_at=0)
+        assert not spool.release_stale_lock(path)
+        assert path.with_name(path.name + ".lock").exists()
+
+    def test_no_lock(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        assert not spool.release_stale_lock(path)
+
+class TestMarkers:
+    def test_done_releases_lock(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        assert spool.claim(path)
+        spool.mark_done(path, {"id": "abc", "url": "https://qiita.com/u/items/abc"})
+
+        assert ArticleSpool.is_published(path)
+        assert ArticleSpool.read_done(path)["id"] == "abc"
+        assert not path.with_name(path.name + ".lock").exists()
+        assert spool.pending() == []
+
+    def test_failed_then_done_removes_failed_marker(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        assert spool.claim(path)
+        spool.mark_failed(path, "publish failed")
+        assert ArticleSpool.read_failed(path)["error"] == "publish failed"
+        assert not ArticleSpool.is_published(path)
+
+        assert spool.claim(path)
+        spool.mark_done(path, {"id": "abc"})
+        assert ArticleSpool.read_failed(path) is None
+        assert ArticleSpool.is_published(path)
+
+class TestEntryPath:
+    def test_resume_keeps_file_names(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        resumed = ArticleSpool(str(tmp_path), run_id=spool.run_id)
+        assert resumed.entry_path(1) == path
+        assert resumed.entry_path(2) == spool.entry_path(2)
+
+    def test_new_run_gets_own_file_names(self, tmp_path):
+        spool, path = spooled(tmp_path)
+        other = ArticleSpool(str(tmp_path))
+        assert other.run_id != spool.run_id
+        assert other.entry_path(1) != path
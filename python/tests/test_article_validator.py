@@ -0,0 +1,110 @@
+"""投稿前の品質ゲート（article_validator）の検査と修正のテスト"""
+
+import json
+
+from article_validator import (
+    ERROR, FIXED, MIN_BODY_FOR_HEADINGS, QIITA_MAX_TAGS, QIITA_TITLE_MAX_LENGTH, WARNING,
+    ArticleValidator, scan_markdown
+)
+
+def article(**overrides):
+    data = {"title": "Pythonの型ヒント入門", "tags": [{"name": "Python", "versions": []}],
+            "body": "## はじめに\n本文\n\n```python\nx: int = 1\n```\n", "finish_reason": "stop"}
+    data.update(overrides)
+    return data
+
+def checks(issues, severity=None):
+    return [issue.check for issue in issues if severity is None or issue.severity == severity]
+
+class TestScanMarkdown:
+    def test_ignores_headings_inside_code_blocks(self):
+        scan = scan_markdown("## 見出し\n```bash\n# コメント\n```\n### 小見出し")
+        assert [number for number, _ in scan.headings] == [1, 5]
+        assert scan.code_blocks[0].lang == "bash"
+        assert scan.code_blocks[0].code == "# コメント"
+
+    def test_qiita_file_name_and_longer_closing_fence(self):
+        scan = scan_markdown("```python:main.py\nprint(1)\n`````\n")
+        assert scan.code_blocks[0].lang == "python"
+        assert scan.unclosed_fence is None
+
+    def test_reports_unclosed_fence(self):
+        scan = scan_markdown("本文\n```python\nprint(1)\n")
+        assert scan.unclosed_fence == 2
+
+class TestChecks:
+    def test_valid_article_has_no_issues(self):
+        assert ArticleValidator().validate_article(article()) == []
+
+    def test_truncated_body_is_an_error(self):
+        issues = ArticleValidator().validate_article(article(finish_reason="length"))
+        assert checks(issues, ERROR) == ["truncation"]
+
+    def test_unclosed_fence_is_an_error(self):
+        issues = ArticleValidator().validate_article(article(body="## はじめに\n```python\nprint(1)\n"))
+        assert checks(issues, ERROR) == ["fence"]
+
+    def test_title_missing_or_too_long(self):
+        assert checks(ArticleValidator().validate_article(article(title="  ")), ERROR) == ["title"]
+        long_title = "あ" * (QIITA_TITLE_MAX_LENGTH + 1)
+        assert checks(ArticleValidator().validate_article(article(title=long_title)), ERROR) == ["title"]
+        assert ArticleValidator().validate_article(article(title="あ" * QIITA_TITLE_MAX_LENGTH)) == []
+
+    def test_tags_are_normalized_and_truncated(self):
+        data = article(tags=[" #Python ", "python", {"name": "Django"}, "", "A", "B", "C", "D"])
+        issues = ArticleValidator().validate_article(data)
+        assert checks(issues, FIXED) == ["tags"]
+        assert [tag["name"] for tag in data["tags"]] == ["Python", "Django", "A", "B", "C"]
+        assert len(data["tags"]) == QIITA_MAX_TAGS
+
+    def test_no_tags_is_an_error(self):
+        assert checks(ArticleValidator().validate_article(article(tags=["#", " "])), ERROR) == ["tags"]
+
+    def test_heading_without_space_is_fixed_outside_code(self):
+        data = article(body="##はじめに\n本文\n```bash\n##コメント\n```\n#タグ")
+        issues = ArticleValidator().validate_article(data)
+        assert checks(issues, FIXED) == ["headings"]
+        assert data["body"] == "## はじめに\n本文\n```bash\n##コメント\n```\n#タグ"
+
+    def test_heading_level_jump_is_a_warning(self):
+        issues = ArticleValidator().validate_article(article(body="## はじめに\n#### 詳細\n本文"))
+        assert checks(issues, WARNING) == ["headings"]
+        assert checks(issues, ERROR) == []
+
+    def test_long_body_without_headings_is_an_error(self):
+        long_body = "本文" * (MIN_BODY_FOR_HEADINGS // 2)
+        assert checks(ArticleValidator().validate_article(article(body=long_body)), ERROR) == ["headings"]
+        assert ArticleValidator().validate_article(article(body="短いTipsです")) == []
+
+    def test_code_syntax_only_when_enabled(self):
+        data = article(body="## はじめに\n```python\ndef f(:\n```\n```json\n{\"a\": }\n```\n```python\n>>> 1 +\n```")
+        assert ArticleValidator().validate_article(dict(data)) == []
+        issues = ArticleValidator(check_code=True).validate_article(dict(data))
+        assert checks(issues, ERROR) == ["code", "code"]
+
+class TestValidateFiles:
+    def test_writes_back_fixed_article(self, tmp_path):
+        path = tmp_path / "article.json"
+        path.write_text(json.dumps(article(tags=["python", "Python"]), ensure_ascii=False), encoding="utf-8")
+
+        result = ArticleValidator().validate(path)
+
+        assert result.ok
+        assert json.loads(path.read_text(encoding="utf-8"))["tags"] == [{"name": "python", "versions": []}]
+
+    def test_unreadable_json_is_an_error(self, tmp_path):
+        path = tmp_path / "broken.json"
+        path.write_text("{", encoding="utf-8")
+        result = ArticleValidator().validate(path)
+        assert not result.ok
+        assert result.summary().startswith("json: ")
+
+    def test_validate_all_keeps_order(self, tmp_path):
+        paths = []
+        for index, title in enumerate(["有効なタイトルの記事", ""]):
+            path = tmp_path / f"{index}.json"
+            path.write_text(json.dumps(article(title=title), ensure_ascii=False), encoding="utf-8")
+            paths.append(path)
+        results = ArticleValidator(max_workers=2).validate_all(paths)
+        assert [result.path for result in results] == paths
+        assert [result.ok for result in results] == [True, False]
@@ -0,0 +1,90 @@
+"""AsyncArticleGeneratorのレート制限・モデルの振り分けとHTTPプール設定のテスト"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import openai
+import pytest
+
+from article_generator import ArticleGenerator, AsyncArticleGenerator, HttpPoolConfig
+from model_routing import RoutingPolicy
+from rate_limiter import RateLimiter
+
+CONTENT = "TITLE: 非同期のテスト\nTAGS: Python\nBODY:\n## はじめに\n本文"
+
+def raw_response(content=CONTENT):
+    """with_raw_responseの応答（.headers と .parse()）"""
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+    )
+    return Mock(headers={}, parse=Mock(return_value=completion))
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+def async_generator(**kwargs):
+    generator = AsyncArticleGenerator(api_key="sk-test", **kwargs)
+    generator.client = Mock()
+    generator.client.chat.completions.with_raw_response.create = AsyncMock(return_value=raw_response())
+    generator.client.chat.completions.create = AsyncMock(side_effect=AssertionError("rate_limiterを経由していません"))
+    return generator
+
+class TestAsyncArticleGenerator:
+    def test_uses_rate_limiter(self):
+        limiter = RateLimiter(rpm=1000, tpm=1_000_000, sleep=lambda _: None)
+        generator = async_generator(rate_limiter=limiter)
+
+        article = asyncio.run(generator.generate_article("テスト"))
+
+        assert article.title == "非同期のテスト"
+        assert limiter.state()["requests"] == 1
+        assert limiter.state()["in_flight"] == 0
+
+    def test_retries_rate_limited_call_through_limiter(self):
+        limiter = RateLimiter(rpm=1000, tpm=1_000_000, base_backoff=0.001, max_backoff=0.001)
+        generator = async_generator(rate_limiter=limiter)
+        create = generator.client.chat.completions.with_raw_response.create
+        create.side_effect = [rate_limit_error(), raw_response()]
+
+        asyncio.run(generator.generate_article("テスト"))
+
+        assert create.await_count == 2
+        assert limiter.state()["rate_limited"] == 1
+
+    def test_routes_model_by_template_and_applies_deadline(self):
+        limiter = RateLimiter(rpm=1000, tpm=1_000_000)
+        generator = async_generator(rate_limiter=limiter, routing=RoutingPolicy(deadline=30))
+
+        asyncio.run(generator.generate_article("テスト", template_style="deep-dive"))
+
+        kwargs = generator.client.chat.completions.with_raw_response.create.await_args.kwargs
+        assert kwargs["model"] == "gpt-4o"
+        assert kwargs["timeout"] == 30
+
+    def test_unsupported_modes_are_not_inherited(self):
+        generator = AsyncArticleGenerator(api_key="sk-test")
+        for name in ("generate_article_stream", "generate_article_sectioned", "generate_article_candidates"):
+            assert not hasattr(generator, name)
+            assert hasattr(ArticleGenerator, name)
+
+class TestHttpPoolConfig:
+    def test_reads_environment_at_construction(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_HTTP_MAX_CONNECTIONS", "7")
+        monkeypatch.setenv("OPENAI_HTTP_TIMEOUT", "12.5")
+        config = HttpPoolConfig()
+        assert config.max_connections == 7
+        assert config.timeout == 12.5
+
+    def test_defaults(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_HTTP_MAX_CONNECTIONS", raising=False)
+        assert HttpPoolConfig().max_connections == 100
+
+class TestRateLimiterEnvironment:
+    def test_reads_limits_at_construction(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_RPM_LIMIT", "42")
+        assert RateLimiter().state()["requests_per_minute"] == 42
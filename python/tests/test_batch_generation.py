@@ -0,0 +1,72 @@
+"""Batch APIによる生成（BatchGenerator）の投入・ポーリング中の中断からの再開のテスト"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "benchmarks"))
+
+from article_generator import ArticleGenerator  # noqa: E402
+from batch_generation import BatchGenerator, BatchItem  # noqa: E402
+from mock_servers import MockConfig, MockOpenAIServer  # noqa: E402
+
+TOPICS = ["Pythonの型ヒント", "ElixirのGenServer"]
+
+class Interrupted(Exception):
+    """ポーリング中のプロセス終了の代わり"""
+
+def interrupt(seconds):
+    raise Interrupted()
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockOpenAIServer(MockConfig(latency=0, completion_chars=300, batch_latency=0.3, seed=1)).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    yield server
+    server.stop()
+
+def items(tmp_path):
+    generator = ArticleGenerator(api_key="sk-test")
+    prompts = [generator._build_prompt(topic, "エンジニア", "短い", None, "tips") for topic in TOPICS]
+    return generator, [
+        BatchItem(index=index, topic=topic, prompt=prompt, output_path=str(tmp_path / f"{index}.json"),
+                  template="tips")
+        for index, (topic, prompt) in enumerate(zip(TOPICS, prompts), start=1)
+    ]
+
+class TestResume:
+    def test_rerun_reuses_saved_batch(self, server, tmp_path):
+        state_dir = tmp_path / "state"
+        state_dir.mkdir()
+
+        # 1回目: 投入後、最初の待機でプロセスが止まる
+        generator, first = items(tmp_path)
+        with pytest.raises(Interrupted):
+            BatchGenerator(generator, str(state_dir), poll_interval=0.05, sleep=interrupt).run(first)
+        assert len(server.batches) == 1
+        batch_id = next(iter(server.batches))
+        [state_path] = state_dir.glob("*.json")
+        assert json.loads(state_path.read_text(encoding="utf-8"))["batch_id"] == batch_id
+
+        # 2回目: 同じ入力で再実行すると、保存したバッチの完了を待って展開する（再投入しない）
+        generator, second = items(tmp_path)
+        results = BatchGenerator(generator, str(state_dir), poll_interval=0.05, sleep=time.sleep).run(second)
+
+        assert list(server.batches) == [batch_id]
+        assert [item.status for item in results] == ["done", "done"]
+        for item, topic in zip(results, TOPICS):
+            assert topic in json.loads(Path(item.output_path).read_text(encoding="utf-8"))["title"]
+        assert not state_path.exists()
+
+    def test_different_input_submits_new_batch(self, server, tmp_path):
+        generator, first = items(tmp_path)
+        with pytest.raises(Interrupted):
+            BatchGenerator(generator, str(tmp_path), poll_interval=0.05, sleep=interrupt).run(first)
+
+        generator, second = items(tmp_path)
+        BatchGenerator(generator, str(tmp_path), poll_interval=0.05, sleep=time.sleep).run(second[:1])
+
+        assert len(server.batches) == 2
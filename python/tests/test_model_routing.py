@@ -0,0 +1,99 @@
+"""モデルの振り分け（RoutingPolicy.route）とヘッジ（run_hedged）のテスト"""
+
+import threading
+import time
+
+import pytest
+
+from model_routing import HEDGE, PRIMARY, DeadlineExceeded, ModelRoute, RoutingPolicy, run_hedged
+
+ROUTE = ModelRoute(model="gpt-4o", fallback_model="gpt-4o-mini")
+
+class FakeRequest:
+    """routeごとの動作を決めたrequest（"slow"はキャンセルされるまで返らない）"""
+
+    def __init__(self, **behaviors):
+        self.behaviors = behaviors
+        self.attempts = []
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, attempt):
+        with self.lock:
+            self.attempts.append(attempt)
+            self.finished[attempt.route] = threading.Event()
+        try:
+            behavior = self.behaviors.get(attempt.route, "ok")
+            if behavior == "fail":
+                raise RuntimeError(f"{attempt.route}が失敗しました")
+            if behavior == "slow":
+                attempt.cancelled.wait(10)
+                return f"{attempt.route}（中断）"
+            attempt.mark_first_token()
+            return f"{attempt.model}の記事"
+        finally:
+            self.finished[attempt.route].set()
+
+    def routes(self):
+        return [attempt.route for attempt in self.attempts]
+
+class TestRoute:
+    def test_same_fallback_is_not_a_hedge_target(self):
+        policy = RoutingPolicy(by_template=False, fallback_model="gpt-4o-mini")
+        assert policy.route(None, "gpt-4o-mini") == ModelRoute(model="gpt-4o-mini")
+        assert not policy.route(None, "gpt-4o-mini").can_hedge
+        assert policy.route(None, "gpt-4o") == ROUTE
+
+    def test_template_fallback(self):
+        assert RoutingPolicy().route("deep-dive", "gpt-4o-mini") == ROUTE
+        assert RoutingPolicy().route("tips", "gpt-4o-mini").fallback_model is None
+
+class TestRunHedged:
+    def test_fast_primary_is_not_hedged(self):
+        request = FakeRequest()
+        outcome = run_hedged(request, ROUTE, hedge_after=5)
+        assert (outcome.result, outcome.route, outcome.hedged) == ("gpt-4oの記事", PRIMARY, False)
+        assert outcome.ttft is not None
+        assert request.routes() == [PRIMARY]
+
+    def test_slow_primary_loses_to_hedge(self):
+        request = FakeRequest(primary="slow")
+        outcome = run_hedged(request, ROUTE, hedge_after=0.05)
+
+        assert (outcome.result, outcome.model, outcome.route, outcome.hedged) == (
+            "gpt-4o-miniの記事", "gpt-4o-mini", HEDGE, True
+        )
+        # 負けた最初のリクエストはキャンセルされて終わる
+        primary = request.attempts[0]
+        assert primary.cancelled.is_set()
+        assert request.finished[PRIMARY].wait(1)
+
+    def test_failed_primary_hedges_without_waiting(self):
+        request = FakeRequest(primary="fail")
+        started_at = time.perf_counter()
+        outcome = run_hedged(request, ROUTE, hedge_after=30)
+
+        assert time.perf_counter() - started_at < 5
+        assert (outcome.route, outcome.model, outcome.hedged) == (HEDGE, "gpt-4o-mini", True)
+
+    def test_all_failed_raises_primary_error(self):
+        request = FakeRequest(primary="fail", hedge="fail")
+        with pytest.raises(RuntimeError, match="primary"):
+            run_hedged(request, ROUTE, hedge_after=30)
+        assert sorted(request.routes()) == [HEDGE, PRIMARY]
+
+    def test_deadline_cancels_all_attempts(self):
+        request = FakeRequest(primary="slow", hedge="slow")
+        with pytest.raises(DeadlineExceeded):
+            run_hedged(request, ROUTE, hedge_after=0.05, deadline=0.3)
+
+        assert request.routes() == [PRIMARY, HEDGE]
+        assert all(attempt.cancelled.is_set() for attempt in request.attempts)
+        assert request.finished[PRIMARY].wait(1)
+        assert request.finished[HEDGE].wait(1)
+
+    def test_no_duplicate_request_without_distinct_fallback(self):
+        request = FakeRequest(primary="fail")
+        with pytest.raises(RuntimeError):
+            run_hedged(request, ModelRoute(model="gpt-4o-mini", fallback_model="gpt-4o-mini"), hedge_after=0.01)
+        assert request.routes() == [PRIMARY]
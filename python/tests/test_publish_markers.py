@@ -0,0 +1,64 @@
+"""投稿成功マーカー（.done）の内容と、--republishでの記事IDの対応付けのテスト"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import generate_and_publish  # noqa: E402
+from article_spool import ArticleSpool  # noqa: E402
+from qiita_catalog import QiitaCatalog, content_hash  # noqa: E402
+
+ARTICLE = {"title": "Elixir入門", "tags": [{"name": "Elixir"}], "body": "本文\r\n", "private": True}
+SCRIPT_OUTPUT = ("✅ 投稿成功!\n   タイトル: Elixir入門\n   URL: https://qiita.com/u/items/abc123\n"
+                 "   ID: abc123\n   プライベート: true\n")
+
+def _write_article(tmp_path):
+    path = tmp_path / "article.json"
+    path.write_text(json.dumps(ARTICLE, ensure_ascii=False), encoding="utf-8")
+    return path
+
+class TestScriptPublish:
+    def test_returns_item_id(self, tmp_path):
+        path = _write_article(tmp_path)
+        completed = subprocess.CompletedProcess([], 0, stdout=SCRIPT_OUTPUT, stderr="")
+        with mock.patch.object(generate_and_publish.subprocess, "run", return_value=completed):
+            response = generate_and_publish.publish_article("token", path)
+        assert response == {"url": "https://qiita.com/u/items/abc123", "id": "abc123"}
+
+    def test_falls_back_to_url(self, tmp_path):
+        path = _write_article(tmp_path)
+        output = SCRIPT_OUTPUT.replace("   ID: abc123\n", "")
+        completed = subprocess.CompletedProcess([], 0, stdout=output, stderr="")
+        with mock.patch.object(generate_and_publish.subprocess, "run", return_value=completed):
+            response = generate_and_publish.publish_article("token", path)
+        assert response["id"] == "abc123"
+
+class TestDoneMarker:
+    def test_records_id_url_and_hash(self, tmp_path):
+        path = _write_article(tmp_path)
+        info = generate_and_publish.done_info(path, {"url": "https://qiita.com/u/items/abc123"})
+        assert info == {
+            "url": "https://qiita.com/u/items/abc123",
+            "id": "abc123",
+            "content_hash": content_hash(ARTICLE["title"], ARTICLE["tags"], ARTICLE["body"])
+        }
+
+    def test_resolves_item_id_from_marker_without_title_match(self, tmp_path):
+        path = _write_article(tmp_path)
+        spool = ArticleSpool(str(tmp_path))
+        assert spool.claim(path)
+        spool.mark_done(path, generate_and_publish.done_info(path, {"id": "abc123", "url": None}))
+        catalog = QiitaCatalog(":memory:")
+        assert generate_and_publish.resolve_item_id(catalog, path, ARTICLE) == "abc123"
+
+    def test_resolves_item_id_from_url_of_older_marker(self, tmp_path):
+        path = _write_article(tmp_path)
+        spool = ArticleSpool(str(tmp_path))
+        assert spool.claim(path)
+        spool.mark_done(path, {"url": "https://qiita.com/u/items/def456"})
+        catalog = QiitaCatalog(":memory:")
+        assert generate_and_publish.resolve_item_id(catalog, path, ARTICLE) == "def456"
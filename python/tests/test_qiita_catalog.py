@@ -0,0 +1,65 @@
+"""QiitaCatalogの差分同期と定期的な全件取得のテスト"""
+
+import time
+
+from qiita_catalog import FULL_SYNC_INTERVAL, QiitaCatalog
+
+def _item(item_id, created_at, updated_at, title="記事"):
+    return {"id": item_id, "title": f"{title}{item_id}", "url": f"https://qiita.com/u/items/{item_id}",
+            "tags": [{"name": "Python"}], "created_at": created_at, "updated_at": updated_at}
+
+class TestSync:
+    def test_first_sync_is_full(self):
+        catalog = QiitaCatalog(":memory:")
+        calls = []
+
+        def fetch(since):
+            calls.append(since)
+            return {"items": [_item("a", "2025-01-01T00:00:00+09:00", "2025-01-02T00:00:00+09:00")],
+                    "total_count": 1, "complete": True}
+
+        result = catalog.sync(fetch)
+        assert calls == [None]
+        assert result.full
+        assert not catalog.needs_full_sync()
+
+    def test_second_sync_is_incremental(self):
+        catalog = QiitaCatalog(":memory:")
+        catalog.sync(lambda since: {"items": [_item("a", "2025-01-01T00:00:00+09:00", "2025-01-02T00:00:00+09:00")],
+                                    "total_count": 1, "complete": True})
+        calls = []
+
+        def fetch(since):
+            calls.append(since)
+            return {"items": [], "total_count": 1, "complete": False}
+
+        result = catalog.sync(fetch)
+        assert calls == ["2025-01-02T00:00:00+09:00"]
+        assert not result.full
+
+    def test_full_sync_after_interval(self):
+        catalog = QiitaCatalog(":memory:")
+        catalog.sync(lambda since: {"items": [_item("a", "2025-01-01T00:00:00+09:00", "2025-01-02T00:00:00+09:00")],
+                                    "total_count": 1, "complete": True})
+        assert catalog.needs_full_sync(now=time.time() + FULL_SYNC_INTERVAL)
+
+        # 古い記事の編集は全件取得で取り込まれる
+        calls = []
+
+        def fetch(since):
+            calls.append(since)
+            return {"items": [_item("a", "2025-01-01T00:00:00+09:00", "2025-03-01T00:00:00+09:00", title="編集後")],
+                    "total_count": 1, "complete": True}
+
+        catalog.set_state("last_full_sync_at", str(time.time() - FULL_SYNC_INTERVAL))
+        result = catalog.sync(fetch)
+        assert calls == [None]
+        assert result.updated == 1
+        assert catalog.get("a").title == "編集後a"
+        assert not catalog.needs_full_sync()
+
+    def test_incomplete_full_fetch_does_not_reset_interval(self):
+        catalog = QiitaCatalog(":memory:")
+        catalog.sync(lambda since: {"items": [_item("a", "2025-01-01T00:00:00+09:00", "2025-01-02T00:00:00+09:00")],
+                                    "total_count": 1, "complete": False})
+        assert catalog.get_state("last_full_sync_at") is None
@@ -0,0 +1,274 @@
+"""RateLimiterのAIMD（429での半減と成功での回復）・retry-after・再試行のテスト"""
+
+from unittest.mock import Mock
+
+import httpx
+import openai
+import pytest
+
+from rate_limiter import DECREASE_FACTOR, RateLimiter, parse_duration
+
+class FakeClock:
+    """sleepで進む時計（acquireのバケット補充と一時停止に使う）"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def limiter(clock, **kwargs):
+    kwargs.setdefault("rpm", 10_000)
+    kwargs.setdefault("tpm", 10_000_000)
+    return RateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+def status_error(status, headers=None, code=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    body = {"code": code} if code else None
+    if status == 429:
+        return openai.RateLimitError("rate limited", response=response, body=body)
+    return openai.InternalServerError("server error", response=response, body=body)
+
+def raw_response(headers=None, total_tokens=None):
+    usage = Mock(total_tokens=total_tokens)
+    return Mock(headers=headers or {}, parse=Mock(return_value=Mock(usage=usage)))
+
+class TestAimd:
+    def test_rate_limited_halves_concurrency_down_to_minimum(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=16, initial_concurrency=8, min_concurrency=2)
+        limits = []
+        for _ in range(4):
+            rl.release(rl.acquire(10), rate_limited=True)
+            limits.append(rl.state()["concurrency_limit"])
+        assert limits == [8 * DECREASE_FACTOR, 2.0, 2.0, 2.0]
+        assert rl.state()["rate_limited"] == 4
+
+    def test_success_increases_additively_up_to_maximum(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=5, initial_concurrency=4)
+        rl.release(rl.acquire(10))
+        assert rl.state()["concurrency_limit"] == 4.25
+        # 1つの窓（limit件）の成功でおよそ1ずつ増え、上限で止まる
+        for _ in range(20):
+            rl.release(rl.acquire(10))
+        assert rl.state()["concurrency_limit"] == 5.0
+
+    def test_recovers_after_backoff(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=8, initial_concurrency=8)
+        rl.release(rl.acquire(10), rate_limited=True)
+        assert rl.state()["concurrency_limit"] == 4.0
+        for _ in range(4):
+            rl.release(rl.acquire(10))
+        assert 4.0 < rl.state()["concurrency_limit"] < 5.0
+
+    def test_low_remaining_quota_stops_increase(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=8, initial_concurrency=4)
+        headers = {"x-ratelimit-limit-requests": "1000", "x-ratelimit-remaining-requests": "50"}
+        rl.release(rl.acquire(10), headers=headers)
+        state = rl.state()
+        assert state["concurrency_limit"] == 4.0
+        assert state["requests_available"] <= 51
+
+    def test_unused_tokens_are_returned(self):
+        clock = FakeClock()
+        rl = limiter(clock, tpm=1000)
+        permit = rl.acquire(400)
+        assert rl.state()["tokens_available"] == 600
+        rl.release(permit, used_tokens=100)
+        assert rl.state()["tokens_available"] == 900
+
+class TestCall:
+    def test_retry_after_pauses_and_decreases(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=8, initial_concurrency=8, base_backoff=0.001, max_backoff=0.001)
+        request = Mock(side_effect=[status_error(429, {"retry-after": "2"}), raw_response()])
+
+        _, retries = rl.call(request, 10)
+
+        assert retries == 1
+        assert request.call_count == 2
+        assert clock.sleeps[0] >= 2
+        state = rl.state()
+        assert state["rate_limited"] == 1
+        assert state["retries"] == 1
+        assert state["in_flight"] == 0
+        assert 4.0 < state["concurrency_limit"] < 5.0
+
+    def test_gives_up_after_max_attempts(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_attempts=3, base_backoff=0.001, max_backoff=0.001)
+        request = Mock(side_effect=status_error(500))
+        with pytest.raises(openai.InternalServerError):
+            rl.call(request, 10)
+        assert request.call_count == 3
+        assert rl.state()["in_flight"] == 0
+
+    def test_insufficient_quota_is_not_retried(self):
+        clock = FakeClock()
+        rl = limiter(clock)
+        request = Mock(side_effect=status_error(429, code="insufficient_quota"))
+        with pytest.raises(openai.RateLimitError):
+            rl.call(request, 10)
+        assert request.call_count == 1
+        assert clock.sleeps == []
+
+def test_parse_duration():
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration(None) is None
+
+class TestOnlySuccessIncreases:
+    def test_server_errors_do_not_increase_concurrency(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=8, initial_concurrency=4, base_backoff=0.001, max_backoff=0.001)
+        request = Mock(side_effect=[status_error(500), status_error(503), raw_response()])
+
+        _, retries = rl.call(request, 10)
+
+        assert retries == 2
+        # 失敗した2回では増やさず、最後の成功の1回分だけ増える
+        assert rl.state()["concurrency_limit"] == 4.25
+
+    def test_failed_release_keeps_limit(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=8, initial_concurrency=4)
+        rl.release(rl.acquire(10), succeeded=False)
+        assert rl.state()["concurrency_limit"] == 4.0
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+def stream_response(chunks):
+    stream = FakeStream(chunks)
+    return Mock(headers={}, parse=Mock(return_value=stream)), stream
+
+class TestStream:
+    def test_permit_is_held_until_stream_is_read(self):
+        clock = FakeClock()
+        rl = limiter(clock, tpm=1000, max_concurrency=8, initial_concurrency=4)
+        raw, fake = stream_response([Mock(usage=None), Mock(usage=Mock(total_tokens=100))])
+
+        stream, _ = rl.call(lambda: raw, 400, stream=True)
+        assert rl.state()["in_flight"] == 1
+        chunks = list(stream)
+
+        assert len(chunks) == 2
+        assert fake.closed
+        state = rl.state()
+        assert state["in_flight"] == 0
+        assert state["tokens_available"] == 900
+        assert state["concurrency_limit"] == 4.25
+
+    def test_closing_early_releases_without_increase(self):
+        clock = FakeClock()
+        rl = limiter(clock, max_concurrency=8, initial_concurrency=4)
+        raw, fake = stream_response([Mock(usage=None), Mock(usage=None)])
+
+        stream, _ = rl.call(lambda: raw, 10, stream=True)
+        chunks = iter(stream)
+        next(chunks)
+        assert rl.state()["in_flight"] == 1
+        stream.close()
+        stream.close()
+
+        assert fake.closed
+        assert rl.state()["in_flight"] == 0
+        assert rl.state()["concurrency_limit"] == 4.0
+
+    def test_generate_article_stream_counts_against_concurrency(self, tmp_path):
+        from types import SimpleNamespace
+
+        from article_generator import ArticleGenerator
+
+        def chunk(content=None, finish_reason=None, usage=None):
+            choices = [SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)]
+            return SimpleNamespace(choices=choices if usage is None else [], usage=usage)
+
+        raw, fake = stream_response([
+            chunk("TITLE: ストリーミングのテスト\nTAGS: Python\nBODY:\n"),
+            chunk("## はじめに\n本文\n"),
+            chunk(finish_reason="stop"),
+            chunk(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30))
+        ])
+        rl = limiter(FakeClock())
+        generator = ArticleGenerator(api_key="sk-test", rate_limiter=rl)
+        generator.client = Mock()
+        generator.client.chat.completions.with_raw_response.create = Mock(return_value=raw)
+        in_flight_at_header = []
+
+        article = generator.generate_article_stream(
+            "テスト", str(tmp_path / "article.json"),
+            on_header=lambda title, tags: in_flight_at_header.append(rl.state()["in_flight"])
+        )
+
+        assert article.title == "ストリーミングのテスト"
+        assert in_flight_at_header == [1]
+        assert fake.closed
+        assert rl.state()["in_flight"] == 0
+
+class TestCallAsyncCancel:
+    def test_cancelled_wait_releases_permit(self):
+        import asyncio
+
+        rl = RateLimiter(rpm=10_000, tpm=10_000_000, max_concurrency=1, initial_concurrency=1)
+
+        async def scenario():
+            held = rl.acquire(10)
+            request = Mock(side_effect=AssertionError("キャンセル後に送信しました"))
+            task = asyncio.ensure_future(rl.call_async(request, 10))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # 待ちのスレッドは枠が空くと確保し、そのまま返却する
+            rl.release(held)
+            for _ in range(100):
+                if rl.state()["in_flight"] == 0 and rl.state()["requests"] == 2:
+                    break
+                await asyncio.sleep(0.01)
+            return request
+
+        request = asyncio.run(scenario())
+        assert rl.state()["requests"] == 2
+        assert rl.state()["in_flight"] == 0
+        request.assert_not_called()
+
+    def test_cancelled_request_releases_permit(self):
+        import asyncio
+
+        rl = RateLimiter(rpm=10_000, tpm=10_000_000)
+
+        async def scenario():
+            started = asyncio.Event()
+
+            async def request():
+                started.set()
+                await asyncio.sleep(60)
+
+            task = asyncio.ensure_future(rl.call_async(request, 10))
+            await started.wait()
+            assert rl.state()["in_flight"] == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        assert rl.state()["in_flight"] == 0
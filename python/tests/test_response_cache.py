@@ -0,0 +1,111 @@
+"""レスポンスキャッシュのTTL・最終アクセス順の削除（件数・サイズ上限）・refreshing()のテスト"""
+
+from response_cache import ResponseCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def cache(tmp_path, clock, **kwargs):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), clock=clock, **kwargs)
+
+def put(cache, key, chars=100):
+    cache.put(key, "x" * chars, {"title": key}, latency=2.0, prompt_tokens=10, completion_tokens=20)
+
+class TestTtl:
+    def test_expired_entry_is_a_miss_and_deleted(self, tmp_path):
+        clock = FakeClock()
+        responses = cache(tmp_path, clock, ttl_seconds=60)
+        put(responses, "a")
+
+        clock.now += 60
+        assert responses.get("a").article == {"title": "a"}
+        clock.now += 1
+        assert responses.get("a") is None
+        assert responses._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+        assert responses.stats()["hits"] == 1
+        assert responses.stats()["misses"] == 1
+
+    def test_put_drops_expired_entries(self, tmp_path):
+        clock = FakeClock()
+        responses = cache(tmp_path, clock, ttl_seconds=60)
+        put(responses, "old")
+        clock.now += 120
+        put(responses, "new")
+        keys = [key for key, in responses._conn.execute("SELECT key FROM responses")]
+        assert keys == ["new"]
+
+    def test_hit_does_not_extend_ttl(self, tmp_path):
+        clock = FakeClock()
+        responses = cache(tmp_path, clock, ttl_seconds=60)
+        put(responses, "a")
+        clock.now += 50
+        assert responses.get("a")
+        clock.now += 50
+        assert responses.get("a") is None
+
+class TestEviction:
+    def test_least_recently_accessed_is_evicted_by_count(self, tmp_path):
+        clock = FakeClock()
+        responses = cache(tmp_path, clock, max_entries=2)
+        put(responses, "a")
+        clock.now += 1
+        put(responses, "b")
+        clock.now += 1
+        assert responses.get("a")
+        clock.now += 1
+        put(responses, "c")
+
+        assert responses.get("b") is None
+        assert responses.get("a")
+        assert responses.get("c")
+
+    def test_evicts_by_size(self, tmp_path):
+        clock = FakeClock()
+        # 1件は本文100バイト＋記事JSON約15バイト。2件までしか入らない
+        responses = cache(tmp_path, clock, max_bytes=250)
+        for key in ("a", "b", "c"):
+            put(responses, key)
+            clock.now += 1
+
+        assert responses.get("a") is None
+        assert responses.get("b")
+        assert responses.get("c")
+
+    def test_entry_larger_than_limit_is_not_kept(self, tmp_path):
+        responses = cache(tmp_path, FakeClock(), max_bytes=50)
+        put(responses, "a")
+        assert responses.get("a") is None
+
+class TestRefreshing:
+    def test_overwrites_without_reading(self, tmp_path):
+        clock = FakeClock()
+        responses = cache(tmp_path, clock, ttl_seconds=60, max_entries=5)
+        put(responses, "a")
+
+        refreshing = responses.refreshing()
+        assert (refreshing.ttl_seconds, refreshing.max_entries, refreshing.refresh) == (60, 5, True)
+        assert refreshing.get("a") is None
+        refreshing.put("a", "新しい本文", {"title": "再生成"}, latency=1.0)
+
+        # 元のキャッシュからは上書きした結果が読める
+        assert responses.get("a").article == {"title": "再生成"}
+        refreshing.close()
+
+    def test_shares_clock(self, tmp_path):
+        clock = FakeClock()
+        responses = cache(tmp_path, clock, ttl_seconds=60)
+        refreshing = responses.refreshing()
+        refreshing.put("a", "本文", {"title": "a"}, latency=1.0)
+        clock.now += 61
+        assert responses.get("a") is None
+        refreshing.close()
+
+def test_refresh_counts_misses(tmp_path):
+    responses = cache(tmp_path, FakeClock(), refresh=True)
+    put(responses, "a")
+    assert responses.get("a") is None
+    assert responses.stats()["misses"] == 1
@@ -0,0 +1,138 @@
+"""実行ジャーナルと、途中で止まったバッチ実行の再開（--resume）のテスト"""
+
+import json
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import generate_and_publish  # noqa: E402
+from article_spool import ArticleSpool  # noqa: E402
+from article_validator import ArticleValidator  # noqa: E402
+from run_journal import (  # noqa: E402
+    FAILED, GENERATED, PUBLISHED, QUEUED, VALIDATED, JournalEntry, RunJournal
+)
+
+TOPICS = ["Pythonの型ヒント", "ElixirのGenServer", "SQLiteのWALモード"]
+
+class TestRunJournal:
+    def test_enqueue_keeps_recorded_rows(self):
+        journal = RunJournal(":memory:")
+        journal.start("run1", "manifest.jsonl", {"model": "gpt-4o-mini"})
+        journal.enqueue("run1", [(1, "a"), (2, "b")])
+        journal.record("run1", 1, GENERATED, path="/tmp/a.json")
+        journal.enqueue("run1", [(1, "a"), (2, "b")])
+
+        entries = journal.entries("run1")
+        assert [entries[1].stage, entries[2].stage] == [GENERATED, QUEUED]
+        assert journal.get_run("run1").counts == {GENERATED: 1, QUEUED: 1}
+
+    def test_record_keeps_path_and_clears_error(self):
+        journal = RunJournal(":memory:")
+        journal.start("run1", "manifest.jsonl", {})
+        journal.enqueue("run1", [(1, "a")])
+        journal.record("run1", 1, GENERATED, path="/tmp/a.json")
+        journal.record("run1", 1, FAILED, error="投稿に失敗しました", failed_stage=PUBLISHED)
+        journal.record("run1", 1, PUBLISHED, url="https://qiita.com/u/items/abc", item_id="abc")
+
+        entry = journal.entries("run1")[1]
+        assert (entry.stage, entry.path, entry.item_id, entry.error, entry.failed_stage) == (
+            PUBLISHED, "/tmp/a.json", "abc", None, None
+        )
+
+    def test_rejects_unknown_stage(self):
+        journal = RunJournal(":memory:")
+        with pytest.raises(ValueError):
+            journal.record("run1", 1, "unknown")
+
+    def test_start_keeps_options_on_resume(self):
+        journal = RunJournal(":memory:")
+        journal.start("run1", "manifest.jsonl", {"concurrency": 4})
+        journal.start("run1", "manifest.jsonl", {"concurrency": 1})
+        assert journal.get_run("run1").options == {"concurrency": 4}
+
+    def test_has_article(self, tmp_path):
+        path = tmp_path / "a.json"
+        path.write_text("{}", encoding="utf-8")
+        assert JournalEntry("run1", 1, "a", GENERATED, str(path)).has_article()
+        assert JournalEntry("run1", 1, "a", FAILED, str(path), failed_stage=PUBLISHED).has_article()
+        # 品質検査で不合格の記事と、消えた記事は再生成する
+        assert not JournalEntry("run1", 1, "a", FAILED, str(path), failed_stage=VALIDATED).has_article()
+        assert not JournalEntry("run1", 1, "a", GENERATED, str(tmp_path / "missing.json")).has_article()
+
+class TestResume:
+    def _run(self, manifest, spool, journal, fail_rows=(), untagged_rows=(), validator=None):
+        generated_rows = []
+
+        def fake_generate_article(topic, *args, output_path=None, **kwargs):
+            row = TOPICS.index(topic) + 1
+            generated_rows.append(row)
+            if row in fail_rows:
+                return None
+            tags = [] if row in untagged_rows else ["Python"]
+            Path(output_path).write_text(json.dumps({"title": topic, "tags": tags, "body": "本文"},
+                                                    ensure_ascii=False), encoding="utf-8")
+            return str(output_path)
+
+        with mock.patch.object(generate_and_publish, "generate_article", side_effect=fake_generate_article), \
+                mock.patch("article_generator.ArticleGenerator"):
+            results = generate_and_publish.generate_batch(str(manifest), concurrency=1, spool=spool,
+                                                          journal=journal, validator=validator)
+        return generated_rows, dict(results)
+
+    def _manifest(self, tmp_path):
+        manifest = tmp_path / "manifest.jsonl"
+        manifest.write_text("\n".join(json.dumps({"topic": topic}, ensure_ascii=False) for topic in TOPICS),
+                            encoding="utf-8")
+        return manifest
+
+    def test_resumes_only_unfinished_rows(self, tmp_path):
+        manifest = self._manifest(tmp_path)
+        journal = RunJournal(str(tmp_path / "journal.sqlite3"))
+        spool = ArticleSpool(str(tmp_path / "spool"))
+
+        # 1回目: 2行目の生成に失敗し、1行目だけ投稿した時点で止まる
+        generated_rows, results = self._run(manifest, spool, journal, fail_rows=(2,))
+        assert generated_rows == [1, 2, 3]
+        assert results[2] is None
+        assert spool.claim(Path(results[1]))
+        spool.mark_done(Path(results[1]), {"url": "https://qiita.com/u/items/abc", "id": "abc"})
+        generate_and_publish.record_publish_results(journal, spool, [(1, results[1])])
+
+        # 2回目: 同じ実行IDで再開すると、生成に失敗した行だけを生成する
+        journal = RunJournal(str(tmp_path / "journal.sqlite3"))
+        resumed = ArticleSpool(str(tmp_path / "spool"), run_id=spool.run_id)
+        generated_rows, results = self._run(manifest, resumed, journal)
+        assert generated_rows == [2]
+        # 生成済み・投稿済みの行は前回の記事を引き継ぐ（投稿済みの記事は.doneマーカーで投稿をスキップする）
+        assert sorted(results) == [1, 2, 3]
+        assert str(results[3]) == str(spool.entry_path(3))
+        assert ArticleSpool.is_published(Path(results[1]))
+
+        entries = journal.entries(spool.run_id)
+        assert [entries[row].stage for row in (1, 2, 3)] == [PUBLISHED, GENERATED, GENERATED]
+        assert entries[1].item_id == "abc"
+        assert entries[2].error is None
+
+    def test_regenerates_carried_row_that_fails_validation(self, tmp_path):
+        manifest = self._manifest(tmp_path)
+        journal = RunJournal(str(tmp_path / "journal.sqlite3"))
+        spool = ArticleSpool(str(tmp_path / "spool"))
+
+        # 1回目: 検査なしで全行を生成（1行目はタグがなく、検査では不合格になる）
+        generated_rows, _ = self._run(manifest, spool, journal, untagged_rows=(1,))
+        assert generated_rows == [1, 2, 3]
+
+        # 2回目: 検査ありで再開すると、引き継いだ1行目だけを再生成する
+        resumed = ArticleSpool(str(tmp_path / "spool"), run_id=spool.run_id)
+        generated_rows, results = self._run(manifest, resumed, journal, validator=ArticleValidator())
+        assert generated_rows == [1]
+        assert all(results[row] for row in (1, 2, 3))
+        assert str(results[1]) == str(spool.entry_path(1))
+        assert json.loads(Path(results[1]).read_text(encoding="utf-8"))["tags"][0]["name"] == "Python"
+
+        entries = journal.entries(spool.run_id)
+        assert [entries[row].stage for row in (1, 2, 3)] == [VALIDATED, VALIDATED, VALIDATED]
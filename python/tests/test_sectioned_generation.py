@@ -0,0 +1,152 @@
+"""分割生成（アウトライン→セクション）のparse_outline・stitch_sections・generate_article_sectionedのテスト"""
+
+import json
+import re
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from article_generator import (
+    MAX_SECTIONS, ArticleGenerationError, ArticleGenerator, parse_outline, stitch_sections
+)
+from prompt_templates import OutlineSection
+
+SECTION_PATTERN = re.compile(r"- セクション: \d+\. (.*)")
+
+def outline_json(**overrides):
+    data = {"title": "GenServer入門", "tags": ["Elixir", "GenServer"],
+            "sections": [{"heading": "はじめに", "points": ["目的"]}, {"heading": "まとめ", "points": []}]}
+    data.update(overrides)
+    return json.dumps(data, ensure_ascii=False)
+
+class TestParseOutline:
+    def test_parses_title_tags_and_sections(self):
+        title, tags, sections = parse_outline(outline_json())
+        assert title == "GenServer入門"
+        assert [tag["name"] for tag in tags] == ["Elixir", "GenServer"]
+        assert sections == [OutlineSection("はじめに", ("目的",)), OutlineSection("まとめ")]
+
+    def test_strips_heading_marks_and_blank_entries(self):
+        sections = [{"heading": "## はじめに ", "points": [" 目的 ", ""]},
+                    {"heading": "  "}, {"heading": "#"}, {"points": ["見出しなし"]}]
+        _, _, parsed = parse_outline(outline_json(sections=sections))
+        assert parsed == [OutlineSection("はじめに", ("目的",))]
+
+    def test_missing_title_and_tags(self):
+        title, tags, _ = parse_outline(json.dumps({"sections": [{"heading": "はじめに"}]}))
+        assert (title, tags) == ("", [])
+
+    def test_sections_are_capped(self):
+        sections = [{"heading": f"見出し{n}"} for n in range(MAX_SECTIONS + 3)]
+        _, _, parsed = parse_outline(outline_json(sections=sections))
+        assert len(parsed) == MAX_SECTIONS
+
+    @pytest.mark.parametrize("content", [
+        outline_json(sections=[]),
+        outline_json(sections=[{"heading": ""}]),
+        json.dumps(["はじめに", "まとめ"]),
+        json.dumps({"title": "見出しなし"})
+    ])
+    def test_no_sections_is_an_error(self, content):
+        with pytest.raises(ValueError):
+            parse_outline(content)
+
+    def test_invalid_json_is_an_error(self):
+        with pytest.raises(ValueError):
+            parse_outline("## はじめに\n## まとめ")
+
+class TestStitchSections:
+    OUTLINE = [OutlineSection("はじめに"), OutlineSection("使い方")]
+
+    def test_sections_get_level_two_headings(self):
+        body = stitch_sections(self.OUTLINE, ["導入です。", "手順です。"])
+        assert body == "## はじめに\n\n導入です。\n\n## 使い方\n\n手順です。"
+
+    def test_repeated_heading_is_removed(self):
+        body = stitch_sections(self.OUTLINE, ["# はじめに\n導入です。", "### 使い方\n手順です。"])
+        assert body == "## はじめに\n\n導入です。\n\n## 使い方\n\n手順です。"
+
+    def test_top_level_headings_are_demoted(self):
+        body = stitch_sections(self.OUTLINE[:1], ["# 背景\n## 目的\n### 詳細\n#タグ\n本文"])
+        assert body == "## はじめに\n\n### 背景\n### 目的\n### 詳細\n#タグ\n本文"
+
+    def test_headings_inside_code_are_kept(self):
+        text = "```bash\n# コメント\n## コメント\n```\n## 次"
+        body = stitch_sections(self.OUTLINE[:1], [text])
+        assert body == "## はじめに\n\n```bash\n# コメント\n## コメント\n```\n### 次"
+
+    def test_unterminated_code_fence_is_closed(self):
+        body = stitch_sections(self.OUTLINE, ["```python\nprint(1)", "手順です。"])
+        assert body == "## はじめに\n\n```python\nprint(1)\n```\n\n## 使い方\n\n手順です。"
+        # 閉じたコードブロックの後の見出しは通常どおり下げる
+        assert "### 次" in stitch_sections(self.OUTLINE[:1], ["```python\nx\n```\n# 次"])
+
+    def test_missing_text(self):
+        assert stitch_sections(self.OUTLINE[:1], [None]) == "## はじめに\n\n"
+
+class FakeCompletions:
+    """アウトラインの要求にはJSON、セクションの要求にはそのセクションの本文を返す"""
+
+    def __init__(self, outline, sections, finish_reasons=None):
+        self.outline = outline
+        self.sections = sections
+        self.finish_reasons = finish_reasons or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def create(self, model, messages, **params):
+        with self.lock:
+            self.calls.append(params)
+        if "response_format" in params:
+            content, finish_reason = self.outline, "stop"
+        else:
+            heading = SECTION_PATTERN.search(messages[-1]["content"]).group(1)
+            content, finish_reason = self.sections[heading], self.finish_reasons.get(heading, "stop")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=20, total_tokens=30)
+        )
+
+def sectioned_generator(completions):
+    generator = ArticleGenerator(api_key="sk-test")
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return generator
+
+class TestGenerateArticleSectioned:
+    SECTIONS = {"はじめに": "## はじめに\nGenServerの概要です。", "使い方": "# 定義\n```elixir\nuse GenServer"}
+
+    def test_outline_then_sections_are_stitched(self):
+        completions = FakeCompletions(
+            outline_json(sections=[{"heading": "はじめに"}, {"heading": "## 使い方"}]), self.SECTIONS
+        )
+        article = sectioned_generator(completions).generate_article_sectioned("GenServer", programming_language="Elixir")
+
+        assert article.title == "GenServer入門"
+        assert [tag["name"] for tag in article.tags] == ["Elixir", "GenServer"]
+        assert article.body == (
+            "## はじめに\n\nGenServerの概要です。\n\n## 使い方\n\n### 定義\n```elixir\nuse GenServer\n```"
+        )
+        assert article.finish_reason == "stop"
+        assert len(completions.calls) == 3
+        assert "response_format" in completions.calls[0]
+
+    def test_truncated_section_marks_article_truncated(self):
+        completions = FakeCompletions(
+            outline_json(sections=[{"heading": "はじめに"}, {"heading": "使い方"}]), self.SECTIONS,
+            finish_reasons={"使い方": "length"}
+        )
+        article = sectioned_generator(completions).generate_article_sectioned("GenServer")
+        assert article.finish_reason == "length"
+
+    def test_missing_title_and_tags_use_defaults(self):
+        completions = FakeCompletions(json.dumps({"sections": [{"heading": "はじめに"}]}), self.SECTIONS)
+        article = sectioned_generator(completions).generate_article_sectioned("GenServer", programming_language="Elixir")
+        assert article.title == "GenServerについて"
+        assert [tag["name"] for tag in article.tags] == ["技術記事", "Elixir"]
+
+    def test_unusable_outline_is_a_generation_error(self):
+        completions = FakeCompletions("アウトラインを作成しました。", self.SECTIONS)
+        with pytest.raises(ArticleGenerationError):
+            sectioned_generator(completions).generate_article_sectioned("GenServer")
+        assert len(completions.calls) == 1
@@ -0,0 +1,91 @@
+"""TopicIndexの類似度・しきい値・パスによる置き換えのテスト"""
+
+import pytest
+
+from topic_index import DEFAULT_THRESHOLD, TopicIndex, minhash, shingles, similarity
+
+def score(a, b):
+    return similarity(minhash(shingles(a)), minhash(shingles(b)))
+
+@pytest.fixture
+def index():
+    topic_index = TopicIndex(":memory:")
+    yield topic_index
+    topic_index.close()
+
+# 言い回しが違うだけの同じ話題
+PARAPHRASES = [
+    ("ElixirのGenServerの使い方", "Elixir GenServer入門"),
+    ("Docker Composeでよくあるエラーの対処法", "Docker Composeのエラー対処法"),
+    ("React Hooksの活用法", "React Hooks入門"),
+    ("Rustの所有権を徹底解説", "Rustの所有権とは"),
+]
+
+# 語句の一部が共通するだけの別の話題
+NEAR_MISSES = [
+    ("Elixir入門", "ElixirのGenServerの使い方"),
+    ("GenServer入門", "ElixirのGenServerの使い方"),
+    ("Pythonの型ヒント入門", "Pythonのデコレータ入門"),
+    ("React Hooksの活用法", "Reactの状態管理"),
+    ("Rustの所有権", "Rustのライフタイム"),
+    ("Dockerのネットワーク設定", "Dockerのボリューム設定"),
+    ("GitHub Actionsでテストを自動化", "GitHub ActionsでDockerイメージをビルド"),
+]
+
+class TestSimilarity:
+    @pytest.mark.parametrize("a, b", PARAPHRASES)
+    def test_paraphrases_are_above_threshold(self, a, b):
+        assert score(a, b) >= DEFAULT_THRESHOLD
+
+    @pytest.mark.parametrize("a, b", NEAR_MISSES)
+    def test_near_misses_are_below_threshold(self, a, b):
+        assert score(a, b) < DEFAULT_THRESHOLD
+
+    def test_filler_words_and_width_are_ignored(self):
+        assert shingles("ＥｌｉｘｉｒのGenServer入門") == shingles("elixir genserverの使い方")
+
+class TestTopicIndex:
+    def test_finds_paraphrase(self, index):
+        index.add("ElixirのGenServerの使い方", "GenServer入門記事", path="a.json")
+        results = index.find_similar("Elixir GenServer入門")
+        assert [r.path for r in results] == ["a.json"]
+        assert results[0].score >= DEFAULT_THRESHOLD
+
+    @pytest.mark.parametrize("a, b", NEAR_MISSES)
+    def test_near_miss_is_not_found(self, index, a, b):
+        index.add(b, path="a.json")
+        assert index.find_similar(a) == []
+
+    def test_threshold_argument(self, index):
+        index.add("ElixirのGenServerの使い方", path="a.json")
+        assert index.find_similar("Elixir入門") == []
+        assert [r.path for r in index.find_similar("Elixir入門", threshold=0.3)] == ["a.json"]
+
+    def test_body_similarity(self, index):
+        body = "GenServerはElixirでプロセスの状態を管理するための仕組みです。handle_callで同期的に応答します。"
+        index.add("GenServer", body=body, path="a.json")
+        assert [r.path for r in index.find_similar(body + "便利です。", field="body")] == ["a.json"]
+        assert index.find_similar("Dockerのボリュームはコンテナの外にデータを保存します。", field="body") == []
+
+    def test_add_replaces_same_path(self, index):
+        first = index.add("Elixir入門", path="a.json")
+        second = index.add("Rustの所有権とは", path="a.json")
+
+        assert first == second
+        assert index.stats() == {"articles": 1}
+        assert index.find_similar("Elixir入門") == []
+        assert [r.topic for r in index.find_similar("Rustの所有権")] == ["Rustの所有権とは"]
+
+    def test_add_without_path_always_inserts(self, index):
+        index.add("Elixir入門")
+        index.add("Elixir入門")
+        assert index.stats() == {"articles": 2}
+
+    def test_contains_path(self, index):
+        index.add("Elixir入門", path="a.json")
+        assert index.contains_path("a.json")
+        assert not index.contains_path("b.json")
+
+    def test_unknown_field(self, index):
+        with pytest.raises(ValueError):
+            index.find_similar("Elixir", field="title")
@@ -0,0 +1,270 @@
+"""
+Topic Index
+生成・投稿済み記事のトピックと本文の類似度インデックス
+
+言い換えただけのトピック（「ElixirのGenServerの使い方」と「Elixir GenServer入門」など）を
+生成前に検出し、API呼び出しを省略するために使う。
+テキストは英数字の単語と日本語の文字2-gramに分解し、MinHashの署名を
+LSH（バンド分割）でSQLiteに索引する。検索はバンドのキーの一致数で候補を
+上位MAX_CANDIDATES件に絞ってから署名を比較するため、記事数が数万件でも
+数ミリ秒で終わる。
+"""
+
+import hashlib
+import re
+import random
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# MinHashの署名長とLSHのバンド分割（2値×32バンド: 類似度0.3程度から候補に入る）
+NUM_PERM = 64
+BAND_ROWS = 2
+NUM_BANDS = NUM_PERM // BAND_ROWS
+# 候補とするのに必要なバンドの一致数（偶然の一致を除外する）
+MIN_BAND_MATCHES = 2
+# 署名を比較する候補の最大数（バンドの一致数が多い順。一致数は類似度の2乗に比例する）
+MAX_CANDIDATES = 64
+
+# デフォルトの類似度のしきい値
+DEFAULT_THRESHOLD = 0.6
+
+# トピックの言い回しにすぎない語句（類似度の計算から除外する）
+FILLER_WORDS = [
+    "初心者向け", "完全ガイド", "について", "のための", "よくある", "使い方", "活用法", "対処法",
+    "入門編", "入門", "活用", "方法", "解説", "まとめ", "徹底", "基礎", "実践", "ガイド",
+    "ための", "とは", "する", "した", "して", "tips",
+    "で", "の", "を", "に", "と", "は", "が", "や", "へ"
+]
+_FILLER = re.compile("|".join(sorted(map(re.escape, FILLER_WORDS), key=len, reverse=True)))
+# 英数字の単語、またはそれ以外（日本語など）の連続
+_TOKEN = re.compile(r"[a-z0-9]+|[^\sa-z0-9\W_]+")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# 署名の互換性のため、ハッシュ関数の係数は固定のシードから作る
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+FIELDS = ("topic", "body")
+
+@dataclass
+class SimilarArticle:
+    """類似度インデックスの検索結果"""
+    id: int
+    topic: str
+    title: str
+    path: Optional[str]
+    score: float
+
+def shingles(text: str) -> Set[str]:
+    """テキストを比較単位に分解（英数字は単語、日本語は文字2-gram）"""
+    text = _FILLER.sub(" ", unicodedata.normalize("NFKC", text).lower())
+    result = set()
+    for token in _TOKEN.findall(text):
+        if token.isascii() or len(token) < 2:
+            result.add(token)
+        else:
+            result.update(token[i:i + 2] for i in range(len(token) - 1))
+    return result
+
+def minhash(items: Set[str]) -> array:
+    """MinHash署名（NUM_PERM個の32bit値）"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in items]
+    if not hashes:
+        return array("Q", [_MAX_HASH] * NUM_PERM)
+    return array("Q", [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ])
+
+def similarity(signature: array, other: array) -> float:
+    """
+    2つの署名の類似度（推定Jaccard係数、0〜1）
+
+    包含率は使わない。「Elixir入門」と「ElixirのGenServerの使い方」のように、
+    短いトピックの語句がすべて長いトピックに含まれるだけの別の話題を重複と判定しないため。
+    """
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERM
+
+def _band_keys(field: str, signature: array) -> List[int]:
+    keys = []
+    for band in range(NUM_BANDS):
+        values = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(f"{field}:{band}:{','.join(map(str, values))}".encode("ascii"), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+class TopicIndex:
+    """
+    トピック・本文の近似重複を検出するインデックス
+
+    記事ごとにトピック（不明な場合はタイトル）と本文の署名を保存する。
+    スレッド間で共有して使用できる。パスに ":memory:" を指定すると
+    永続化しない一時インデックスになる（バッチ内の重複検出用）。
+    """
+
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD):
+        """
+        初期化
+
+        Args:
+            path: SQLiteファイルのパス（":memory:"で一時インデックス）
+            threshold: find_similarのデフォルトのしきい値
+        """
+        self.path = path
+        self.threshold = threshold
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                topic TEXT NOT NULL,
+                title TEXT NOT NULL,
+                path TEXT,
+                topic_size INTEGER NOT NULL,
+                topic_signature BLOB NOT NULL,
+                body_size INTEGER NOT NULL DEFAULT 0,
+                body_signature BLOB,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_path ON articles (path);
+            CREATE TABLE IF NOT EXISTS bands (
+                key INTEGER NOT NULL,
+                article_id INTEGER NOT NULL,
+                PRIMARY KEY (key, article_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS bands_article ON bands (article_id);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, topic: str, title: str = "", body: Optional[str] = None, path: Optional[str] = None) -> int:
+        """
+        記事をインデックスに追加（同じpathの記事が登録済みなら置き換える）
+
+        Args:
+            topic: 記事のトピック（空ならタイトルで代用）
+            title: 記事のタイトル
+            body: 記事の本文（省略時は本文の類似検索の対象外）
+            path: 記事JSONのパス
+
+        Returns:
+            int: 追加（置き換え）した記事のID
+        """
+        topic = topic or title
+        topic_items = shingles(topic)
+        topic_signature = minhash(topic_items)
+        body_items = shingles(body) if body else set()
+        body_signature = minhash(body_items) if body_items else None
+
+        values = (topic, title, str(path) if path else None, len(topic_items), topic_signature.tobytes(),
+                  len(body_items), body_signature.tobytes() if body_signature else None)
+
+        with self._lock:
+            # 再生成・再登録で同じpathの記事が重複しないよう、登録済みの行を更新する
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM articles WHERE path = ? ORDER BY id", (str(path),)
+            )] if path else []
+            if ids:
+                article_id = ids[0]
+                placeholders = ",".join("?" * len(ids))
+                self._conn.execute(f"DELETE FROM bands WHERE article_id IN ({placeholders})", ids)
+                self._conn.execute(f"DELETE FROM articles WHERE id IN ({placeholders}) AND id != ?", ids + [article_id])
+                self._conn.execute(
+                    "UPDATE articles SET topic = ?, title = ?, path = ?, topic_size = ?, topic_signature = ?, "
+                    "body_size = ?, body_signature = ? WHERE id = ?",
+                    values + (article_id,)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "INSERT INTO articles (topic, title, path, topic_size, topic_signature, body_size, body_signature, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    values + (time.time(),)
+                )
+                article_id = cursor.lastrowid
+            keys = _band_keys("topic", topic_signature) if topic_items else []
+            if body_signature:
+                keys += _band_keys("body", body_signature)
+            self._conn.executemany("INSERT OR IGNORE INTO bands (key, article_id) VALUES (?, ?)",
+                                   [(key, article_id) for key in keys])
+            self._conn.commit()
+        return article_id
+
+    def find_similar(
+        self,
+        text: str,
+        field: str = "topic",
+        threshold: Optional[float] = None,
+        limit: int = 5
+    ) -> List[SimilarArticle]:
+        """
+        類似する記事を類似度の高い順に返す
+
+        Args:
+            text: 比較するトピックまたは本文
+            field: "topic"（トピック同士）または "body"（本文同士）
+            threshold: 類似度のしきい値（省略時はインスタンスの設定）
+            limit: 返す最大件数
+        """
+        if field not in FIELDS:
+            raise ValueError(f"fieldは {FIELDS} のいずれかです: {field}")
+        threshold = self.threshold if threshold is None else threshold
+        items = shingles(text)
+        if not items:
+            return []
+        signature = minhash(items)
+        keys = _band_keys(field, signature)
+
+        with self._lock:
+            matches = Counter(row[0] for row in self._conn.execute(
+                f"SELECT article_id FROM bands WHERE key IN ({','.join('?' * len(keys))})", keys
+            ))
+            candidate_ids = [
+                article_id for article_id, count in matches.most_common(max(MAX_CANDIDATES, limit))
+                if count >= MIN_BAND_MATCHES
+            ]
+            if not candidate_ids:
+                return []
+            rows = self._conn.execute(
+                f"SELECT id, topic, title, path, {field}_signature FROM articles "
+                f"WHERE id IN ({','.join('?' * len(candidate_ids))})",
+                candidate_ids
+            ).fetchall()
+
+        results = []
+        for article_id, topic, title, path, blob in rows:
+            if not blob:
+                continue
+            score = similarity(signature, array("Q", blob))
+            if score >= threshold:
+                results.append(SimilarArticle(id=article_id, topic=topic, title=title, path=path, score=round(score, 3)))
+        results.sort(key=lambda r: r.score, reverse=True)
+        return results[:limit]
+
+    def contains_path(self, path: str) -> bool:
+        """記事JSONのパスが登録済みか"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM articles WHERE path = ? LIMIT 1", (str(path),)).fetchone()
+        return row is not None
+
+    def stats(self) -> Dict[str, int]:
+        """インデックスの件数"""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+        return {"articles": count}
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
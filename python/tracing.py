@@ -0,0 +1,274 @@
+"""
+Tracing
+実行の段階ごとの所要時間を記録する軽量なトレーシング（--profile）
+
+環境の確認・プロンプトの構築・OpenAI APIの呼び出し・解析・JSONの書き込み・投稿などを
+スパン（名前・開始/終了時刻・親子関係・属性）として記録し、段階ごとの内訳と
+ウォーターフォールを表示する。スパンのフィールド名はOpenTelemetryのJSON形式
+（traceId / spanId / parentSpanId / startTimeUnixNano ...）に合わせている。
+
+Elixirの投稿側とはW3C Trace Contextの`traceparent`で同じトレースをつなぎ、
+Elixir側で記録したスパン（BEAMの起動、Qiita APIへのPOSTなど）を受け取って合わせて表示する。
+
+有効化（enable）するまでは、span()は何も記録しない軽い関数として動く。
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+OK = "ok"
+ERROR = "error"
+
+# ウォーターフォールに表示する最大行数と、バーの幅（文字数）
+DEFAULT_WATERFALL_LINES = 40
+BAR_WIDTH = 30
+
+@dataclass
+class Span:
+    """記録した1区間"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = OK
+    service: str = "python"
+    thread: str = ""
+
+    @property
+    def duration(self) -> float:
+        """所要時間（秒）"""
+        return max(0, self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        """エクスポート用（OpenTelemetryのJSONのフィールド名）"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+            "service": self.service,
+            "thread": self.thread
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Span":
+        """to_dictの形式（Elixir側のスパンも同じ形式）から復元"""
+        return cls(
+            name=data["name"],
+            trace_id=data["traceId"],
+            span_id=data["spanId"],
+            parent_id=data.get("parentSpanId"),
+            start_ns=int(data["startTimeUnixNano"]),
+            end_ns=int(data["endTimeUnixNano"]),
+            attributes=data.get("attributes") or {},
+            status=data.get("status") or OK,
+            service=data.get("service") or "python",
+            thread=data.get("thread") or ""
+        )
+
+# 現在のスレッド（またはasyncioタスク）で実行中のスパン
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+class Tracer:
+    """
+    1回の実行のスパンを集めるトレーサー
+
+    スレッド間で共有して使用できる。時刻はtime.time_ns()を起点にperf_counter_ns()で進めるため、
+    壁時計の補正の影響を受けず、Elixir側のスパンとも同じ時間軸で並べられる。
+    """
+
+    def __init__(self, service: str = "python"):
+        self.service = service
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._wall_base = time.time_ns()
+        self._perf_base = time.perf_counter_ns()
+
+    def now_ns(self) -> int:
+        """現在時刻（UNIXエポックからのナノ秒）"""
+        return self._wall_base + time.perf_counter_ns() - self._perf_base
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """with文の区間をスパンとして記録（例外で抜けた場合はstatusをerrorにする）"""
+        parent = _current.get()
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_ns=self.now_ns(),
+            attributes=attributes,
+            service=self.service,
+            thread=threading.current_thread().name
+        )
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            # sys.exit(0)は正常終了として扱う
+            if not (isinstance(e, SystemExit) and not e.code):
+                span.status = ERROR
+                span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = self.now_ns()
+            with self._lock:
+                self.spans.append(span)
+
+    def traceparent(self) -> str:
+        """子プロセス・デーモンへ渡すW3C Trace Contextの値（現在のスパンを親とする）"""
+        parent = _current.get()
+        return f"00-{self.trace_id}-{parent.span_id if parent else '0' * 16}-01"
+
+    def add_spans(self, spans: List[Dict[str, Any]]) -> None:
+        """他のプロセス（Elixir側）で記録したスパンを追加"""
+        with self._lock:
+            self.spans.extend(Span.from_dict(span) for span in spans)
+
+    def export(self, path: str) -> None:
+        """
+        スパンをファイルに書き出す
+
+        拡張子が.jsonの場合はChromeのトレース形式（chrome://tracing・Perfettoで開ける）、
+        それ以外はスパンを1行1件のJSONLで書き出す。
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        spans = sorted(self.spans, key=lambda span: span.start_ns)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.suffix == ".json":
+                json.dump({"traceEvents": [_chrome_event(span) for span in spans]}, f, ensure_ascii=False)
+            else:
+                for span in spans:
+                    f.write(json.dumps(span.to_dict(), ensure_ascii=False) + "\n")
+
+_tracer: Optional[Tracer] = None
+
+def enable(service: str = "python") -> Tracer:
+    """プロセス全体のトレーサーを有効化"""
+    global _tracer
+    _tracer = Tracer(service)
+    return _tracer
+
+def get_tracer() -> Optional[Tracer]:
+    """有効なトレーサー（無効ならNone）"""
+    return _tracer
+
+def span(name: str, **attributes):
+    """トレーサーが有効ならスパンを記録するコンテキストマネージャー（無効なら何もしない）"""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.span(name, **attributes)
+
+def traceparent() -> Optional[str]:
+    """トレーサーが有効ならtraceparentの値"""
+    return _tracer.traceparent() if _tracer else None
+
+def add_spans(spans: Optional[List[Dict[str, Any]]]) -> None:
+    """トレーサーが有効なら他のプロセスのスパンを追加"""
+    if _tracer and spans:
+        _tracer.add_spans(spans)
+
+def propagate(fn: Callable) -> Callable:
+    """
+    現在のスパンを親として別スレッドで実行する関数を返す
+
+    ThreadPoolExecutorのスレッドにはcontextvarsが引き継がれないため、
+    submit / mapに渡す関数をこれで包む。
+    """
+    if _tracer is None:
+        return fn
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+def summarize(spans: List[Span]) -> List[Dict[str, Any]]:
+    """スパン名ごとの件数・合計・平均・最大（合計の大きい順）"""
+    stages: Dict[str, List[float]] = {}
+    for span in spans:
+        stages.setdefault(span.name, []).append(span.duration)
+    rows = [
+        {"name": name, "count": len(durations), "total": sum(durations),
+         "mean": sum(durations) / len(durations), "max": max(durations)}
+        for name, durations in stages.items()
+    ]
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+def print_profile(tracer: Tracer, limit: int = DEFAULT_WATERFALL_LINES) -> None:
+    """段階ごとの内訳とウォーターフォールを表示"""
+    spans = sorted(tracer.spans, key=lambda span: span.start_ns)
+    if not spans:
+        return
+    start = spans[0].start_ns
+    end = max(span.end_ns for span in spans)
+    wall = max(end - start, 1) / 1e9
+
+    print(f"\n⏱️  プロファイル: {wall:.3f}秒 / {len(spans)}スパン (トレースID: {tracer.trace_id})")
+    print("   段階ごとの内訳（並行に実行した段階は合計が全体の時間を超えます）:")
+    # 全角の見出しは表示幅が2文字分のため、数値の列と揃うように幅を詰める
+    print(f"   {'段階':<28}{'件数':>4}{'合計(秒)':>8}{'平均':>8}{'最大':>8}{'割合':>7}")
+    for row in summarize(spans):
+        print(f"   {row['name']:<30}{row['count']:>6}{row['total']:>10.3f}{row['mean']:>10.3f}"
+              f"{row['max']:>10.3f}{row['total'] / wall:>9.1%}")
+
+    print("   ウォーターフォール:")
+    lines = list(_waterfall(spans))
+    for depth, span in lines[:limit]:
+        offset = (span.start_ns - start) / 1e9
+        left = int((span.start_ns - start) / (end - start or 1) * BAR_WIDTH)
+        width = max(1, int((span.end_ns - span.start_ns) / (end - start or 1) * BAR_WIDTH))
+        bar = " " * left + "█" * min(width, BAR_WIDTH - left)
+        name = ("  " * depth + span.name + ("" if span.service == "python" else f" [{span.service}]"))[:36]
+        mark = " ❌" if span.status == ERROR else ""
+        print(f"   +{offset:8.3f}s {span.duration:8.3f}s  {name:<36} |{bar:<{BAR_WIDTH}}|{mark}")
+    if len(lines) > limit:
+        print(f"   ... 他{len(lines) - limit}スパン（全件は--profile-outputで書き出せます）")
+
+def _waterfall(spans: List[Span]) -> Iterator[tuple]:
+    """(深さ, スパン) を親子順・開始時刻順に返す（親が見つからないスパンは最上位に置く）"""
+    ids = {span.span_id for span in spans}
+    children: Dict[Optional[str], List[Span]] = {}
+    for span in spans:
+        parent = span.parent_id if span.parent_id in ids else None
+        children.setdefault(parent, []).append(span)
+
+    stack = [(0, span) for span in reversed(children.get(None, []))]
+    while stack:
+        depth, span = stack.pop()
+        yield depth, span
+        stack.extend((depth + 1, child) for child in reversed(children.get(span.span_id, [])))
+
+def _chrome_event(span: Span) -> Dict[str, Any]:
+    """Chromeのトレース形式の完了イベント（時刻はマイクロ秒）"""
+    return {
+        "name": span.name,
+        "ph": "X",
+        "ts": span.start_ns / 1000,
+        "dur": (span.end_ns - span.start_ns) / 1000,
+        "pid": span.service,
+        "tid": span.thread or span.service,
+        "args": dict(span.attributes, status=span.status)
+    }